@@ -1,95 +1,87 @@
 # -*- coding: utf-8 -*-
 
 import asyncio
-import threading
-from typing import Coroutine
-from concurrent.futures import Future
-
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 
 from alibabacloud_gpdb20160503.client import Client as gpdb20160503Client
+from alibabacloud_gpdb20160503 import models as gpdb_20160503_models
 from alibabacloud_tea_openapi import models as open_api_models
+from alibabacloud_tea_util import models as util_models
+
+DEFAULT_MAX_CONCURRENCY = 8
+# the sdk keeps one requests session per endpoint, pooling this many connections
+MAX_CONCURRENCY = 40
 
 
-# maybe need multiple clients
 class AliGPDBClient:
-    def __init__(self, ten_env, access_key_id, access_key_secret, endpoint):
-        self.stopEvent = asyncio.Event()
-        self.loop = None
-        self.tasks = asyncio.Queue()
+    """
+    Awaitable gpdb client. The sdk calls block, so they run on a bounded
+    thread pool and callers await plain asyncio futures: the sync sdk path
+    reuses keep-alive connections, where the sdk's own async path opens a new
+    http session for every call.
+    """
+
+    def __init__(
+        self,
+        ten_env,
+        access_key_id,
+        access_key_secret,
+        endpoint,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        **config_options,
+    ):
+        self.ten_env = ten_env
         self.access_key_id = access_key_id
         self.access_key_secret = access_key_secret
         self.endpoint = endpoint
+        self.config_options = config_options
+        self.max_concurrency = min(max(1, max_concurrency), MAX_CONCURRENCY)
         self.client = self.create_client()
-        self.thread = threading.Thread(
-            target=asyncio.run, args=(self.__thread_routine(),)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="gpdb_client"
         )
-        self.thread.start()
-        self.ten_env = ten_env
-
-    async def stop_thread(self):
-        self.stopEvent.set()
 
     def create_client(self) -> gpdb20160503Client:
         config = open_api_models.Config(
             access_key_id=self.access_key_id,
             access_key_secret=self.access_key_secret,
             endpoint=self.endpoint,
+            **self.config_options,
         )
         return gpdb20160503Client(config)
 
     def get(self) -> gpdb20160503Client:
         return self.client
 
-    def close(self):
-        if (self.loop is not None) and self.thread.is_alive():
-            self.stopEvent.set()
-            asyncio.run_coroutine_threadsafe(self.stop_thread(), self.loop)
-            self.thread.join()
-
-    async def __thread_routine(self):
-        self.ten_env.log_info("client __thread_routine start")
-        self.loop = asyncio.get_running_loop()
-        tasks = set()
-        while not self.stopEvent.is_set():
-            if not self.tasks.empty():
-                coro, future = await self.tasks.get()
-                try:
-                    task = asyncio.create_task(coro)
-                    tasks.add(task)
-                    task.add_done_callback(lambda t: future.set_result(t.result()))
-                except Exception as e:
-                    future.set_exception(e)
-            elif tasks:
-                done, tasks = await asyncio.wait(
-                    tasks, return_when=asyncio.FIRST_COMPLETED
-                )
-                for task in done:
-                    if task.exception():
-                        self.ten_env.log_error(f"task exception: {task.exception()}")
-                        future.set_exception(task.exception())
-            else:
-                await asyncio.sleep(0.1)
-        self.ten_env.log_info("client __thread_routine end")
-
-    async def submit_task(self, coro: Coroutine) -> Future:
-        future = Future()
-        await self.tasks.put((coro, future))
-        return future
-
-    def submit_task_with_new_thread(self, coro: Coroutine) -> Future:
-        future = Future()
+    async def call(self, method: str, *args) -> Any:
+        """Run the blocking sdk method named `method` on the pool and await it."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(getattr(self.client, method), *args)
+        )
 
-        def run_coro_in_new_thread():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                result = loop.run_until_complete(coro)
-                future.set_result(result)
-            except Exception as e:
-                future.set_exception(e)
-            finally:
-                loop.close()
+    async def health_check(self, timeout_ms: int = 3000) -> bool:
+        """Cheap authenticated round trip to the endpoint."""
+        start_time = time.perf_counter()
+        try:
+            runtime = util_models.RuntimeOptions(
+                read_timeout=timeout_ms, connect_timeout=timeout_ms
+            )
+            await self.call(
+                "describe_regions_with_options",
+                gpdb_20160503_models.DescribeRegionsRequest(),
+                runtime,
+            )
+        except Exception as e:
+            self.ten_env.log_error(f"gpdb health check failed: {e}")
+            return False
+        self.ten_env.log_info(
+            f"gpdb health check ok, cost {int((time.perf_counter() - start_time) * 1000)}ms"
+        )
+        return True
 
-        thread = threading.Thread(target=run_coro_in_new_thread)
-        thread.start()
-        return future
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
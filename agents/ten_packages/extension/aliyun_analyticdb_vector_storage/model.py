@@ -6,6 +6,9 @@ import json
 from typing import Dict, List, Any, Tuple
 from alibabacloud_tea_util import models as util_models
 
+# texts per delete request, the filter lists them all
+DELETE_BATCH_SIZE = 100
+
 
 class Model:
     def __init__(self, ten_env, region_id, dbinstance_id, client):
@@ -51,8 +54,8 @@ class Model:
             runtime = util_models.RuntimeOptions(
                 read_timeout=self.read_timeout, connect_timeout=self.connect_timeout
             )
-            response = await self.get_client().init_vector_database_with_options_async(
-                request, runtime
+            response = await self.client.call(
+                "init_vector_database_with_options", request, runtime
             )
             self.ten_env.log_debug(
                 f"init_vector_database response code: {response.status_code}, body:{response.body}"
@@ -99,8 +102,8 @@ class Model:
             runtime = util_models.RuntimeOptions(
                 read_timeout=self.read_timeout, connect_timeout=self.connect_timeout
             )
-            response = await self.get_client().create_namespace_with_options_async(
-                request, runtime
+            response = await self.client.call(
+                "create_namespace_with_options", request, runtime
             )
             self.ten_env.log_debug(
                 f"create_namespace response code: {response.status_code}, body:{response.body}"
@@ -185,8 +188,8 @@ class Model:
             runtime = util_models.RuntimeOptions(
                 read_timeout=self.read_timeout, connect_timeout=self.connect_timeout
             )
-            response = await self.get_client().create_collection_with_options_async(
-                request, runtime
+            response = await self.client.call(
+                "create_collection_with_options", request, runtime
             )
             self.ten_env.log_debug(
                 f"create_document_collection response code: {response.status_code}, body:{response.body}"
@@ -231,8 +234,8 @@ class Model:
             runtime = util_models.RuntimeOptions(
                 read_timeout=self.read_timeout, connect_timeout=self.connect_timeout
             )
-            response = await self.get_client().delete_collection_with_options_async(
-                request, runtime
+            response = await self.client.call(
+                "delete_collection_with_options", request, runtime
             )
             self.ten_env.log_info(
                 f"delete_collection response code: {response.status_code}, body:{response.body}"
@@ -321,10 +324,10 @@ class Model:
             runtime = util_models.RuntimeOptions(
                 read_timeout=self.read_timeout, connect_timeout=self.connect_timeout
             )
-            response = (
-                await self.get_client().upsert_collection_data_with_options_async(
-                    upsert_collection_data_request, runtime
-                )
+            response = await self.client.call(
+                "upsert_collection_data_with_options",
+                upsert_collection_data_request,
+                runtime,
             )
             self.ten_env.log_debug(
                 f"upsert_collection response code: {response.status_code}, body:{response.body}"
@@ -333,6 +336,45 @@ class Model:
             self.ten_env.log_error(f"Error: {e}")
             return e
 
+    async def delete_collection_data_async(
+        self,
+        collection,
+        namespace,
+        namespace_password,
+        file_name: str,
+        contents: List[str],
+    ) -> None:
+        def quote(value: str) -> str:
+            return "'" + value.replace("'", "''") + "'"
+
+        runtime = util_models.RuntimeOptions(
+            read_timeout=self.read_timeout, connect_timeout=self.connect_timeout
+        )
+        # keep each filter bounded, a re-uploaded document may drop many chunks
+        for i in range(0, len(contents), DELETE_BATCH_SIZE):
+            batch = contents[i : i + DELETE_BATCH_SIZE]
+            try:
+                collection_data_filter = (
+                    f"file_name = {quote(file_name)} AND content IN ({', '.join(quote(c) for c in batch)})"
+                )
+                request = gpdb_20160503_models.DeleteCollectionDataRequest(
+                    region_id=self.region_id,
+                    dbinstance_id=self.dbinstance_id,
+                    collection=collection,
+                    namespace_password=namespace_password,
+                    namespace=namespace,
+                    collection_data_filter=collection_data_filter,
+                )
+                response = await self.client.call(
+                    "delete_collection_data_with_options", request, runtime
+                )
+                self.ten_env.log_debug(
+                    f"delete_collection_data response code: {response.status_code}, body:{response.body}"
+                )
+            except Exception as e:
+                self.ten_env.log_error(f"Error: {e}")
+                return e
+
     # pylint: disable=redefined-builtin
     def query_collection_data(
         self,
@@ -418,8 +460,10 @@ class Model:
             runtime = util_models.RuntimeOptions(
                 read_timeout=self.read_timeout, connect_timeout=self.connect_timeout
             )
-            response = await self.get_client().query_collection_data_with_options_async(
-                query_collection_data_request, runtime
+            response = await self.client.call(
+                "query_collection_data_with_options",
+                query_collection_data_request,
+                runtime,
             )
             self.ten_env.log_debug(f"query_collection response code: {response.status_code}")
             return response, None
@@ -430,20 +474,31 @@ class Model:
     def parse_collection_data(
         self, body: gpdb_20160503_models.QueryCollectionDataResponseBody
     ) -> str:
+        return json.dumps(self.parse_collection_matches(body))
+
+    def parse_collection_matches(
+        self, body: gpdb_20160503_models.QueryCollectionDataResponseBody
+    ) -> List[Dict[str, Any]]:
+        """Matches by descending score, with their vector if the query included values."""
         try:
             matches = body.to_map()["Matches"]["match"]
-            results = [
-                {"content": match["Metadata"]["content"], "score": match["Score"]}
-                for match in matches
-            ]
+            results = []
+            for match in matches:
+                result = {
+                    "content": match["Metadata"]["content"],
+                    "score": match["Score"],
+                    "file_name": match["Metadata"].get("file_name", ""),
+                }
+                if match.get("Values"):
+                    result["embedding"] = match["Values"]["value"]
+                results.append(result)
             results.sort(key=lambda x: x["score"], reverse=True)
-            json_str = json.dumps(results)
-            return json_str
+            return results
         except Exception as e:
             self.ten_env.log_error(
                 f"parse collection data failed, error: {e}, data: {body.to_map()}"
             )
-            return "[]"
+            return []
 
     def list_collections(self, namespace, namespace_password) -> Tuple[List[str], Any]:
         try:
@@ -479,8 +534,8 @@ class Model:
             runtime = util_models.RuntimeOptions(
                 read_timeout=self.read_timeout, connect_timeout=self.connect_timeout
             )
-            response = await self.get_client().list_collections_with_options_async(
-                request, runtime
+            response = await self.client.call(
+                "list_collections_with_options", request, runtime
             )
             self.ten_env.log_debug(
                 f"list_collections response code: {response.status_code}, body:{response.body}"
@@ -535,8 +590,8 @@ class Model:
             runtime = util_models.RuntimeOptions(
                 read_timeout=self.read_timeout, connect_timeout=self.connect_timeout
             )
-            response = await self.get_client().create_vector_index_with_options_async(
-                request, runtime
+            response = await self.client.call(
+                "create_vector_index_with_options", request, runtime
             )
             self.ten_env.log_debug(
                 f"create_vector_index response code: {response.status_code}, body:{response.body}"
@@ -0,0 +1,246 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Query latency of the gpdb client against a local stub of the gpdb API, which
+answers QueryCollectionData after --server-ms. The stub serves https with a
+self-signed certificate added to the certifi bundle, like the real endpoint;
+it needs the openssl command.
+
+Compared are the previous dispatch, a thread polling its task queue every
+0.1s and running the sdk's async call, the sdk's async call awaited directly,
+which opens a new https session per call, and AliGPDBClient's thread pool.
+
+    python tests/bench_client.py [--queries 200] [--concurrency 8] [--server-ms 5] [--http]
+"""
+import argparse
+import asyncio
+import json
+import random
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import certifi  # noqa: E402
+from alibabacloud_gpdb20160503 import models as gpdb_20160503_models  # noqa: E402
+from alibabacloud_tea_util import models as util_models  # noqa: E402
+
+from client import AliGPDBClient  # noqa: E402
+
+
+class StubGPDB(BaseHTTPRequestHandler):
+    """
+    Answers every action with success. A query takes server_ms, an upsert
+    write_ms plus row_ms per row, with at most `writers` upserts at a time.
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server_ms = 0.0
+    write_ms = 0.0
+    row_ms = 0.0
+    writers = threading.Semaphore(4)
+    requests = 0
+    rows = 0
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers.get("content-length") or 0))
+        action = self.headers.get("x-acs-action")
+        body = {"RequestId": "stub", "Status": "success"}
+        StubGPDB.requests += 1
+        if action == "UpsertCollectionData":
+            count = len(json.loads(parse_qs(data.decode())["Rows"][0]))
+            with self.writers:
+                time.sleep((self.write_ms + self.row_ms * count) / 1000)
+            StubGPDB.rows += count
+        elif action == "QueryCollectionData":
+            time.sleep(self.server_ms / 1000)
+            body["Matches"] = {
+                "match": [
+                    {"Id": str(i), "Score": 1 - i / 10, "Metadata": {"content": f"chunk {i}"}}
+                    for i in range(5)
+                ]
+            }
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST
+
+    def log_message(self, *args):
+        pass
+
+
+class NullTenEnv:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class PollingDispatcher:
+    """The dispatch AliGPDBClient used to do: a queue polled every 0.1s."""
+
+    def __init__(self):
+        self.loop = None
+        self.tasks = None
+        self.stopped = False
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=asyncio.run, args=(self.routine(),))
+        self.thread.start()
+        self.ready.wait()
+
+    async def routine(self):
+        self.loop = asyncio.get_running_loop()
+        self.tasks = asyncio.Queue()
+        self.ready.set()
+        while not self.stopped:
+            if not self.tasks.empty():
+                coro, future = await self.tasks.get()
+                task = asyncio.create_task(coro)
+                task.add_done_callback(lambda t, f=future: f.set_result(t.result()))
+            else:
+                await asyncio.sleep(0.1)
+
+    async def submit(self, coro):
+        future = Future()
+        await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(self.tasks.put((coro, future)), self.loop)
+        )
+        return await asyncio.wrap_future(future)
+
+    def close(self):
+        self.stopped = True
+        self.thread.join()
+
+
+def serve_tls(server, directory):
+    """Wrap the stub in tls, returning a ca bundle which trusts it."""
+    cert, key, bundle = (f"{directory}/{name}" for name in ("cert.pem", "key.pem", "ca.pem"))
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", key, "-out", cert, "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True,
+        capture_output=True,
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    # handshake in the handler threads, not in the accepting one
+    server.socket = context.wrap_socket(
+        server.socket, server_side=True, do_handshake_on_connect=False
+    )
+    with open(bundle, "w", encoding="utf-8") as out:
+        for path in (certifi.where(), cert):
+            with open(path, encoding="utf-8") as f:
+                out.write(f.read())
+    return bundle
+
+
+def query_request(dim, ca):
+    vector = [random.random() for _ in range(dim)]
+    request = gpdb_20160503_models.QueryCollectionDataRequest(
+        region_id="cn-stub",
+        dbinstance_id="stub",
+        collection="bench",
+        namespace="ns",
+        namespace_password="pw",
+        vector=vector,
+        top_k=5,
+    )
+    runtime = util_models.RuntimeOptions(read_timeout=10000, connect_timeout=10000, ca=ca)
+    return request, runtime
+
+
+async def run(query, args):
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await query()
+            latencies.append(time.perf_counter() - start)
+
+    await one()  # warm up connections
+    latencies.clear()
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.queries)))
+    return latencies, args.queries / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--server-ms", type=float, default=5)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--http", action="store_true", help="serve the stub without tls")
+    args = parser.parse_args()
+
+    StubGPDB.server_ms = args.server_ms
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGPDB)
+    directory = tempfile.TemporaryDirectory()
+    ca = None if args.http else serve_tls(server, directory.name)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"127.0.0.1:{server.server_port}"
+
+    client = AliGPDBClient(
+        NullTenEnv(),
+        "id",
+        "secret",
+        endpoint,
+        max_concurrency=args.concurrency,
+        protocol="http" if args.http else "https",
+        ca=ca,
+    )
+    sdk = client.get()
+    request, runtime = query_request(args.dim, ca)
+    polling = PollingDispatcher()
+
+    modes = {
+        "polling thread": lambda: polling.submit(
+            sdk.query_collection_data_with_options_async(request, runtime)
+        ),
+        "sdk async": lambda: sdk.query_collection_data_with_options_async(request, runtime),
+        "thread pool": lambda: client.call(
+            "query_collection_data_with_options", request, runtime
+        ),
+    }
+
+    print(
+        f"{args.queries} queries, concurrency {args.concurrency}, "
+        f"{'http' if args.http else 'https'} stub answers in {args.server_ms:g}ms"
+    )
+    print(f"{'client':<16}{'p50':>9}{'p99':>9}{'qps':>8}")
+    for name, query in modes.items():
+        latencies, qps = asyncio.run(run(query, args))
+        latencies.sort()
+        p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+        print(
+            f"{name:<16}{statistics.median(latencies) * 1000:>7.1f}ms"
+            f"{p99 * 1000:>7.1f}ms{qps:>8.0f}"
+        )
+    print(f"health check: {asyncio.run(client.health_check())}")
+
+    polling.close()
+    client.close()
+    server.shutdown()
+    directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
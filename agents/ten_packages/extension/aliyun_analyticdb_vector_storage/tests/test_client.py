@@ -0,0 +1,93 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from client import AliGPDBClient  # noqa: E402
+
+
+class FakeTenEnv:
+    def __init__(self):
+        self.errors = []
+
+    def log_info(self, msg):
+        pass
+
+    def log_error(self, msg):
+        self.errors.append(msg)
+
+
+class FakeSDK:
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def query_collection_data_with_options(self, request, runtime):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+        return request
+
+    def describe_regions_with_options(self, request, runtime):
+        raise ConnectionError("endpoint unreachable")
+
+
+def make_client(max_concurrency):
+    client = AliGPDBClient(
+        FakeTenEnv(), "id", "secret", "127.0.0.1:1", max_concurrency=max_concurrency
+    )
+    client.client = FakeSDK()
+    return client
+
+
+def test_calls_are_bounded_by_max_concurrency():
+    client = make_client(2)
+
+    async def main():
+        return await asyncio.gather(
+            *(client.call("query_collection_data_with_options", i, None) for i in range(6))
+        )
+
+    assert asyncio.run(main()) == list(range(6))
+    assert client.client.max_running == 2
+    client.close()
+
+
+def test_call_does_not_block_the_loop():
+    client = make_client(1)
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.001)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        await client.call("query_collection_data_with_options", None, None)
+        ticker.cancel()
+        return ticks
+
+    assert asyncio.run(main()) > 3
+    client.close()
+
+
+def test_health_check_reports_failure():
+    client = make_client(1)
+    assert asyncio.run(client.health_check()) is False
+    assert "unreachable" in client.ten_env.errors[0]
+    client.close()
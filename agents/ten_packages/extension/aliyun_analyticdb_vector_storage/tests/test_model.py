@@ -0,0 +1,66 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from model import DELETE_BATCH_SIZE, Model  # noqa: E402
+
+
+class FakeTenEnv:
+    def __init__(self):
+        self.errors = []
+
+    def log_debug(self, msg):
+        pass
+
+    def log_error(self, msg):
+        self.errors.append(msg)
+
+
+class FakeClient:
+    def __init__(self, fail_at: int = -1):
+        self.filters = []
+        self.fail_at = fail_at
+
+    async def call(self, method, request, runtime):
+        assert method == "delete_collection_data_with_options"
+        if len(self.filters) == self.fail_at:
+            raise ConnectionError("endpoint unreachable")
+        self.filters.append(request.collection_data_filter)
+        return SimpleNamespace(status_code=200, body={})
+
+
+def delete(client, contents):
+    model = Model(FakeTenEnv(), "region", "instance", client)
+    return asyncio.run(
+        model.delete_collection_data_async("coll", "ns", "pw", "a.pdf", contents)
+    )
+
+
+def test_delete_is_split_into_bounded_filters():
+    client = FakeClient()
+    contents = [f"chunk {i}" for i in range(DELETE_BATCH_SIZE * 2 + 1)]
+    assert delete(client, contents) is None
+    assert len(client.filters) == 3
+    assert client.filters[0].count("'chunk ") == DELETE_BATCH_SIZE
+    assert client.filters[2] == "file_name = 'a.pdf' AND content IN ('chunk 200')"
+
+
+def test_delete_quotes_contents():
+    client = FakeClient()
+    assert delete(client, ["it's"]) is None
+    assert client.filters == ["file_name = 'a.pdf' AND content IN ('it''s')"]
+
+
+def test_delete_stops_at_the_first_failed_batch():
+    client = FakeClient(fail_at=1)
+    err = delete(client, [f"chunk {i}" for i in range(DELETE_BATCH_SIZE * 3)])
+    assert isinstance(err, ConnectionError)
+    assert len(client.filters) == 1
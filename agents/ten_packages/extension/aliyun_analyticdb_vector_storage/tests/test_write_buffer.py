@@ -0,0 +1,105 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from write_buffer import WriteBuffer  # noqa: E402
+
+
+def rows(name, n):
+    return [("f", f"{name}{i}", [0.0]) for i in range(n)]
+
+
+class Backend:
+    def __init__(self):
+        self.bulks = []
+        self.gate = None
+
+    async def write(self, collection, batch):
+        self.bulks.append((collection, [content for _, content, _ in batch]))
+        if self.gate is not None:
+            await self.gate.wait()
+        if any(content.startswith("bad") for _, content, _ in batch):
+            return Exception("bad row")
+        return None
+
+
+def test_concurrent_upserts_are_coalesced():
+    backend = Backend()
+
+    async def main():
+        buffer = WriteBuffer(backend.write, max_rows=200, max_delay_ms=10)
+        return await asyncio.gather(*(buffer.upsert("c", rows(i, 5)) for i in range(10)))
+
+    results = asyncio.run(main())
+    assert [r.written for r in results] == [5] * 10
+    assert len(backend.bulks) == 1
+    assert len(backend.bulks[0][1]) == 50
+
+
+def test_upsert_split_across_bulks_completes_once_all_written():
+    backend = Backend()
+
+    async def main():
+        buffer = WriteBuffer(backend.write, max_rows=8, max_delay_ms=1000)
+        first = asyncio.ensure_future(buffer.upsert("c", rows("a", 5)))
+        second = asyncio.ensure_future(buffer.upsert("c", rows("b", 5)))
+        await asyncio.sleep(0)
+        await buffer.flush("c")
+        return await first, await second
+
+    first, second = asyncio.run(main())
+    assert [len(b) for _, b in backend.bulks] == [8, 2]
+    assert (first.written, second.written) == (5, 5)
+
+
+def test_failed_bulk_only_fails_the_bad_upsert():
+    backend = Backend()
+
+    async def main():
+        buffer = WriteBuffer(backend.write, max_delay_ms=5)
+        return await asyncio.gather(
+            buffer.upsert("c", rows("good", 3)),
+            buffer.upsert("c", rows("bad", 2)),
+            buffer.upsert("d", rows("other", 1)),
+        )
+
+    good, bad, other = asyncio.run(main())
+    assert (good.written, good.failed, good.error) == (3, 0, None)
+    assert (bad.written, bad.failed) == (0, 2)
+    assert str(bad.error) == "bad row"
+    assert other.written == 1
+    # the failed bulk, then each of its upserts alone, and the other collection
+    assert sorted(len(b) for _, b in backend.bulks) == [1, 2, 3, 5]
+
+
+def test_backpressure_holds_upserts_until_rows_are_written():
+    backend = Backend()
+
+    async def main():
+        backend.gate = asyncio.Event()
+        buffer = WriteBuffer(backend.write, max_rows=4, max_pending_rows=8, max_concurrency=1)
+        first = asyncio.ensure_future(buffer.upsert("c", rows("a", 8)))
+        await asyncio.sleep(0.01)
+        held = asyncio.ensure_future(buffer.upsert("c", rows("b", 1)))
+        await asyncio.sleep(0.01)
+        assert not held.done()
+        assert buffer.pending_rows == 8
+        backend.gate.set()
+        return await first, await held
+
+    first, held = asyncio.run(main())
+    assert (first.written, held.written) == (8, 1)
+
+
+def test_empty_upsert():
+    async def main():
+        return await WriteBuffer(Backend().write).upsert("c", [])
+
+    assert asyncio.run(main()).written == 0
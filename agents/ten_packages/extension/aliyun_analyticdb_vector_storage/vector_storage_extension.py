@@ -15,6 +15,16 @@ from ten import (
 
 import threading
 from datetime import datetime
+from typing import Optional
+
+from ten_ai_base.embedding import (
+    BINARY_EMBEDDING_FORMATS,
+    PROPERTY_EMBEDDING_FORMAT,
+    decode_embedding,
+    decode_embeddings,
+    embedding_format_of,
+    encode_embeddings,
+)
 
 
 class AliPGDBExtension(Extension):
@@ -27,16 +37,24 @@ class AliPGDBExtension(Extension):
         self.region_id = os.environ.get("ADBPG_INSTANCE_REGION")
         self.dbinstance_id = os.environ.get("ADBPG_INSTANCE_ID")
         self.endpoint = "gpdb.aliyuncs.com"
+        self.client = None
         self.model = None
+        self.write_buffer = None
         self.account = os.environ.get("ADBPG_ACCOUNT")
         self.account_password = os.environ.get("ADBPG_ACCOUNT_PASSWORD")
         self.namespace = os.environ.get("ADBPG_NAMESPACE")
         self.namespace_password = os.environ.get("ADBPG_NAMESPACE_PASSWORD")
+        self.max_concurrency = 8
+        self.upsert_batch_rows = 200
+        self.upsert_flush_ms = 20
+        self.upsert_max_pending_rows = 2000
+        self.upsert_max_concurrency = 4
 
     async def __thread_routine(self, ten_env: TenEnv):
         ten_env.log_info("__thread_routine start")
         self.loop = asyncio.get_running_loop()
         ten_env.on_start_done()
+        await self.client.health_check()
         await self.stopEvent.wait()
 
     async def stop_thread(self):
@@ -66,6 +84,21 @@ class AliPGDBExtension(Extension):
         self.namespace_password = self.get_property_string(
             ten, "ADBPG_NAMESPACE_PASSWORD", self.namespace_password
         )
+        self.max_concurrency = self.get_property_int(
+            ten, "max_concurrency", self.max_concurrency
+        )
+        self.upsert_batch_rows = self.get_property_int(
+            ten, "upsert_batch_rows", self.upsert_batch_rows
+        )
+        self.upsert_flush_ms = self.get_property_int(
+            ten, "upsert_flush_ms", self.upsert_flush_ms
+        )
+        self.upsert_max_pending_rows = self.get_property_int(
+            ten, "upsert_max_pending_rows", self.upsert_max_pending_rows
+        )
+        self.upsert_max_concurrency = self.get_property_int(
+            ten, "upsert_max_concurrency", self.upsert_max_concurrency
+        )
 
         if self.region_id in (
             "cn-beijing",
@@ -86,11 +119,23 @@ class AliPGDBExtension(Extension):
         # lazy import packages which requires long time to load
         from .client import AliGPDBClient
         from .model import Model
+        from .write_buffer import WriteBuffer
 
-        client = AliGPDBClient(
-            ten, self.access_key_id, self.access_key_secret, self.endpoint
+        self.client = AliGPDBClient(
+            ten,
+            self.access_key_id,
+            self.access_key_secret,
+            self.endpoint,
+            max_concurrency=self.max_concurrency,
+        )
+        self.model = Model(ten, self.region_id, self.dbinstance_id, self.client)
+        self.write_buffer = WriteBuffer(
+            self.write_rows,
+            max_rows=self.upsert_batch_rows,
+            max_delay_ms=self.upsert_flush_ms,
+            max_pending_rows=self.upsert_max_pending_rows,
+            max_concurrency=self.upsert_max_concurrency,
         )
-        self.model = Model(ten, self.region_id, self.dbinstance_id, client)
         self.thread = threading.Thread(
             target=asyncio.run, args=(self.__thread_routine(ten),)
         )
@@ -102,9 +147,18 @@ class AliPGDBExtension(Extension):
     def on_stop(self, ten: TenEnv) -> None:
         ten.log_info("on_stop")
         if self.thread is not None and self.thread.is_alive():
+            try:
+                asyncio.run_coroutine_threadsafe(
+                    self.write_buffer.flush(), self.loop
+                ).result(timeout=10)
+            except Exception as e:
+                ten.log_warn(f"failed to flush buffered upserts: {e}")
             asyncio.run_coroutine_threadsafe(self.stop_thread(), self.loop)
             self.thread.join()
         self.thread = None
+        if self.client is not None:
+            self.client.close()
+            self.client = None
         ten.on_stop_done()
         return
 
@@ -127,6 +181,10 @@ class AliPGDBExtension(Extension):
                 asyncio.run_coroutine_threadsafe(
                     self.async_upsert_vector(ten, cmd), self.loop
                 )
+            elif cmd_name == "delete_vector":
+                asyncio.run_coroutine_threadsafe(
+                    self.async_delete_vector(ten, cmd), self.loop
+                )
             elif cmd_name == "query_vector":
                 asyncio.run_coroutine_threadsafe(
                     self.async_query_vector(ten, cmd), self.loop
@@ -165,13 +223,48 @@ class AliPGDBExtension(Extension):
         file = cmd.get_property_string("file_name")
         content = cmd.get_property_string("content")
         obj = json.loads(content)
-        rows = [(file, item["text"], item["embedding"]) for item in obj]
+        if embedding_format_of(cmd) in BINARY_EMBEDDING_FORMATS:
+            embeddings = decode_embeddings(cmd.get_property_buf("embeddings_buf"))
+            if len(embeddings) != len(obj):
+                ten.log_error(
+                    f"upsert_vector got {len(embeddings)} embeddings for {len(obj)} texts"
+                )
+                ten.return_result(CmdResult.create(StatusCode.ERROR), cmd)
+                return
+        else:
+            embeddings = [item["embedding"] for item in obj]
+        rows = [(file, item["text"], e) for item, e in zip(obj, embeddings)]
+
+        # coalesced with the rows of other upserts into bulk writes
+        result = await self.write_buffer.upsert(collection, rows)
+        ten.log_info(
+            f"upsert_vector finished for file {file}, collection {collection}, rows len {len(rows)}, failed {result.failed}, err {result.error}, cost {int((datetime.now() - start_time).total_seconds() * 1000)}ms"
+        )
+        ret = CmdResult.create(
+            StatusCode.OK if result.failed == 0 else StatusCode.ERROR
+        )
+        ret.set_property_int("upserted_rows", result.written)
+        ret.set_property_int("failed_rows", result.failed)
+        ten.return_result(ret, cmd)
 
-        err = await self.model.upsert_collection_data_async(
+    async def write_rows(self, collection: str, rows) -> Optional[Exception]:
+        return await self.model.upsert_collection_data_async(
             collection, self.namespace, self.namespace_password, rows
         )
+
+    async def async_delete_vector(self, ten: TenEnv, cmd: Cmd):
+        start_time = datetime.now()
+        collection = cmd.get_property_string("collection_name")
+        file = cmd.get_property_string("file_name")
+        contents = json.loads(cmd.get_property_string("content"))
+
+        # rows buffered before the delete must not be written after it
+        await self.write_buffer.flush(collection)
+        err = await self.model.delete_collection_data_async(
+            collection, self.namespace, self.namespace_password, file, contents
+        )
         ten.log_info(
-            f"upsert_vector finished for file {file}, collection {collection}, rows len {len(rows)}, err {err}, cost {int((datetime.now() - start_time).total_seconds() * 1000)}ms"
+            f"delete_vector finished for file {file}, collection {collection}, rows len {len(contents)}, err {err}, cost {int((datetime.now() - start_time).total_seconds() * 1000)}ms"
         )
         if err is None:
             ten.return_result(CmdResult.create(StatusCode.OK), cmd)
@@ -181,26 +274,51 @@ class AliPGDBExtension(Extension):
     async def async_query_vector(self, ten: TenEnv, cmd: Cmd):
         start_time = datetime.now()
         collection = cmd.get_property_string("collection_name")
-        embedding = cmd.get_property_to_json("embedding")
         top_k = cmd.get_property_int("top_k")
-        vector = json.loads(embedding)
+        if embedding_format_of(cmd) in BINARY_EMBEDDING_FORMATS:
+            vector = decode_embedding(cmd.get_property_buf("embedding_buf"))
+        else:
+            vector = json.loads(cmd.get_property_to_json("embedding"))
+        include_embedding = False
+        try:
+            include_embedding = cmd.get_property_bool("include_embedding")
+        except Exception:
+            pass
         response, error = await self.model.query_collection_data_async(
-            collection, self.namespace, self.namespace_password, vector, top_k=top_k
+            collection,
+            self.namespace,
+            self.namespace_password,
+            vector,
+            top_k=top_k,
+            include_values=include_embedding or None,
         )
         ten.log_info(
-            f"query_vector finished for collection {collection}, embedding len {len(embedding)}, err {error}, cost {int((datetime.now() - start_time).total_seconds() * 1000)}ms"
+            f"query_vector finished for collection {collection}, embedding len {len(vector)}, err {error}, cost {int((datetime.now() - start_time).total_seconds() * 1000)}ms"
         )
 
         if error:
             return ten.return_result(CmdResult.create(StatusCode.ERROR), cmd)
         else:
-            body = self.model.parse_collection_data(response.body)
+            matches = self.model.parse_collection_matches(response.body)
             ret = CmdResult.create(StatusCode.OK)
-            ret.set_property_from_json("response", body)
+            fmt = embedding_format_of(cmd)
+            if (
+                include_embedding
+                and fmt in BINARY_EMBEDDING_FORMATS
+                and matches
+                and all(match.get("embedding") for match in matches)
+            ):
+                # stored vectors, for the consumer to re-rank without embedding
+                # again, they are left in the json if any match lacks one
+                embeddings = [match.pop("embedding") for match in matches]
+                ret.set_property_string(PROPERTY_EMBEDDING_FORMAT, fmt)
+                ret.set_property_buf("embeddings_buf", encode_embeddings(embeddings, fmt))
+            ret.set_property_from_json("response", json.dumps(matches))
             ten.return_result(ret, cmd)
 
     async def async_delete_collection(self, ten: TenEnv, cmd: Cmd):
         collection = cmd.get_property_string("collection_name")
+        await self.write_buffer.flush(collection)
         # pylint: disable=too-many-function-args
         err = await self.model.delete_collection_async(
             self.account, self.account_password, self.namespace, collection
@@ -216,3 +334,10 @@ class AliPGDBExtension(Extension):
         except Exception as e:
             ten.log_error(f"Error: {e}")
             return default
+
+    def get_property_int(self, ten: TenEnv, key: str, default: int) -> int:
+        try:
+            return ten.get_property_int(key.lower())
+        except Exception as e:
+            ten.log_warn(f"Error: {e}")
+            return default
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+# (file_name, content, vector)
+Row = Tuple[str, str, List[float]]
+WriteFn = Callable[[str, List[Row]], Awaitable[Optional[Exception]]]
+
+
+class _Upsert:
+    """Rows of one upsert_vector cmd, possibly written across several bulks."""
+
+    def __init__(self, rows: List[Row]):
+        self.rows = rows
+        self.unsent = len(rows)
+        self.outstanding = 0
+        self.written = 0
+        self.failed = 0
+        self.error: Optional[Exception] = None
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class UpsertResult:
+    def __init__(self, written: int, failed: int, error: Optional[Exception]):
+        self.written = written
+        self.failed = failed
+        self.error = error
+
+
+class WriteBuffer:
+    """
+    Coalesces the rows of upsert cmds into bulk writes per collection, sent
+    once max_rows rows are buffered or max_delay_ms after the first of them.
+
+    At most max_concurrency bulks are written at once. A bulk takes its rows
+    when it gets to be written, so rows arriving while the writes are busy
+    join the next bulk instead of queueing as many small ones.
+
+    upsert() waits while max_pending_rows rows are buffered or being written,
+    which holds back the cmd result and so the sender. A bulk which fails is
+    written again cmd by cmd, so one bad cmd does not fail the others it was
+    coalesced with. Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        write: WriteFn,
+        max_rows: int = 200,
+        max_delay_ms: float = 20,
+        max_pending_rows: int = 2000,
+        max_concurrency: int = 4,
+    ):
+        self.write = write
+        self.max_rows = max(1, max_rows)
+        self.max_delay = max(0.0, max_delay_ms) / 1000
+        self.max_pending_rows = max(self.max_rows, max_pending_rows)
+        self.semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self.buffers: Dict[str, List[_Upsert]] = {}
+        self.buffered_rows: Dict[str, int] = {}
+        self.timers: Dict[str, asyncio.TimerHandle] = {}
+        self.senders: Dict[str, asyncio.Task] = {}
+        self.writing: Dict[str, Set[asyncio.Task]] = {}
+        self.pending_rows = 0
+        self.space = asyncio.Condition()
+        self.bulks = 0
+
+    async def upsert(self, collection: str, rows: List[Row]) -> UpsertResult:
+        if not rows:
+            return UpsertResult(0, 0, None)
+        async with self.space:
+            # a cmd larger than the limit still goes through, alone
+            await self.space.wait_for(
+                lambda: self.pending_rows == 0
+                or self.pending_rows + len(rows) <= self.max_pending_rows
+            )
+            self.pending_rows += len(rows)
+
+        upsert = _Upsert(rows)
+        self.buffers.setdefault(collection, []).append(upsert)
+        self.buffered_rows[collection] = self.buffered_rows.get(collection, 0) + len(rows)
+        if self.buffered_rows[collection] >= self.max_rows or not self.max_delay:
+            self._send(collection)
+        elif collection not in self.timers:
+            self.timers[collection] = asyncio.get_running_loop().call_later(
+                self.max_delay, self._send, collection
+            )
+        return await upsert.future
+
+    async def flush(self, collection: Optional[str] = None) -> None:
+        """Send what is buffered and wait until it is written."""
+        if collection is not None:
+            collections = [collection]
+        else:
+            collections = list(self.buffers.keys() | self.writing.keys())
+        for name in collections:
+            self._send(name)
+            sender = self.senders.get(name)
+            if sender is not None:
+                await asyncio.gather(sender, return_exceptions=True)
+            tasks = self.writing.get(name)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _send(self, collection: str) -> None:
+        timer = self.timers.pop(collection, None)
+        if timer is not None:
+            timer.cancel()
+        if self.buffered_rows.get(collection) and collection not in self.senders:
+            sender = asyncio.get_running_loop().create_task(self._sender(collection))
+            self.senders[collection] = sender
+
+    async def _sender(self, collection: str) -> None:
+        try:
+            while self.buffered_rows[collection]:
+                await self.semaphore.acquire()
+                parts = self._take(collection, self.max_rows)
+                task = asyncio.get_running_loop().create_task(
+                    self._write(collection, parts)
+                )
+                tasks = self.writing.setdefault(collection, set())
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            del self.senders[collection]
+
+    def _take(self, collection: str, limit: int) -> List[Tuple[_Upsert, List[Row]]]:
+        buffer = self.buffers[collection]
+        parts: List[Tuple[_Upsert, List[Row]]] = []
+        taken = 0
+        while buffer and taken < limit:
+            upsert = buffer[0]
+            start = len(upsert.rows) - upsert.unsent
+            count = min(upsert.unsent, limit - taken)
+            parts.append((upsert, upsert.rows[start : start + count]))
+            upsert.unsent -= count
+            upsert.outstanding += 1
+            taken += count
+            if not upsert.unsent:
+                buffer.pop(0)
+        self.buffered_rows[collection] -= taken
+        if not self.buffered_rows[collection]:
+            timer = self.timers.pop(collection, None)
+            if timer is not None:
+                timer.cancel()
+        return parts
+
+    async def _write(self, collection: str, parts: List[Tuple[_Upsert, List[Row]]]) -> None:
+        """Writes a bulk, holding a slot of the semaphore acquired by the sender."""
+        rows = [row for _, part in parts for row in part]
+        try:
+            self.bulks += 1
+            err = await self._write_rows(collection, rows)
+        finally:
+            self.semaphore.release()
+        if err is None or len(parts) == 1:
+            results = [err] * len(parts)
+        else:
+            results = await asyncio.gather(
+                *(self._write_alone(collection, part) for _, part in parts)
+            )
+
+        for (upsert, part), part_err in zip(parts, results):
+            upsert.outstanding -= 1
+            if part_err is None:
+                upsert.written += len(part)
+            else:
+                upsert.failed += len(part)
+                upsert.error = upsert.error or part_err
+            if not upsert.unsent and not upsert.outstanding and not upsert.future.done():
+                upsert.future.set_result(
+                    UpsertResult(upsert.written, upsert.failed, upsert.error)
+                )
+        async with self.space:
+            self.pending_rows -= len(rows)
+            self.space.notify_all()
+
+    async def _write_alone(self, collection: str, rows: List[Row]) -> Optional[Exception]:
+        async with self.semaphore:
+            self.bulks += 1
+            return await self._write_rows(collection, rows)
+
+    async def _write_rows(self, collection: str, rows: List[Row]) -> Any:
+        try:
+            return await self.write(collection, rows)
+        except Exception as e:
+            return e
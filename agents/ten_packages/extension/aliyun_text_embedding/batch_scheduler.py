@@ -0,0 +1,221 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, List, Optional
+
+# call_batch(texts) returns one embedding per text, in order, or raises
+CallBatchFn = Callable[[List[str]], List[Any]]
+DoneFn = Callable[[Optional[List[Any]], Optional[Exception]], None]
+
+
+class _Request:
+    def __init__(self, texts: List[str], done: DoneFn):
+        self.texts = texts
+        self.done = done
+        self.results: List[Any] = [None] * len(texts)
+        self.remaining = len(texts)
+        self.failed = False
+        self.lock = threading.Lock()
+
+    def complete(self, index: int, embedding: Any) -> None:
+        with self.lock:
+            if self.failed:
+                return
+            self.results[index] = embedding
+            self.remaining -= 1
+            if self.remaining:
+                return
+        self.done(self.results, None)
+
+    def fail(self, err: Exception) -> None:
+        with self.lock:
+            if self.failed:
+                return
+            self.failed = True
+        self.done(None, err)
+
+
+class _Item:
+    __slots__ = ("request", "index", "enqueued_at")
+
+    def __init__(self, request: _Request, index: int, enqueued_at: float):
+        self.request = request
+        self.index = index
+        self.enqueued_at = enqueued_at
+
+    @property
+    def text(self) -> str:
+        return self.request.texts[self.index]
+
+
+class RateLimiter:
+    """Space out calls to at most rate per second, 0 disables it."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.next_at = 0.0
+
+    def wait(self, stopped: threading.Event) -> None:
+        if not self.interval:
+            return
+        now = time.monotonic()
+        delay = self.next_at - now
+        self.next_at = max(now, self.next_at) + self.interval
+        if delay > 0:
+            stopped.wait(delay)
+
+
+class MicroBatchScheduler:
+    """
+    Coalesce the inputs of all pending embed and embed_batch cmds into vendor sized batches.
+
+    A batch is sent when it is full or when its oldest input waited batch_window_ms.
+    Query inputs (single embed) go first, ingestion inputs fill the rest of the batch.
+    Up to max_concurrency batches are in flight, started at most max_requests_per_second,
+    and each embedding is scattered back to the request it came from.
+    query_slots of the max_concurrency slots are kept for batches carrying a query,
+    so that a query does not wait for ingestion batches to complete.
+    """
+
+    def __init__(
+        self,
+        call_batch: CallBatchFn,
+        max_batch_size: int = 6,
+        batch_window_ms: int = 10,
+        max_concurrency: int = 4,
+        max_requests_per_second: float = 0,
+        query_slots: int = 1,
+    ):
+        self.call_batch = call_batch
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window_ms / 1000
+        self.max_concurrency = max_concurrency
+        self.query_slots = min(query_slots, max_concurrency - 1)
+        self.limiter = RateLimiter(max_requests_per_second)
+
+        self.queries: Deque[_Item] = deque()
+        self.documents: Deque[_Item] = deque()
+        self.cond = threading.Condition()
+        self.inflight = 0
+        self.stopped = threading.Event()
+        self.executor: ThreadPoolExecutor = None
+        self.thread: threading.Thread = None
+
+        self.batches = 0
+        self.texts = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        self.stopped.clear()
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="embedding_batch"
+        )
+        self.thread = threading.Thread(target=self._dispatch_loop, name="embedding_scheduler")
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        with self.cond:
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        with self.cond:
+            pending = list(self.queries) + list(self.documents)
+            self.queries.clear()
+            self.documents.clear()
+        for item in pending:
+            item.request.fail(Exception("embedding scheduler stopped"))
+
+    def submit(self, texts: List[str], done: DoneFn, query: bool = False) -> None:
+        if not texts:
+            done([], None)
+            return
+        request = _Request(texts, done)
+        now = time.monotonic()
+        with self.cond:
+            target = self.queries if query else self.documents
+            target.extend(_Item(request, i, now) for i in range(len(texts)))
+            self.cond.notify()
+
+    def metrics(self) -> dict:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0,
+            "errors": self.errors,
+        }
+
+    def _pending(self) -> int:
+        return len(self.queries) + len(self.documents)
+
+    def _take_batch(self) -> List[_Item]:
+        with self.cond:
+            while not self.stopped.is_set():
+                query_ready = self.queries and self.inflight < self.max_concurrency
+                document_ready = self.documents and (
+                    self.inflight < self.max_concurrency - self.query_slots
+                )
+                if not query_ready and not document_ready:
+                    # pending inputs keep piling up while the slots are busy
+                    self.cond.wait()
+                    continue
+
+                # give other callers a chance to fill the batch
+                if self._pending() < self.max_batch_size:
+                    oldest = min(
+                        q[0].enqueued_at for q in (self.queries, self.documents) if q
+                    )
+                    remaining = oldest + self.batch_window - time.monotonic()
+                    if remaining > 0:
+                        self.cond.wait(remaining)
+                        continue
+
+                batch = []
+                if query_ready:
+                    while self.queries and len(batch) < self.max_batch_size:
+                        batch.append(self.queries.popleft())
+                # documents ride along in a query batch for free
+                while self.documents and len(batch) < self.max_batch_size and (batch or document_ready):
+                    batch.append(self.documents.popleft())
+                self.inflight += 1
+                return batch
+            return []
+
+    def _dispatch_loop(self) -> None:
+        while not self.stopped.is_set():
+            batch = self._take_batch()
+            if not batch:
+                continue
+            self.limiter.wait(self.stopped)
+            self.executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch: List[_Item]) -> None:
+        try:
+            embeddings = self.call_batch([item.text for item in batch])
+            if len(embeddings) != len(batch):
+                raise ValueError(f"expected {len(batch)} embeddings, got {len(embeddings)}")
+        except Exception as e:
+            with self.cond:
+                self.errors += 1
+            for item in batch:
+                item.request.fail(e)
+            return
+        finally:
+            with self.cond:
+                self.batches += 1
+                self.texts += len(batch)
+                self.inflight -= 1
+                self.cond.notify()
+
+        for item, embedding in zip(batch, embeddings):
+            item.request.complete(item.index, embedding)
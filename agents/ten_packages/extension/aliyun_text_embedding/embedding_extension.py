@@ -7,159 +7,143 @@ from ten import (
 )
 
 import json
-from typing import Generator, List
+from typing import Any, List, Optional
 from http import HTTPStatus
-import threading, queue
 from datetime import datetime
 
+from ten_ai_base.embedding import (
+    BINARY_EMBEDDING_FORMATS,
+    PROPERTY_EMBEDDING_FORMAT,
+    embedding_format_of,
+    encode_embeddings,
+)
+
+from .batch_scheduler import MicroBatchScheduler
+
 CMD_EMBED = "embed"
 CMD_EMBED_BATCH = "embed_batch"
 
 FIELD_KEY_EMBEDDING = "embedding"
 FIELD_KEY_EMBEDDINGS = "embeddings"
+FIELD_KEY_EMBEDDING_BUF = "embedding_buf"
+FIELD_KEY_EMBEDDINGS_BUF = "embeddings_buf"
 FIELD_KEY_MESSAGE = "message"
 FIELD_KEY_CODE = "code"
 
 DASHSCOPE_MAX_BATCH_SIZE = 6
 
+BATCH_WINDOW_MS = 10
+MAX_CONCURRENT_REQUESTS = 10
+MAX_REQUESTS_PER_SECOND = 0
+
+
+class DashScopeError(Exception):
+    def __init__(self, code: Any, message: str):
+        super().__init__(f"dashscope error {code}: {message}")
+        self.code = code
+        self.message = message
+
 
 class EmbeddingExtension(Extension):
     def __init__(self, name: str):
         super().__init__(name)
         self.api_key = ""
         self.model = ""
+        self.base_url = ""
 
-        self.stop = False
-        self.queue = queue.Queue()
-        self.threads = []
-
-        # workaround to speed up the embedding process,
-        # should be replace by https://help.aliyun.com/zh/model-studio/developer-reference/text-embedding-batch-api?spm=a2c4g.11186623.0.0.24cb7453KSjdhC
-        # once v3 models supported
-        self.parallel = 10
+        self.scheduler: MicroBatchScheduler = None
 
     def on_start(self, ten: TenEnv) -> None:
         ten.log_info("on_start")
         self.api_key = self.get_property_string(ten, "api_key", self.api_key)
         self.model = self.get_property_string(ten, "model", self.api_key)
+        self.base_url = self.get_property_string(ten, "base_url", self.base_url)
 
         # lazy import packages which requires long time to load
         global dashscope  # pylint: disable=global-statement
         import dashscope
 
         dashscope.api_key = self.api_key
-
-        for i in range(self.parallel):
-            thread = threading.Thread(target=self.async_handler, args=[i, ten])
-            thread.start()
-            self.threads.append(thread)
-
-        ten.on_start_done()
-
-    def async_handler(self, index: int, ten: TenEnv):
-        ten.log_info(f"async_handler {index} statend")
-
-        while not self.stop:
-            cmd = self.queue.get()
-            if cmd is None:
-                break
-
-            cmd_name = cmd.get_name()
-            start_time = datetime.now()
-            ten.log_info(f"async_handler {index} processing cmd {cmd_name}")
-
-            if cmd_name == CMD_EMBED:
-                cmd_result = self.call_with_str(cmd.get_property_string("input"), ten)
-                ten.return_result(cmd_result, cmd)
-            elif cmd_name == CMD_EMBED_BATCH:
-                inputs_list = json.loads(cmd.get_property_to_json("inputs"))
-                cmd_result = self.call_with_strs(inputs_list, ten)
-                ten.return_result(cmd_result, cmd)
-            else:
-                ten.log_warn("unknown cmd {cmd_name}")
-
-            ten.log_info(
-                f"async_handler {index} finished processing cmd {cmd_name}, cost {int((datetime.now() - start_time).total_seconds() * 1000)}ms"
+        if self.base_url:
+            dashscope.base_http_api_url = self.base_url
+
+        # inputs of all cmds are merged into full vendor batches, sent concurrently
+        self.scheduler = MicroBatchScheduler(
+            self.call_batch,
+            max_batch_size=DASHSCOPE_MAX_BATCH_SIZE,
+            batch_window_ms=self.get_property_int(ten, "batch_window_ms", BATCH_WINDOW_MS),
+            max_concurrency=self.get_property_int(
+                ten, "max_concurrent_requests", MAX_CONCURRENT_REQUESTS
             )
+            or MAX_CONCURRENT_REQUESTS,
+            max_requests_per_second=self.get_property_int(
+                ten, "max_requests_per_second", MAX_REQUESTS_PER_SECOND
+            ),
+        )
+        self.scheduler.start()
 
-        ten.log_info(f"async_handler {index} stopped")
+        ten.on_start_done()
 
-    def call_with_str(self, message: str, ten: TenEnv) -> CmdResult:
-        start_time = datetime.now()
+    def call_batch(self, messages: List[str]) -> List[List[float]]:
         # pylint: disable=undefined-variable
-        response = dashscope.TextEmbedding.call(model=self.model, input=message)
+        response = dashscope.TextEmbedding.call(model=self.model, input=messages)
+        if response.status_code != HTTPStatus.OK:
+            raise DashScopeError(response.status_code, response.message)
+        embeddings = sorted(response.output["embeddings"], key=lambda e: e["text_index"])
+        return [e["embedding"] for e in embeddings]
+
+    def on_embedded(
+        self,
+        ten: TenEnv,
+        cmd: Cmd,
+        start_time: datetime,
+        embeddings: Optional[List[List[float]]],
+        err: Optional[Exception],
+    ):
+        cmd_name = cmd.get_name()
         ten.log_info(
-            f"embedding call finished for input [{message}], status_code {response.status_code}, cost {int((datetime.now() - start_time).total_seconds() * 1000)}ms"
+            f"embedding finished for cmd {cmd_name}, err {err}, cost {int((datetime.now() - start_time).total_seconds() * 1000)}ms"
         )
 
-        if response.status_code == HTTPStatus.OK:
+        embedding_format = embedding_format_of(cmd)
+        if err is None and embedding_format in BINARY_EMBEDDING_FORMATS:
+            # the consumer asked for the compact binary encoding
+            cmd_result = CmdResult.create(StatusCode.OK)
+            cmd_result.set_property_string(PROPERTY_EMBEDDING_FORMAT, embedding_format)
+            cmd_result.set_property_buf(
+                FIELD_KEY_EMBEDDING_BUF if cmd_name == CMD_EMBED else FIELD_KEY_EMBEDDINGS_BUF,
+                encode_embeddings(embeddings, embedding_format),
+            )
+        elif err is not None:
+            cmd_result = CmdResult.create(StatusCode.ERROR)
+            cmd_result.set_property_string(FIELD_KEY_CODE, str(getattr(err, "code", "")))
+            cmd_result.set_property_string(FIELD_KEY_MESSAGE, str(err))
+        elif cmd_name == CMD_EMBED:
             cmd_result = CmdResult.create(StatusCode.OK)
             cmd_result.set_property_from_json(
-                FIELD_KEY_EMBEDDING,
-                json.dumps(response.output["embeddings"][0]["embedding"]),
+                FIELD_KEY_EMBEDDING, json.dumps(embeddings[0])
             )
-            return cmd_result
         else:
-            cmd_result = CmdResult.create(StatusCode.ERROR)
-            cmd_result.set_property_string(FIELD_KEY_CODE, response.status_code)
-            cmd_result.set_property_string(FIELD_KEY_MESSAGE, response.message)
-            return cmd_result
-
-    def batched(
-        self, inputs: List, batch_size: int = DASHSCOPE_MAX_BATCH_SIZE
-    ) -> Generator[List, None, None]:
-        for i in range(0, len(inputs), batch_size):
-            yield inputs[i : i + batch_size]
-
-    def call_with_strs(self, messages: List[str], ten: TenEnv) -> CmdResult:
-        start_time = datetime.now()
-        result = None  # merge the results.
-        batch_counter = 0
-        for batch in self.batched(messages):
-            # pylint: disable=undefined-variable
-            response = dashscope.TextEmbedding.call(model=self.model, input=batch)
-            # ten.log_info("%s Received %s", batch, response)
-            if response.status_code == HTTPStatus.OK:
-                if result is None:
-                    result = response.output
-                else:
-                    for emb in response.output["embeddings"]:
-                        emb["text_index"] += batch_counter
-                        result["embeddings"].append(emb)
-            else:
-                ten.log_error("call %s failed, errmsg: %s", batch, response)
-            batch_counter += len(batch)
-
-        ten.log_info(
-            f"embedding call finished for inputs len {len(messages)}, batch_counter {batch_counter}, results len {len(result['embeddings'])}, cost {int((datetime.now() - start_time).total_seconds() * 1000)}ms "
-        )
-        if result is not None:
             cmd_result = CmdResult.create(StatusCode.OK)
-
             # too slow `set_property_to_json`, so use `set_property_string` at the moment as workaround
             # will be replaced once `set_property_to_json` improved
             cmd_result.set_property_string(
-                FIELD_KEY_EMBEDDINGS, json.dumps(result["embeddings"])
+                FIELD_KEY_EMBEDDINGS,
+                json.dumps(
+                    [
+                        {"text_index": i, "embedding": embedding}
+                        for i, embedding in enumerate(embeddings)
+                    ]
+                ),
             )
-            return cmd_result
-        else:
-            cmd_result = CmdResult.create(StatusCode.ERROR)
-            cmd_result.set_property_string(FIELD_KEY_MESSAGE, "All batch failed")
-            ten.log_error("All batch failed")
-            return cmd_result
+        ten.return_result(cmd_result, cmd)
 
     def on_stop(self, ten: TenEnv) -> None:
         ten.log_info("on_stop")
-        self.stop = True
-        # clear queue
-        while not self.queue.empty():
-            self.queue.get()
-        # put enough None to stop all threads
-        for thread in self.threads:
-            self.queue.put(None)
-        for thread in self.threads:
-            thread.join()
-        self.threads = []
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            ten.log_info(f"embedding scheduler metrics {self.scheduler.metrics()}")
+            self.scheduler = None
 
         ten.on_stop_done()
 
@@ -179,7 +163,19 @@ class EmbeddingExtension(Extension):
             #     "inputs": ["hello", ...]
             # }
 
-            self.queue.put(cmd)
+            start_time = datetime.now()
+            if cmd_name == CMD_EMBED:
+                texts = [cmd.get_property_string("input")]
+            else:
+                texts = json.loads(cmd.get_property_to_json("inputs"))
+            self.scheduler.submit(
+                texts,
+                lambda embeddings, err: self.on_embedded(
+                    ten, cmd, start_time, embeddings, err
+                ),
+                # query time embeddings go first
+                query=cmd_name == CMD_EMBED,
+            )
         else:
             ten.log_warn(f"unknown cmd {cmd_name}")
             cmd_result = CmdResult.create(StatusCode.ERROR)
@@ -191,3 +187,10 @@ class EmbeddingExtension(Extension):
         except Exception as e:
             ten.log_warn(f"err: {e}")
             return default
+
+    def get_property_int(self, ten: TenEnv, key, default):
+        try:
+            return ten.get_property_int(key)
+        except Exception as e:
+            ten.log_warn(f"err: {e}")
+            return default
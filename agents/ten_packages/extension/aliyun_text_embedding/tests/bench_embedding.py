@@ -0,0 +1,165 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Benchmark embeddings per second and query latency under mixed load against a
+local fake dashscope endpoint, through the real dashscope SDK.
+
+Ingestion sends embed_batch cmds of --batch inputs with --inflight cmds outstanding,
+like file_chunker does, while a query embed arrives every --query-interval-ms.
+The legacy mode replays the previous handling: 10 worker threads pulling cmds
+from one FIFO queue, each calling the vendor sequentially per 6 inputs.
+
+    python tests/bench_embedding.py [--cmds 200] [--latency-ms 60]
+"""
+import argparse
+import queue
+import statistics
+import sys
+import threading
+import time
+from http import HTTPStatus
+from pathlib import Path
+
+import dashscope
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from batch_scheduler import MicroBatchScheduler  # noqa: E402
+from fake_dashscope import FakeDashScope  # noqa: E402
+
+DASHSCOPE_MAX_BATCH_SIZE = 6
+
+
+def call_batch(texts):
+    response = dashscope.TextEmbedding.call(model="text-embedding-v1", input=texts)
+    if response.status_code != HTTPStatus.OK:
+        raise Exception(f"{response.status_code} {response.message}")
+    embeddings = sorted(response.output["embeddings"], key=lambda e: e["text_index"])
+    return [e["embedding"] for e in embeddings]
+
+
+class LegacyEmbedding:
+    def __init__(self, parallel: int = 10):
+        self.queue = queue.Queue()
+        self.threads = [threading.Thread(target=self._worker) for _ in range(parallel)]
+        for t in self.threads:
+            t.start()
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            texts, done = item
+            results = []
+            for i in range(0, len(texts), DASHSCOPE_MAX_BATCH_SIZE):
+                results.extend(call_batch(texts[i : i + DASHSCOPE_MAX_BATCH_SIZE]))
+            done(results, None)
+
+    def submit(self, texts, done, query=False):
+        self.queue.put((texts, done))
+
+    def stop(self):
+        for _ in self.threads:
+            self.queue.put(None)
+        for t in self.threads:
+            t.join()
+
+
+def run(args, embedder):
+    inflight = threading.Semaphore(args.inflight)
+    finished = threading.Event()
+    remaining = [args.cmds]
+    lock = threading.Lock()
+    latencies = []
+
+    def on_batch(embeddings, err):
+        assert err is None and len(embeddings) == args.batch
+        inflight.release()
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                finished.set()
+
+    def ingest():
+        for i in range(args.cmds):
+            inflight.acquire()
+            embedder.submit([f"chunk {i} {j}" for j in range(args.batch)], on_batch)
+
+    def on_query(start, embeddings, err):
+        assert err is None and len(embeddings) == 1
+        latencies.append(time.perf_counter() - start)
+
+    def query_loop():
+        i = 0
+        while not finished.is_set():
+            start = time.perf_counter()
+            embedder.submit(
+                [f"question {i}"],
+                lambda e, err, start=start: on_query(start, e, err),
+                query=True,
+            )
+            i += 1
+            finished.wait(args.query_interval_ms / 1000)
+        # let the last queries land
+        time.sleep(0.5)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=ingest), threading.Thread(target=query_loop)]
+    for t in threads:
+        t.start()
+    finished.wait()
+    elapsed = time.perf_counter() - start
+    for t in threads:
+        t.join()
+
+    lat = sorted(latencies)
+    p99 = lat[max(0, int(len(lat) * 0.99) - 1)]
+    return args.cmds * args.batch / elapsed, statistics.median(lat) * 1000, p99 * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cmds", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=5)
+    parser.add_argument("--inflight", type=int, default=8)
+    parser.add_argument("--query-interval-ms", type=float, default=100)
+    parser.add_argument("--latency-ms", type=float, default=60)
+    parser.add_argument("--per-input-ms", type=float, default=2)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 10])
+    args = parser.parse_args()
+
+    fake = FakeDashScope(args.latency_ms, args.per_input_ms)
+    fake.start()
+    dashscope.api_key = "fake"
+    dashscope.base_http_api_url = fake.base_url
+    try:
+        print(f"{args.cmds} embed_batch cmds x {args.batch}, {args.inflight} in flight, query every {args.query_interval_ms:.0f} ms")
+        print(f"{'mode':<22}{'embeddings/s':>14}{'query p50':>12}{'query p99':>12}{'vendor calls':>14}")
+
+        fake.calls = 0
+        legacy = LegacyEmbedding()
+        rate, p50, p99 = run(args, legacy)
+        legacy.stop()
+        print(f"{'legacy x10':<22}{rate:>14.0f}{p50:>10.0f}ms{p99:>10.0f}ms{fake.calls:>14}")
+
+        for concurrency in args.concurrency:
+            fake.calls = 0
+            scheduler = MicroBatchScheduler(
+                call_batch, max_batch_size=DASHSCOPE_MAX_BATCH_SIZE, max_concurrency=concurrency
+            )
+            scheduler.start()
+            rate, p50, p99 = run(args, scheduler)
+            scheduler.stop()
+            name = f"scheduler x{concurrency}"
+            print(f"{name:<22}{rate:>14.0f}{p50:>10.0f}ms{p99:>10.0f}ms{fake.calls:>14}")
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
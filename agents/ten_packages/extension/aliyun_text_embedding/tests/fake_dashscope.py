@@ -0,0 +1,83 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_PATH = "/api/v1/services/embeddings/text-embedding/text-embedding"
+
+
+class FakeDashScope:
+    """
+    Local stand-in for the dashscope text embedding endpoint.
+    Each call takes latency_ms + per_input_ms per text, batches above max_batch_size are rejected.
+    """
+
+    def __init__(self, latency_ms: float = 60, per_input_ms: float = 2, max_batch_size: int = 6, dimension: int = 8):
+        self.latency = latency_ms / 1000
+        self.per_input = per_input_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.dimension = dimension
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.server: ThreadingHTTPServer = None
+        self.thread: threading.Thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def start(self) -> None:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                status, payload = fake.handle(self.path, body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, path: str, body: dict):
+        if path != EMBEDDING_PATH:
+            return 404, {"code": "NotFound", "message": path}
+        texts = body["input"]["texts"]
+        if isinstance(texts, str):
+            texts = [texts]
+        if len(texts) > self.max_batch_size:
+            return 400, {"code": "InvalidParameter", "message": "batch size is invalid"}
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency + self.per_input * len(texts))
+        embeddings = [
+            {"text_index": i, "embedding": [float(len(t))] + [0.1] * (self.dimension - 1)}
+            for i, t in enumerate(texts)
+        ]
+        return 200, {
+            "output": {"embeddings": embeddings},
+            "usage": {"total_tokens": sum(len(t) for t in texts)},
+            "request_id": f"req-{self.calls}",
+        }
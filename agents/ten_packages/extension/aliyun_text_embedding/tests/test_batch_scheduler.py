@@ -0,0 +1,131 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from batch_scheduler import MicroBatchScheduler  # noqa: E402
+
+
+class Results:
+    def __init__(self, expected: int):
+        self.items = {}
+        self.lock = threading.Lock()
+        self.expected = expected
+        self.all_done = threading.Event()
+
+    def callback(self, key):
+        def done(embeddings, err):
+            with self.lock:
+                self.items[key] = (embeddings, err)
+                if len(self.items) == self.expected:
+                    self.all_done.set()
+
+        return done
+
+
+def test_inputs_coalesced_and_scattered_back():
+    calls = []
+
+    def call_batch(texts):
+        calls.append(list(texts))
+        time.sleep(0.02)
+        return [[float(len(t))] for t in texts]
+
+    scheduler = MicroBatchScheduler(call_batch, max_batch_size=6, batch_window_ms=50, max_concurrency=2)
+    results = Results(5)
+    scheduler.start()
+    try:
+        scheduler.submit(["a", "bb", "ccc", "dddd"], results.callback("batch1"))
+        scheduler.submit(["eeeee"], results.callback("query1"), query=True)
+        scheduler.submit(["hh"], results.callback("query2"), query=True)
+        scheduler.submit(["ffffff", "g"], results.callback("batch2"))
+        scheduler.submit([], results.callback("empty"))
+        assert results.all_done.wait(5)
+    finally:
+        scheduler.stop()
+
+    # 8 inputs from 4 cmds in 2 vendor calls, queries first
+    assert len(calls) == 2
+    assert calls[0][:2] == ["eeeee", "hh"] and len(calls[0]) == 6
+    assert results.items["batch1"] == ([[1.0], [2.0], [3.0], [4.0]], None)
+    assert results.items["batch2"] == ([[6.0], [1.0]], None)
+    assert results.items["query1"] == ([[5.0]], None)
+    assert results.items["empty"] == ([], None)
+    assert scheduler.metrics()["avg_batch_size"] == 4
+
+
+def test_concurrency_and_rate_limit():
+    lock = threading.Lock()
+    state = {"inflight": 0, "max": 0, "starts": []}
+
+    def call_batch(texts):
+        with lock:
+            state["inflight"] += 1
+            state["max"] = max(state["max"], state["inflight"])
+            state["starts"].append(time.monotonic())
+        time.sleep(0.05)
+        with lock:
+            state["inflight"] -= 1
+        return [[0.0]] * len(texts)
+
+    scheduler = MicroBatchScheduler(
+        call_batch, max_batch_size=2, batch_window_ms=1, max_concurrency=3, max_requests_per_second=100, query_slots=0
+    )
+    results = Results(10)
+    scheduler.start()
+    try:
+        for i in range(10):
+            scheduler.submit([f"text {i}", f"more {i}"], results.callback(i))
+        assert results.all_done.wait(5)
+    finally:
+        scheduler.stop()
+
+    assert state["max"] == 3
+    starts = state["starts"]
+    assert min(b - a for a, b in zip(starts, starts[1:])) >= 0.009
+
+
+def test_failed_batch_fails_only_its_requests():
+    def call_batch(texts):
+        if "bad" in texts:
+            raise RuntimeError("vendor error")
+        return [[1.0]] * len(texts)
+
+    scheduler = MicroBatchScheduler(call_batch, max_batch_size=2, batch_window_ms=1, max_concurrency=1)
+    results = Results(2)
+    scheduler.start()
+    try:
+        scheduler.submit(["bad", "x"], results.callback("bad"))
+        scheduler.submit(["y", "z"], results.callback("good"))
+        assert results.all_done.wait(5)
+    finally:
+        scheduler.stop()
+
+    assert results.items["bad"][0] is None
+    assert str(results.items["bad"][1]) == "vendor error"
+    assert results.items["good"] == ([[1.0], [1.0]], None)
+
+
+def test_short_response_fails_the_batch():
+    scheduler = MicroBatchScheduler(
+        lambda texts: [[1.0]], max_batch_size=2, batch_window_ms=1, max_concurrency=1
+    )
+    results = Results(1)
+    scheduler.start()
+    try:
+        scheduler.submit(["a", "b"], results.callback("short"))
+        assert results.all_done.wait(5)
+    finally:
+        scheduler.stop()
+
+    embeddings, err = results.items["short"]
+    assert embeddings is None
+    assert isinstance(err, ValueError)
+    assert str(err) == "expected 2 embeddings, got 1"
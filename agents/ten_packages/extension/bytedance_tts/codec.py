@@ -0,0 +1,194 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+The binary protocol of the bytedance TTS websocket service, refer to:
+https://www.volcengine.com/docs/6561/79823.
+
+A message starts with a 4-byte header:
+  version (4 bits), header size in 4 bytes (4 bits),
+  message type (4 bits), message type specific flags (4 bits),
+  serialization method (4 bits), compression (4 bits),
+  reserved (1 byte).
+An audio-only response goes on with a signed sequence number and a payload
+size, both 4 bytes big-endian, an error with a code and a message size.
+"""
+import gzip
+import json
+import struct
+from typing import Any, Dict, NamedTuple, Optional
+
+# message types
+FULL_CLIENT_REQUEST = 0x1
+AUDIO_ONLY_RESPONSE = 0xB
+FRONTEND_RESPONSE = 0xC
+ERROR_RESPONSE = 0xF
+
+# message type specific flags
+NO_SEQUENCE = 0x0
+POSITIVE_SEQUENCE = 0x1
+LAST_MESSAGE = 0x2
+NEGATIVE_SEQUENCE = 0x3
+
+NO_COMPRESSION = 0x0
+GZIP = 0x1
+
+MESSAGE_TYPES = {
+    AUDIO_ONLY_RESPONSE: "audio-only server response",
+    FRONTEND_RESPONSE: "frontend server response",
+    ERROR_RESPONSE: "error message from server",
+}
+MESSAGE_TYPE_SPECIFIC_FLAGS = {
+    NO_SEQUENCE: "no sequence number",
+    POSITIVE_SEQUENCE: "sequence number > 0",
+    LAST_MESSAGE: "last message from server (seq < 0)",
+    NEGATIVE_SEQUENCE: "sequence number < 0",
+}
+MESSAGE_SERIALIZATION_METHODS = {0: "no serialization", 1: "JSON", 15: "custom type"}
+MESSAGE_COMPRESSIONS = {0: "no compression", 1: "gzip", 15: "custom compression method"}
+
+HEADER = struct.Struct(">BBBB")
+# header of 4 bytes, sequence number, payload size
+AUDIO_PREFIX = struct.Struct(">BBBBiI")
+# sequence number, payload size
+SEQUENCE_FIELDS = struct.Struct(">iI")
+# code, message size
+ERROR_FIELDS = struct.Struct(">II")
+SIZE = struct.Struct(">I")
+
+# full client request, no flags, JSON, gzip
+REQUEST_HEADER = HEADER.pack(0x11, FULL_CLIENT_REQUEST << 4, 0x11, 0x00)
+
+
+class Response(NamedTuple):
+    message_type: int
+    flags: int
+    sequence: int
+    # audio, or the gunzipped message of a frontend response, as a view of
+    # the websocket message
+    payload: Optional[memoryview]
+    done: bool
+    error_code: int = 0
+    error: str = ""
+
+
+def _decompress(payload: memoryview, compression: int) -> memoryview:
+    if compression == GZIP:
+        return memoryview(gzip.decompress(payload))
+    return payload
+
+
+def decode_response(message: bytes) -> Response:
+    view = memoryview(message)
+    if len(view) >= AUDIO_PREFIX.size:
+        b0, b1, b2, _, sequence, size = AUDIO_PREFIX.unpack_from(view)
+        if b0 & 0x0F == 1 and b1 >> 4 == AUDIO_ONLY_RESPONSE and b1 & 0x0F:
+            # fast path: an audio frame with the plain 4-byte header
+            return Response(
+                AUDIO_ONLY_RESPONSE,
+                b1 & 0x0F,
+                sequence,
+                view[AUDIO_PREFIX.size : AUDIO_PREFIX.size + size],
+                sequence < 0,
+            )
+
+    b0, b1, b2, _ = HEADER.unpack_from(view)
+    offset = (b0 & 0x0F) * 4
+    message_type = b1 >> 4
+    flags = b1 & 0x0F
+    compression = b2 & 0x0F
+
+    if message_type == AUDIO_ONLY_RESPONSE:
+        if flags == NO_SEQUENCE:  # ACK
+            return Response(message_type, flags, 0, None, False)
+        sequence, size = SEQUENCE_FIELDS.unpack_from(view, offset)
+        start = offset + SEQUENCE_FIELDS.size
+        return Response(
+            message_type, flags, sequence, view[start : start + size], sequence < 0
+        )
+    if message_type == ERROR_RESPONSE:
+        code, size = ERROR_FIELDS.unpack_from(view, offset)
+        start = offset + ERROR_FIELDS.size
+        error = _decompress(view[start : start + size], compression)
+        return Response(
+            message_type, flags, 0, None, True, code, str(error, "utf-8", "replace")
+        )
+    if message_type == FRONTEND_RESPONSE:
+        (size,) = SIZE.unpack_from(view, offset)
+        start = offset + SIZE.size
+        payload = _decompress(view[start : start + size], compression)
+        return Response(message_type, flags, 0, payload, False)
+    return Response(
+        message_type, flags, 0, None, True, error=f"undefined message type {message_type:#x}"
+    )
+
+
+def describe(message: bytes) -> str:
+    """The header of message, for debugging."""
+    b0, b1, b2, b3 = HEADER.unpack_from(message)
+    message_type = b1 >> 4
+    flags = b1 & 0x0F
+    return (
+        f"version {b0 >> 4}, header size {(b0 & 0x0F) * 4} bytes, "
+        f"{MESSAGE_TYPES.get(message_type, hex(message_type))}, "
+        f"{MESSAGE_TYPE_SPECIFIC_FLAGS.get(flags, hex(flags))}, "
+        f"{MESSAGE_SERIALIZATION_METHODS.get(b2 >> 4, hex(b2 >> 4))}, "
+        f"{MESSAGE_COMPRESSIONS.get(b2 & 0x0F, hex(b2 & 0x0F))}, "
+        f"reserved {b3:#04x}, {len(message)} bytes"
+    )
+
+
+class RequestEncoder:
+    """
+    Full client requests of a fixed app, user and audio part, only the
+    request part being serialized for each text.
+    """
+
+    def __init__(self, template: Dict[str, Any], compresslevel: int = 1) -> None:
+        self.compresslevel = compresslevel
+        head = {k: v for k, v in template.items() if k != "request"}
+        self.request = dict(template["request"])
+        # '{"app": ..., "audio": ..., ' then the request part and '}'
+        self.prefix = json.dumps(head)[:-1] + ', "request": '
+
+    def encode(self, request_id: str, text: str) -> bytes:
+        self.request["reqid"] = request_id
+        self.request["text"] = text
+        body = gzip.compress(
+            (self.prefix + json.dumps(self.request) + "}").encode(),
+            compresslevel=self.compresslevel,
+            mtime=0,
+        )
+        return b"".join((REQUEST_HEADER, SIZE.pack(len(body)), body))
+
+
+def decode_request(message: bytes) -> Dict[str, Any]:
+    """The JSON of a full client request, as the service reads it."""
+    view = memoryview(message)
+    offset = (view[0] & 0x0F) * 4
+    (size,) = SIZE.unpack_from(view, offset)
+    body = view[offset + SIZE.size : offset + SIZE.size + size]
+    if view[2] & 0x0F == GZIP:
+        body = gzip.decompress(body)
+    return json.loads(bytes(body))
+
+
+def encode_audio(sequence: int, audio: bytes) -> bytes:
+    flags = POSITIVE_SEQUENCE if sequence > 0 else NEGATIVE_SEQUENCE
+    return (
+        AUDIO_PREFIX.pack(
+            0x11, AUDIO_ONLY_RESPONSE << 4 | flags, 0x00, 0x00, sequence, len(audio)
+        )
+        + audio
+    )
+
+
+def encode_error(code: int, message: str) -> bytes:
+    payload = gzip.compress(message.encode())
+    return (
+        HEADER.pack(0x11, ERROR_RESPONSE << 4, 0x11, 0x00)
+        + ERROR_FIELDS.pack(code, len(payload))
+        + payload
+    )
@@ -4,8 +4,10 @@
 # See the LICENSE file for more information.
 #
 import traceback
+from contextlib import aclosing
 
-from .bytedance_tts import TTSConfig, TTSClient
+from .bytedance_tts import TTSConfig
+from .tts_client import TTSClient
 from ten import (
     AsyncTenEnv,
 )
@@ -34,6 +36,10 @@ class BytedanceTTSExtension(AsyncTTSBaseExtension):
             if not self.config.token:
                 raise ValueError("token is required")
 
+            if self.config.prefetch:
+                # the queued fragment is prefetched as it is, it must not be merged
+                self.fragment_merger = None
+
             self.client = TTSClient(config=self.config, ten_env=ten_env)
             await self.client.connect()
         except Exception:
@@ -41,6 +47,7 @@ class BytedanceTTSExtension(AsyncTTSBaseExtension):
 
     async def on_stop(self, ten_env: AsyncTenEnv) -> None:
         if self.client:
+            ten_env.log_info(f"Websocket pool: {self.client.pool.metrics()}")
             await self.client.close()
 
         await super().on_stop(ten_env)
@@ -53,8 +60,16 @@ class BytedanceTTSExtension(AsyncTTSBaseExtension):
     async def on_request_tts(
         self, ten_env: AsyncTenEnv, input_text: str, end_of_segment: bool
     ) -> None:
-        async for audio_data in self.client.text_to_speech_stream(input_text):
-            await self.send_audio_out(ten_env, audio_data)
+        async with aclosing(
+            self.client.text_to_speech_stream(input_text)
+        ) as stream:
+            async for audio_data in stream:
+                if self.config.prefetch:
+                    # overlap the synthesis of the next sentence with this one
+                    queued = self.queue.peek()
+                    if queued is not None:
+                        self.client.prefetch(queued[0])
+                await self.send_audio_out(ten_env, audio_data)
 
     async def on_cancel_tts(self, ten_env: AsyncTenEnv) -> None:
         await self.client.cancel()
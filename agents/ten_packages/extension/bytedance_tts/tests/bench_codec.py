@@ -0,0 +1,154 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Frames per second of the response parsing of the bytedance TTS client and
+requests per second of its request building, against the previous ones,
+which are kept here: bit shifts on the header bytes, seven debug lines
+formatted for every frame, a deep copy of the request template and a new
+gzip of the whole JSON for every sentence.
+
+The ten_env drops every log line, as a runtime with debug logs off does.
+
+    python tests/bench_codec.py [--frames 200000] [--frame-bytes 3200]
+"""
+import argparse
+import copy
+import gzip
+import json
+import sys
+import time
+import types
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+
+EXTENSION_DIR = Path(__file__).resolve().parent.parent
+
+# the package without its __init__, which needs the ten runtime
+package = types.ModuleType("bytedance_tts")
+package.__path__ = [str(EXTENSION_DIR)]
+sys.modules["bytedance_tts"] = package
+
+from bytedance_tts.codec import (  # noqa: E402
+    MESSAGE_COMPRESSIONS,
+    MESSAGE_SERIALIZATION_METHODS,
+    MESSAGE_TYPE_SPECIFIC_FLAGS,
+    MESSAGE_TYPES,
+    encode_audio,
+)
+from bytedance_tts.tts_client import TTSClient  # noqa: E402
+
+
+class Logger:
+    def log_debug(self, _):
+        pass
+
+    log_info = log_warn = log_error = log_debug
+
+
+class LegacyCodec:
+    def __init__(self, template, ten_env):
+        self.request_template = template
+        self.ten_env = ten_env
+        self.default_header = bytearray(b"\x11\x10\x11\x00")
+
+    def parse_response(self, response):
+        protocol_version = response[0] >> 4
+        header_size = response[0] & 0x0F
+        message_type = response[1] >> 4
+        message_type_specific_flags = response[1] & 0x0F
+        serialization_method = response[2] >> 4
+        message_compression = response[2] & 0x0F
+        reserved = response[3]
+        header_extensions = response[4 : header_size * 4]
+        payload = response[header_size * 4 :]
+        self.ten_env.log_debug(
+            f"Protocol version: {protocol_version:#x} - version {protocol_version}"
+        )
+        self.ten_env.log_debug(
+            f"Header size: {header_size:#x} - {header_size * 4} bytes"
+        )
+        self.ten_env.log_debug(
+            f"Message type: {message_type:#x} - {MESSAGE_TYPES[message_type]}"
+        )
+        self.ten_env.log_debug(
+            f"Message type specific flags: {message_type_specific_flags:#x} - {MESSAGE_TYPE_SPECIFIC_FLAGS[message_type_specific_flags]}"
+        )
+        self.ten_env.log_debug(
+            f"Message serialization method: {serialization_method:#x} - {MESSAGE_SERIALIZATION_METHODS[serialization_method]}"
+        )
+        self.ten_env.log_debug(
+            f"Message compression: {message_compression:#x} - {MESSAGE_COMPRESSIONS[message_compression]}"
+        )
+        self.ten_env.log_debug(f"Reserved: {reserved:#04x}")
+        if header_size != 1:
+            self.ten_env.log_debug(f"Header extensions: {header_extensions}")
+        # audio-only server response with sequence number
+        sequence_number = int.from_bytes(payload[:4], "big", signed=True)
+        payload_size = int.from_bytes(payload[4:8], "big", signed=False)
+        payload = payload[8:]
+        self.ten_env.log_debug(f"Sequence number: {sequence_number}")
+        self.ten_env.log_debug(f"Payload size: {payload_size} bytes")
+        return payload, sequence_number < 0
+
+    def build_request(self, text):
+        request_id = str(uuid.uuid4())
+        request = copy.deepcopy(self.request_template)
+        request["request"]["reqid"] = request_id
+        request["request"]["text"] = text
+        request["user"]["uid"] = str(uuid.uuid4())
+        request_bytes = gzip.compress(str.encode(json.dumps(request)))
+        full_request = bytearray(self.default_header)
+        full_request.extend((len(request_bytes)).to_bytes(4, "big"))
+        full_request.extend(request_bytes)
+        self.ten_env.log_info(f"Request ({request_id}): {request}")
+        return request_id, bytes(full_request)
+
+
+def rate(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return len(items) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=200000)
+    parser.add_argument("--frame-bytes", type=int, default=3200, help="100ms of 16kHz pcm")
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    config = SimpleNamespace(
+        appid="app",
+        token="token",
+        voice_type="BV001_streaming",
+        sample_rate=16000,
+        api_url="",
+        cluster="volcano_tts",
+        pool_size=2,
+        ping_interval_ms=0,
+        drain_timeout_ms=3000,
+        log_frames=False,
+    )
+    client = TTSClient(config, Logger())
+    legacy = LegacyCodec(client.request_template, Logger())
+
+    audio = bytes(args.frame_bytes)
+    frames = [encode_audio(i + 1 if i % 50 else -(i + 1), audio) for i in range(args.frames)]
+    sentence = "Sure, the XK-4821 pump needs a new filter every six months."
+    texts = [sentence] * args.requests
+
+    print(f"{args.frames} frames of {args.frame_bytes} bytes, {args.requests} requests")
+    print(f"{'':<10}{'frames/s':>12}{'requests/s':>12}")
+    for name, codec in (("legacy", legacy), ("struct", client)):
+        frames_per_sec = rate(codec.parse_response, frames)
+        requests_per_sec = rate(codec.build_request, texts)
+        print(f"{name:<10}{frames_per_sec:>12,.0f}{requests_per_sec:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
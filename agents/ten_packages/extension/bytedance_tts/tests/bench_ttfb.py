@@ -0,0 +1,188 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Time to first audio of the bytedance TTS client against the local fake
+server, whose handshake takes --handshake-ms in place of the TLS and
+websocket round trips to the service.
+
+barge-in   every request is cancelled after --played frames and followed by
+           the next one, as when the user interrupts the agent:
+             reconnect  the previous behavior, a cancel closes the websocket
+                        and the next request connects again
+             pool       the cancelled request is drained on its websocket
+                        while the next one takes a standby
+sentences  --sentences sentences of an answer played back in real time, one
+           frame every --play-ms; the gap is the wait for the first audio of
+           a sentence once the previous one played, with and without the
+           request of the next sentence sent ahead on a standby.
+
+    python tests/bench_ttfb.py [--turns 30] [--handshake-ms 150]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import types
+from pathlib import Path
+from types import SimpleNamespace
+
+import websockets
+
+EXTENSION_DIR = Path(__file__).resolve().parent.parent
+
+# the package without its __init__, which needs the ten runtime
+package = types.ModuleType("bytedance_tts")
+package.__path__ = [str(EXTENSION_DIR)]
+sys.modules["bytedance_tts"] = package
+sys.path.insert(0, str(EXTENSION_DIR / "tests"))
+
+from bytedance_tts.tts_client import TTSClient  # noqa: E402
+from fake_tts_server import FakeTTSServer  # noqa: E402
+
+
+class Logger:
+    def log_debug(self, _):
+        pass
+
+    log_info = log_warn = log_error = log_debug
+
+
+def make_client(args, server):
+    config = SimpleNamespace(
+        appid="app",
+        token="token",
+        voice_type="BV001_streaming",
+        sample_rate=16000,
+        api_url=server.url,
+        cluster="volcano_tts",
+        pool_size=args.pool_size,
+        ping_interval_ms=0,
+        drain_timeout_ms=3000,
+        log_frames=False,
+    )
+    return TTSClient(config, Logger())
+
+
+async def reconnect_turn(client, server, text, played):
+    """A request on a new websocket, closed when cancelled."""
+    start = time.perf_counter()
+    ws = await websockets.connect(server.url, close_timeout=1)
+    _, request = client.build_request(text)
+    await ws.send(request)
+    ttfb = None
+    frames = 0
+    while frames < played:
+        payload, done = client.parse_response(await ws.recv())
+        if payload:
+            if ttfb is None:
+                ttfb = (time.perf_counter() - start) * 1000
+            frames += 1
+        if done:
+            break
+    await ws.close()
+    return ttfb
+
+
+async def pool_turn(client, text, played):
+    start = time.perf_counter()
+    ttfb = None
+    frames = 0
+    stream = client.text_to_speech_stream(text)
+    try:
+        async for _ in stream:
+            if ttfb is None:
+                ttfb = (time.perf_counter() - start) * 1000
+            frames += 1
+            if frames >= played:
+                await client.cancel()
+    finally:
+        await stream.aclose()
+    return ttfb
+
+
+async def barge_in(args, mode):
+    server = await FakeTTSServer(
+        handshake_ms=args.handshake_ms,
+        first_frame_ms=args.first_frame_ms,
+        frame_ms=args.frame_ms,
+        frames=args.frames,
+    ).start()
+    client = make_client(args, server)
+    if mode == "pool":
+        await client.connect()
+    ttfbs = []
+    for turn in range(args.turns):
+        text = f"sentence {turn}"
+        if mode == "pool":
+            ttfbs.append(await pool_turn(client, text, args.played))
+        else:
+            ttfbs.append(await reconnect_turn(client, server, text, args.played))
+        # the user speaks before the agent answers again
+        await asyncio.sleep(args.pause_ms / 1000)
+    await client.close()
+    await server.stop()
+    return ttfbs, server.connections
+
+
+async def sentences(args, prefetch):
+    server = await FakeTTSServer(
+        handshake_ms=args.handshake_ms,
+        first_frame_ms=args.first_frame_ms,
+        frame_ms=args.frame_ms,
+        frames=args.frames,
+    ).start()
+    client = make_client(args, server)
+    await client.connect()
+    texts = [f"sentence {i}" for i in range(args.sentences)]
+    gaps = []
+    for i, text in enumerate(texts):
+        start = time.perf_counter()
+        first = True
+        async for _ in client.text_to_speech_stream(text):
+            if first and i > 0:
+                gaps.append((time.perf_counter() - start) * 1000)
+            first = False
+            if prefetch and i + 1 < len(texts):
+                client.prefetch(texts[i + 1])
+            await asyncio.sleep(args.play_ms / 1000)
+    await client.close()
+    await server.stop()
+    return gaps
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--sentences", type=int, default=10)
+    parser.add_argument("--handshake-ms", type=float, default=150)
+    parser.add_argument("--first-frame-ms", type=float, default=80)
+    parser.add_argument("--frame-ms", type=float, default=20)
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--played", type=int, default=3, help="frames before barge-in")
+    parser.add_argument("--pause-ms", type=float, default=500, help="before the next answer")
+    parser.add_argument("--play-ms", type=float, default=40)
+    parser.add_argument("--pool-size", type=int, default=2)
+    args = parser.parse_args()
+
+    print(
+        f"handshake {args.handshake_ms}ms, first frame {args.first_frame_ms}ms, "
+        f"{args.frames} frames every {args.frame_ms}ms, pool of {args.pool_size}"
+    )
+    print(f"{'barge-in':<12}{'ttfb p50':>10}{'p95':>8}{'connections':>13}")
+    for mode in ("reconnect", "pool"):
+        ttfbs, connections = asyncio.run(barge_in(args, mode))
+        p95 = statistics.quantiles(ttfbs, n=20)[-1]
+        print(f"{mode:<12}{statistics.median(ttfbs):>8.0f}ms{p95:>6.0f}ms{connections:>13}")
+
+    print(f"{'sentences':<12}{'gap p50':>10}{'max':>8}")
+    for name, prefetch in (("pool", False), ("prefetch", True)):
+        gaps = asyncio.run(sentences(args, prefetch))
+        print(f"{name:<12}{statistics.median(gaps):>8.0f}ms{max(gaps):>6.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
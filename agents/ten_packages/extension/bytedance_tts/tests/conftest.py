@@ -0,0 +1,16 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import sys
+import types
+from pathlib import Path
+
+EXTENSION_DIR = Path(__file__).resolve().parent.parent
+
+# the package without its __init__, which needs the ten runtime
+package = types.ModuleType("bytedance_tts")
+package.__path__ = [str(EXTENSION_DIR)]
+sys.modules.setdefault("bytedance_tts", package)
+sys.path.insert(0, str(EXTENSION_DIR / "tests"))
@@ -0,0 +1,123 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+A local websocket server speaking the binary protocol of the bytedance TTS
+service, for tests and benchmarks. Every request is answered, after
+first_frame_ms, with frames of silence every frame_ms, the last one with a
+negative sequence number. As the real service does, a request is answered to
+its end even if the client stops reading, and requests on a connection are
+answered one after the other.
+"""
+import asyncio
+import gzip
+import json
+from typing import List, Optional
+
+import websockets
+
+
+def audio_frame(seq: int, audio: bytes) -> bytes:
+    flags = 1 if seq > 0 else 3
+    header = bytes([0x11, 0xB0 | flags, 0x00, 0x00])
+    return (
+        header
+        + seq.to_bytes(4, "big", signed=True)
+        + len(audio).to_bytes(4, "big")
+        + audio
+    )
+
+
+def error_frame(code: int, message: str) -> bytes:
+    payload = gzip.compress(message.encode())
+    return (
+        bytes([0x11, 0xF0, 0x11, 0x00])
+        + code.to_bytes(4, "big")
+        + len(payload).to_bytes(4, "big")
+        + payload
+    )
+
+
+def parse_request(message: bytes) -> dict:
+    header_size = message[0] & 0x0F
+    payload = message[header_size * 4 :]
+    size = int.from_bytes(payload[:4], "big")
+    return json.loads(gzip.decompress(payload[4 : 4 + size]))
+
+
+class FakeTTSServer:
+    def __init__(
+        self,
+        handshake_ms: float = 0,
+        first_frame_ms: float = 20,
+        frame_ms: float = 10,
+        frames: int = 5,
+        frame_bytes: int = 640,
+    ) -> None:
+        self.handshake_ms = handshake_ms
+        self.first_frame_ms = first_frame_ms
+        self.frame_ms = frame_ms
+        self.frames = frames
+        self.frame_bytes = frame_bytes
+
+        self.server = None
+        self.connections = 0
+        self.requests: List[dict] = []
+        # the connections of the next requests are dropped instead of answered
+        self.drop_next = 0
+        self.sockets = set()
+
+    @property
+    def url(self) -> str:
+        port = self.server.sockets[0].getsockname()[1]
+        return f"ws://127.0.0.1:{port}/api/v1/tts/ws_binary"
+
+    async def start(self) -> "FakeTTSServer":
+        self.server = await websockets.serve(
+            self._handle, "127.0.0.1", 0, process_request=self._handshake
+        )
+        return self
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def drop_connections(self) -> None:
+        """Closes every connection, as a server restart would."""
+        for ws in list(self.sockets):
+            await ws.close()
+
+    async def _handshake(self, path, headers) -> Optional[tuple]:
+        # in place of the TLS and websocket round trips to the service
+        await asyncio.sleep(self.handshake_ms / 1000)
+        return None
+
+    async def _handle(self, ws) -> None:
+        self.connections += 1
+        self.sockets.add(ws)
+        try:
+            async for message in ws:
+                request = parse_request(message)
+                self.requests.append(request)
+                if self.drop_next:
+                    self.drop_next -= 1
+                    await ws.close()
+                    return
+                await self._answer(ws, request)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.sockets.discard(ws)
+
+    async def _answer(self, ws, request: dict) -> None:
+        if not request["request"]["text"]:
+            await ws.send(error_frame(3011, "empty text"))
+            return
+        await asyncio.sleep(self.first_frame_ms / 1000)
+        for i in range(1, self.frames + 1):
+            seq = i if i < self.frames else -i
+            await ws.send(audio_frame(seq, bytes(self.frame_bytes)))
+            if i < self.frames:
+                await asyncio.sleep(self.frame_ms / 1000)
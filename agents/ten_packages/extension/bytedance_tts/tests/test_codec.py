@@ -0,0 +1,111 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import gzip
+import json
+import random
+import struct
+
+import pytest
+
+from bytedance_tts.codec import (
+    AUDIO_ONLY_RESPONSE,
+    ERROR_RESPONSE,
+    FRONTEND_RESPONSE,
+    RequestEncoder,
+    decode_request,
+    decode_response,
+    describe,
+    encode_audio,
+    encode_error,
+)
+from fake_tts_server import audio_frame, error_frame
+
+TEMPLATE = {
+    "app": {"appid": "app", "token": "access_token", "cluster": "volcano_tts"},
+    "user": {"uid": "user"},
+    "audio": {"rate": 16000, "voice_type": "BV001_streaming", "encoding": "pcm"},
+    "request": {"reqid": "", "text": "", "text_type": "plain", "operation": "submit"},
+}
+
+
+def with_extensions(frame: bytes, words: int) -> bytes:
+    """frame with a header of 1 + words 4-byte words."""
+    return bytes([0x10 | (1 + words)]) + frame[1:4] + bytes(4 * words) + frame[4:]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_audio_round_trip_fuzz(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        sequence = rng.choice([1, -1]) * rng.randint(1, 2**31 - 1)
+        audio = rng.randbytes(rng.randint(0, 4096))
+        frame = encode_audio(sequence, audio)
+        # as the service frames it
+        assert frame == audio_frame(sequence, audio)
+        if rng.random() < 0.3:
+            frame = with_extensions(frame, rng.randint(1, 3))
+
+        response = decode_response(frame)
+        assert response.message_type == AUDIO_ONLY_RESPONSE
+        assert response.sequence == sequence
+        assert response.done == (sequence < 0)
+        assert bytes(response.payload) == audio
+
+
+def test_audio_payload_is_a_view_of_the_message():
+    frame = encode_audio(1, b"\x01\x02" * 320)
+    payload = decode_response(frame).payload
+    assert isinstance(payload, memoryview)
+    assert payload.obj is frame
+
+
+def test_ack_has_no_payload():
+    response = decode_response(bytes([0x11, 0xB0, 0x00, 0x00]))
+    assert response.payload is None
+    assert not response.done
+
+
+def test_error_round_trip():
+    for frame in (encode_error(3011, "empty text"), error_frame(3011, "empty text")):
+        response = decode_response(frame)
+        assert response.message_type == ERROR_RESPONSE
+        assert response.done
+        assert (response.error_code, response.error) == (3011, "empty text")
+
+
+def test_frontend_message_is_gunzipped():
+    message = json.dumps({"phonemes": []}).encode()
+    payload = gzip.compress(message)
+    frame = bytes([0x11, 0xC0, 0x11, 0x00]) + struct.pack(">I", len(payload)) + payload
+    response = decode_response(frame)
+    assert response.message_type == FRONTEND_RESPONSE
+    assert bytes(response.payload) == message
+    assert not response.done
+
+
+def test_undefined_message_type_ends_response():
+    response = decode_response(bytes([0x11, 0x90, 0x00, 0x00]))
+    assert response.done
+    assert response.error
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_request_round_trip_fuzz(seed):
+    rng = random.Random(seed)
+    encoder = RequestEncoder(TEMPLATE)
+    alphabet = "abc 你好，。\"\\\n\t "
+    for i in range(100):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 80)))
+        request = decode_request(encoder.encode(f"id{i}", text))
+        expected = json.loads(json.dumps(TEMPLATE))
+        expected["request"].update(reqid=f"id{i}", text=text)
+        assert request == expected
+    # the template is left as it is
+    assert TEMPLATE["request"]["text"] == ""
+
+
+def test_describe():
+    assert "audio-only server response" in describe(encode_audio(-3, b""))
@@ -0,0 +1,139 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+from types import SimpleNamespace
+
+from bytedance_tts.tts_client import TTSClient
+from fake_tts_server import FakeTTSServer
+
+
+class Logger:
+    def log_debug(self, _):
+        pass
+
+    log_info = log_warn = log_error = log_debug
+
+
+def make_client(server, **kwargs):
+    config = SimpleNamespace(
+        appid="app",
+        token="token",
+        voice_type="BV001_streaming",
+        sample_rate=16000,
+        api_url=server.url,
+        cluster="volcano_tts",
+        pool_size=2,
+        ping_interval_ms=0,
+        drain_timeout_ms=1000,
+        log_frames=False,
+    )
+    config.__dict__.update(kwargs)
+    return TTSClient(config, Logger())
+
+
+async def collect(client, text, limit=None):
+    chunks = []
+    stream = client.text_to_speech_stream(text)
+    try:
+        async for chunk in stream:
+            chunks.append(chunk)
+            if limit is not None and len(chunks) >= limit:
+                await client.cancel()
+    finally:
+        await stream.aclose()
+    return chunks
+
+
+async def settle(client):
+    while client.pool.tasks:
+        await asyncio.wait(list(client.pool.tasks))
+
+
+def run(scenario, **server_kwargs):
+    async def main():
+        server = await FakeTTSServer(**server_kwargs).start()
+        client = make_client(server)
+        await client.connect()
+        try:
+            return await scenario(server, client)
+        finally:
+            await client.close()
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+def test_requests_reuse_pooled_connections():
+    async def scenario(server, client):
+        for text in ("one", "two", "three"):
+            assert len(await collect(client, text)) == server.frames
+        await settle(client)
+        assert server.connections == 2
+        assert client.pool.metrics()["cold_connects"] == 0
+
+    run(scenario)
+
+
+def test_cancel_drains_connection_for_reuse():
+    async def scenario(server, client):
+        assert len(await collect(client, "barge in", limit=2)) == 2
+        await settle(client)
+        assert client.pool.metrics()["drained"] == 1
+        assert len(await collect(client, "next")) == server.frames
+        await settle(client)
+        # the cancelled request cost no connection
+        assert server.connections == 2
+
+    run(scenario, frames=10)
+
+
+def test_standby_takes_over_after_connection_error():
+    async def scenario(server, client):
+        server.drop_next = 1
+        assert len(await collect(client, "retried")) == server.frames
+        await settle(client)
+        metrics = client.pool.metrics()
+        assert metrics["discarded"] == 1
+        assert metrics["cold_connects"] == 0
+        assert metrics["idle"] == 2
+        assert [r["request"]["text"] for r in server.requests] == ["retried", "retried"]
+
+    run(scenario)
+
+
+def test_dropped_idle_connections_are_replaced():
+    async def scenario(server, client):
+        await server.drop_connections()
+        await asyncio.sleep(0.05)
+        assert len(await collect(client, "after restart")) == server.frames
+
+    run(scenario)
+
+
+def test_prefetch_overlaps_next_sentence():
+    async def scenario(server, client):
+        stream = client.text_to_speech_stream("first")
+        async for _ in stream:
+            client.prefetch("second")
+        assert client.prefetched is not None
+        # the second request was answered while the first one streamed
+        await asyncio.sleep(0.1)
+        chunks = await collect(client, "second")
+        assert len(chunks) == server.frames
+        assert [r["request"]["text"] for r in server.requests] == ["first", "second"]
+
+    run(scenario)
+
+
+def test_prefetch_of_other_text_is_abandoned():
+    async def scenario(server, client):
+        await collect(client, "first")
+        client.prefetch("flushed")
+        assert len(await collect(client, "other")) == server.frames
+        await settle(client)
+        assert client.pool.metrics()["idle"] == 2
+
+    run(scenario)
@@ -0,0 +1,404 @@
+#
+#
+# Agora Real Time Engagement
+# Created by XinHui Li in 2024.
+# Copyright (c) 2024 Agora IO. All rights reserved.
+#
+#
+
+from collections import deque
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Optional, Set, Tuple
+
+import websockets
+import uuid
+import asyncio
+import threading
+import time
+
+from .codec import (
+    AUDIO_ONLY_RESPONSE,
+    ERROR_RESPONSE,
+    FRONTEND_RESPONSE,
+    RequestEncoder,
+    decode_response,
+    describe,
+)
+
+
+class WebsocketPool:
+    """
+    Up to size pre-connected websockets, the ones no request uses being warm
+    standbys, so that a request does not wait for a TLS and websocket
+    handshake. A socket whose request was abandoned is drained of the rest of
+    its response in the background and reused; a broken one is closed and
+    replaced, the next request taking a standby meanwhile. Keep-alive pings
+    are left to the websockets library, which closes a socket that stops
+    answering them.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Awaitable[Any]],
+        ten_env: Any,
+        size: int = 2,
+        drain_timeout_ms: int = 3000,
+    ) -> None:
+        self.connect = connect
+        self.ten_env = ten_env
+        self.size = max(1, size)
+        self.drain_timeout = drain_timeout_ms / 1000
+        self.idle: Deque[Any] = deque()
+        self.in_use = 0
+        self.connecting = 0
+        self.tasks: Set[asyncio.Task] = set()
+        self.closed = False
+
+        self.warm_acquires = 0
+        self.cold_connects = 0
+        self.drained = 0
+        self.discarded = 0
+
+    async def start(self) -> None:
+        self.closed = False
+        self._replenish()
+        if self.tasks:
+            await asyncio.wait(self.tasks)
+
+    async def acquire(self) -> Any:
+        ws = self.try_acquire()
+        if ws is not None:
+            return ws
+        self.cold_connects += 1
+        self.in_use += 1
+        try:
+            return await self.connect()
+        except BaseException:
+            self.in_use -= 1
+            raise
+
+    def try_acquire(self) -> Optional[Any]:
+        """An idle open socket, or None without waiting."""
+        while self.idle:
+            ws = self.idle.popleft()
+            if ws.open:
+                self.warm_acquires += 1
+                self.in_use += 1
+                return ws
+            self._drop(ws)
+        return None
+
+    def release(self, ws: Any) -> None:
+        self.in_use -= 1
+        self._keep(ws)
+
+    def abandon(self, ws: Any, drain: Callable[[Any], Awaitable[None]]) -> None:
+        """Reuses ws once drain has read the response left of its request."""
+
+        async def run():
+            try:
+                await asyncio.wait_for(drain(ws), self.drain_timeout)
+            except Exception as e:
+                self.ten_env.log_warn(f"Websocket drain failed: {e!r}.")
+                self.discard(ws)
+                return
+            self.drained += 1
+            self.release(ws)
+
+        self._spawn(run())
+
+    def discard(self, ws: Any) -> None:
+        self.in_use -= 1
+        self._drop(ws)
+
+    async def close(self) -> None:
+        self.closed = True
+        for task in list(self.tasks):
+            task.cancel()
+        while self.idle:
+            await self.idle.popleft().close()
+
+    def metrics(self) -> dict:
+        return {
+            "idle": len(self.idle),
+            "in_use": self.in_use,
+            "warm_acquires": self.warm_acquires,
+            "cold_connects": self.cold_connects,
+            "drained": self.drained,
+            "discarded": self.discarded,
+        }
+
+    def _keep(self, ws: Any) -> None:
+        if self.closed or not ws.open or len(self.idle) + self.in_use >= self.size:
+            self._spawn(ws.close())
+            return
+        self.idle.append(ws)
+
+    def _drop(self, ws: Any) -> None:
+        self.discarded += 1
+        self._spawn(ws.close())
+        self._replenish()
+
+    def _replenish(self) -> None:
+        while (
+            not self.closed
+            and len(self.idle) + self.in_use + self.connecting < self.size
+        ):
+            self.connecting += 1
+            self._spawn(self._open())
+
+    async def _open(self) -> None:
+        try:
+            ws = await self.connect()
+        except Exception as e:
+            self.ten_env.log_warn(f"Standby websocket connection failed: {e!r}.")
+            return
+        finally:
+            self.connecting -= 1
+        self._keep(ws)
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+
+class _Prefetch:
+    """A request sent ahead of its turn, its audio buffered until streamed."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.chunks: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+        # the websocket until the request is sent on it
+        self.ws: Any = None
+
+
+class TTSClient:
+    def __init__(self, config: Any, ten_env: Any) -> None:
+        self.config = config
+        self.ten_env = ten_env
+        self.pool = WebsocketPool(
+            self._connect,
+            ten_env,
+            size=config.pool_size,
+            drain_timeout_ms=config.drain_timeout_ms,
+        )
+        self.prefetched: Optional[_Prefetch] = None
+
+        # Refer to: https://www.volcengine.com/docs/6561/79823.
+        self.request_template = {
+            "app": {
+                "appid": self.config.appid,
+                "token": "access_token",
+                "cluster": self.config.cluster,
+            },
+            "user": {"uid": str(uuid.uuid4())},  # Any non-empty string, used for tracing.
+            "audio": {
+                "rate": self.config.sample_rate,
+                "voice_type": self.config.voice_type,
+                "encoding": "pcm",
+                "speed_ratio": 1.0,
+                "volume_ratio": 1.0,
+                "pitch_ratio": 1.0,
+            },
+            "request": {
+                "reqid": "",  # Must be unique for each request.
+                "text": "",  # Text to be synthesized.
+                "text_type": "plain",
+                "operation": "submit",
+            },
+        }
+        self.encoder = RequestEncoder(self.request_template)
+        self._cancel = threading.Event()
+
+    def is_cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    async def cancel(self) -> None:
+        self._cancel.set()
+        self._abandon_prefetch()
+
+    async def connect(self) -> None:
+        """Opens the pool: one websocket per request in flight and standbys."""
+        await self.pool.start()
+        self.ten_env.log_info(f"Websocket pool started, {self.pool.metrics()}.")
+
+    async def _connect(self) -> Any:
+        header = {"Authorization": f"Bearer; {self.config.token}"}
+        ping_interval = self.config.ping_interval_ms / 1000 or None
+        ws = await websockets.connect(
+            self.config.api_url,
+            extra_headers=header,
+            ping_interval=ping_interval,
+            ping_timeout=ping_interval,
+            close_timeout=1,
+        )
+        self.ten_env.log_info("Websocket connection established.")
+        return ws
+
+    async def close(self) -> None:
+        self._abandon_prefetch()
+        await self.pool.close()
+        self.ten_env.log_info(f"Websocket pool closed, {self.pool.metrics()}.")
+
+    async def reconnect(self) -> None:
+        await self.close()
+        await self.connect()
+
+    def parse_response(self, response: websockets.Data) -> Tuple[Optional[memoryview], bool]:
+        """The audio of response, a view of it, and whether it is the last one."""
+        r = decode_response(response)
+        if self.config.log_frames:
+            self.ten_env.log_debug(
+                f"Response: {describe(response)}, sequence {r.sequence}, "
+                f"payload {len(r.payload) if r.payload is not None else 0} bytes"
+            )
+
+        if r.message_type == AUDIO_ONLY_RESPONSE:
+            return r.payload, r.done
+        if r.message_type == FRONTEND_RESPONSE:
+            if self.config.log_frames:
+                self.ten_env.log_debug(f"Frontend message: {bytes(r.payload)}")
+            return None, False
+        if r.message_type == ERROR_RESPONSE:
+            self.ten_env.log_error(f"Error message code {r.error_code}: {r.error}")
+        else:
+            self.ten_env.log_error(r.error)
+        return None, True
+
+    def build_request(self, text: str) -> Tuple[str, bytes]:
+        request_id = str(uuid.uuid4())
+        self.ten_env.log_info(f"Request ({request_id}): {text}")
+        return request_id, self.encoder.encode(request_id, text)
+
+    async def drain(self, ws: Any) -> None:
+        """Reads and drops the rest of the response of an abandoned request."""
+        while True:
+            _, done = self.parse_response(await ws.recv())
+            if done:
+                return
+
+    def prefetch(self, text: str) -> None:
+        """
+        Sends the request of the next sentence on a standby websocket, so that
+        its synthesis overlaps the current one. Only done if a standby is idle.
+        """
+        if self.prefetched is not None or self.is_cancelled():
+            return
+        ws = self.pool.try_acquire()
+        if ws is None:
+            return
+        prefetched = _Prefetch(text)
+        prefetched.ws = ws
+        prefetched.task = asyncio.ensure_future(self._fetch(prefetched))
+        prefetched.task.add_done_callback(
+            # cancelled before it could start
+            lambda _: prefetched.ws and self.pool.release(prefetched.ws)
+        )
+        self.prefetched = prefetched
+
+    async def _fetch(self, prefetched: _Prefetch) -> None:
+        ws, prefetched.ws = prefetched.ws, None
+        try:
+            async with aclosing(self._request(ws, prefetched.text)) as stream:
+                async for payload in stream:
+                    prefetched.chunks.put_nowait(payload)
+        except Exception as e:
+            prefetched.chunks.put_nowait(e)
+        finally:
+            prefetched.chunks.put_nowait(None)
+
+    def _abandon_prefetch(self) -> None:
+        if self.prefetched is not None:
+            self.prefetched.task.cancel()
+            self.prefetched = None
+
+    async def text_to_speech_stream(self, text: str) -> AsyncIterator[bytes]:
+        self._cancel.clear()
+        prefetched, self.prefetched = self.prefetched, None
+        if prefetched is not None:
+            if prefetched.text == text:
+                async for payload in self._stream_prefetched(prefetched):
+                    yield payload
+                return
+            prefetched.task.cancel()
+
+        # a request failing before any audio is retried once, on a standby
+        for attempt in range(2):
+            ws = await self.pool.acquire()
+            started = False
+            try:
+                async with aclosing(self._request(ws, text)) as stream:
+                    async for payload in stream:
+                        started = True
+                        yield payload
+                return
+            except websockets.exceptions.ConnectionClosed as e:
+                self.ten_env.log_error(f"Connection is closed with error: {e}.")
+                if started or attempt > 0:
+                    return
+            except asyncio.TimeoutError:
+                self.ten_env.log_error("Timeout waiting for response.")
+                return
+
+    async def _stream_prefetched(self, prefetched: _Prefetch) -> AsyncIterator[bytes]:
+        try:
+            while True:
+                payload = await prefetched.chunks.get()
+                if payload is None:
+                    return
+                if isinstance(payload, Exception):
+                    self.ten_env.log_error(f"Prefetched request failed: {payload!r}.")
+                    return
+                if self.is_cancelled():
+                    return
+                yield payload
+        finally:
+            prefetched.task.cancel()
+
+    async def _request(self, ws: Any, text: str) -> AsyncIterator[bytes]:
+        """
+        Streams the audio of text from ws, given back to the pool afterwards:
+        as is once the response ended, drained if the request was cancelled
+        or abandoned, closed if the connection failed.
+        """
+        start = time.perf_counter()
+        request_id, full_request = self.build_request(text)
+        done = False
+        first = True
+        try:
+            await ws.send(full_request)
+
+            while True:
+                if self.is_cancelled():
+                    self.ten_env.log_info(f"Request ({request_id}) has been cancelled.")
+                    break
+
+                resp = await ws.recv()
+                payload, done = self.parse_response(resp)
+
+                if payload:
+                    if first:
+                        first = False
+                        ttfb = int((time.perf_counter() - start) * 1000)
+                        self.ten_env.log_info(f"Request ({request_id}), ttfb {ttfb}ms.")
+                    yield payload
+
+                if done:
+                    self.ten_env.log_info(
+                        f"Response is completed for request: {request_id}."
+                    )
+                    break
+        except (websockets.exceptions.ConnectionClosed, OSError):
+            self.pool.discard(ws)
+            ws = None
+            raise
+        finally:
+            if ws is None:
+                pass
+            elif done:
+                self.pool.release(ws)
+            else:
+                # the server streams the rest of the response regardless
+                self.pool.abandon(ws, self.drain)
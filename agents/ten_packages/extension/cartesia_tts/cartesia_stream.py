@@ -0,0 +1,201 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import base64
+import json
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from urllib.parse import urlencode
+
+import websockets
+
+CARTESIA_VERSION = "2024-06-10"
+
+
+class _Context:
+    """The context of a turn: its text goes in as it comes, audio goes on."""
+
+    def __init__(self) -> None:
+        self.context_id = uuid.uuid4().hex
+        self.cancelled = False
+        self.text_sent_at: Optional[float] = None
+        self.ttfb_ms: Optional[int] = None
+        # audio held until the contexts of the previous turns are done
+        self.audio: Deque[bytes] = deque()
+        self.done = False
+
+
+class CartesiaTurnStream:
+    """
+    The sentences of a turn sent as continuations of one context of the
+    Cartesia websocket, so the voice keeps its prosody across them and no
+    request is set up per sentence. Audio is read continuously into the
+    buffer of its context, and the buffers go to the queue turn by turn, so
+    the audio of a turn waits until the previous turn is done. Each turn gets
+    its own context on the same connection; a cancel cancels the contexts
+    server-side and drops their audio, held or still coming.
+
+    Refer to: https://docs.cartesia.ai/api-reference/tts/tts.
+    """
+
+    def __init__(self, config: Any, ten_env: Any) -> None:
+        self.config = config
+        self.ten_env = ten_env
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.ws = None
+        self.receiver: Optional[asyncio.Task] = None
+        # the context taking the text of the turn
+        self.context: Optional[_Context] = None
+        # the contexts audio may still come for, by id
+        self.contexts: Dict[str, _Context] = {}
+        # the contexts whose audio is not all queued yet, in turn order
+        self.order: Deque[_Context] = deque()
+        self.lock = asyncio.Lock()
+        self.closed = False
+
+        self.connections = 0
+        self.turns = 0
+        self.ttfbs: List[int] = []
+
+    @property
+    def url(self) -> str:
+        query = urlencode({"cartesia_version": CARTESIA_VERSION})
+        return f"{self.config.ws_url}/tts/websocket?{query}"
+
+    async def connect(self) -> None:
+        self.ws = await websockets.connect(
+            self.url,
+            extra_headers={"X-API-Key": self.config.api_key},
+            close_timeout=1,
+        )
+        self.connections += 1
+        self._end_contexts()
+        self.receiver = asyncio.create_task(self._receive(self.ws))
+        self.ten_env.log_info(f"websocket is open, connections: {self.connections}")
+
+    async def close(self) -> None:
+        self.closed = True
+        if self.ws is not None:
+            await self.ws.close()
+        if self.receiver is not None:
+            await asyncio.gather(self.receiver, return_exceptions=True)
+        await self.queue.put(None)
+
+    async def get_audio_bytes(self) -> Optional[bytes]:
+        return await self.queue.get()
+
+    async def send_text(self, text: str, end_of_segment: bool) -> None:
+        async with self.lock:
+            if self.ws is None or not self.ws.open:
+                await self.connect()
+            context = self.context
+            if context is None:
+                context = _Context()
+                self.context = context
+                self.contexts[context.context_id] = context
+                self.order.append(context)
+                self.turns += 1
+            if context.text_sent_at is None and text.strip():
+                context.text_sent_at = time.perf_counter()
+            # the last input of a context says so with continue false
+            await self._send(
+                context,
+                transcript=text + " " if text.strip() and not end_of_segment else text,
+                **{"continue": not end_of_segment},
+            )
+            if end_of_segment:
+                self.context = None
+
+    async def cancel(self) -> None:
+        """Stops the audio of the turns in progress, keeping the connection."""
+        self.context = None
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        for context in self.order:
+            context.audio.clear()
+        self.order.clear()
+        for context in list(self.contexts.values()):
+            context.cancelled = True
+            self.contexts.pop(context.context_id, None)
+            try:
+                await self.ws.send(
+                    json.dumps({"context_id": context.context_id, "cancel": True})
+                )
+            except websockets.exceptions.ConnectionClosed as e:
+                self.ten_env.log_warn(f"cancelling context failed, {e}")
+
+    def metrics(self) -> dict:
+        ttfbs = sorted(self.ttfbs)
+        return {
+            "connections": self.connections,
+            "turns": self.turns,
+            "ttfb_p50_ms": ttfbs[len(ttfbs) // 2] if ttfbs else None,
+        }
+
+    async def _send(self, context: _Context, **message) -> None:
+        message.update(
+            context_id=context.context_id,
+            model_id=self.config.model_id,
+            language=self.config.language,
+            voice={"mode": "id", "id": self.config.voice_id},
+            output_format={
+                "container": "raw",
+                "encoding": "pcm_s16le",
+                "sample_rate": self.config.sample_rate,
+            },
+        )
+        await self.ws.send(json.dumps(message))
+
+    async def _receive(self, ws) -> None:
+        try:
+            async for message in ws:
+                data = json.loads(message)
+                context_id = data.get("context_id")
+                context = self.contexts.get(context_id)
+                kind = data.get("type")
+                if kind == "error":
+                    self.ten_env.log_error(f"context {context_id} failed, {data.get('error')}")
+                done = kind in ("done", "error") or data.get("done")
+                if done:
+                    self.contexts.pop(context_id, None)
+                if context is None or context.cancelled:
+                    continue
+                if kind == "chunk":
+                    if context.ttfb_ms is None and context.text_sent_at is not None:
+                        context.ttfb_ms = int((time.perf_counter() - context.text_sent_at) * 1000)
+                        self.ttfbs.append(context.ttfb_ms)
+                        self.ten_env.log_info(f"context {context_id} ttfb {context.ttfb_ms}ms")
+                    context.audio.append(base64.b64decode(data["data"]))
+                if done:
+                    context.done = True
+                self._release()
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.ten_env.log_info("websocket is closed.")
+            if self.ws is ws:
+                self._end_contexts()
+
+    def _release(self) -> None:
+        # the first turn streams, the next ones wait for it to be done
+        while self.order:
+            context = self.order[0]
+            while context.audio:
+                self.queue.put_nowait(context.audio.popleft())
+            if not context.done:
+                return
+            self.order.popleft()
+
+    def _end_contexts(self) -> None:
+        # no more audio comes for the contexts of a closed connection, the
+        # audio they got is played out in order
+        self.context = None
+        self.contexts.clear()
+        for context in self.order:
+            context.done = True
+        self._release()
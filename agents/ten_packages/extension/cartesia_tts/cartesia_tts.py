@@ -21,6 +21,10 @@ class CartesiaTTSConfig(BaseConfig):
     request_timeout_seconds: int = 10
     sample_rate: int = 16000
     voice_id: str = "f9836c6e-a0bd-460e-9d3c-f7299fa60f94"
+    # Stream the sentences of a turn into one context of the websocket API,
+    # instead of a request per sentence.
+    turn_streaming: bool = True
+    ws_url: str = "wss://api.cartesia.ai"
 
 class CartesiaTTS:
     def __init__(self, config: CartesiaTTSConfig) -> None:
@@ -3,8 +3,10 @@
 # Licensed under the Apache License, Version 2.0.
 # See the LICENSE file for more information.
 #
+import asyncio
 import traceback
 
+from .cartesia_stream import CartesiaTurnStream
 from .cartesia_tts import CartesiaTTS, CartesiaTTSConfig
 from ten import (
     AsyncTenEnv,
@@ -31,7 +33,12 @@ class CartesiaTTSExtension(AsyncTTSBaseExtension):
             if not self.config.api_key:
                 raise ValueError("api_key is required")
 
-            self.client = CartesiaTTS(self.config)
+            if self.config.turn_streaming:
+                self.client = CartesiaTurnStream(self.config, ten_env)
+                asyncio.create_task(self._process_audio_data(ten_env))
+                await self.client.connect()
+            else:
+                self.client = CartesiaTTS(self.config)
         except Exception:
             ten_env.log_error(f"on_start failed: {traceback.format_exc()}")
 
@@ -39,17 +46,38 @@ class CartesiaTTSExtension(AsyncTTSBaseExtension):
         await super().on_stop(ten_env)
         ten_env.log_debug("on_stop")
 
+        if isinstance(self.client, CartesiaTurnStream):
+            ten_env.log_info(f"turn streaming metrics: {self.client.metrics()}")
+            await self.client.close()
+
     async def on_deinit(self, ten_env: AsyncTenEnv) -> None:
         await super().on_deinit(ten_env)
         ten_env.log_debug("on_deinit")
 
+    async def _process_audio_data(self, ten_env: AsyncTenEnv) -> None:
+        while True:
+            audio_data = await self.client.get_audio_bytes()
+
+            if audio_data is None:
+                break
+
+            await self.send_audio_out(
+                ten_env, audio_data, sample_rate=self.config.sample_rate
+            )
+
     async def on_request_tts(
         self, ten_env: AsyncTenEnv, input_text: str, end_of_segment: bool
     ) -> None:
+        if self.config.turn_streaming:
+            await self.client.send_text(input_text, end_of_segment)
+            return
+
         audio_stream = await self.client.text_to_speech_stream(input_text)
 
         async for audio_data in audio_stream:
             await self.send_audio_out(ten_env, audio_data["audio"])
 
     async def on_cancel_tts(self, ten_env: AsyncTenEnv) -> None:
+        if self.config.turn_streaming:
+            await self.client.cancel()
         return await super().on_cancel_tts(ten_env)
@@ -0,0 +1,132 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+A local websocket server speaking the Cartesia websocket protocol with
+contexts, for tests. Every non-blank transcript of a context is answered,
+first_audio_ms after it arrives, with frames_per_text base64 chunks every
+frame_ms, in the order the transcripts came, and done follows the audio of
+the input with continue false. A chunk is the transcript padded with
+silence, so tests can tell whose audio it is. A cancel drops the audio left
+for the context.
+"""
+import asyncio
+import base64
+import json
+from typing import Dict, List
+
+import websockets
+
+
+class FakeCartesiaServer:
+    def __init__(
+        self,
+        handshake_ms: float = 0,
+        first_audio_ms: float = 20,
+        frame_ms: float = 5,
+        frames_per_text: int = 3,
+        frame_bytes: int = 640,
+    ) -> None:
+        self.handshake_ms = handshake_ms
+        self.first_audio_ms = first_audio_ms
+        self.frame_ms = frame_ms
+        self.frames_per_text = frames_per_text
+        self.frame_bytes = frame_bytes
+
+        self.server = None
+        self.connections = 0
+        self.contexts: Dict[str, dict] = {}
+        self.texts: List[str] = []
+        self.sockets = set()
+
+    @property
+    def url(self) -> str:
+        port = self.server.sockets[0].getsockname()[1]
+        return f"ws://127.0.0.1:{port}"
+
+    async def start(self) -> "FakeCartesiaServer":
+        self.server = await websockets.serve(
+            self._handle, "127.0.0.1", 0, process_request=self._handshake
+        )
+        return self
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def drop_connections(self) -> None:
+        for ws in list(self.sockets):
+            await ws.close()
+
+    async def _handshake(self, path, headers):
+        await asyncio.sleep(self.handshake_ms / 1000)
+        return None
+
+    async def _handle(self, ws) -> None:
+        self.connections += 1
+        self.sockets.add(ws)
+        try:
+            async for message in ws:
+                request = json.loads(message)
+                context_id = request["context_id"]
+                context = self.contexts.get(context_id)
+                if context is None:
+                    context = {
+                        "context_id": context_id,
+                        "texts": asyncio.Queue(),
+                        "cancelled": False,
+                        "done": False,
+                        "request": request,
+                    }
+                    context["synthesis"] = asyncio.create_task(self._synthesize(ws, context))
+                    self.contexts[context_id] = context
+                if request.get("cancel"):
+                    context["cancelled"] = True
+                    context["synthesis"].cancel()
+                    continue
+                if context["done"]:
+                    await ws.send(
+                        json.dumps(
+                            {"type": "error", "context_id": context_id, "error": "context done"}
+                        )
+                    )
+                    continue
+                if request["transcript"].strip():
+                    self.texts.append(request["transcript"].strip())
+                    context["texts"].put_nowait(request["transcript"])
+                if not request.get("continue"):
+                    context["done"] = True
+                    context["texts"].put_nowait(None)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.sockets.discard(ws)
+
+    async def _synthesize(self, ws, context) -> None:
+        try:
+            while True:
+                text = await context["texts"].get()
+                if text is None:
+                    await ws.send(
+                        json.dumps({"type": "done", "done": True, "context_id": context["context_id"]})
+                    )
+                    return
+                frame = text.strip().encode().ljust(self.frame_bytes, b"\0")
+                data = base64.b64encode(frame).decode()
+                await asyncio.sleep(self.first_audio_ms / 1000)
+                for _ in range(self.frames_per_text):
+                    await ws.send(
+                        json.dumps(
+                            {
+                                "type": "chunk",
+                                "data": data,
+                                "done": False,
+                                "context_id": context["context_id"],
+                            }
+                        )
+                    )
+                    await asyncio.sleep(self.frame_ms / 1000)
+        except websockets.exceptions.ConnectionClosed:
+            pass
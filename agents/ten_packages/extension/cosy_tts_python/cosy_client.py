@@ -0,0 +1,247 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Optional
+
+import websockets
+
+# Refer to: https://help.aliyun.com/zh/model-studio/cosyvoice-websocket-api.
+RUN_TASK = "run-task"
+CONTINUE_TASK = "continue-task"
+FINISH_TASK = "finish-task"
+TASK_STARTED = "task-started"
+RESULT_GENERATED = "result-generated"
+TASK_FINISHED = "task-finished"
+TASK_FAILED = "task-failed"
+
+
+class _Task:
+    """A synthesis task, the sentences of one turn."""
+
+    def __init__(self) -> None:
+        self.task_id = uuid.uuid4().hex
+        self.started = asyncio.Event()
+        self.finished = asyncio.Event()
+        # finish-task is sent, no text is to come
+        self.finishing = False
+        # audio still arriving is dropped
+        self.cancelled = False
+        self.text_sent_at: Optional[float] = None
+        self.ttfb_ms: Optional[int] = None
+
+
+class CosyTTS:
+    """
+    Speech synthesis over one DashScope duplex websocket, kept open between
+    turns. The sentences of a turn are continue-task inputs of a single task,
+    so the service keeps their prosody and no task is negotiated per sentence.
+    A cancelled task is finished server-side while its audio is dropped, and
+    the next turn goes on the same connection.
+
+    Tasks on a connection run one after the other and audio frames carry no
+    task id, so the frames received belong to the oldest unfinished task.
+    """
+
+    def __init__(self, config: Any, ten_env: Any) -> None:
+        self.config = config
+        self.ten_env = ten_env
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.ws = None
+        self.receiver: Optional[asyncio.Task] = None
+        # the task taking text, and the one audio arrives for
+        self.task: Optional[_Task] = None
+        self.receiving: Optional[_Task] = None
+        self.lock = asyncio.Lock()
+        self.closed = False
+
+        self.connections = 0
+        self.tasks = 0
+        self.ttfbs = []
+
+    async def connect(self) -> None:
+        header = {"Authorization": f"Bearer {self.config.api_key}"}
+        ping_interval = self.config.ping_interval_ms / 1000 or None
+        self.ws = await websockets.connect(
+            self.config.url,
+            extra_headers=header,
+            ping_interval=ping_interval,
+            ping_timeout=ping_interval,
+            close_timeout=1,
+        )
+        self.connections += 1
+        self.receiving = None
+        self.task = None
+        self.receiver = asyncio.create_task(self._receive(self.ws))
+        self.ten_env.log_info(f"websocket is open, connections: {self.connections}")
+
+    async def close(self) -> None:
+        self.closed = True
+        if self.ws is not None:
+            await self.ws.close()
+        if self.receiver is not None:
+            await asyncio.gather(self.receiver, return_exceptions=True)
+        await self.queue.put(None)
+
+    async def get_audio_bytes(self) -> Optional[bytes]:
+        return await self.queue.get()
+
+    async def text_to_speech_stream(
+        self, ten_env: Any, text: str, end_of_segment: bool
+    ) -> None:
+        async with self.lock:
+            try:
+                if self.task is None:
+                    self.task = await self._start_task()
+                task = self.task
+                if text:
+                    if task.text_sent_at is None:
+                        task.text_sent_at = time.perf_counter()
+                    await self._send(CONTINUE_TASK, task, {"text": text})
+                if end_of_segment:
+                    ten_env.log_info("Streaming complete")
+                    await self._send(FINISH_TASK, task, {})
+                    task.finishing = True
+                    self.task = None
+            except (websockets.exceptions.ConnectionClosed, OSError) as e:
+                ten_env.log_error(f"WebSocket connection closed, {e}")
+                self.task = None
+            except Exception as e:
+                ten_env.log_error(f"Error streaming text, {e}")
+                self.task = None
+
+    async def cancel(self, ten_env: Any) -> None:
+        """Cancels the task of the turn, keeping the connection."""
+        task = self.receiving
+        self.task = None
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        if task is None or task.finished.is_set() or task.cancelled:
+            return
+        task.cancelled = True
+        # also once finish-task is sent, as the sdk does, to stop synthesis
+        task.finishing = True
+        try:
+            await self._send(FINISH_TASK, task, {"directive": "cancel"})
+        except Exception as e:
+            ten_env.log_error(f"Error cancelling streaming, {e}")
+
+    def metrics(self) -> dict:
+        ttfbs = sorted(self.ttfbs)
+        return {
+            "connections": self.connections,
+            "tasks": self.tasks,
+            "ttfb_p50_ms": ttfbs[len(ttfbs) // 2] if ttfbs else None,
+        }
+
+    async def _start_task(self) -> _Task:
+        previous = self.receiving
+        if previous is not None and not previous.finished.is_set():
+            # a turn cancelled or finished before this one may still be going
+            try:
+                await asyncio.wait_for(
+                    previous.finished.wait(), self.config.cancel_timeout_ms / 1000
+                )
+            except asyncio.TimeoutError:
+                self.ten_env.log_warn("previous task did not finish, reconnecting")
+                await self.ws.close()
+        if self.ws is None or not self.ws.open:
+            await self.connect()
+
+        task = _Task()
+        self.receiving = task
+        self.tasks += 1
+        await self._send(
+            RUN_TASK,
+            task,
+            {},
+            {
+                "voice": self.config.voice,
+                "text_type": "PlainText",
+                "format": "pcm",
+                "sample_rate": self.config.sample_rate,
+            },
+        )
+        await asyncio.wait_for(task.started.wait(), self.config.cancel_timeout_ms / 1000)
+        return task
+
+    async def _send(
+        self, action: str, task: _Task, payload_input: dict, parameters: Optional[dict] = None
+    ) -> None:
+        payload = {"input": payload_input}
+        if action != FINISH_TASK:
+            payload.update(
+                model=self.config.model,
+                task_group="audio",
+                task="tts",
+                function="SpeechSynthesizer",
+            )
+        if parameters is not None:
+            payload["parameters"] = parameters
+        message = {
+            "header": {"action": action, "task_id": task.task_id, "streaming": "duplex"},
+            "payload": payload,
+        }
+        await self.ws.send(json.dumps(message))
+
+    async def _receive(self, ws) -> None:
+        try:
+            async for message in ws:
+                task = self.receiving
+                if isinstance(message, bytes):
+                    if task is None or task.cancelled:
+                        continue
+                    if task.ttfb_ms is None and task.text_sent_at is not None:
+                        task.ttfb_ms = int((time.perf_counter() - task.text_sent_at) * 1000)
+                        self.ttfbs.append(task.ttfb_ms)
+                        self.ten_env.log_info(f"task {task.task_id} ttfb {task.ttfb_ms}ms")
+                    self.queue.put_nowait(message)
+                    continue
+
+                event = json.loads(message)
+                header = event["header"]
+                if task is None or header.get("task_id") != task.task_id:
+                    continue
+                name = header["event"]
+                if name == TASK_STARTED:
+                    task.started.set()
+                elif name == TASK_FINISHED:
+                    self.ten_env.log_info("speech synthesis task complete successfully.")
+                    task.finished.set()
+                elif name == TASK_FAILED:
+                    self.ten_env.log_error(
+                        f"speech synthesis task failed, {header.get('error_message')}"
+                    )
+                    task.started.set()
+                    task.finished.set()
+                    if self.task is task:
+                        self.task = None
+                elif name == RESULT_GENERATED:
+                    self.ten_env.log_debug(f"received event: {message}")
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.ten_env.log_info("websocket is closed.")
+            task = self.receiving
+            if task is not None:
+                task.started.set()
+                task.finished.set()
+            if self.ws is ws:
+                self.task = None
+                if not self.closed:
+                    # warm for the next turn
+                    asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        async with self.lock:
+            if self.closed or (self.ws is not None and self.ws.open):
+                return
+            try:
+                await self.connect()
+            except Exception as e:
+                self.ten_env.log_warn(f"reconnect failed, {e!r}")
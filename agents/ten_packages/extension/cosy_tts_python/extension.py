@@ -4,7 +4,8 @@
 # See the LICENSE file for more information.
 #
 import asyncio
-from .cosy_tts import CosyTTS, CosyTTSConfig
+from .cosy_client import CosyTTS
+from .cosy_tts import CosyTTSConfig
 from ten import (
     AsyncTenEnv,
 )
@@ -26,15 +27,21 @@ class CosyTTSExtension(AsyncTTSBaseExtension):
         ten_env.log_debug("on_start")
 
         self.config = await CosyTTSConfig.create_async(ten_env=ten_env)
-        self.client = CosyTTS(self.config)
+        self.client = CosyTTS(self.config, ten_env)
 
         asyncio.create_task(self._process_audio_data(ten_env))
+        try:
+            # warm for the first turn
+            await self.client.connect()
+        except Exception as e:
+            ten_env.log_warn(f"connect failed, retrying on the first turn, {e!r}")
 
     async def on_stop(self, ten_env: AsyncTenEnv) -> None:
         await super().on_stop(ten_env)
         ten_env.log_debug("on_stop")
 
-        await self.queue.put(None)
+        ten_env.log_info(f"synthesis metrics: {self.client.metrics()}")
+        await self.client.close()
 
     async def on_deinit(self, ten_env: AsyncTenEnv) -> None:
         await super().on_deinit(ten_env)
@@ -47,12 +54,14 @@ class CosyTTSExtension(AsyncTTSBaseExtension):
             if audio_data is None:
                 break
 
-            await self.send_audio_out(ten_env, audio_data)
+            await self.send_audio_out(
+                ten_env, audio_data, sample_rate=self.config.sample_rate
+            )
 
     async def on_request_tts(
         self, ten_env: AsyncTenEnv, input_text: str, end_of_segment: bool
     ) -> None:
-        self.client.text_to_speech_stream(ten_env, input_text, end_of_segment)
+        await self.client.text_to_speech_stream(ten_env, input_text, end_of_segment)
 
     async def on_cancel_tts(self, ten_env: AsyncTenEnv) -> None:
-        self.client.cancel(ten_env)
+        await self.client.cancel(ten_env)
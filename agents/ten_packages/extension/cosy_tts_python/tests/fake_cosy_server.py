@@ -0,0 +1,131 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+A local websocket server speaking the DashScope duplex task protocol of
+CosyVoice, for tests. Tasks on a connection run one after the other: every
+continue-task text is answered, first_audio_ms after it arrives, with
+frames_per_text frames of silence every frame_ms, and task-finished follows
+the audio of the last text once finish-task came. A finish-task with the
+cancel directive drops the audio left and finishes the task at once.
+"""
+import asyncio
+import json
+from typing import List
+
+import websockets
+
+
+def event(name: str, task_id: str, **payload) -> str:
+    return json.dumps(
+        {
+            "header": {"event": name, "task_id": task_id},
+            "payload": payload,
+        }
+    )
+
+
+class FakeCosyServer:
+    def __init__(
+        self,
+        handshake_ms: float = 0,
+        first_audio_ms: float = 20,
+        frame_ms: float = 5,
+        frames_per_text: int = 3,
+        frame_bytes: int = 640,
+    ) -> None:
+        self.handshake_ms = handshake_ms
+        self.first_audio_ms = first_audio_ms
+        self.frame_ms = frame_ms
+        self.frames_per_text = frames_per_text
+        self.frame_bytes = frame_bytes
+
+        self.server = None
+        self.connections = 0
+        self.tasks: List[dict] = []
+        self.texts: List[str] = []
+        self.sockets = set()
+
+    @property
+    def url(self) -> str:
+        port = self.server.sockets[0].getsockname()[1]
+        return f"ws://127.0.0.1:{port}/api-ws/v1/inference"
+
+    async def start(self) -> "FakeCosyServer":
+        self.server = await websockets.serve(
+            self._handle, "127.0.0.1", 0, process_request=self._handshake
+        )
+        return self
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def drop_connections(self) -> None:
+        for ws in list(self.sockets):
+            await ws.close()
+
+    async def _handshake(self, path, headers):
+        await asyncio.sleep(self.handshake_ms / 1000)
+        return None
+
+    async def _handle(self, ws) -> None:
+        self.connections += 1
+        self.sockets.add(ws)
+        task = None
+        try:
+            async for message in ws:
+                request = json.loads(message)
+                header = request["header"]
+                action = header["action"]
+                if action == "run-task":
+                    if task is not None and not task["finished"]:
+                        await ws.send(
+                            event("task-failed", header["task_id"], error_message="task running")
+                        )
+                        continue
+                    task = {
+                        "task_id": header["task_id"],
+                        "parameters": request["payload"]["parameters"],
+                        "texts": asyncio.Queue(),
+                        "finished": False,
+                        "cancelled": False,
+                    }
+                    self.tasks.append(task)
+                    await ws.send(event("task-started", task["task_id"]))
+                    task["synthesis"] = asyncio.create_task(self._synthesize(ws, task))
+                elif task is None or header["task_id"] != task["task_id"]:
+                    await ws.send(
+                        event("task-failed", header["task_id"], error_message="no such task")
+                    )
+                elif task["finished"]:
+                    continue
+                elif action == "continue-task":
+                    self.texts.append(request["payload"]["input"]["text"])
+                    task["texts"].put_nowait(request["payload"]["input"]["text"])
+                elif action == "finish-task":
+                    if request["payload"]["input"].get("directive") == "cancel":
+                        task["cancelled"] = True
+                        task["finished"] = True
+                        task["synthesis"].cancel()
+                        await ws.send(event("task-finished", task["task_id"]))
+                    else:
+                        task["texts"].put_nowait(None)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.sockets.discard(ws)
+
+    async def _synthesize(self, ws, task) -> None:
+        while True:
+            text = await task["texts"].get()
+            if text is None:
+                task["finished"] = True
+                await ws.send(event("task-finished", task["task_id"]))
+                return
+            await asyncio.sleep(self.first_audio_ms / 1000)
+            for _ in range(self.frames_per_text):
+                await ws.send(bytes(self.frame_bytes))
+                await asyncio.sleep(self.frame_ms / 1000)
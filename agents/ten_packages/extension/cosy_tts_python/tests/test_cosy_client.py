@@ -0,0 +1,112 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from cosy_client import CosyTTS  # noqa: E402
+from fake_cosy_server import FakeCosyServer  # noqa: E402
+
+
+class Logger:
+    def log_debug(self, _):
+        pass
+
+    log_info = log_warn = log_error = log_debug
+
+
+def run(scenario, **server_kwargs):
+    async def main():
+        server = await FakeCosyServer(**server_kwargs).start()
+        config = SimpleNamespace(
+            api_key="key",
+            voice="longxiaochun",
+            model="cosyvoice-v1",
+            sample_rate=16000,
+            url=server.url,
+            ping_interval_ms=0,
+            cancel_timeout_ms=1000,
+        )
+        client = CosyTTS(config, Logger())
+        await client.connect()
+        try:
+            return await scenario(server, client)
+        finally:
+            await client.close()
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+async def turn(client, sentences):
+    for i, text in enumerate(sentences):
+        await client.text_to_speech_stream(Logger(), text, i == len(sentences) - 1)
+    await client.receiving.finished.wait()
+
+
+def drain(client):
+    chunks = []
+    while not client.queue.empty():
+        chunks.append(client.queue.get_nowait())
+    return chunks
+
+
+def test_sentences_of_a_turn_share_one_task():
+    async def scenario(server, client):
+        await turn(client, ["Hello there,", "how are you?", "Fine."])
+        assert len(drain(client)) == 3 * server.frames_per_text
+        assert len(server.tasks) == 1
+        assert server.texts == ["Hello there,", "how are you?", "Fine."]
+
+    run(scenario)
+
+
+def test_turns_reuse_the_connection():
+    async def scenario(server, client):
+        for i in range(3):
+            await turn(client, [f"turn {i}."])
+        assert len(server.tasks) == 3
+        assert server.connections == 1
+        metrics = client.metrics()
+        assert metrics["connections"] == 1
+        assert metrics["tasks"] == 3
+        assert metrics["ttfb_p50_ms"] >= server.first_audio_ms - 5
+
+    run(scenario)
+
+
+def test_cancel_drops_audio_and_keeps_the_connection():
+    async def scenario(server, client):
+        await client.text_to_speech_stream(Logger(), "a long answer,", False)
+        await client.text_to_speech_stream(Logger(), "that goes on.", True)
+        await asyncio.sleep(0.03)
+        await client.cancel(Logger())
+        await client.receiving.finished.wait()
+        assert drain(client) == []
+
+        await turn(client, ["next turn."])
+        assert len(drain(client)) == server.frames_per_text
+        assert server.tasks[0]["cancelled"]
+        assert server.connections == 1
+
+    run(scenario, frames_per_text=10)
+
+
+def test_reconnects_after_the_connection_drops():
+    async def scenario(server, client):
+        await server.drop_connections()
+        await asyncio.sleep(0.05)
+        # warm again before the next turn
+        assert server.connections == 2
+        await turn(client, ["after the drop."])
+        assert len(drain(client)) == server.frames_per_text
+        assert client.metrics()["connections"] == 2
+
+    run(scenario)
@@ -0,0 +1,174 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import json
+import os
+from typing import Any, AsyncGenerator, Dict, List, Tuple
+
+import aiohttp
+
+# Codes that will not be fixed by starting a new conversation.
+CODE_BOT_NOT_PUBLISHED = 4000
+CODE_TOKEN_DEPLETED = 4011
+NON_RETRYABLE_CODES = (CODE_BOT_NOT_PUBLISHED, CODE_TOKEN_DEPLETED)
+
+
+class CozeAPIError(Exception):
+    def __init__(self, code: int, msg: str = ""):
+        super().__init__(f"coze api error {code}: {msg}")
+        self.code = code
+        self.msg = msg
+
+
+class CozeChatClient:
+    """Thin client for the Coze v3 chat and v1 conversation APIs over one aiohttp session."""
+
+    def __init__(self, base_url: str, token: str, bot_id: str, user_id: str):
+        self.base_url = base_url
+        self.token = token
+        self.bot_id = bot_id
+        self.user_id = user_id
+        self.session: aiohttp.ClientSession = None
+        self.last_request_bytes = 0
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json",
+        }
+
+    async def create_conversation(self, messages: List[Dict[str, Any]]) -> str:
+        url = f"{self.base_url}/v1/conversation/create"
+        body = json.dumps({"messages": messages})
+        async with self._get_session().post(
+            url, data=body, headers=self._headers()
+        ) as response:
+            result = await response.json(content_type=None)
+        if result.get("code", 0) != 0:
+            raise CozeAPIError(result.get("code"), result.get("msg", ""))
+        return result["data"]["id"]
+
+    async def stream_chat(
+        self, additional_messages: List[Dict[str, Any]], conversation_id: str = ""
+    ) -> AsyncGenerator[Tuple[str, str], None]:
+        """Yield (event, data) pairs of the chat stream until the done event."""
+        url = f"{self.base_url}/v3/chat"
+        params = {"conversation_id": conversation_id} if conversation_id else None
+        body = json.dumps(
+            {
+                "bot_id": self.bot_id,
+                "user_id": self.user_id,
+                "additional_messages": additional_messages,
+                "stream": True,
+                "auto_save_history": True,
+            }
+        )
+        self.last_request_bytes = len(body)
+
+        event = ""
+        async with self._get_session().post(
+            url, params=params, data=body, headers=self._headers()
+        ) as response:
+            async for line in response.content:
+                decoded_line = line.decode("utf-8").strip()
+                if not decoded_line:
+                    continue
+                if decoded_line.startswith("data:"):
+                    yield event, decoded_line[5:].strip()
+                elif decoded_line.startswith("event:"):
+                    event = decoded_line[6:].strip()
+                    if event == "done":
+                        break
+                else:
+                    result = json.loads(decoded_line)
+                    raise CozeAPIError(result.get("code", -1), result.get("msg", ""))
+
+    async def close(self) -> None:
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+
+class CozeConversation:
+    """
+    Keep one server-side conversation so that each chat only carries the new messages.
+    The conversation id is kept across reconnects, and optionally persisted to store_path.
+    If the conversation is rejected (e.g. expired), a new one is created seeded with the
+    last max_replay_history messages of the local history and the chat is retried once.
+    """
+
+    def __init__(
+        self, client: CozeChatClient, store_path: str = "", max_replay_history: int = 6
+    ):
+        self.client = client
+        self.store_path = store_path
+        self.max_replay_history = max_replay_history
+        self.key = f"{client.bot_id}:{client.user_id}"
+        self.id = self._load()
+        self.created = 0
+        self.replayed = 0
+
+    async def ensure(self, history: List[Dict[str, Any]]) -> str:
+        if not self.id:
+            replay = history[-self.max_replay_history :] if self.max_replay_history > 0 else []
+            self.id = await self.client.create_conversation(replay)
+            self.created += 1
+            self.replayed += len(replay)
+            self._save()
+        return self.id
+
+    def reset(self) -> None:
+        self.id = ""
+        self._save()
+
+    async def stream_chat(
+        self, messages: List[Dict[str, Any]], history: List[Dict[str, Any]]
+    ) -> AsyncGenerator[Tuple[str, str], None]:
+        """Send only messages within the conversation, history is used to seed a new conversation."""
+        retried = False
+        while True:
+            conversation_id = await self.ensure(history)
+            yielded = False
+            try:
+                async for item in self.client.stream_chat(messages, conversation_id):
+                    yielded = True
+                    yield item
+                return
+            except CozeAPIError as e:
+                if retried or yielded or e.code in NON_RETRYABLE_CODES:
+                    raise
+                retried = True
+                self.reset()
+
+    def _load(self) -> str:
+        if not self.store_path or not os.path.exists(self.store_path):
+            return ""
+        try:
+            with open(self.store_path, "r", encoding="utf-8") as f:
+                return json.load(f).get(self.key, "")
+        except (OSError, ValueError):
+            return ""
+
+    def _save(self) -> None:
+        if not self.store_path:
+            return
+        store = {}
+        if os.path.exists(self.store_path):
+            try:
+                with open(self.store_path, "r", encoding="utf-8") as f:
+                    store = json.load(f)
+            except (OSError, ValueError):
+                store = {}
+        if self.id:
+            store[self.key] = self.id
+        else:
+            store.pop(self.key, None)
+        with open(self.store_path, "w", encoding="utf-8") as f:
+            json.dump(store, f)
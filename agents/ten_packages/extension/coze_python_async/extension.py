@@ -5,8 +5,6 @@
 #
 import asyncio
 import traceback
-import aiohttp
-import json
 import copy
 
 from typing import List, Any, AsyncGenerator
@@ -37,6 +35,13 @@ from ten_ai_base.types import (
     LLMToolMetadata,
 )
 
+from .coze_client import (
+    CODE_BOT_NOT_PUBLISHED,
+    CozeAPIError,
+    CozeChatClient,
+    CozeConversation,
+)
+
 CMD_IN_FLUSH = "flush"
 CMD_IN_ON_USER_JOINED = "on_user_joined"
 CMD_IN_ON_USER_LEFT = "on_user_left"
@@ -81,6 +86,12 @@ class CozeConfig(BaseConfig):
     user_id: str = "TenAgent"
     greeting: str = ""
     max_history: int = 32
+    # continue a server-side conversation instead of resending the history every chat
+    use_conversation: bool = False
+    # file to keep conversation ids across restarts, in memory only if empty
+    conversation_store: str = ""
+    # messages replayed into a new conversation when the previous one expired
+    max_replay_history: int = 6
 
 
 class AsyncCozeExtension(AsyncLLMBaseExtension):
@@ -93,7 +104,8 @@ class AsyncCozeExtension(AsyncLLMBaseExtension):
     memory: ChatMemory = None
 
     acoze: AsyncCoze = None
-    # conversation: str = ""
+    client: CozeChatClient = None
+    conversation: CozeConversation = None
 
     async def on_init(self, ten_env: AsyncTenEnv) -> None:
         await super().on_init(ten_env)
@@ -118,10 +130,19 @@ class AsyncCozeExtension(AsyncLLMBaseExtension):
                 auth=TokenAuth(token=self.config.token), base_url=self.config.base_url
             )
 
-            # self.conversation = await self.acoze.conversations.create(messages = [
-            #        Message.build_user_question_text(self.config.prompt)
-            #    ] if self.config.prompt else [])
-
+            self.client = CozeChatClient(
+                base_url=self.config.base_url,
+                token=self.config.token,
+                bot_id=self.config.bot_id,
+                user_id=self.config.user_id,
+            )
+            if self.config.use_conversation:
+                # created lazily on first chat, kept across user reconnects
+                self.conversation = CozeConversation(
+                    self.client,
+                    store_path=self.config.conversation_store,
+                    max_replay_history=self.config.max_replay_history,
+                )
         except Exception as e:
             ten_env.log_error(f"Failed to create conversation {e}")
 
@@ -132,6 +153,8 @@ class AsyncCozeExtension(AsyncLLMBaseExtension):
         ten_env.log_debug("on_stop")
 
         self.stopped = True
+        if self.client:
+            await self.client.close()
 
     async def on_deinit(self, ten_env: AsyncTenEnv) -> None:
         await super().on_deinit(ten_env)
@@ -178,7 +201,8 @@ class AsyncCozeExtension(AsyncLLMBaseExtension):
             return
 
         input_messages: LLMChatCompletionUserMessageParam = kargs.get("messages", [])
-        messages = copy.copy(self.memory.get())
+        history = copy.copy(self.memory.get())
+        messages = copy.copy(history)
         if not input_messages:
             ten_env.log_warn("No message in data")
         else:
@@ -191,8 +215,13 @@ class AsyncCozeExtension(AsyncLLMBaseExtension):
         calls = {}
 
         sentences = []
-        self.ten_env.log_info(f"messages: {messages}")
-        response = self._stream_chat(messages=messages)
+        if self.conversation:
+            # the server keeps the history, only send the new messages
+            self.ten_env.log_info(f"messages: {input_messages}")
+            response = self._stream_chat(messages=input_messages, history=history)
+        else:
+            self.ten_env.log_info(f"messages: {messages}")
+            response = self._stream_chat(messages=messages)
         async for message in response:
             self.ten_env.log_info(f"content: {message}")
             try:
@@ -281,9 +310,7 @@ class AsyncCozeExtension(AsyncLLMBaseExtension):
         )
         asyncio.create_task(self.ten_env.send_data(data))
 
-    async def _stream_chat(
-        self, messages: List[Any]
-    ) -> AsyncGenerator[ChatEvent, None]:
+    def _to_coze_messages(self, messages: List[Any]) -> List[Any]:
         additionals = []
         for m in messages:
             if m["role"] == "user":
@@ -294,7 +321,11 @@ class AsyncCozeExtension(AsyncLLMBaseExtension):
                 additionals.append(
                     Message.build_assistant_answer(m["content"]).model_dump()
                 )
+        return additionals
 
+    async def _stream_chat(
+        self, messages: List[Any], history: List[Any] = None
+    ) -> AsyncGenerator[ChatEvent, None]:
         def chat_stream_handler(event: str, event_data: Any) -> ChatEvent:
             if event == ChatEventType.DONE:
                 raise StopAsyncIteration
@@ -318,57 +349,35 @@ class AsyncCozeExtension(AsyncLLMBaseExtension):
             else:
                 raise ValueError(f"invalid chat.event: {event}, {event_data}")
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                url = f"{self.config.base_url}/v3/chat"
-                headers = {
-                    "Authorization": f"Bearer {self.config.token}",
-                }
-                params = {
-                    "bot_id": self.config.bot_id,
-                    "user_id": self.config.user_id,
-                    "additional_messages": additionals,
-                    "stream": True,
-                    "auto_save_history": True,
-                    # "conversation_id": self.conversation.id
-                }
-                event = ""
-                async with session.post(url, json=params, headers=headers) as response:
-                    async for line in response.content:
-                        if line:
-                            try:
-                                self.ten_env.log_info(f"line: {line}")
-                                decoded_line = line.decode("utf-8").strip()
-                                if decoded_line:
-                                    if decoded_line.startswith("data:"):
-                                        data = decoded_line[5:].strip()
-                                        yield chat_stream_handler(
-                                            event=event, event_data=data.strip()
-                                        )
-                                    elif decoded_line.startswith("event:"):
-                                        event = decoded_line[6:]
-                                        self.ten_env.log_info(f"event: {event}")
-                                        if event == "done":
-                                            break
-                                    else:
-                                        result = json.loads(decoded_line)
-                                        code = result.get("code", 0)
-                                        if code == 4000:
-                                            await self._send_text(
-                                                "Coze bot is not published.", True
-                                            )
-                                        else:
-                                            self.ten_env.log_error(
-                                                f"Failed to stream chat: {result['code']}"
-                                            )
-                                            await self._send_text(
-                                                "Coze bot is not connected. Please check your configuration.",
-                                                True,
-                                            )
-                            except Exception as e:
-                                self.ten_env.log_error(f"Failed to stream chat: {e}")
-            except Exception as e:
-                traceback.print_exc()
-                self.ten_env.log_error(f"Failed to stream chat: {e}")
-            finally:
-                await session.close()
+        try:
+            if self.conversation:
+                stream = self.conversation.stream_chat(
+                    self._to_coze_messages(messages),
+                    self._to_coze_messages(history or []),
+                )
+            else:
+                stream = self.client.stream_chat(self._to_coze_messages(messages))
+
+            async for event, data in stream:
+                try:
+                    self.ten_env.log_info(f"event: {event}, data: {data}")
+                    yield chat_stream_handler(event=event, event_data=data)
+                except Exception as e:
+                    self.ten_env.log_error(f"Failed to stream chat: {e}")
+
+            self.ten_env.log_info(
+                f"chat request {self.client.last_request_bytes} bytes, conversation "
+                f"{self.conversation.id if self.conversation else ''}"
+            )
+        except CozeAPIError as e:
+            if e.code == CODE_BOT_NOT_PUBLISHED:
+                await self._send_text("Coze bot is not published.", True)
+            else:
+                self.ten_env.log_error(f"Failed to stream chat: {e.code}")
+                await self._send_text(
+                    "Coze bot is not connected. Please check your configuration.",
+                    True,
+                )
+        except Exception as e:
+            traceback.print_exc()
+            self.ten_env.log_error(f"Failed to stream chat: {e}")
@@ -0,0 +1,167 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from coze_client import CozeChatClient, CozeConversation  # noqa: E402
+
+CODE_CONVERSATION_NOT_FOUND = 4200
+
+
+class FakeCoze:
+    """Local stand-in for the Coze conversation and streaming chat endpoints."""
+
+    def __init__(self):
+        self.conversations = {}
+        self.created = []
+        self.chat_bodies = []
+        self.runner = None
+        self.base_url = ""
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1/conversation/create", self._create)
+        app.router.add_post("/v3/chat", self._chat)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    def expire(self, conversation_id: str):
+        self.conversations.pop(conversation_id, None)
+
+    async def _create(self, request: web.Request):
+        body = await request.json()
+        conversation_id = f"conv-{len(self.created) + 1}"
+        self.conversations[conversation_id] = list(body["messages"])
+        self.created.append(body["messages"])
+        return web.json_response({"code": 0, "data": {"id": conversation_id}})
+
+    async def _chat(self, request: web.Request):
+        raw = await request.read()
+        self.chat_bodies.append(raw)
+        body = json.loads(raw)
+        conversation_id = request.query.get("conversation_id", "")
+        if conversation_id not in self.conversations:
+            return web.json_response(
+                {"code": CODE_CONVERSATION_NOT_FOUND, "msg": "conversation not found"}
+            )
+
+        history = self.conversations[conversation_id]
+        history.extend(body["additional_messages"])
+        answer = f"answer {len(history)}"
+        history.append({"role": "assistant", "content": answer})
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        delta = json.dumps({"role": "assistant", "type": "answer", "content": answer})
+        await response.write(f"event:conversation.message.delta\ndata:{delta}\n\n".encode())
+        await response.write(b'event:done\ndata:"[DONE]"\n\n')
+        await response.write_eof()
+        return response
+
+
+def _user(i: int):
+    return {"role": "user", "content": f"question {i:04d}", "content_type": "text"}
+
+
+async def _run_turns(conversation: CozeConversation, history: list, turns: range):
+    for i in turns:
+        message = _user(i)
+        answer = ""
+        async for event, data in conversation.stream_chat([message], history):
+            if event == "conversation.message.delta":
+                answer += json.loads(data)["content"]
+        assert answer
+        history.append(message)
+        history.append({"role": "assistant", "content": answer})
+
+
+def test_payload_size_constant_over_turns():
+    async def run():
+        server = FakeCoze()
+        await server.start()
+        client = CozeChatClient(server.base_url, "token", "bot", "user")
+        try:
+            conversation = CozeConversation(client)
+            history = []
+            await _run_turns(conversation, history, range(50))
+
+            assert len(server.chat_bodies) == 50
+            assert len({len(b) for b in server.chat_bodies}) == 1
+            assert len(server.created) == 1
+            # the server holds the whole conversation
+            assert len(server.conversations[conversation.id]) == 100
+        finally:
+            await client.close()
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_expired_conversation_falls_back_to_bounded_replay():
+    async def run():
+        server = FakeCoze()
+        await server.start()
+        client = CozeChatClient(server.base_url, "token", "bot", "user")
+        try:
+            conversation = CozeConversation(client, max_replay_history=4)
+            history = []
+            await _run_turns(conversation, history, range(20))
+            expired = conversation.id
+            server.expire(expired)
+
+            await _run_turns(conversation, history, range(20, 50))
+
+            assert conversation.id != expired
+            assert len(server.created) == 2
+            # the 4 messages before turn 20 are replayed
+            assert server.created[1] == history[36:40]
+            assert conversation.replayed == 4
+            # one rejected chat, then constant size again
+            assert len(server.chat_bodies) == 51
+            assert len({len(b) for b in server.chat_bodies}) == 1
+        finally:
+            await client.close()
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_conversation_id_kept_across_reconnect(tmp_path):
+    async def run():
+        server = FakeCoze()
+        await server.start()
+        store = str(tmp_path / "conversations.json")
+        try:
+            client = CozeChatClient(server.base_url, "token", "bot", "user")
+            conversation = CozeConversation(client, store_path=store)
+            await _run_turns(conversation, [], range(3))
+            await client.close()
+
+            client = CozeChatClient(server.base_url, "token", "bot", "user")
+            reconnected = CozeConversation(client, store_path=store)
+            assert reconnected.id == conversation.id
+            await _run_turns(reconnected, [], range(3, 6))
+            await client.close()
+
+            assert len(server.created) == 1
+            assert len(server.conversations[conversation.id]) == 12
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,221 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import base64
+import json
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from urllib.parse import urlencode
+
+import websockets
+
+
+class _Context:
+    """The context of a turn: its text goes in as it comes, audio goes on."""
+
+    def __init__(self) -> None:
+        self.context_id = uuid.uuid4().hex
+        self.cancelled = False
+        self.closing = False
+        self.text_sent_at: Optional[float] = None
+        self.ttfb_ms: Optional[int] = None
+        # audio held until the contexts of the previous turns are final
+        self.audio: Deque[bytes] = deque()
+        self.final = False
+
+
+class ElevenLabsTurnStream:
+    """
+    The sentences of a turn streamed into one context of the ElevenLabs
+    multi-context websocket, so the voice keeps its prosody across them and
+    no request is set up per sentence. Audio is read continuously into the
+    buffer of its context, and the buffers go to the queue turn by turn, so
+    the audio of a turn waits until the previous turn is final. Each turn gets
+    its own context on the same connection; a cancel closes the contexts
+    server-side and drops their audio, held or still coming.
+
+    Refer to: https://elevenlabs.io/docs/api-reference/multi-context-text-to-speech.
+    """
+
+    def __init__(self, config: Any, ten_env: Any) -> None:
+        self.config = config
+        self.ten_env = ten_env
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.ws = None
+        self.receiver: Optional[asyncio.Task] = None
+        # the context taking the text of the turn
+        self.context: Optional[_Context] = None
+        # the contexts audio may still come for, by id
+        self.contexts: Dict[str, _Context] = {}
+        # the contexts whose audio is not all queued yet, in turn order
+        self.order: Deque[_Context] = deque()
+        self.lock = asyncio.Lock()
+        self.closed = False
+
+        self.connections = 0
+        self.turns = 0
+        self.ttfbs: List[int] = []
+
+    @property
+    def url(self) -> str:
+        query = urlencode(
+            {
+                "model_id": self.config.model_id,
+                "output_format": "pcm_16000",
+                "inactivity_timeout": self.config.inactivity_timeout_seconds,
+            }
+        )
+        return (
+            f"{self.config.ws_url}/v1/text-to-speech/{self.config.voice_id}"
+            f"/multi-stream-input?{query}"
+        )
+
+    async def connect(self) -> None:
+        self.ws = await websockets.connect(
+            self.url,
+            extra_headers={"xi-api-key": self.config.api_key},
+            close_timeout=1,
+        )
+        self.connections += 1
+        self._end_contexts()
+        self.receiver = asyncio.create_task(self._receive(self.ws))
+        self.ten_env.log_info(f"websocket is open, connections: {self.connections}")
+
+    async def close(self) -> None:
+        self.closed = True
+        if self.ws is not None:
+            try:
+                await self.ws.send(json.dumps({"close_socket": True}))
+            except websockets.exceptions.ConnectionClosed:
+                pass
+            await self.ws.close()
+        if self.receiver is not None:
+            await asyncio.gather(self.receiver, return_exceptions=True)
+        await self.queue.put(None)
+
+    async def get_audio_bytes(self) -> Optional[bytes]:
+        return await self.queue.get()
+
+    async def send_text(self, text: str, end_of_segment: bool) -> None:
+        async with self.lock:
+            if self.ws is None or not self.ws.open:
+                await self.connect()
+            context = self.context
+            if context is None:
+                context = await self._start_context()
+            if text.strip():
+                if context.text_sent_at is None:
+                    context.text_sent_at = time.perf_counter()
+                # flushed at once, as the text comes sentence by sentence
+                await self._send(context, text=text + " ", flush=True)
+            if end_of_segment:
+                self.context = None
+
+    async def cancel(self) -> None:
+        """Stops the audio of the turns in progress, keeping the connection."""
+        self.context = None
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        for context in self.order:
+            context.audio.clear()
+        self.order.clear()
+        for context in list(self.contexts.values()):
+            await self._close_context(context, cancel=True)
+
+    def metrics(self) -> dict:
+        ttfbs = sorted(self.ttfbs)
+        return {
+            "connections": self.connections,
+            "turns": self.turns,
+            "ttfb_p50_ms": ttfbs[len(ttfbs) // 2] if ttfbs else None,
+        }
+
+    async def _start_context(self) -> _Context:
+        # the previous turns are done, their contexts count to a limit, but
+        # they are kept until isFinal for the audio still coming for them
+        for previous in list(self.contexts.values()):
+            await self._close_context(previous, cancel=False)
+        context = _Context()
+        self.context = context
+        self.contexts[context.context_id] = context
+        self.order.append(context)
+        self.turns += 1
+        await self._send(
+            context,
+            text=" ",
+            voice_settings={
+                "stability": self.config.stability,
+                "similarity_boost": self.config.similarity_boost,
+                "style": self.config.style,
+                "use_speaker_boost": self.config.speaker_boost,
+            },
+        )
+        return context
+
+    async def _close_context(self, context: _Context, cancel: bool) -> None:
+        context.cancelled = context.cancelled or cancel
+        if context.closing:
+            return
+        context.closing = True
+        try:
+            await self._send(context, close_context=True)
+        except websockets.exceptions.ConnectionClosed as e:
+            self.ten_env.log_warn(f"closing context failed, {e}")
+
+    async def _send(self, context: _Context, **message) -> None:
+        message["context_id"] = context.context_id
+        await self.ws.send(json.dumps(message))
+
+    async def _receive(self, ws) -> None:
+        try:
+            async for message in ws:
+                data = json.loads(message)
+                context_id = data.get("contextId") or data.get("context_id")
+                context = self.contexts.get(context_id)
+                if data.get("error"):
+                    self.ten_env.log_error(f"context {context_id} failed, {data['error']}")
+                # a failed context gets no more audio either
+                final = data.get("isFinal") or data.get("error")
+                if final:
+                    self.contexts.pop(context_id, None)
+                if context is None or context.cancelled:
+                    continue
+                if data.get("audio"):
+                    if context.ttfb_ms is None and context.text_sent_at is not None:
+                        context.ttfb_ms = int((time.perf_counter() - context.text_sent_at) * 1000)
+                        self.ttfbs.append(context.ttfb_ms)
+                        self.ten_env.log_info(f"context {context_id} ttfb {context.ttfb_ms}ms")
+                    context.audio.append(base64.b64decode(data["audio"]))
+                if final:
+                    context.final = True
+                self._release()
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            self.ten_env.log_info("websocket is closed.")
+            if self.ws is ws:
+                self._end_contexts()
+
+    def _release(self) -> None:
+        # the first turn streams, the next ones wait for it to be final
+        while self.order:
+            context = self.order[0]
+            while context.audio:
+                self.queue.put_nowait(context.audio.popleft())
+            if not context.final:
+                return
+            self.order.popleft()
+
+    def _end_contexts(self) -> None:
+        # no more audio comes for the contexts of a closed connection, the
+        # audio they got is played out in order
+        self.context = None
+        self.contexts.clear()
+        for context in self.order:
+            context.final = True
+        self._release()
@@ -22,6 +22,11 @@ class ElevenLabsTTSConfig(BaseConfig):
     request_timeout_seconds: int = 10
     style: float = 0.0
     voice_id: str = "pNInz6obpgDQGcFmaJgB"
+    # Stream the sentences of a turn into one context of the websocket API,
+    # instead of a request per sentence.
+    turn_streaming: bool = True
+    ws_url: str = "wss://api.elevenlabs.io"
+    inactivity_timeout_seconds: int = 180
 
 
 class ElevenLabsTTS:
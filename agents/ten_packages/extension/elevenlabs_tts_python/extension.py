@@ -3,7 +3,9 @@
 # Licensed under the Apache License, Version 2.0.
 # See the LICENSE file for more information.
 #
+import asyncio
 import traceback
+from .elevenlabs_stream import ElevenLabsTurnStream
 from .elevenlabs_tts import ElevenLabsTTS, ElevenLabsTTSConfig
 from ten import (
     AsyncTenEnv,
@@ -30,7 +32,12 @@ class ElevenLabsTTSExtension(AsyncTTSBaseExtension):
             if not self.config.api_key:
                 raise ValueError("api_key is required")
 
-            self.client = ElevenLabsTTS(self.config)
+            if self.config.turn_streaming:
+                self.client = ElevenLabsTurnStream(self.config, ten_env)
+                asyncio.create_task(self._process_audio_data(ten_env))
+                await self.client.connect()
+            else:
+                self.client = ElevenLabsTTS(self.config)
         except Exception:
             ten_env.log_error(f"on_start failed: {traceback.format_exc()}")
 
@@ -38,13 +45,30 @@ class ElevenLabsTTSExtension(AsyncTTSBaseExtension):
         await super().on_stop(ten_env)
         ten_env.log_debug("on_stop")
 
+        if isinstance(self.client, ElevenLabsTurnStream):
+            ten_env.log_info(f"turn streaming metrics: {self.client.metrics()}")
+            await self.client.close()
+
     async def on_deinit(self, ten_env: AsyncTenEnv) -> None:
         await super().on_deinit(ten_env)
         ten_env.log_debug("on_deinit")
 
+    async def _process_audio_data(self, ten_env: AsyncTenEnv) -> None:
+        while True:
+            audio_data = await self.client.get_audio_bytes()
+
+            if audio_data is None:
+                break
+
+            await self.send_audio_out(ten_env, audio_data)
+
     async def on_request_tts(
         self, ten_env: AsyncTenEnv, input_text: str, end_of_segment: bool
     ) -> None:
+        if self.config.turn_streaming:
+            await self.client.send_text(input_text, end_of_segment)
+            return
+
         audio_stream = await self.client.text_to_speech_stream(input_text)
         ten_env.log_info(f"on_request_tts: {input_text}")
         async for audio_data in audio_stream:
@@ -52,4 +76,6 @@ class ElevenLabsTTSExtension(AsyncTTSBaseExtension):
         ten_env.log_info(f"on_request_tts: {input_text} done")
 
     async def on_cancel_tts(self, ten_env: AsyncTenEnv) -> None:
+        if self.config.turn_streaming:
+            await self.client.cancel()
         return await super().on_cancel_tts(ten_env)
@@ -0,0 +1,162 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Time to first audio and the gaps between sentences of the ElevenLabs client
+against the local fake server, whose handshake takes --handshake-ms in place
+of the TLS and websocket round trips to the service. The LLM gives one of
+--sentences sentences every --llm-ms and the audio is played back in real
+time, one frame every --play-ms; the gap is the wait for the first audio of a
+sentence once the previous one played.
+
+sentence   the previous behavior, a request per sentence, sent once the audio
+           of the previous one is in
+turn       the sentences of the turn pushed into one context of a websocket
+           kept open, as the LLM gives them
+
+    python tests/bench_turn_streaming.py [--turns 10] [--handshake-ms 150]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from elevenlabs_stream import ElevenLabsTurnStream  # noqa: E402
+from fake_elevenlabs_server import FakeElevenLabsServer  # noqa: E402
+
+
+class Logger:
+    def log_debug(self, _):
+        pass
+
+    log_info = log_warn = log_error = log_debug
+
+
+def make_config(server):
+    return SimpleNamespace(
+        api_key="key",
+        model_id="eleven_multilingual_v2",
+        voice_id="voice",
+        ws_url=server.url,
+        inactivity_timeout_seconds=180,
+        stability=0.5,
+        similarity_boost=0.75,
+        style=0.0,
+        speaker_boost=False,
+    )
+
+
+async def llm(args, sentences: asyncio.Queue):
+    for i in range(args.sentences):
+        await asyncio.sleep(args.llm_ms / 1000)
+        sentences.put_nowait((f"sentence {i}.", i == args.sentences - 1))
+
+
+async def receive(client, count, arrivals):
+    for _ in range(count):
+        await client.get_audio_bytes()
+        arrivals.append(time.perf_counter())
+
+
+async def sentence_turn(server, args, arrivals):
+    sentences = asyncio.Queue()
+    producer = asyncio.create_task(llm(args, sentences))
+    for _ in range(args.sentences):
+        text, _ = await sentences.get()
+        client = ElevenLabsTurnStream(make_config(server), Logger())
+        await client.send_text(text, True)
+        await receive(client, server.frames_per_text, arrivals)
+        await client.close()
+    await producer
+
+
+async def streamed_turn(client, server, args, arrivals):
+    sentences = asyncio.Queue()
+    producer = asyncio.create_task(llm(args, sentences))
+    receiver = asyncio.create_task(
+        receive(client, args.sentences * server.frames_per_text, arrivals)
+    )
+    for _ in range(args.sentences):
+        text, end_of_segment = await sentences.get()
+        await client.send_text(text, end_of_segment)
+    await asyncio.gather(producer, receiver)
+
+
+def measure(started, arrivals, frames, play_ms):
+    """The first audio of the turn, and the stall before every next sentence."""
+    ttfb = (arrivals[0] - started) * 1000
+    gaps = []
+    played = arrivals[0]
+    for i, arrival in enumerate(arrivals):
+        if i and i % frames == 0:
+            gaps.append(max(0.0, arrival - played) * 1000)
+        played = max(played, arrival) + play_ms / 1000
+    return ttfb, gaps
+
+
+async def bench(mode, args):
+    server = await FakeElevenLabsServer(
+        handshake_ms=args.handshake_ms,
+        first_audio_ms=args.first_audio_ms,
+        frame_ms=args.frame_ms,
+        frames_per_text=args.frames,
+    ).start()
+    client = ElevenLabsTurnStream(make_config(server), Logger())
+    await client.connect()
+    ttfbs, gaps = [], []
+    try:
+        for _ in range(args.turns):
+            arrivals = []
+            started = time.perf_counter()
+            if mode == "sentence":
+                await sentence_turn(server, args, arrivals)
+            else:
+                await streamed_turn(client, server, args, arrivals)
+            ttfb, turn_gaps = measure(started, arrivals, args.frames, args.play_ms)
+            ttfbs.append(ttfb)
+            gaps.extend(turn_gaps)
+            await asyncio.sleep(args.pause_ms / 1000)
+    finally:
+        await client.close()
+        await server.stop()
+    return ttfbs, gaps, server.connections
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--sentences", type=int, default=6)
+    parser.add_argument("--handshake-ms", type=float, default=150)
+    parser.add_argument("--first-audio-ms", type=float, default=120)
+    parser.add_argument("--frame-ms", type=float, default=20)
+    parser.add_argument("--frames", type=int, default=10)
+    parser.add_argument("--llm-ms", type=float, default=150, help="per sentence")
+    parser.add_argument("--play-ms", type=float, default=40)
+    parser.add_argument("--pause-ms", type=float, default=200, help="before the next turn")
+    args = parser.parse_args()
+
+    print(f"{'mode':<10}{'ttfb p50':>10}{'gap p50':>10}{'p95':>8}{'max':>8}{'connections':>13}")
+    for mode in ("sentence", "turn"):
+        ttfbs, gaps, connections = asyncio.run(bench(mode, args))
+        print(
+            f"{mode:<10}{statistics.median(ttfbs):>8.0f}ms"
+            f"{statistics.median(gaps):>8.0f}ms{percentile(gaps, 0.95):>6.0f}ms"
+            f"{max(gaps):>6.0f}ms{connections:>13}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from elevenlabs_stream import ElevenLabsTurnStream  # noqa: E402
+from fake_elevenlabs_server import FakeElevenLabsServer  # noqa: E402
+
+
+class Logger:
+    def log_debug(self, _):
+        pass
+
+    log_info = log_warn = log_error = log_debug
+
+
+def run(scenario, **server_kwargs):
+    async def main():
+        server = await FakeElevenLabsServer(**server_kwargs).start()
+        config = SimpleNamespace(
+            api_key="key",
+            model_id="eleven_multilingual_v2",
+            voice_id="voice",
+            ws_url=server.url,
+            inactivity_timeout_seconds=180,
+            stability=0.5,
+            similarity_boost=0.75,
+            style=0.0,
+            speaker_boost=False,
+        )
+        client = ElevenLabsTurnStream(config, Logger())
+        await client.connect()
+        try:
+            return await scenario(server, client)
+        finally:
+            await client.close()
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+async def turn(server, client, sentences):
+    for i, text in enumerate(sentences):
+        await client.send_text(text, i == len(sentences) - 1)
+    # the audio of every sentence
+    await asyncio.sleep(
+        (server.first_audio_ms + server.frames_per_text * server.frame_ms)
+        * len(sentences)
+        / 1000
+        + 0.05
+    )
+
+
+def drain(client):
+    chunks = []
+    while not client.queue.empty():
+        chunks.append(client.queue.get_nowait())
+    return chunks
+
+
+def texts_of(chunks):
+    return [chunk.rstrip(b"\0").decode() for chunk in chunks]
+
+
+def test_sentences_of_a_turn_share_one_context():
+    async def scenario(server, client):
+        await turn(server, client, ["Hello there,", "how are you?", "Fine."])
+        assert len(drain(client)) == 3 * server.frames_per_text
+        assert len(server.contexts) == 1
+        assert server.texts == ["Hello there,", "how are you?", "Fine."]
+        (context,) = server.contexts.values()
+        assert context["voice_settings"]["similarity_boost"] == 0.75
+
+    run(scenario)
+
+
+def test_turns_reuse_the_connection():
+    async def scenario(server, client):
+        for i in range(3):
+            await turn(server, client, [f"turn {i}."])
+        assert len(server.contexts) == 3
+        assert server.connections == 1
+        # a turn done is closed when the next one starts
+        assert sum(c["closed"] for c in server.contexts.values()) == 2
+        metrics = client.metrics()
+        assert metrics["connections"] == 1
+        assert metrics["turns"] == 3
+        assert metrics["ttfb_p50_ms"] >= server.first_audio_ms - 5
+
+    run(scenario)
+
+
+def test_next_turn_keeps_the_audio_of_the_previous_one():
+    async def scenario(server, client):
+        # the second turn starts before any audio of the first one came
+        await client.send_text("first turn.", True)
+        await client.send_text("second turn.", True)
+        await asyncio.sleep(0.15)
+        # both are synthesized at once, but played one after the other
+        assert texts_of(drain(client)) == (
+            ["first turn."] * server.frames_per_text
+            + ["second turn."] * server.frames_per_text
+        )
+        first, second = server.contexts.values()
+        assert first["closed"] and not second["closed"]
+        # the first context is forgotten once it is final
+        assert list(client.contexts) == [second["context_id"]]
+
+    run(scenario)
+
+
+def test_cancel_drops_audio_and_closes_the_context():
+    async def scenario(server, client):
+        await client.send_text("a long answer,", False)
+        await client.send_text("that goes on.", True)
+        await asyncio.sleep(0.03)
+        await client.cancel()
+        await asyncio.sleep(0.1)
+        assert drain(client) == []
+        (cancelled,) = server.contexts.values()
+        assert cancelled["closed"]
+
+        await turn(server, client, ["next turn."])
+        assert len(drain(client)) == server.frames_per_text
+        assert server.connections == 1
+
+    run(scenario, frames_per_text=10)
+
+
+def test_cancel_drops_the_audio_held_for_the_next_turn():
+    async def scenario(server, client):
+        await client.send_text("a long answer.", True)
+        await client.send_text("the next answer.", True)
+        await asyncio.sleep(0.03)
+        assert set(texts_of(drain(client))) == {"a long answer."}
+        assert len(client.order[1].audio) > 0
+        await client.cancel()
+        await asyncio.sleep(0.1)
+        assert drain(client) == []
+        assert all(c["closed"] for c in server.contexts.values())
+
+        # the turn after the cancel does not wait for the cancelled ones
+        await turn(server, client, ["after the cancel."])
+        assert texts_of(drain(client)) == ["after the cancel."] * server.frames_per_text
+
+    run(scenario, frames_per_text=10)
+
+
+def test_reconnects_after_the_connection_drops():
+    async def scenario(server, client):
+        await server.drop_connections()
+        await asyncio.sleep(0.05)
+        await turn(server, client, ["after the drop."])
+        assert len(drain(client)) == server.frames_per_text
+        assert client.metrics()["connections"] == 2
+
+    run(scenario)
@@ -0,0 +1,106 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import hashlib
+import sqlite3
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ChunkCache:
+    """
+    Local sqlite store of
+    - embeddings, keyed by chunk hash and embedding model, stored as float32
+    - the chunks indexed for each (collection, document), to re-index only what changed
+    Safe to use from several threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "hash TEXT NOT NULL, model TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (hash, model))"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS indexed_chunks ("
+            "collection TEXT NOT NULL, document TEXT NOT NULL, hash TEXT NOT NULL, text TEXT NOT NULL, "
+            "PRIMARY KEY (collection, document, hash))"
+        )
+        self.db.commit()
+
+    def hash_text(self, text: str) -> str:
+        return chunk_hash(text)
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.close()
+
+    def get_vectors(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        if not hashes:
+            return {}
+        placeholders = ",".join("?" * len(hashes))
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                [model, *hashes],
+            ).fetchall()
+        return {h: array("f", vector).tolist() for h, vector in rows}
+
+    def put_vectors(self, model: str, items: Iterable[Tuple[str, List[float]]]) -> None:
+        rows = [(h, model, array("f", vector).tobytes()) for h, vector in items]
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, model, vector) VALUES (?, ?, ?)",
+                rows,
+            )
+            self.db.commit()
+
+    def indexed_chunks(self, collection: str, document: str) -> Dict[str, str]:
+        """Hash to text of the chunks of the document stored in the collection."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT hash, text FROM indexed_chunks WHERE collection = ? AND document = ?",
+                (collection, document),
+            ).fetchall()
+        return dict(rows)
+
+    def add_indexed_chunks(
+        self, collection: str, document: str, items: Iterable[Tuple[str, str]]
+    ) -> None:
+        rows = [(collection, document, h, text) for h, text in items]
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO indexed_chunks (collection, document, hash, text) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self.db.commit()
+
+    def remove_indexed_chunks(self, collection: str, document: str, hashes: Iterable[str]) -> None:
+        rows = [(collection, document, h) for h in hashes]
+        with self.lock:
+            self.db.executemany(
+                "DELETE FROM indexed_chunks WHERE collection = ? AND document = ? AND hash = ?",
+                rows,
+            )
+            self.db.commit()
+
+    def last_collection(self, document: str) -> Optional[str]:
+        """Collection the document was last indexed in."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT collection FROM indexed_chunks WHERE document = ? ORDER BY rowid DESC LIMIT 1",
+                (document,),
+            ).fetchone()
+        return row[0] if row else None
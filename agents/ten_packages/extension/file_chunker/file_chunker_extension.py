@@ -12,44 +12,50 @@ from ten import (
     StatusCode,
     CmdResult,
 )
-from typing import List, Any
+from typing import Iterable, List, Any, Callable, Optional
 import json
-from datetime import datetime
-import uuid, math
-import queue, threading
+import os
+import tempfile
+import uuid
+import threading
+
+from ten_ai_base.embedding import (
+    BINARY_EMBEDDING_FORMATS,
+    PROPERTY_EMBEDDING_FORMAT,
+    decode_embeddings,
+    embedding_format_of,
+    encode_embeddings,
+)
+
+from .chunk_cache import ChunkCache
+from .parser_pool import ChunkStream, ParserPool, split_document
+from .pipeline import FileJob, IngestionPipeline
 
 CMD_FILE_CHUNK = "file_chunk"
 UPSERT_VECTOR_CMD = "upsert_vector"
+DELETE_VECTOR_CMD = "delete_vector"
 FILE_CHUNKED_CMD = "file_chunked"
+UPSERT_TEXT_CMD = "upsert_text"
 
 CHUNK_SIZE = 200
 CHUNK_OVERLAP = 20
 BATCH_SIZE = 5
-
-
-def batch(nodes, size):
-    batch_texts = []
-    for n in nodes:
-        batch_texts.append(n.text)
-        if len(batch_texts) == size:
-            yield batch_texts[:]
-            batch_texts.clear()
-    if batch_texts:
-        yield batch_texts
+MAX_INFLIGHT_EMBED_BATCHES = 8
+PARSED_QUEUE_SIZE = 2
+PARSER_PROCESSES = 0
+DEFAULT_EMBEDDING_MODEL = "default"
 
 
 class FileChunkerExtension(Extension):
     def __init__(self, name: str):
         super().__init__(name)
 
-        self.counters = {}
-        self.expected = {}
-        self.new_collection_name = ""
-        self.file_chunked_event = threading.Event()
-
-        self.thread = None
-        self.queue = queue.Queue()
-        self.stop = False
+        self.pipeline: IngestionPipeline = None
+        self.parser_pool: ParserPool = None
+        self.chunk_cache: ChunkCache = None
+        self.reuse_collection = False
+        self.embedding_format = ""
+        self.ten: TenEnv = None
 
     def generate_collection_name(self) -> str:
         """
@@ -58,93 +64,155 @@ class FileChunkerExtension(Extension):
 
         return "coll_" + uuid.uuid1().hex.lower()
 
-    def split(self, ten: TenEnv, path: str) -> List[Any]:
-        # lazy import packages which requires long time to load
-        from llama_index.core import SimpleDirectoryReader
-        from llama_index.core.node_parser import SentenceSplitter
+    def parse(self, path: str) -> Iterable[List[str]]:
+        split_args = {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+        if self.parser_pool is not None:
+            # chunks are streamed back while the worker is still parsing
+            return self.parser_pool.submit(path)
 
-        # load pdf file by path
-        documents = SimpleDirectoryReader(
-            input_files=[path], filename_as_id=True
-        ).load_data()
+        # chunk the whole file on this thread
+        parts = list(split_document(path, **split_args))
+        self.ten.log_info(f"file {path} chunking count {sum(len(p) for p in parts)}")
+        return parts
 
-        # split pdf file into chunks
-        splitter = SentenceSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP,
-        )
-        nodes = splitter.get_nodes_from_documents(documents)
-        ten.log_info(f"file {path} pages count {documents}, chunking count {nodes}")
-        return nodes
+    def chunk(self, parts: Iterable[Any]) -> Iterable[str]:
+        if isinstance(parts, ChunkStream):
+            return parts
+        return (text for texts in parts for text in texts)
 
-    def create_collection(self, ten: TenEnv, collection_name: str, wait: bool):
+    def create_collection(self, collection_name: str):
         cmd_out = Cmd.create("create_collection")
         cmd_out.set_property_string("collection_name", collection_name)
 
         wait_event = threading.Event()
-        ten.send_cmd(
+        self.ten.send_cmd(
             cmd_out,
             lambda ten, result, _: wait_event.set(),
         )
-        if wait:
-            wait_event.wait()
-
-    def embedding(self, ten: TenEnv, path: str, texts: List[str]):
-        ten.log_info(
-            f"generate embeddings for the file: {path}, with batch size: {len(texts)}"
-        )
+        wait_event.wait()
+        self.ten.log_info(f"collection {collection_name} created")
+
+    def embedding(
+        self,
+        texts: List[str],
+        done: Callable[[Optional[List[Any]], Optional[Exception]], None],
+    ):
+        def callback(ten: TenEnv, result: CmdResult, _):
+            if result.get_status_code() != StatusCode.OK:
+                done(None, Exception("embed_batch failed"))
+                return
+            try:
+                if embedding_format_of(result) in BINARY_EMBEDDING_FORMATS:
+                    embeddings = decode_embeddings(
+                        result.get_property_buf("embeddings_buf")
+                    )
+                else:
+                    embed_output = json.loads(result.get_property_string("embeddings"))
+                    embeddings = [record["embedding"] for record in embed_output]
+            except Exception as e:
+                done(None, e)
+                return
+            done(embeddings, None)
 
         cmd_out = Cmd.create("embed_batch")
         cmd_out.set_property_from_json("inputs", json.dumps(texts))
-        ten.send_cmd(
-            cmd_out, lambda ten, result, _: self.vector_store(ten, path, texts, result)
-        )
+        if self.embedding_format:
+            cmd_out.set_property_string(PROPERTY_EMBEDDING_FORMAT, self.embedding_format)
+        self.ten.send_cmd(cmd_out, callback)
+
+    def vector_store(
+        self,
+        job: FileJob,
+        texts: List[str],
+        embeddings: List[Any],
+        done: Callable[[Optional[Exception]], None],
+    ):
+        def callback(ten: TenEnv, result: CmdResult, _):
+            if result.get_status_code() != StatusCode.OK:
+                done(Exception("upsert_vector failed"))
+            else:
+                done(None)
 
-    def vector_store(self, ten: TenEnv, path: str, texts: List[str], result: CmdResult):
-        ten.log_info(f"vector store start for one splitting of the file {path}")
-        file_name = path.split("/")[-1]
-        embed_output_json = result.get_property_string("embeddings")
-        embed_output = json.loads(embed_output_json)
         cmd_out = Cmd.create(UPSERT_VECTOR_CMD)
-        cmd_out.set_property_string("collection_name", self.new_collection_name)
-        cmd_out.set_property_string("file_name", file_name)
-        embeddings = [record["embedding"] for record in embed_output]
-        content = []
-        for text, embedding in zip(texts, embeddings):
-            content.append({"text": text, "embedding": embedding})
-        cmd_out.set_property_string("content", json.dumps(content))
-        # ten.log_info(json.dumps(content))
-        ten.send_cmd(cmd_out, lambda ten, result, _: self.file_chunked(ten, path))
-
-    def file_chunked(self, ten: TenEnv, path: str):
-        if path in self.counters and path in self.expected:
-            self.counters[path] += 1
-            ten.log_info(
-                "complete vector store for one splitting of the file: %s, current counter: %i, expected: %i",
-                path,
-                self.counters[path],
-                self.expected[path],
+        cmd_out.set_property_string("collection_name", job.collection)
+        cmd_out.set_property_string("file_name", job.file_name)
+        if self.embedding_format:
+            content = [{"text": text} for text in texts]
+            cmd_out.set_property_string(PROPERTY_EMBEDDING_FORMAT, self.embedding_format)
+            cmd_out.set_property_buf(
+                "embeddings_buf", encode_embeddings(embeddings, self.embedding_format)
             )
-            if self.counters[path] == self.expected[path]:
-                chunks_count = self.counters[path]
-                del self.counters[path]
-                del self.expected[path]
-                ten.log_info(
-                    f"complete chunk for the file: {path}, chunks_count {chunks_count}"
-                )
-                cmd_out = Cmd.create(FILE_CHUNKED_CMD)
-                cmd_out.set_property_string("path", path)
-                cmd_out.set_property_string("collection", self.new_collection_name)
-                ten.send_cmd(
-                    cmd_out,
-                    lambda ten, result, _: ten.log_info("send_cmd done"),
-                )
-                self.file_chunked_event.set()
         else:
-            ten.log_error("missing counter for the file path: %s", path)
+            content = []
+            for text, embedding in zip(texts, embeddings):
+                content.append({"text": text, "embedding": embedding})
+        cmd_out.set_property_string("content", json.dumps(content))
+        self.ten.send_cmd(cmd_out, callback)
+
+    def delete_vector(
+        self,
+        job: FileJob,
+        texts: List[str],
+        done: Callable[[Optional[Exception]], None],
+    ):
+        def callback(ten: TenEnv, result: CmdResult, _):
+            if result.get_status_code() != StatusCode.OK:
+                done(Exception("delete_vector failed"))
+            else:
+                done(None)
+
+        cmd_out = Cmd.create(DELETE_VECTOR_CMD)
+        cmd_out.set_property_string("collection_name", job.collection)
+        cmd_out.set_property_string("file_name", job.file_name)
+        cmd_out.set_property_string("content", json.dumps(texts))
+        self.ten.send_cmd(cmd_out, callback)
+
+    def upsert_text(self, job: FileJob, texts: List[str]):
+        def callback(ten: TenEnv, result: CmdResult, _):
+            if result.get_status_code() != StatusCode.OK:
+                ten.log_warn(f"upsert_text failed for file {job.file_name}")
+
+        # replaces the texts of the file in the collection, for keyword search
+        cmd_out = Cmd.create(UPSERT_TEXT_CMD)
+        cmd_out.set_property_string("collection_name", job.collection)
+        cmd_out.set_property_string("file_name", job.file_name)
+        cmd_out.set_property_string("content", json.dumps(texts))
+        self.ten.send_cmd(cmd_out, callback)
+
+    def on_progress(self, job: FileJob):
+        self.ten.log_debug(
+            f"file {job.path} progress {job.progress():.0%}, upserted {job.upserted}, failed {job.failed}, batches {job.batches}"
+        )
+
+    def file_chunked(self, job: FileJob):
+        if job.error:
+            self.ten.log_error(f"failed to process {job.path}: {job.error}")
+            return
+        if job.failed:
+            self.ten.log_error(
+                f"{job.failed}/{job.batches} batches of the file {job.path} failed, last error: {job.batch_error}"
+            )
+        self.ten.log_info(
+            f"finished processing {job.path}, collection {job.collection}, chunks_count {job.chunks}, cost {job.cost_ms()}ms"
+        )
+        if self.chunk_cache is not None:
+            self.ten.log_info(
+                f"file {job.path} cache hit rate {job.cache_hit_rate():.0%}, unchanged {job.unchanged}, embedding cache hits {job.cache_hits}, deleted {job.deleted}"
+            )
+        if job.batches and not job.completed:
+            return
+
+        cmd_out = Cmd.create(FILE_CHUNKED_CMD)
+        cmd_out.set_property_string("path", job.path)
+        cmd_out.set_property_string("collection", job.collection)
+        self.ten.send_cmd(
+            cmd_out,
+            lambda ten, result, _: ten.log_info("send_cmd done"),
+        )
 
     def on_cmd(self, ten: TenEnv, cmd: Cmd) -> None:
         cmd_name = cmd.get_name()
+        cmd_result = CmdResult.create(StatusCode.OK)
         if cmd_name == CMD_FILE_CHUNK:
             path = cmd.get_property_string("path")
 
@@ -154,70 +222,124 @@ class FileChunkerExtension(Extension):
             except Exception:
                 ten.log_warn(f"missing collection property in cmd {cmd_name}")
 
-            self.queue.put((path, collection))  # make sure files are processed in order
-        else:
-            ten.log_info(f"unknown cmd {cmd_name}")
-
-        cmd_result = CmdResult.create(StatusCode.OK)
-        cmd_result.set_property_string("detail", "ok")
-        ten.return_result(cmd_result, cmd)
+            document = ""
+            try:
+                document = cmd.get_property_string("filename")
+            except Exception:
+                pass
 
-    def async_handler(self, ten: TenEnv) -> None:
-        while not self.stop:
-            value = self.queue.get()
-            if value is None:
-                break
-            path, collection = value
+            if not collection and document and self.reuse_collection:
+                # re-index an updated document where it was indexed before,
+                # unless the caller already named the collection
+                collection = self.chunk_cache.last_collection(document)
+                if collection:
+                    ten.log_info(f"reuse collection {collection} of {document}")
 
-            # start processing the file
-            start_time = datetime.now()
-            if collection is None:
+            if not collection:
                 collection = self.generate_collection_name()
                 ten.log_info(f"collection {collection} generated")
             ten.log_info(f"start processing {path}, collection {collection}")
+            self.pipeline.submit(path, collection, document)
+            cmd_result.set_property_string("collection", collection)
+        else:
+            ten.log_info(f"unknown cmd {cmd_name}")
 
-            # create collection
-            self.create_collection(ten, collection, True)
-            ten.log_info(f"collection {collection} created")
-
-            # split
-            nodes = self.split(ten, path)
-
-            # reset counters and events
-            self.new_collection_name = collection
-            self.expected[path] = math.ceil(len(nodes) / BATCH_SIZE)
-            self.counters[path] = 0
-            self.file_chunked_event.clear()
-
-            # trigger embedding and vector storing in parallel
-            for texts in list(batch(nodes, BATCH_SIZE)):
-                self.embedding(ten, path, texts)
-
-            # wait for all chunks to be processed
-            self.file_chunked_event.wait()
-
-            ten.log_info(
-                f"finished processing {path}, collection {collection}, cost {int((datetime.now() - start_time).total_seconds() * 1000)}ms"
-            )
+        cmd_result.set_property_string("detail", "ok")
+        ten.return_result(cmd_result, cmd)
 
     def on_start(self, ten: TenEnv) -> None:
         ten.log_info("on_start")
 
-        self.stop = False
-        self.thread = threading.Thread(target=self.async_handler, args=[ten])
-        self.thread.start()
+        self.ten = ten
+        self.embedding_format = self.get_property_string(ten, "embedding_format", "")
+        if self.embedding_format and self.embedding_format not in BINARY_EMBEDDING_FORMATS:
+            ten.log_warn(f"unknown embedding_format {self.embedding_format}, use json")
+            self.embedding_format = ""
+        # 0 parses in the runtime process. Worker processes import this package,
+        # and with it the addon, to unpickle their tasks, so they are opt-in.
+        parser_processes = self.get_property_int(
+            ten, "parser_processes", PARSER_PROCESSES, allow_zero=True
+        )
+        if parser_processes > 0:
+            self.parser_pool = ParserPool(
+                parser_processes,
+                split_args={"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP},
+            )
+            self.parser_pool.start()
+
+        if self.get_property_bool(ten, "enable_chunk_cache", True):
+            cache_path = self.get_property_string(ten, "chunk_cache_path", "") or os.path.join(
+                tempfile.gettempdir(), "file_chunker_cache.db"
+            )
+            try:
+                self.chunk_cache = ChunkCache(cache_path)
+                self.reuse_collection = self.get_property_bool(ten, "reuse_collection", False)
+            except Exception as e:
+                ten.log_error(f"failed to open chunk cache {cache_path}, err: {e}")
+
+        self.pipeline = IngestionPipeline(
+            create_collection=self.create_collection,
+            parse=self.parse,
+            chunk=self.chunk,
+            embed=self.embedding,
+            upsert=self.vector_store,
+            on_file_done=self.file_chunked,
+            on_progress=self.on_progress,
+            on_chunked=(
+                self.upsert_text
+                if self.get_property_bool(ten, "index_text", False)
+                else None
+            ),
+            batch_size=self.get_property_int(ten, "batch_size", BATCH_SIZE),
+            max_inflight_batches=self.get_property_int(
+                ten, "max_inflight_embed_batches", MAX_INFLIGHT_EMBED_BATCHES
+            ),
+            queue_size=self.get_property_int(
+                ten, "parsed_queue_size", PARSED_QUEUE_SIZE
+            ),
+            cache=self.chunk_cache,
+            embedding_model=self.get_property_string(
+                ten, "embedding_model", DEFAULT_EMBEDDING_MODEL
+            ),
+            delete=self.delete_vector,
+        )
+        self.pipeline.start()
 
         ten.on_start_done()
 
     def on_stop(self, ten: TenEnv) -> None:
         ten.log_info("on_stop")
 
-        self.stop = True
-        if self.thread is not None:
-            while not self.queue.empty():
-                self.queue.get()
-            self.queue.put(None)
-            self.thread.join()
-            self.thread = None
+        # stop the pool first, it unblocks a chunking stage waiting on a cancelled parse
+        if self.parser_pool is not None:
+            self.parser_pool.stop()
+            self.parser_pool = None
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline = None
+        if self.chunk_cache is not None:
+            self.chunk_cache.close()
+            self.chunk_cache = None
 
         ten.on_stop_done()
+
+    def get_property_int(
+        self, ten: TenEnv, key: str, default: int, allow_zero: bool = False
+    ) -> int:
+        try:
+            value = ten.get_property_int(key)
+            return value if value > 0 or (allow_zero and value == 0) else default
+        except Exception:
+            return default
+
+    def get_property_bool(self, ten: TenEnv, key: str, default: bool) -> bool:
+        try:
+            return ten.get_property_bool(key)
+        except Exception:
+            return default
+
+    def get_property_string(self, ten: TenEnv, key: str, default: str) -> str:
+        try:
+            return ten.get_property_string(key)
+        except Exception:
+            return default
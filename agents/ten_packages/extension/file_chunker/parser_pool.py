@@ -0,0 +1,166 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import itertools
+import multiprocessing
+import os
+import queue
+import shutil
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+# split_fn(path, **split_args) yields lists of chunk texts
+SplitFn = Callable[..., Iterator[List[str]]]
+
+_result_queue = None
+
+
+def warm_up_llama_index() -> None:
+    # the import takes seconds, pay it once per worker instead of per file
+    from llama_index.core import SimpleDirectoryReader  # noqa: F401
+    from llama_index.core.node_parser import SentenceSplitter  # noqa: F401
+
+
+def split_document(
+    path: str, chunk_size: int, chunk_overlap: int, pages_per_part: int = 8
+) -> Iterator[List[str]]:
+    """Load a file with llama_index and yield its chunk texts, pages_per_part pages at a time."""
+    from llama_index.core import SimpleDirectoryReader
+    from llama_index.core.node_parser import SentenceSplitter
+
+    documents = SimpleDirectoryReader(input_files=[path], filename_as_id=True).load_data()
+    splitter = SentenceSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    for i in range(0, len(documents), pages_per_part):
+        nodes = splitter.get_nodes_from_documents(documents[i : i + pages_per_part])
+        yield [n.text for n in nodes]
+
+
+def _init_worker(result_queue, warm_up: Optional[Callable[[], None]]) -> None:
+    global _result_queue
+    _result_queue = result_queue
+    if warm_up is not None:
+        warm_up()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _run_split(task_id: int, split_fn: SplitFn, path: str, split_args: dict) -> None:
+    # results go through one queue so that parts, end and errors keep their order
+    try:
+        for texts in split_fn(path, **split_args):
+            _result_queue.put((task_id, texts, None))
+        _result_queue.put((task_id, None, None))
+    except Exception as e:
+        _result_queue.put((task_id, None, f"{type(e).__name__}: {e}"))
+
+
+class ChunkStream:
+    """Chunk texts of one file, in order, as the worker produces them."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parts: queue.Queue = queue.Queue()
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            texts, err = self.parts.get()
+            if err is not None:
+                raise RuntimeError(f"failed to split {self.path}: {err}")
+            if texts is None:
+                return
+            yield from texts
+
+
+class ParserPool:
+    """
+    Parse and split files in a bounded pool of worker processes, so that the CPU heavy
+    work does not hold the GIL of the runtime process.
+    Workers are spawned and warmed up once, chunk texts are streamed back per part.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        split_args: Optional[dict] = None,
+        split_fn: SplitFn = split_document,
+        warm_up: Optional[Callable[[], None]] = warm_up_llama_index,
+    ):
+        self.max_workers = max_workers
+        self.split_args = split_args or {}
+        self.split_fn = split_fn
+        self.warm_up = warm_up
+
+        self.executor: ProcessPoolExecutor = None
+        self.results = None
+        self.reader: threading.Thread = None
+        self.streams: Dict[int, ChunkStream] = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count()
+
+    def start(self) -> None:
+        # never fork the runtime process, its threads do not survive a fork
+        ctx = multiprocessing.get_context("spawn")
+        if not os.path.basename(sys.executable).startswith("python"):
+            # embedded interpreter, sys.executable is the host binary
+            ctx.set_executable(shutil.which("python3") or sys.executable)
+
+        self.results = ctx.Queue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self.results, self.warm_up),
+        )
+        self.reader = threading.Thread(target=self._read_results, name="file_chunker_parser_pool")
+        self.reader.start()
+
+        # workers are spawned on submit, start and warm all of them now
+        for _ in range(self.max_workers):
+            self.executor.submit(_ping)
+
+    def stop(self) -> None:
+        if self.executor is None:
+            return
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.results.put(None)
+        self.reader.join()
+        self.results.close()
+        self.executor = None
+
+    def submit(self, path: str) -> ChunkStream:
+        task_id = next(self.ids)
+        stream = ChunkStream(path)
+        with self.lock:
+            self.streams[task_id] = stream
+        future = self.executor.submit(_run_split, task_id, self.split_fn, path, self.split_args)
+        future.add_done_callback(lambda f: self._on_done(task_id, f))
+        return stream
+
+    def _on_done(self, task_id: int, future: Future) -> None:
+        # only a cancelled task or a dead worker gets here without its end marker
+        if future.cancelled():
+            self._dispatch(task_id, None, "cancelled")
+        elif future.exception() is not None:
+            self._dispatch(task_id, None, str(future.exception()) or "worker failed")
+
+    def _read_results(self) -> None:
+        while True:
+            item = self.results.get()
+            if item is None:
+                break
+            self._dispatch(*item)
+
+    def _dispatch(self, task_id: int, texts: Optional[List[str]], err: Optional[str]) -> None:
+        with self.lock:
+            stream = self.streams.get(task_id)
+            if stream is None:
+                return
+            if texts is None:
+                del self.streams[task_id]
+        stream.parts.put((texts, err))
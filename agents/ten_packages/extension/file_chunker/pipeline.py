@@ -0,0 +1,360 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from .chunk_cache import ChunkCache
+
+# embed(texts, done) must eventually call done(embeddings, error)
+EmbedFn = Callable[
+    [List[str], Callable[[Optional[List[Any]], Optional[Exception]], None]], None
+]
+# upsert(job, texts, embeddings, done) must eventually call done(error)
+UpsertFn = Callable[
+    ["FileJob", List[str], List[Any], Callable[[Optional[Exception]], None]], None
+]
+# delete(job, texts, done) must eventually call done(error)
+DeleteFn = Callable[["FileJob", List[str], Callable[[Optional[Exception]], None]], None]
+
+
+@dataclass(eq=False)
+class FileJob:
+    path: str
+    collection: str
+    document: str = ""
+    """Name of the document, stored as file_name and used to find its previous chunks."""
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+    chunks: int = 0
+    batches: int = 0
+    embedded: int = 0
+    unchanged: int = 0
+    """Chunks already in the collection."""
+    cache_hits: int = 0
+    """Chunks whose embedding came from the cache."""
+    deleted: int = 0
+    upserted: int = 0
+    completed: int = 0
+    """Batches upserted or deleted."""
+    failed: int = 0
+    error: str = ""
+    """Set if the whole file failed to parse or chunk."""
+    batch_error: str = ""
+    """Last error of a failed batch."""
+
+    dispatched: bool = False
+    notified: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def file_name(self) -> str:
+        return self.document or self.path.split("/")[-1]
+
+    @property
+    def done(self) -> bool:
+        return bool(self.error) or (
+            self.dispatched and self.completed + self.failed == self.batches
+        )
+
+    def progress(self) -> float:
+        if self.done:
+            return 1.0
+        if not self.batches:
+            return 0.0
+        return (self.completed + self.failed) / self.batches
+
+    def cache_hit_rate(self) -> float:
+        if not self.chunks:
+            return 0.0
+        return (self.unchanged + self.cache_hits) / self.chunks
+
+    def cost_ms(self) -> int:
+        return int((self.finished_at - self.submitted_at) * 1000)
+
+
+class IngestionPipeline:
+    """
+    Staged file ingestion: parse -> chunk -> embed -> upsert.
+
+    Parsing and chunking run on their own threads connected by a bounded queue,
+    so the next file is parsed while the previous one is still being embedded.
+    Embedding and upsert are asynchronous cmds, at most max_inflight_batches
+    batches are between being sent to embedding and acknowledged by the vector
+    store, which throttles the chunking stage.
+    A failure only fails its batch, or its file for parse/chunk errors.
+
+    With a ChunkCache, a chunk already stored for the document in the collection is
+    skipped, an embedding computed before by the same model is reused, and chunks
+    no longer in the document are deleted once the whole file is chunked.
+
+    on_chunked, if set, gets every chunk text of a file once it is chunked,
+    including the unchanged ones, e.g. to index them for keyword search.
+    """
+
+    def __init__(
+        self,
+        create_collection: Callable[[str], None],
+        parse: Callable[[str], Any],
+        chunk: Callable[[Any], Iterable[str]],
+        embed: EmbedFn,
+        upsert: UpsertFn,
+        on_file_done: Callable[[FileJob], None],
+        batch_size: int = 5,
+        max_inflight_batches: int = 4,
+        queue_size: int = 2,
+        on_progress: Optional[Callable[[FileJob], None]] = None,
+        cache: Optional["ChunkCache"] = None,
+        embedding_model: str = "",
+        delete: Optional[DeleteFn] = None,
+        on_chunked: Optional[Callable[[FileJob, List[str]], None]] = None,
+    ):
+        self.create_collection = create_collection
+        self.parse = parse
+        self.chunk = chunk
+        self.embed = embed
+        self.upsert = upsert
+        self.on_file_done = on_file_done
+        self.on_progress = on_progress
+        self.batch_size = batch_size
+        self.cache = cache
+        self.embedding_model = embedding_model
+        self.delete = delete
+        self.on_chunked = on_chunked
+
+        self.files: queue.Queue = queue.Queue()
+        self.parsed: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.inflight = threading.BoundedSemaphore(max_inflight_batches)
+        self.stopped = threading.Event()
+        self.threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        self.stopped.clear()
+        self.threads = [
+            threading.Thread(target=self._parse_loop, name="file_chunker_parse"),
+            threading.Thread(target=self._chunk_loop, name="file_chunker_chunk"),
+        ]
+        for t in self.threads:
+            t.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        while not self.files.empty():
+            self.files.get_nowait()
+        self.files.put(None)
+        for t in self.threads:
+            t.join()
+        self.threads = []
+
+    def submit(self, path: str, collection: str, document: str = "") -> FileJob:
+        job = FileJob(path=path, collection=collection, document=document)
+        self.files.put(job)
+        return job
+
+    def _parse_loop(self) -> None:
+        while True:
+            job = self.files.get()
+            if job is None or self.stopped.is_set():
+                break
+            job.started_at = time.time()
+            try:
+                # collections are created in submission order
+                self.create_collection(job.collection)
+                documents = self.parse(job.path)
+            except Exception as e:
+                self._fail_file(job, e)
+                continue
+            if not self._put(self.parsed, (job, documents)):
+                break
+        self._put(self.parsed, None)
+
+    def _chunk_loop(self) -> None:
+        while True:
+            item = self.parsed.get()
+            if item is None:
+                break
+            job, documents = item
+            # chunks may be streamed, batches are sent as soon as they are full
+            texts = []
+            chunked: List[str] = []
+            indexed: Dict[str, str] = {}
+            seen = set()
+            try:
+                if self.cache is not None:
+                    indexed = self.cache.indexed_chunks(job.collection, job.file_name)
+                for text in self.chunk(documents):
+                    if self.on_chunked is not None:
+                        chunked.append(text)
+                    if self.cache is not None:
+                        h = self.cache.hash_text(text)
+                        if h in seen:
+                            continue
+                        seen.add(h)
+                        if h in indexed:
+                            with job.lock:
+                                job.chunks += 1
+                                job.unchanged += 1
+                            continue
+                    texts.append(text)
+                    if len(texts) == self.batch_size:
+                        if not self._dispatch(job, texts):
+                            return
+                        texts = []
+                if texts and not self._dispatch(job, texts):
+                    return
+                removed = [h for h in indexed if h not in seen]
+                if removed and not self._dispatch_delete(job, removed, indexed):
+                    return
+                if self.on_chunked is not None:
+                    self.on_chunked(job, chunked)
+            except Exception as e:
+                self._fail_file(job, e)
+                continue
+
+            with job.lock:
+                job.dispatched = True
+            self._check_done(job)
+
+    def _dispatch(self, job: FileJob, texts: List[str]) -> bool:
+        if not self._acquire():
+            return False
+        with job.lock:
+            job.chunks += len(texts)
+            job.batches += 1
+        self._embed(job, texts)
+        return True
+
+    def _dispatch_delete(self, job: FileJob, hashes: List[str], indexed: Dict[str, str]) -> bool:
+        if self.delete is None:
+            return True
+        if not self._acquire():
+            return False
+        with job.lock:
+            job.batches += 1
+
+        def on_deleted(err: Optional[Exception]):
+            if err is not None:
+                self._fail_batch(job, err)
+                return
+            self.cache.remove_indexed_chunks(job.collection, job.file_name, hashes)
+            with job.lock:
+                job.deleted += len(hashes)
+            self._complete_batch(job)
+
+        try:
+            self.delete(job, [indexed[h] for h in hashes], on_deleted)
+        except Exception as e:
+            self._fail_batch(job, e)
+        return True
+
+    def _embed(self, job: FileJob, texts: List[str]) -> None:
+        hashes: List[str] = []
+        cached: Dict[str, List[float]] = {}
+        missing = list(range(len(texts)))
+        if self.cache is not None:
+            hashes = [self.cache.hash_text(text) for text in texts]
+            cached = self.cache.get_vectors(self.embedding_model, hashes)
+            missing = [i for i, h in enumerate(hashes) if h not in cached]
+            with job.lock:
+                job.cache_hits += len(cached)
+
+        def on_embedded(embeddings: Optional[List[Any]], err: Optional[Exception]):
+            if err is not None:
+                self._fail_batch(job, err)
+                return
+            with job.lock:
+                job.embedded += 1
+            if self.cache is not None:
+                self.cache.put_vectors(
+                    self.embedding_model,
+                    [(hashes[i], e) for i, e in zip(missing, embeddings)],
+                )
+                merged = [cached.get(h) for h in hashes]
+                for i, embedding in zip(missing, embeddings):
+                    merged[i] = embedding
+                embeddings = merged
+            try:
+                self.upsert(job, texts, embeddings, on_upserted)
+            except Exception as e:
+                self._fail_batch(job, e)
+
+        def on_upserted(err: Optional[Exception]):
+            if err is not None:
+                self._fail_batch(job, err)
+                return
+            if self.cache is not None:
+                self.cache.add_indexed_chunks(
+                    job.collection, job.file_name, zip(hashes, texts)
+                )
+            with job.lock:
+                job.upserted += 1
+            self._complete_batch(job)
+
+        if not missing:
+            # every embedding is cached
+            on_embedded([], None)
+            return
+        try:
+            self.embed([texts[i] for i in missing], on_embedded)
+        except Exception as e:
+            self._fail_batch(job, e)
+
+    def _complete_batch(self, job: FileJob) -> None:
+        with job.lock:
+            job.completed += 1
+        self.inflight.release()
+        self._report(job)
+
+    def _fail_batch(self, job: FileJob, err: Exception) -> None:
+        with job.lock:
+            job.failed += 1
+            job.batch_error = str(err) or type(err).__name__
+        self.inflight.release()
+        self._report(job)
+
+    def _fail_file(self, job: FileJob, err: Exception) -> None:
+        with job.lock:
+            job.error = str(err) or type(err).__name__
+        self._check_done(job)
+
+    def _report(self, job: FileJob) -> None:
+        if self.on_progress:
+            self.on_progress(job)
+        self._check_done(job)
+
+    def _check_done(self, job: FileJob) -> None:
+        with job.lock:
+            if not job.done or job.notified:
+                return
+            job.notified = True
+            job.finished_at = time.time()
+        self.on_file_done(job)
+
+    def _acquire(self) -> bool:
+        while not self.stopped.is_set():
+            if self.inflight.acquire(timeout=0.1):
+                return True
+        return False
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        while not self.stopped.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        # make sure the consumer wakes up on stop
+        if item is None:
+            try:
+                q.put_nowait(None)
+            except queue.Full:
+                pass
+        return False
@@ -0,0 +1,140 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Benchmark the event loop lag of a co-resident async extension while files are
+ingested, with parsing in the runtime process versus in the parser pool.
+A pure python splitter stands in for llama_index, the loop runs a 10 ms ticker
+on its own thread like the runtime does for async extensions.
+
+    python tests/bench_parser_pool.py [--files 6] [--pages 40] [--workers 1]
+"""
+import argparse
+import asyncio
+import re
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from parser_pool import ParserPool  # noqa: E402
+from pipeline import IngestionPipeline  # noqa: E402
+
+TICK_S = 0.01
+WORDS = "the quick brown fox jumps over the lazy dog while agents talk in real time".split()
+
+
+def cpu_split(path: str, pages: int, chunk_words: int = 40):
+    """Generate and split a fake document, all in pure python to hold the GIL like parsing does."""
+    for page in range(pages):
+        words = [WORDS[(page * 7 + i * 13) % len(WORDS)] for i in range(20000)]
+        text = ". ".join(" ".join(words[i : i + 12]) for i in range(0, len(words), 12))
+        sentences = re.split(r"(?<=\.)\s+", text)
+        chunks, current = [], []
+        for sentence in sentences:
+            current.extend(sentence.split())
+            if len(current) >= chunk_words:
+                chunks.append(" ".join(current))
+                current = []
+        if current:
+            chunks.append(" ".join(current))
+        yield chunks
+
+
+class LoopLagProbe:
+    def __init__(self):
+        self.lags = []
+        self.loop = asyncio.new_event_loop()
+        self.running = True
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self._tick(),))
+
+    async def _tick(self):
+        while self.running:
+            start = time.perf_counter()
+            await asyncio.sleep(TICK_S)
+            self.lags.append(time.perf_counter() - start - TICK_S)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.loop.close()
+
+    def report(self):
+        lags = sorted(self.lags)
+        return (
+            statistics.median(lags) * 1000,
+            lags[int(len(lags) * 0.99) - 1] * 1000,
+            lags[-1] * 1000,
+        )
+
+
+def run(args, pool: ParserPool):
+    done = threading.Semaphore(0)
+    chunks = [0]
+
+    def parse(path):
+        if pool is not None:
+            return pool.submit(path)
+        return list(cpu_split(path, args.pages))
+
+    def chunk(parts):
+        if pool is not None:
+            return parts
+        return (t for texts in parts for t in texts)
+
+    def embed(texts, on_done):
+        chunks[0] += len(texts)
+        on_done([[0.0]] * len(texts), None)
+
+    pipeline = IngestionPipeline(
+        create_collection=lambda name: None,
+        parse=parse,
+        chunk=chunk,
+        embed=embed,
+        upsert=lambda job, texts, embeddings, on_done: on_done(None),
+        on_file_done=lambda job: done.release(),
+    )
+    pipeline.start()
+    probe = LoopLagProbe()
+    probe.start()
+    start = time.perf_counter()
+    for i in range(args.files):
+        pipeline.submit(f"file_{i}.pdf", "coll")
+    for _ in range(args.files):
+        done.acquire()
+    elapsed = time.perf_counter() - start
+    probe.stop()
+    pipeline.stop()
+    return (elapsed, chunks[0]) + probe.report()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=6)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{args.files} files x {args.pages} pages, loop ticker {int(TICK_S * 1000)} ms")
+    print(f"{'mode':<16}{'total s':>9}{'chunks':>8}{'lag p50':>10}{'lag p99':>10}{'lag max':>10}")
+    result = run(args, None)
+    print(f"{'in-process':<16}{result[0]:>9.2f}{result[1]:>8}" + "".join(f"{v:>8.1f}ms" for v in result[2:]))
+
+    pool = ParserPool(args.workers, split_args={"pages": args.pages}, split_fn=cpu_split, warm_up=None)
+    pool.start()
+    time.sleep(1)  # let the workers spawn, as they do at on_start
+    result = run(args, pool)
+    pool.stop()
+    print(f"{f'pool x{args.workers}':<16}{result[0]:>9.2f}{result[1]:>8}" + "".join(f"{v:>8.1f}ms" for v in result[2:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Benchmark ingestion throughput (chunks/s) of the staged pipeline versus the number
+of in-flight embed batches, against fake embedding and vector store extensions
+that answer cmds from their own worker threads with a configurable latency.
+The legacy row replays the previous behaviour: one file at a time, every batch of
+the file sent at once, and the next file only parsed when all batches are stored.
+
+    python tests/bench_pipeline.py [--files 8] [--pages 25] [--embed-ms 80]
+"""
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pipeline import IngestionPipeline  # noqa: E402
+
+BATCH_SIZE = 5
+CHUNKS_PER_PAGE = 4
+
+
+class FakeEmbeddingExtension:
+    """Answers embed_batch after base + per input latency, with a bounded number of parallel requests."""
+
+    def __init__(self, latency_ms: float, per_input_ms: float, capacity: int):
+        self.latency = latency_ms / 1000
+        self.per_input = per_input_ms / 1000
+        self.executor = ThreadPoolExecutor(max_workers=capacity)
+
+    def embed_batch(self, texts, done):
+        def run():
+            time.sleep(self.latency + self.per_input * len(texts))
+            done([[0.0] * 8 for _ in texts], None)
+
+        self.executor.submit(run)
+
+    def close(self):
+        self.executor.shutdown()
+
+
+class FakeVectorStoreExtension:
+    def __init__(self, latency_ms: float, capacity: int):
+        self.latency = latency_ms / 1000
+        self.executor = ThreadPoolExecutor(max_workers=capacity)
+        self.rows = 0
+        self.lock = threading.Lock()
+
+    def create_collection(self, name):
+        time.sleep(self.latency)
+
+    def upsert_vector(self, job, texts, embeddings, done):
+        def run():
+            time.sleep(self.latency)
+            with self.lock:
+                self.rows += len(texts)
+            done(None)
+
+        self.executor.submit(run)
+
+    def close(self):
+        self.executor.shutdown()
+
+
+class FakeFiles:
+    def __init__(self, pages: int, parse_ms_per_page: float, chunk_ms_per_page: float):
+        self.pages = pages
+        self.parse_ms = parse_ms_per_page / 1000
+        self.chunk_ms = chunk_ms_per_page / 1000
+
+    def parse(self, path):
+        time.sleep(self.pages * self.parse_ms)
+        return [f"{path} page {i}" for i in range(self.pages)]
+
+    def chunk(self, documents):
+        time.sleep(len(documents) * self.chunk_ms)
+        return [f"{d} chunk {j}" for d in documents for j in range(CHUNKS_PER_PAGE)]
+
+
+def run_legacy(args, files: FakeFiles) -> float:
+    embedding = FakeEmbeddingExtension(args.embed_ms, args.embed_per_input_ms, args.embed_capacity)
+    store = FakeVectorStoreExtension(args.upsert_ms, args.store_capacity)
+    start = time.perf_counter()
+    for i in range(args.files):
+        store.create_collection(f"coll_{i}")
+        texts = files.chunk(files.parse(f"file_{i}.pdf"))
+        batches = [texts[j : j + BATCH_SIZE] for j in range(0, len(texts), BATCH_SIZE)]
+        remaining = [len(batches)]
+        lock = threading.Lock()
+        finished = threading.Event()
+
+        def on_stored(err):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    finished.set()
+
+        for b in batches:
+            embedding.embed_batch(
+                b, lambda e, err, b=b: store.upsert_vector(None, b, e, on_stored)
+            )
+        finished.wait()
+    elapsed = time.perf_counter() - start
+    embedding.close()
+    store.close()
+    return store.rows / elapsed
+
+
+def run_pipeline(args, files: FakeFiles, inflight: int) -> float:
+    embedding = FakeEmbeddingExtension(args.embed_ms, args.embed_per_input_ms, args.embed_capacity)
+    store = FakeVectorStoreExtension(args.upsert_ms, args.store_capacity)
+    done = threading.Semaphore(0)
+    pipeline = IngestionPipeline(
+        create_collection=store.create_collection,
+        parse=files.parse,
+        chunk=files.chunk,
+        embed=embedding.embed_batch,
+        upsert=store.upsert_vector,
+        on_file_done=lambda job: done.release(),
+        batch_size=BATCH_SIZE,
+        max_inflight_batches=inflight,
+    )
+    pipeline.start()
+    start = time.perf_counter()
+    for i in range(args.files):
+        pipeline.submit(f"file_{i}.pdf", f"coll_{i}")
+    for _ in range(args.files):
+        done.acquire()
+    elapsed = time.perf_counter() - start
+    pipeline.stop()
+    embedding.close()
+    store.close()
+    return store.rows / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=25)
+    parser.add_argument("--parse-ms-per-page", type=float, default=8)
+    parser.add_argument("--chunk-ms-per-page", type=float, default=1)
+    parser.add_argument("--embed-ms", type=float, default=80)
+    parser.add_argument("--embed-per-input-ms", type=float, default=2)
+    parser.add_argument("--embed-capacity", type=int, default=8)
+    parser.add_argument("--upsert-ms", type=float, default=20)
+    parser.add_argument("--store-capacity", type=int, default=4)
+    parser.add_argument("--inflight", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    files = FakeFiles(args.pages, args.parse_ms_per_page, args.chunk_ms_per_page)
+    total = args.files * args.pages * CHUNKS_PER_PAGE
+    print(f"{args.files} files, {total} chunks, batch size {BATCH_SIZE}")
+    print(f"{'mode':<12}{'in-flight':>10}{'chunks/s':>12}")
+    print(f"{'legacy':<12}{'all':>10}{run_legacy(args, files):>12.0f}")
+    for inflight in args.inflight:
+        rate = run_pipeline(args, files, inflight)
+        print(f"{'pipeline':<12}{inflight:>10}{rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
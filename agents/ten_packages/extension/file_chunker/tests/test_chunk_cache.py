@@ -0,0 +1,110 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chunk_cache import ChunkCache  # noqa: E402
+from pipeline import IngestionPipeline  # noqa: E402
+
+
+class FakeStore:
+    """Embedding and vector store answering inline, recording what they were asked."""
+
+    def __init__(self):
+        self.embedded = []
+        self.rows = {}
+        self.deleted = []
+
+    def embed(self, texts, done):
+        self.embedded.extend(texts)
+        done([[float(len(t)), 0.5] for t in texts], None)
+
+    def upsert(self, job, texts, embeddings, done):
+        for text, embedding in zip(texts, embeddings):
+            assert embedding == [float(len(text)), 0.5]
+            self.rows[(job.collection, text)] = embedding
+        done(None)
+
+    def delete(self, job, texts, done):
+        self.deleted.extend(texts)
+        for text in texts:
+            del self.rows[(job.collection, text)]
+        done(None)
+
+
+def ingest(cache, store, chunks, collection, on_chunked=None):
+    finished = []
+    done = threading.Event()
+    pipeline = IngestionPipeline(
+        create_collection=lambda name: None,
+        parse=lambda path: chunks,
+        chunk=lambda texts: texts,
+        embed=store.embed,
+        upsert=store.upsert,
+        delete=store.delete,
+        on_file_done=lambda job: (finished.append(job), done.set()),
+        batch_size=2,
+        cache=cache,
+        embedding_model="model-a",
+        on_chunked=on_chunked,
+    )
+    pipeline.start()
+    try:
+        pipeline.submit("/tmp/upload-123.pdf", collection, "manual.pdf")
+        assert done.wait(5)
+    finally:
+        pipeline.stop()
+    return finished[0]
+
+
+def test_reupload_only_touches_changed_chunks(tmp_path):
+    cache = ChunkCache(str(tmp_path / "cache.db"))
+    store = FakeStore()
+    original = [f"paragraph {i}" for i in range(10)]
+
+    job = ingest(cache, store, original, "coll_a")
+    assert len(store.embedded) == 10 and job.cache_hit_rate() == 0
+
+    store.embedded.clear()
+    job = ingest(cache, store, original, "coll_a")
+    assert store.embedded == [] and job.unchanged == 10
+    assert job.cache_hit_rate() == 1.0
+
+    edited = original[:3] + ["paragraph 3, edited"] + original[5:]
+    chunked = []
+    job = ingest(cache, store, edited, "coll_a", lambda job, texts: chunked.append(texts))
+    assert store.embedded == ["paragraph 3, edited"]
+    # the whole document, unchanged chunks included
+    assert chunked == [edited]
+    assert sorted(store.deleted) == ["paragraph 3", "paragraph 4"]
+    assert job.unchanged == 8 and job.deleted == 2
+    assert job.cache_hit_rate() == 8 / 9
+    assert sorted(t for _, t in store.rows) == sorted(edited)
+    assert job.progress() == 1.0
+
+    cache.close()
+
+
+def test_embeddings_reused_across_collections_and_restarts(tmp_path):
+    path = str(tmp_path / "cache.db")
+    store = FakeStore()
+    chunks = [f"line {i}" for i in range(7)]
+
+    cache = ChunkCache(path)
+    ingest(cache, store, chunks, "coll_a")
+    cache.close()
+
+    store.embedded.clear()
+    cache = ChunkCache(path)
+    job = ingest(cache, store, chunks, "coll_b")
+    assert store.embedded == []
+    assert job.cache_hits == 7 and job.upserted == 4
+    assert len([c for c, _ in store.rows if c == "coll_b"]) == 7
+    assert cache.last_collection("manual.pdf") == "coll_b"
+    cache.close()
@@ -0,0 +1,61 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from parser_pool import ParserPool, split_document  # noqa: E402
+
+
+def fake_split(path: str, parts: int):
+    if path == "broken.pdf":
+        raise ValueError("not a pdf")
+    for i in range(parts):
+        yield [f"{path} {os.getpid()} part {i} chunk {j}" for j in range(3)]
+
+
+def test_chunks_streamed_from_worker_process():
+    pool = ParserPool(2, split_args={"parts": 4}, split_fn=fake_split, warm_up=None)
+    pool.start()
+    try:
+        streams = [pool.submit(f"file_{i}.pdf") for i in range(3)]
+        for i, stream in enumerate(streams):
+            texts = list(stream)
+            assert len(texts) == 12
+            assert texts[0].startswith(f"file_{i}.pdf")
+            assert texts[-1].endswith("part 3 chunk 2")
+            assert str(os.getpid()) not in {t.split()[1] for t in texts}
+    finally:
+        pool.stop()
+
+
+def test_split_error_reaches_stream_only():
+    pool = ParserPool(1, split_args={"parts": 1}, split_fn=fake_split, warm_up=None)
+    pool.start()
+    try:
+        broken = pool.submit("broken.pdf")
+        ok = pool.submit("ok.pdf")
+        with pytest.raises(RuntimeError, match="not a pdf"):
+            list(broken)
+        assert len(list(ok)) == 3
+    finally:
+        pool.stop()
+
+
+def test_split_document_in_process(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text(
+        "\n\n".join(f"Paragraph {i} talks about topic {i} at some length." for i in range(40))
+    )
+    parts = list(split_document(str(path), chunk_size=64, chunk_overlap=8))
+    texts = [text for part in parts for text in part]
+    assert len(texts) > 1
+    assert texts[0].startswith("Paragraph 0")
+    assert "Paragraph 39" in texts[-1]
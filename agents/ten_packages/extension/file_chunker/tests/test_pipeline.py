@@ -0,0 +1,112 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pipeline import IngestionPipeline  # noqa: E402
+
+
+class Harness:
+    def __init__(self, max_inflight_batches=2, fail_parse=(), fail_embed=()):
+        self.executor = ThreadPoolExecutor(max_workers=16)
+        self.fail_parse = set(fail_parse)
+        self.fail_embed = set(fail_embed)
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.max_inflight = 0
+        self.stored = {}
+        self.finished = []
+        self.all_done = threading.Event()
+        self.expected = 0
+        self.pipeline = IngestionPipeline(
+            create_collection=lambda name: None,
+            parse=self.parse,
+            chunk=lambda docs: [f"{d} chunk {i}" for d in docs for i in range(10)],
+            embed=self.embed,
+            upsert=self.upsert,
+            on_file_done=self.on_file_done,
+            batch_size=5,
+            max_inflight_batches=max_inflight_batches,
+        )
+
+    def parse(self, path):
+        if path in self.fail_parse:
+            raise ValueError(f"cannot parse {path}")
+        return [path]
+
+    def embed(self, texts, done):
+        with self.lock:
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+
+        def run():
+            time.sleep(0.01)
+            if any(t.startswith(p) and t.endswith("chunk 0") for p in self.fail_embed for t in texts):
+                done(None, RuntimeError("embedding failed"))
+                self._release()
+            else:
+                done([[1.0]] * len(texts), None)
+
+        self.executor.submit(run)
+
+    def upsert(self, job, texts, embeddings, done):
+        def run():
+            time.sleep(0.005)
+            with self.lock:
+                self.stored.setdefault(job.path, []).extend(texts)
+            self._release()
+            done(None)
+
+        self.executor.submit(run)
+
+    def _release(self):
+        with self.lock:
+            self.inflight -= 1
+
+    def on_file_done(self, job):
+        self.finished.append(job)
+        if len(self.finished) == self.expected:
+            self.all_done.set()
+
+    def run(self, paths):
+        self.expected = len(paths)
+        self.pipeline.start()
+        try:
+            for path in paths:
+                self.pipeline.submit(path, "coll")
+            assert self.all_done.wait(5)
+        finally:
+            self.pipeline.stop()
+            self.executor.shutdown()
+        return {job.path: job for job in self.finished}
+
+
+def test_all_chunks_stored_with_bounded_inflight_batches():
+    harness = Harness(max_inflight_batches=2)
+    jobs = harness.run([f"f{i}" for i in range(4)])
+
+    assert harness.max_inflight <= 2
+    for path, job in jobs.items():
+        assert job.chunks == 10 and job.batches == 2
+        assert job.upserted == 2 and job.progress() == 1.0
+        assert len(harness.stored[path]) == 10
+
+
+def test_failures_are_isolated():
+    harness = Harness(max_inflight_batches=3, fail_parse={"bad"}, fail_embed={"half"})
+    jobs = harness.run(["f0", "bad", "half", "f1"])
+
+    assert jobs["bad"].error == "cannot parse bad"
+    assert jobs["half"].failed == 1 and jobs["half"].upserted == 1
+    assert jobs["half"].batch_error == "embedding failed"
+    for path in ("f0", "f1"):
+        assert not jobs[path].error and jobs[path].upserted == 2
+        assert len(harness.stored[path]) == 10
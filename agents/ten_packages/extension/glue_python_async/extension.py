@@ -37,6 +37,8 @@ from ten_ai_base.usage import (
 )
 from ten_ai_base import (
     AsyncLLMBaseExtension,
+    LLMModelProfile,
+    LLMRouter,
 )
 from ten_ai_base.types import (
     LLMChatCompletionUserMessageParam,
@@ -130,6 +132,8 @@ class GlueConfig(BaseConfig):
     context_enabled: bool = False
     extra_context: dict = field(default_factory=dict)
     enable_storage: bool = False
+    # optional per-turn model routing, see ten_ai_base.routing.LLMRoutingConfig
+    model_routing: dict = field(default_factory=dict)
 
 
 class AsyncGlueExtension(AsyncLLMBaseExtension):
@@ -165,6 +169,13 @@ class AsyncGlueExtension(AsyncLLMBaseExtension):
 
         self.memory = ChatMemory(self.config.max_history)
 
+        if self.config.model_routing:
+            try:
+                self.router = LLMRouter.from_config(self.config.model_routing)
+                ten_env.log_info(f"model routing: {list(self.router.profiles)}")
+            except Exception as e:
+                ten_env.log_error(f"Failed to initialize model routing: {e}")
+
         if self.config.enable_storage:
             [result, _] = await ten_env.send_cmd(Cmd.create("retrieve"))
             if result.get_status_code() == StatusCode.OK:
@@ -294,7 +305,13 @@ class AsyncGlueExtension(AsyncLLMBaseExtension):
         sentences = []
         start_time = time.time()
         first_token_time = None
-        response = self._stream_chat(messages=messages, tools=tools)
+        profile = self.select_model_profile(
+            ten_env,
+            input_messages,
+            history_length=len(history),
+            follow_up=not input_messages,
+        )
+        response = self._stream_chat(messages=messages, tools=tools, profile=profile)
         async for message in response:
             self.ten_env.log_debug(f"content: {message}")
             try:
@@ -447,30 +464,35 @@ class AsyncGlueExtension(AsyncLLMBaseExtension):
         asyncio.create_task(self.ten_env.send_data(data))
 
     async def _stream_chat(
-        self, messages: List[Any], tools: List[Any]
+        self, messages: List[Any], tools: List[Any], profile: LLMModelProfile = None
     ) -> AsyncGenerator[dict, None]:
+        request_start_time = time.time()
+        first_chunk_time = None
         async with aiohttp.ClientSession() as session:
             try:
                 payload = {
                     "messages": messages,
                     "tools": tools,
                     "tools_choice": "auto" if tools else "none",
-                    "model": "gpt-3.5-turbo",
+                    "model": profile.model if profile else "gpt-3.5-turbo",
                     "stream": True,
                     "stream_options": {"include_usage": True},
                     "ssml_enabled": self.config.ssml_enabled,
                 }
+                if profile and profile.max_tokens:
+                    payload["max_tokens"] = profile.max_tokens
                 if self.config.context_enabled:
                     payload["context"] = {**self.config.extra_context}
                 self.ten_env.log_info(f"payload before sending: {json.dumps(payload)}")
                 headers = {
-                    "Authorization": f"Bearer {self.config.token}",
+                    "Authorization": f"Bearer {(profile and profile.api_key) or self.config.token}",
                     "Content-Type": "application/json",
                 }
+                api_url = (profile and profile.base_url) or self.config.api_url
 
                 start_time = time.time()
                 async with session.post(
-                    self.config.api_url, json=payload, headers=headers
+                    api_url, json=payload, headers=headers
                 ) as response:
                     if response.status != 200:
                         r = await response.json()
@@ -479,6 +501,12 @@ class AsyncGlueExtension(AsyncLLMBaseExtension):
                         )
                         if self.config.failure_info:
                             await self._send_text(self.config.failure_info)
+                        self.record_model_latency(
+                            self.ten_env,
+                            profile,
+                            total_latency=time.time() - request_start_time,
+                            error=True,
+                        )
                         return
                     end_time = time.time()
                     self.connect_times.append(end_time - start_time)
@@ -491,10 +519,30 @@ class AsyncGlueExtension(AsyncLLMBaseExtension):
                                 if content == "[DONE]":
                                     break
                                 self.ten_env.log_debug(f"content: {content}")
+                                if first_chunk_time is None:
+                                    first_chunk_time = time.time()
                                 yield json.loads(content)
+
+                self.record_model_latency(
+                    self.ten_env,
+                    profile,
+                    first_token_latency=(
+                        first_chunk_time - request_start_time
+                        if first_chunk_time
+                        else None
+                    ),
+                    total_latency=time.time() - request_start_time,
+                    error=False,
+                )
             except Exception as e:
                 traceback.print_exc()
                 self.ten_env.log_error(f"Failed to handle {e}")
+                self.record_model_latency(
+                    self.ten_env,
+                    profile,
+                    total_latency=time.time() - request_start_time,
+                    error=True,
+                )
             finally:
                 await session.close()
                 session = None
@@ -0,0 +1,76 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import traceback
+from contextlib import aclosing
+
+from .hedged_tts import HedgedTTSConfig
+from .hedging import HedgedTTS
+from .vendors import create_backend
+from ten import (
+    AsyncTenEnv,
+)
+from ten_ai_base.tts import AsyncTTSBaseExtension
+
+
+class HedgedTTSExtension(AsyncTTSBaseExtension):
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self.client = None
+        self.config = None
+
+    async def on_init(self, ten_env: AsyncTenEnv) -> None:
+        await super().on_init(ten_env)
+        ten_env.log_debug("on_init")
+
+    async def on_start(self, ten_env: AsyncTenEnv) -> None:
+        try:
+            await super().on_start(ten_env)
+            ten_env.log_debug("on_start")
+            self.config = await HedgedTTSConfig.create_async(ten_env=ten_env)
+
+            if len(self.config.backends) < 2:
+                raise ValueError("at least two backends are required")
+
+            backends = [
+                create_backend(options, self.config.sample_rate)
+                for options in self.config.backends
+            ]
+            # the rolling stats are kept per backend name
+            names = [backend.name for backend in backends]
+            duplicates = sorted({name for name in names if names.count(name) > 1})
+            if duplicates:
+                raise ValueError(
+                    f"backend names must be unique, {duplicates} used more than once, set a name per backend"
+                )
+            self.client = HedgedTTS(backends, self.config, ten_env)
+        except Exception:
+            ten_env.log_error(f"on_start failed: {traceback.format_exc()}")
+
+    async def on_stop(self, ten_env: AsyncTenEnv) -> None:
+        await super().on_stop(ten_env)
+        ten_env.log_debug("on_stop")
+
+        if self.client:
+            ten_env.log_info(f"vendor metrics: {self.client.metrics()}")
+            await self.client.close()
+
+    async def on_deinit(self, ten_env: AsyncTenEnv) -> None:
+        await super().on_deinit(ten_env)
+        ten_env.log_debug("on_deinit")
+
+    async def on_request_tts(
+        self, ten_env: AsyncTenEnv, input_text: str, end_of_segment: bool
+    ) -> None:
+        async with aclosing(self.client.synthesize(input_text)) as stream:
+            async for audio_data in stream:
+                await self.send_audio_out(
+                    ten_env, audio_data, sample_rate=self.config.sample_rate
+                )
+
+    async def on_cancel_tts(self, ten_env: AsyncTenEnv) -> None:
+        # nothing to stop here, cancelling the request task closes the
+        # synthesis, which cancels the vendor requests still running
+        pass
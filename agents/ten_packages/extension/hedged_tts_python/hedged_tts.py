@@ -0,0 +1,25 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+from dataclasses import dataclass, field
+
+from ten_ai_base.config import BaseConfig
+
+
+@dataclass
+class HedgedTTSConfig(BaseConfig):
+    # the vendors in order of preference, e.g.
+    # [{"vendor": "elevenlabs", "api_key": "..."}, {"vendor": "cartesia", "api_key": "..."}]
+    backends: list = field(default_factory=list)
+    sample_rate: int = 16000
+    # a sentence goes to the next vendor too once the first audio is later
+    # than this percentile of the rolling ttfb of the vendor
+    hedge_percentile: float = 0.9
+    # the hedge delay until a vendor has min_samples, and its floor
+    hedge_delay_ms: int = 600
+    hedge_min_ms: int = 150
+    window: int = 50
+    min_samples: int = 5
+    max_error_rate: float = 0.2
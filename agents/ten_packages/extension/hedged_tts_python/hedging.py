@@ -0,0 +1,208 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, List, Optional
+
+from .vendors import TTSBackend
+
+
+class AllVendorsFailed(Exception):
+    def __init__(self, errors: dict):
+        super().__init__(f"all tts vendors failed: {errors}")
+        self.errors = errors
+
+
+class VendorStats:
+    """Rolling time to first audio and error rate of a vendor."""
+
+    def __init__(self, window: int) -> None:
+        self.ttfbs: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+        self.errors = 0
+
+    def record_ttfb(self, ttfb_ms: float) -> None:
+        self.ttfbs.append(ttfb_ms)
+
+    def record_outcome(self, error: bool) -> None:
+        self.outcomes.append(error)
+        self.errors += error
+
+    def ttfb_percentile(self, p: float) -> Optional[float]:
+        if not self.ttfbs:
+            return None
+        ttfbs = sorted(self.ttfbs)
+        return ttfbs[min(len(ttfbs) - 1, int(len(ttfbs) * p))]
+
+    def error_rate(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def metrics(self) -> dict:
+        p50 = self.ttfb_percentile(0.5)
+        p90 = self.ttfb_percentile(0.9)
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "wins": self.wins,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate(), 3),
+            "ttfb_p50_ms": None if p50 is None else round(p50),
+            "ttfb_p90_ms": None if p90 is None else round(p90),
+        }
+
+
+class _Attempt:
+    """The request of a sentence to one vendor, its audio buffered until it wins."""
+
+    def __init__(self, backend: TTSBackend, text: str, changed: asyncio.Event) -> None:
+        self.backend = backend
+        self.changed = changed
+        self.chunks: asyncio.Queue = asyncio.Queue()
+        self.started_at = time.perf_counter()
+        self.ttfb_ms: Optional[float] = None
+        self.error: Optional[BaseException] = None
+        self.task = asyncio.create_task(self._run(text))
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000
+
+    async def _run(self, text: str) -> None:
+        stream = self.backend.synthesize(text)
+        try:
+            async for chunk in stream:
+                if not chunk:
+                    continue
+                if self.ttfb_ms is None:
+                    self.ttfb_ms = self.elapsed_ms()
+                    self.changed.set()
+                self.chunks.put_nowait(chunk)
+            if self.ttfb_ms is None:
+                raise ValueError("no audio")
+            self.chunks.put_nowait(None)
+        except Exception as e:
+            self.error = e
+            self.chunks.put_nowait(e)
+            self.changed.set()
+        finally:
+            await stream.aclose()
+
+
+class HedgedTTS:
+    """
+    Speech synthesis over several vendors, each sentence requested from the
+    primary vendor first. If its first audio misses the hedge_percentile of
+    its rolling time to first audio, the sentence is also requested from the
+    next vendor, and if a vendor fails before any audio, from the next one at
+    once. The first vendor to give audio plays the whole sentence, the others
+    are cancelled.
+
+    The primary is the healthy vendor, error rate not above max_error_rate,
+    with the lowest median time to first audio. A vendor with fewer than
+    min_samples is tried as primary first, so every vendor is measured.
+    """
+
+    def __init__(self, backends: List[TTSBackend], config: Any, ten_env: Any) -> None:
+        self.backends = backends
+        self.config = config
+        self.ten_env = ten_env
+        self.stats = {backend.name: VendorStats(config.window) for backend in backends}
+
+    def ranked(self) -> List[TTSBackend]:
+        def key(item):
+            index, backend = item
+            stats = self.stats[backend.name]
+            unhealthy = stats.error_rate() > self.config.max_error_rate
+            measured = len(stats.ttfbs) >= self.config.min_samples
+            return (unhealthy, stats.ttfb_percentile(0.5) if measured else 0, index)
+
+        return [backend for _, backend in sorted(enumerate(self.backends), key=key)]
+
+    def hedge_delay_ms(self, backend: TTSBackend) -> float:
+        stats = self.stats[backend.name]
+        if len(stats.ttfbs) < self.config.min_samples:
+            delay = self.config.hedge_delay_ms
+        else:
+            delay = stats.ttfb_percentile(self.config.hedge_percentile)
+        return max(delay, self.config.hedge_min_ms)
+
+    async def synthesize(self, text: str) -> AsyncIterator[bytes]:
+        pending = self.ranked()
+        attempts: List[_Attempt] = []
+        failed: dict = {}
+        changed = asyncio.Event()
+
+        def launch() -> None:
+            backend = pending.pop(0)
+            stats = self.stats[backend.name]
+            stats.requests += 1
+            if attempts:
+                stats.hedges += 1
+                self.ten_env.log_info(f"hedging [{text}] on {backend.name}")
+            attempts.append(_Attempt(backend, text, changed))
+
+        try:
+            launch()
+            while True:
+                winner = next((a for a in attempts if a.ttfb_ms is not None), None)
+                if winner is not None:
+                    break
+                for attempt in attempts:
+                    name = attempt.backend.name
+                    if attempt.error is not None and name not in failed:
+                        failed[name] = repr(attempt.error)
+                        self.stats[name].record_outcome(True)
+                        self.ten_env.log_warn(f"{name} failed on [{text}], {attempt.error!r}")
+                running = [a for a in attempts if a.error is None]
+                if not running:
+                    if not pending:
+                        raise AllVendorsFailed(failed)
+                    launch()
+                    continue
+                timeout = None
+                if pending:
+                    last = attempts[-1]
+                    timeout = max(0.0, self.hedge_delay_ms(last.backend) - last.elapsed_ms()) / 1000
+                changed.clear()
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    launch()
+
+            stats = self.stats[winner.backend.name]
+            stats.wins += 1
+            stats.record_ttfb(winner.ttfb_ms)
+            for attempt in attempts:
+                if attempt is winner or attempt.error is not None:
+                    continue
+                attempt.task.cancel()
+                if attempt.started_at < winner.started_at:
+                    # lost with a head start, the wait is a lower bound of its ttfb
+                    self.stats[attempt.backend.name].record_ttfb(attempt.elapsed_ms())
+
+            while True:
+                chunk = await winner.chunks.get()
+                if chunk is None:
+                    stats.record_outcome(False)
+                    break
+                if isinstance(chunk, Exception):
+                    # the sentence is cut, its audio was already sent on
+                    stats.record_outcome(True)
+                    raise chunk
+                yield chunk
+        finally:
+            for attempt in attempts:
+                attempt.task.cancel()
+
+    def metrics(self) -> dict:
+        return {name: stats.metrics() for name, stats in self.stats.items()}
+
+    async def close(self) -> None:
+        for backend in self.backends:
+            await backend.close()
@@ -0,0 +1,69 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Local TTS vendors for tests. A request gives, ttfb_ms after it starts, chunks
+chunks of audio every chunk_ms, each the vendor name, so the audio tells which
+vendor played it. fail_before / fail_after make a request fail before any
+audio or after that many chunks. ttfb_ms and the failures can be given per
+request as lists, the last value repeating.
+"""
+import asyncio
+from typing import AsyncIterator, List, Union
+
+from hedged_tts_python.vendors import TTSBackend
+
+
+class VendorError(Exception):
+    pass
+
+
+def nth(value, n):
+    if isinstance(value, list):
+        return value[min(n, len(value) - 1)]
+    return value
+
+
+class FakeVendor(TTSBackend):
+    def __init__(
+        self,
+        name: str,
+        ttfb_ms: Union[float, List[float]] = 20,
+        chunks: int = 3,
+        chunk_ms: float = 5,
+        fail_before: Union[bool, List[bool]] = False,
+        fail_after: int = 0,
+    ) -> None:
+        super().__init__(name)
+        self.ttfb_ms = ttfb_ms
+        self.chunks = chunks
+        self.chunk_ms = chunk_ms
+        self.fail_before = fail_before
+        self.fail_after = fail_after
+
+        self.requests = 0
+        self.cancelled = 0
+        self.completed = 0
+        self.closed = False
+
+    async def synthesize(self, text: str) -> AsyncIterator[bytes]:
+        n = self.requests
+        self.requests += 1
+        try:
+            await asyncio.sleep(nth(self.ttfb_ms, n) / 1000)
+            if nth(self.fail_before, n):
+                raise VendorError(f"{self.name} is down")
+            for i in range(self.chunks):
+                if self.fail_after and i == self.fail_after:
+                    raise VendorError(f"{self.name} dropped the stream")
+                yield self.name.encode()
+                await asyncio.sleep(self.chunk_ms / 1000)
+            self.completed += 1
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+    async def close(self) -> None:
+        self.closed = True
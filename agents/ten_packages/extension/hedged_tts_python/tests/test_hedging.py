@@ -0,0 +1,218 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import time
+from contextlib import aclosing
+from types import SimpleNamespace
+
+import pytest
+
+from hedged_tts_python.hedging import AllVendorsFailed, HedgedTTS
+from fake_vendors import FakeVendor, VendorError
+
+
+class Logger:
+    def log_debug(self, _):
+        pass
+
+    log_info = log_warn = log_error = log_debug
+
+
+def make_config(**kwargs):
+    config = dict(
+        hedge_percentile=0.9,
+        hedge_delay_ms=100,
+        hedge_min_ms=20,
+        window=50,
+        min_samples=3,
+        max_error_rate=0.2,
+    )
+    config.update(kwargs)
+    return SimpleNamespace(**config)
+
+
+def run(scenario, vendors, **config):
+    async def main():
+        client = HedgedTTS(vendors, make_config(**config), Logger())
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+
+    return asyncio.run(main())
+
+
+async def speak(client, text="Hello there."):
+    """The vendors that played the sentence, and when its first audio came."""
+    started = time.perf_counter()
+    ttfb_ms, played = None, []
+    async with aclosing(client.synthesize(text)) as stream:
+        async for chunk in stream:
+            if ttfb_ms is None:
+                ttfb_ms = (time.perf_counter() - started) * 1000
+            played.append(chunk.decode())
+    return played, ttfb_ms
+
+
+def test_fast_primary_is_not_hedged():
+    primary, secondary = FakeVendor("primary"), FakeVendor("secondary")
+
+    async def scenario(client):
+        played, _ = await speak(client)
+        assert played == ["primary"] * 3
+        assert secondary.requests == 0
+        assert client.metrics()["primary"]["wins"] == 1
+
+    run(scenario, [primary, secondary])
+
+
+def test_slow_primary_is_hedged_and_the_first_audio_wins():
+    primary = FakeVendor("primary", ttfb_ms=500)
+    secondary = FakeVendor("secondary", ttfb_ms=20)
+
+    async def scenario(client):
+        played, ttfb_ms = await speak(client)
+        # the whole sentence from the vendor that answered first
+        assert played == ["secondary"] * 3
+        assert ttfb_ms < 100 + 20 + 60
+        await asyncio.sleep(0.01)
+        assert primary.cancelled == 1
+        metrics = client.metrics()
+        assert metrics["secondary"]["hedges"] == 1
+        assert metrics["secondary"]["wins"] == 1
+        # what the primary made us wait counts against it
+        assert metrics["primary"]["ttfb_p50_ms"] >= 100
+
+    run(scenario, [primary, secondary])
+
+
+def test_primary_answering_after_the_hedge_still_wins():
+    primary = FakeVendor("primary", ttfb_ms=130)
+    secondary = FakeVendor("secondary", ttfb_ms=300)
+
+    async def scenario(client):
+        played, _ = await speak(client)
+        assert played == ["primary"] * 3
+        await asyncio.sleep(0.01)
+        assert secondary.requests == 1
+        assert secondary.cancelled == 1
+
+    run(scenario, [primary, secondary])
+
+
+def test_failure_before_audio_fails_over_at_once():
+    primary = FakeVendor("primary", ttfb_ms=10, fail_before=True)
+    secondary = FakeVendor("secondary", ttfb_ms=20)
+
+    async def scenario(client):
+        played, ttfb_ms = await speak(client)
+        assert played == ["secondary"] * 3
+        # not waiting for the hedge delay
+        assert ttfb_ms < 90
+        assert client.metrics()["primary"]["errors"] == 1
+
+    run(scenario, [primary, secondary])
+
+
+def test_all_vendors_failing_raises():
+    vendors = [
+        FakeVendor("primary", fail_before=True),
+        FakeVendor("secondary", fail_before=True),
+        FakeVendor("tertiary", fail_before=True),
+    ]
+
+    async def scenario(client):
+        with pytest.raises(AllVendorsFailed) as raised:
+            await speak(client)
+        assert set(raised.value.errors) == {"primary", "secondary", "tertiary"}
+
+    run(scenario, vendors)
+
+
+def test_failure_after_audio_ends_the_sentence():
+    primary = FakeVendor("primary", chunks=5, fail_after=2)
+    secondary = FakeVendor("secondary")
+
+    async def scenario(client):
+        played = []
+        with pytest.raises(VendorError):
+            async with aclosing(client.synthesize("Hello.")) as stream:
+                async for chunk in stream:
+                    played.append(chunk.decode())
+        # no other voice in the middle of the sentence
+        assert played == ["primary"] * 2
+        assert secondary.requests == 0
+        assert client.metrics()["primary"]["error_rate"] == 1.0
+
+    run(scenario, [primary, secondary])
+
+
+def test_the_fastest_vendor_becomes_primary():
+    primary = FakeVendor("primary", ttfb_ms=60)
+    secondary = FakeVendor("secondary", ttfb_ms=15)
+
+    async def scenario(client):
+        for _ in range(8):
+            await speak(client)
+        assert [backend.name for backend in client.ranked()] == ["secondary", "primary"]
+        played, _ = await speak(client)
+        assert played == ["secondary"] * 3
+        metrics = client.metrics()
+        assert metrics["secondary"]["ttfb_p50_ms"] < metrics["primary"]["ttfb_p50_ms"]
+
+    # no hedging, the vendors are measured as primary in turn
+    run(scenario, [primary, secondary], hedge_delay_ms=1000, hedge_min_ms=1000)
+
+
+def test_erroring_vendor_is_demoted():
+    primary = FakeVendor("primary", ttfb_ms=5, fail_before=[True, False])
+    secondary = FakeVendor("secondary", ttfb_ms=30)
+
+    async def scenario(client):
+        played, _ = await speak(client)
+        assert played == ["secondary"] * 3
+        # an error in two outcomes is over max_error_rate
+        assert client.ranked()[0] is secondary
+
+    run(scenario, [primary, secondary])
+
+
+def test_hedge_delay_follows_the_ttfb_percentile():
+    primary = FakeVendor("primary", ttfb_ms=[10, 10, 10, 200])
+    secondary = FakeVendor("secondary", ttfb_ms=40)
+
+    async def scenario(client):
+        # each measured as primary in turn
+        for _ in range(6):
+            await speak(client)
+        assert client.ranked()[0] is primary
+        # p90 of ~10ms, floored at hedge_min_ms
+        assert client.hedge_delay_ms(primary) == 20
+
+        played, ttfb_ms = await speak(client)
+        assert played == ["secondary"] * 3
+        assert ttfb_ms < 20 + 40 + 60
+        assert client.metrics()["secondary"]["hedges"] == 1
+
+    run(scenario, [primary, secondary], hedge_delay_ms=1000)
+
+
+def test_closing_the_stream_cancels_every_request():
+    primary = FakeVendor("primary", ttfb_ms=500)
+    secondary = FakeVendor("secondary", ttfb_ms=500)
+
+    async def scenario(client):
+        task = asyncio.create_task(speak(client))
+        await asyncio.sleep(0.15)
+        # a flush cancels on_request_tts
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.01)
+        assert primary.cancelled == 1
+        assert secondary.cancelled == 1
+
+    run(scenario, [primary, secondary])
@@ -0,0 +1,114 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+
+
+class TTSBackend(ABC):
+    """
+    A TTS vendor giving the audio of one sentence as a stream of pcm s16le
+    mono chunks at the sample rate of the extension.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    @abstractmethod
+    async def synthesize(self, text: str) -> AsyncIterator[bytes]:
+        raise NotImplementedError
+        # an async generator, as the implementations
+        yield  # pylint: disable=unreachable
+
+    async def close(self) -> None:
+        pass
+
+
+class ElevenLabsBackend(TTSBackend):
+    def __init__(self, name: str, options: dict, sample_rate: int) -> None:
+        super().__init__(name)
+        self.options = options
+        self.sample_rate = sample_rate
+        self.client = None
+
+    async def synthesize(self, text: str) -> AsyncIterator[bytes]:
+        # to avoid circular import issue when using openai with 11labs
+        from elevenlabs.client import AsyncElevenLabs
+        from elevenlabs import Voice, VoiceSettings
+
+        if not self.client:
+            self.client = AsyncElevenLabs(
+                api_key=self.options["api_key"],
+                timeout=self.options.get("request_timeout_seconds", 10),
+            )
+
+        stream = self.client.generate(
+            text=text,
+            model=self.options.get("model_id", "eleven_multilingual_v2"),
+            optimize_streaming_latency=self.options.get("optimize_streaming_latency", 0),
+            output_format=f"pcm_{self.sample_rate}",
+            stream=True,
+            voice=Voice(
+                voice_id=self.options.get("voice_id", "pNInz6obpgDQGcFmaJgB"),
+                settings=VoiceSettings(
+                    stability=self.options.get("stability", 0.5),
+                    similarity_boost=self.options.get("similarity_boost", 0.75),
+                    style=self.options.get("style", 0.0),
+                    speaker_boost=self.options.get("speaker_boost", False),
+                ),
+            ),
+        )
+        async for chunk in stream:
+            yield chunk
+
+
+class CartesiaBackend(TTSBackend):
+    def __init__(self, name: str, options: dict, sample_rate: int) -> None:
+        super().__init__(name)
+        self.options = options
+        self.sample_rate = sample_rate
+        self.client = None
+
+    async def synthesize(self, text: str) -> AsyncIterator[bytes]:
+        from cartesia import AsyncCartesia
+
+        if not self.client:
+            self.client = AsyncCartesia(
+                api_key=self.options["api_key"],
+                timeout=self.options.get("request_timeout_seconds", 10),
+            )
+
+        stream = await self.client.tts.sse(
+            language=self.options.get("language", "en"),
+            model_id=self.options.get("model_id", "sonic-english"),
+            output_format={
+                "container": "raw",
+                "encoding": "pcm_s16le",
+                "sample_rate": self.sample_rate,
+            },
+            stream=True,
+            transcript=text,
+            voice_id=self.options.get("voice_id", "f9836c6e-a0bd-460e-9d3c-f7299fa60f94"),
+        )
+        async for chunk in stream:
+            yield chunk["audio"]
+
+    async def close(self) -> None:
+        if self.client:
+            await self.client.close()
+
+
+VENDORS = {
+    "elevenlabs": ElevenLabsBackend,
+    "cartesia": CartesiaBackend,
+}
+
+
+def create_backend(options: dict, sample_rate: int) -> TTSBackend:
+    """Creates the backend of a `backends` entry, e.g. {"vendor": "cartesia", "api_key": ...}."""
+    vendor = options.get("vendor", "")
+    if vendor not in VENDORS:
+        raise ValueError(f"unknown tts vendor {vendor!r}, expected one of {sorted(VENDORS)}")
+    return VENDORS[vendor](options.get("name") or vendor, options, sample_rate)
@@ -0,0 +1,46 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+from typing import AsyncIterator
+
+from ten import Cmd, CmdResult, StatusCode, TenEnv
+
+
+def send_cmd_async(ten: TenEnv, cmd: Cmd) -> "asyncio.Future[CmdResult]":
+    """
+    Sends cmd and returns a future of its result on the running loop, resolved
+    from the runtime thread the callback is called on.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def callback(_, result, __):
+        loop.call_soon_threadsafe(_resolve, future, result)
+
+    ten.send_cmd(cmd, callback)
+    return future
+
+
+async def send_cmd_stream(ten: TenEnv, cmd: Cmd) -> AsyncIterator[CmdResult]:
+    """Sends cmd and yields its results until the final or a failed one."""
+    loop = asyncio.get_running_loop()
+    results: asyncio.Queue = asyncio.Queue()
+
+    def callback(_, result, __):
+        loop.call_soon_threadsafe(results.put_nowait, result)
+
+    ten.send_cmd(cmd, callback)
+    while True:
+        result = await results.get()
+        yield result
+        if result.get_status_code() != StatusCode.OK or result.get_is_final():
+            return
+
+
+def _resolve(future: asyncio.Future, result: CmdResult) -> None:
+    # the awaiting turn may have been cancelled meanwhile
+    if not future.done():
+        future.set_result(result)
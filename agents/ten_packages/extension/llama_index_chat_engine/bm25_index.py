@@ -0,0 +1,160 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+")
+_WORD = re.compile(r"[^\W_]+(?:[-_./][^\W_]+)*")
+_SEPARATORS = re.compile(r"[-_./]")
+
+# postings scored between two checks of the latency budget
+_BUDGET_CHECK_EVERY = 2048
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase words, identifiers like "XK-4821" kept whole and also split into
+    their parts, and character bigrams for CJK text which has no spaces.
+    """
+    text = text.lower()
+    tokens = []
+    for run in _CJK.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    for word in _WORD.findall(_CJK.sub(" ", text)):
+        tokens.append(word)
+        parts = _SEPARATORS.split(word)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p)
+    return tokens
+
+
+class BM25Index:
+    """
+    Okapi BM25 over the chunk texts of one collection, kept per file so a file
+    sent again replaces its previous chunks.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.texts: Dict[int, str] = {}
+        self.lengths: Dict[int, int] = {}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.files: Dict[str, List[int]] = {}
+        self.total_length = 0
+        self.next_id = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def replace_file(self, file_name: str, texts: Sequence[str]) -> None:
+        tokenized = [(text, Counter(tokenize(text))) for text in dict.fromkeys(texts)]
+        with self.lock:
+            self._remove_file(file_name)
+            ids = []
+            for text, terms in tokenized:
+                doc_id = self.next_id
+                self.next_id += 1
+                length = sum(terms.values())
+                self.texts[doc_id] = text
+                self.lengths[doc_id] = length
+                self.total_length += length
+                for term, tf in terms.items():
+                    self.postings.setdefault(term, {})[doc_id] = tf
+                ids.append(doc_id)
+            self.files[file_name] = ids
+
+    def remove_file(self, file_name: str) -> None:
+        with self.lock:
+            self._remove_file(file_name)
+
+    def _remove_file(self, file_name: str) -> None:
+        for doc_id in self.files.pop(file_name, []):
+            text = self.texts.pop(doc_id)
+            self.total_length -= self.lengths.pop(doc_id)
+            for term in set(tokenize(text)):
+                postings = self.postings.get(term)
+                if postings is None:
+                    continue
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+
+    def search(self, query: str, top_k: int, budget_ms: float = 0) -> List[Tuple[str, float]]:
+        """
+        Best top_k texts for the query. With a budget, scoring stops once it is
+        spent; terms are scored rarest first, so what is cut matters the least.
+        """
+        deadline = time.perf_counter() + budget_ms / 1000 if budget_ms > 0 else None
+        with self.lock:
+            n = len(self.texts)
+            if not n:
+                return []
+            avg_length = self.total_length / n
+            terms = [t for t in set(tokenize(query)) if t in self.postings]
+            terms.sort(key=lambda t: len(self.postings[t]))
+
+            k1, b = self.k1, self.b
+            lengths = self.lengths
+            scores: Dict[int, float] = defaultdict(float)
+            scored = 0
+            for term in terms:
+                postings = self.postings[term]
+                df = len(postings)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = k1 * (1 - b + b * lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm)
+                    scored += 1
+                    if deadline is not None and scored % _BUDGET_CHECK_EVERY == 0:
+                        if time.perf_counter() > deadline:
+                            break
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            return [(self.texts[doc_id], score) for doc_id, score in best]
+
+
+class BM25Store:
+    """BM25 indexes by collection, fed with the chunks file_chunker emits."""
+
+    def __init__(self):
+        self.indexes: Dict[str, BM25Index] = {}
+        self.lock = threading.Lock()
+
+    def replace_file(self, collection: str, file_name: str, texts: Sequence[str]) -> None:
+        with self.lock:
+            index = self.indexes.setdefault(collection, BM25Index())
+        index.replace_file(file_name, texts)
+
+    def get(self, collection: str) -> Optional[BM25Index]:
+        with self.lock:
+            return self.indexes.get(collection)
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]], k: int = 60, top_k: int = 0
+) -> List[Tuple[str, float]]:
+    """
+    Merge ranked lists of texts: each text scores the sum of 1 / (k + rank) over
+    the lists it appears in, which needs no calibration between their scores.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, text in enumerate(ranking, 1):
+            scores[text] = scores.get(text, 0.0) + 1.0 / (k + rank)
+    fused = sorted(scores.items(), key=lambda item: -item[1])
+    return fused[:top_k] if top_k > 0 else fused
@@ -0,0 +1,135 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]")
+
+# shortest overlap taken for the one file_chunker leaves between two chunks
+MIN_OVERLAP_CHARS = 16
+
+
+def estimate_tokens(text: str) -> int:
+    """About 4 characters per token, and one per CJK character."""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+@dataclass
+class Candidate:
+    text: str
+    score: float
+    file_name: str = ""
+    embedding: Optional[Sequence[float]] = None
+
+
+def mmr(candidates: Sequence[Candidate], lambda_mult: float = 0.7) -> List[Candidate]:
+    """
+    Candidates in maximal marginal relevance order: each next one maximizes
+    lambda_mult * relevance - (1 - lambda_mult) * its highest cosine similarity
+    to the ones before it. Relevance is the score relative to the best one; a
+    candidate without embedding is similar to none.
+    """
+    n = len(candidates)
+    if n < 2:
+        return list(candidates)
+    top = max(c.score for c in candidates)
+    relevance = np.array([c.score / top if top > 0 else 0.0 for c in candidates])
+
+    vectors = np.zeros((n, 0))
+    with_embedding = [c.embedding is not None and len(c.embedding) > 0 for c in candidates]
+    dims = {len(c.embedding) for c, e in zip(candidates, with_embedding) if e}
+    if len(dims) == 1:
+        vectors = np.zeros((n, dims.pop()), dtype=np.float32)
+        for i, c in enumerate(candidates):
+            if with_embedding[i]:
+                vectors[i] = c.embedding
+        norms = np.linalg.norm(vectors, axis=1)
+        norms[norms == 0] = 1
+        vectors /= norms[:, None]
+    similarities = vectors @ vectors.T if vectors.shape[1] else np.zeros((n, n))
+
+    order = [int(np.argmax(relevance))]
+    redundancy = similarities[order[0]].copy()
+    remaining = np.ones(n, dtype=bool)
+    remaining[order[0]] = False
+    while remaining.any():
+        gains = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        gains[~remaining] = -np.inf
+        best = int(np.argmax(gains))
+        order.append(best)
+        remaining[best] = False
+        np.maximum(redundancy, similarities[best], out=redundancy)
+    return [candidates[i] for i in order]
+
+
+def overlap(left: str, right: str, min_chars: int = MIN_OVERLAP_CHARS) -> int:
+    """Length of the longest suffix of left that is a prefix of right."""
+    head = right[:min_chars]
+    if len(head) < min_chars:
+        return 0
+    # the first match is the longest, a suffix as long as right is a duplicate
+    pos = left.find(head, max(0, len(left) - len(right) + 1))
+    while pos != -1:
+        if right.startswith(left[pos:]):
+            return len(left) - pos
+        pos = left.find(head, pos + 1)
+    return 0
+
+
+def merge_adjacent(chunks: List[Candidate]) -> List[Candidate]:
+    """
+    Joins chunks of the same file that follow each other, as told by the
+    overlap the chunker leaves between them. The merged chunk takes the place
+    and the best score of the first one.
+    """
+    merged: List[Candidate] = []
+    for chunk in chunks:
+        position = None
+        # a chunk may join two kept ones, which then join each other
+        while True:
+            for i, kept in enumerate(merged):
+                if not chunk.file_name or kept.file_name != chunk.file_name:
+                    continue
+                size = overlap(kept.text, chunk.text)
+                if size:
+                    text = kept.text + chunk.text[size:]
+                else:
+                    size = overlap(chunk.text, kept.text)
+                    if not size:
+                        continue
+                    text = chunk.text + kept.text[size:]
+                del merged[i]
+                chunk = Candidate(text, max(kept.score, chunk.score), kept.file_name)
+                position = i if position is None else min(position, i)
+                break
+            else:
+                break
+        merged.insert(position if position is not None else len(merged), chunk)
+    return merged
+
+
+def pack(
+    candidates: Sequence[Candidate],
+    token_budget: int,
+    lambda_mult: float = 0.7,
+    count_tokens: Callable[[str], int] = estimate_tokens,
+) -> List[Candidate]:
+    """
+    Chunks in MMR order that fit token_budget, a chunk too long for what is
+    left is skipped for the next ones. Adjacent chunks of a file are merged,
+    which gives their overlap back to the budget.
+    """
+    packed: List[Candidate] = []
+    for candidate in mmr(candidates, lambda_mult):
+        packed.append(candidate)
+        tokens = sum(count_tokens(c.text) for c in merge_adjacent(packed))
+        if tokens > token_budget:
+            packed.pop()
+    return merge_adjacent(packed)
@@ -13,22 +13,77 @@ from ten import (
     StatusCode,
     CmdResult,
 )
-import queue, threading
+from ten_ai_base.embedding import BINARY_EMBEDDING_FORMATS, PROPERTY_EMBEDDING_FORMAT
+import asyncio, json, threading, time
 from datetime import datetime
 
 PROPERTY_CHAT_MEMORY_TOKEN_LIMIT = "chat_memory_token_limit"
 PROPERTY_GREETING = "greeting"
+PROPERTY_HYBRID_RETRIEVAL = "hybrid_retrieval"
+PROPERTY_RETRIEVAL_TOP_K = "retrieval_top_k"
+PROPERTY_VECTOR_TOP_K = "vector_top_k"
+PROPERTY_BM25_TOP_K = "bm25_top_k"
+PROPERTY_BM25_BUDGET_MS = "bm25_budget_ms"
+PROPERTY_RRF_K = "rrf_k"
+PROPERTY_QUERY_EMBEDDING_CACHE_SIZE = "query_embedding_cache_size"
+PROPERTY_QUERY_RESULT_CACHE_SIZE = "query_result_cache_size"
+PROPERTY_QUERY_RESULT_CACHE_TTL_MS = "query_result_cache_ttl_ms"
+PROPERTY_CONTEXT_TOKEN_BUDGET = "context_token_budget"
+PROPERTY_RETRIEVAL_CANDIDATES = "retrieval_candidates"
+PROPERTY_MMR_LAMBDA = "mmr_lambda"
+PROPERTY_PREFETCH_RETRIEVAL = "prefetch_retrieval"
+PROPERTY_SPECULATIVE_RETRIEVAL = "speculative_retrieval"
+PROPERTY_SPECULATIVE_STABLE_MS = "speculative_stable_ms"
 
 TASK_TYPE_CHAT_REQUEST = "chat_request"
 TASK_TYPE_GREETING = "greeting"
 
+CONTEXT_SYSTEM_PROMPT = (
+    # "You are an expert Q&A system that is trusted around the world.\n"
+    "You are a voice assistant who talks in a conversational way and can chat with me like my friends. \n"
+    "I will speak to you in English or Chinese, and you will answer in the corrected and improved version of my text with the language I use. \n"
+    "Don’t talk like a robot, instead I would like you to talk like a real human with emotions. \n"
+    "I will use your answer for text-to-speech, so don’t return me any meaningless characters. \n"
+    "I want you to be helpful, when I’m asking you for advice, give me precise, practical and useful advice instead of being vague. \n"
+    "When giving me a list of options, express the options in a narrative way instead of bullet points.\n"
+    "Always answer the query using the provided context information, "
+    "and not prior knowledge.\n"
+    "Some rules to follow:\n"
+    "1. Never directly reference the given context in your answer.\n"
+    "2. Avoid statements like 'Based on the context, ...' or "
+    "'The context information ...' or anything along "
+    "those lines."
+)
+SIMPLE_SYSTEM_PROMPT = (
+    "You are a voice assistant who talks in a conversational way and can chat with me like my friends. \n"
+    "I will speak to you in English or Chinese, and you will answer in the corrected and improved version of my text with the language I use. \n"
+    "Don’t talk like a robot, instead I would like you to talk like a real human with emotions. \n"
+    "I will use your answer for text-to-speech, so don’t return me any meaningless characters. \n"
+    "I want you to be helpful, when I’m asking you for advice, give me precise, practical and useful advice instead of being vague. \n"
+    "When giving me a list of options, express the options in a narrative way instead of bullet points.\n"
+)
+
 
 class LlamaIndexExtension(Extension):
     def __init__(self, name: str):
         super().__init__(name)
-        self.queue = queue.Queue()
+        # turns run as tasks on the loop of this thread
         self.thread = None
+        self.loop = None
+        self.stopEvent = None
         self.stop = False
+        self.last_turn = None
+
+        # chat engines by collection, "" for the one without retrieval, built
+        # once and dropped when their collection changes
+        self.engines = {}
+        self.retrievers = {}
+        # retrieval of a turn starts while the previous turn is answered
+        self.prefetch_retrieval = True
+        # retrieval of stable interim transcripts, used if the final one matches
+        self.speculative = None
+        self.speculative_retrieval = False
+        self.speculative_stable_ms = 300
 
         self.outdate_ts = datetime.now()
         self.outdate_ts_lock = threading.Lock()
@@ -36,6 +91,26 @@ class LlamaIndexExtension(Extension):
         self.collection_name = ""
         self.chat_memory_token_limit = 3000
         self.chat_memory = None
+        self.embedding_format = ""
+
+        # retrieval, hybrid adds a bm25 stage over the chunks sent by file_chunker
+        self.bm25_store = None
+        self.retrieval_top_k = 3
+        self.vector_top_k = 3
+        self.bm25_top_k = 10
+        self.bm25_budget_ms = 20
+        self.rrf_k = 60
+        # with a budget, over-fetched candidates are packed into the context
+        self.context_token_budget = 0
+        self.retrieval_candidates = 12
+        self.mmr_lambda = 0.7
+
+        # repeated questions reuse their embedding and, until the collection
+        # changes, their retrieval results
+        self.query_cache = None
+        self.query_embedding_cache_size = 256
+        self.query_result_cache_size = 256
+        self.query_result_cache_ttl_ms = 60000
 
     def _send_text_data(self, ten: TenEnv, text: str, end_of_segment: bool):
         try:
@@ -67,8 +142,62 @@ class LlamaIndexExtension(Extension):
                 f"get {PROPERTY_CHAT_MEMORY_TOKEN_LIMIT} property failed, err: {err}"
             )
 
-        self.thread = threading.Thread(target=self.async_handle, args=[ten])
-        self.thread.start()
+        try:
+            self.embedding_format = ten.get_property_string(PROPERTY_EMBEDDING_FORMAT)
+        except Exception as err:
+            ten.log_warn(f"get {PROPERTY_EMBEDDING_FORMAT} property failed, err: {err}")
+        if self.embedding_format and self.embedding_format not in BINARY_EMBEDDING_FORMATS:
+            ten.log_warn(f"unknown embedding_format {self.embedding_format}, use json")
+            self.embedding_format = ""
+
+        for key in (PROPERTY_PREFETCH_RETRIEVAL, PROPERTY_SPECULATIVE_RETRIEVAL):
+            try:
+                setattr(self, key, ten.get_property_bool(key))
+            except Exception as err:
+                ten.log_warn(f"get {key} property failed, err: {err}")
+
+        hybrid_retrieval = False
+        try:
+            hybrid_retrieval = ten.get_property_bool(PROPERTY_HYBRID_RETRIEVAL)
+        except Exception as err:
+            ten.log_warn(f"get {PROPERTY_HYBRID_RETRIEVAL} property failed, err: {err}")
+        for key in (
+            PROPERTY_RETRIEVAL_TOP_K,
+            PROPERTY_VECTOR_TOP_K,
+            PROPERTY_BM25_TOP_K,
+            PROPERTY_BM25_BUDGET_MS,
+            PROPERTY_RRF_K,
+            PROPERTY_QUERY_EMBEDDING_CACHE_SIZE,
+            PROPERTY_QUERY_RESULT_CACHE_SIZE,
+            PROPERTY_QUERY_RESULT_CACHE_TTL_MS,
+            PROPERTY_SPECULATIVE_STABLE_MS,
+            PROPERTY_CONTEXT_TOKEN_BUDGET,
+            PROPERTY_RETRIEVAL_CANDIDATES,
+        ):
+            try:
+                setattr(self, key, ten.get_property_int(key))
+            except Exception as err:
+                ten.log_warn(f"get {key} property failed, err: {err}")
+        try:
+            self.mmr_lambda = ten.get_property_float(PROPERTY_MMR_LAMBDA)
+        except Exception as err:
+            ten.log_warn(f"get {PROPERTY_MMR_LAMBDA} property failed, err: {err}")
+        if hybrid_retrieval:
+            from .bm25_index import BM25Store
+
+            self.bm25_store = BM25Store()
+        from .query_cache import QueryCache, SpeculativeRetrieval
+
+        self.query_cache = QueryCache(
+            embedding_capacity=self.query_embedding_cache_size,
+            result_capacity=self.query_result_cache_size,
+            result_ttl_ms=self.query_result_cache_ttl_ms,
+        )
+        if self.speculative_retrieval:
+            self.speculative = SpeculativeRetrieval(
+                lambda text: self.speculate(ten, text),
+                stable_ms=self.speculative_stable_ms,
+            )
 
         # enable chat memory
         from llama_index.core.storage.chat_store import SimpleChatStore
@@ -83,18 +212,37 @@ class LlamaIndexExtension(Extension):
         if greeting is not None:
             self._send_text_data(ten, greeting, True)
 
+        self.thread = threading.Thread(
+            target=asyncio.run, args=(self.__thread_routine(ten),)
+        )
+        # Then 'on_start_done' will be called in the thread
+        self.thread.start()
+
+    async def __thread_routine(self, ten: TenEnv):
+        ten.log_info("__thread_routine start")
+        self.loop = asyncio.get_running_loop()
+        self.stopEvent = asyncio.Event()
         ten.on_start_done()
+        await self.stopEvent.wait()
+        if self.last_turn is not None:
+            # turns stop at their next token as they are outdated
+            await asyncio.wait([self.last_turn], timeout=5)
+        ten.log_info("__thread_routine stopped")
 
     def on_stop(self, ten: TenEnv) -> None:
         ten.log_info("on_stop")
 
         self.stop = True
         self.flush()
-        self.queue.put(None)
-        if self.thread is not None:
+        if self.thread is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.stopEvent.set)
             self.thread.join()
-            self.thread = None
+        self.thread = None
         self.chat_memory = None
+        if self.query_cache is not None:
+            ten.log_info(f"query cache metrics {self.query_cache.metrics()}")
+        if self.speculative is not None:
+            ten.log_info(f"speculative retrieval metrics {self.speculative.metrics()}")
 
         ten.on_stop_done()
 
@@ -104,6 +252,7 @@ class LlamaIndexExtension(Extension):
         ten.log_info("on_cmd {cmd_name}")
         if cmd_name == "file_chunked":
             coll = cmd.get_property_string("collection")
+            self.invalidate_query_cache(ten, coll)
 
             # only update selected collection if empty
             if len(self.collection_name) == 0:
@@ -119,20 +268,25 @@ class LlamaIndexExtension(Extension):
             # notify user
             file_chunked_text = "Your document has been processed. You can now start asking questions about your document. "
             # self._send_text_data(ten, file_chunked_text, True)
-            self.queue.put((file_chunked_text, datetime.now(), TASK_TYPE_GREETING))
+            self.drop_chat_engine(coll)
+            self.put_turn(ten, file_chunked_text, datetime.now(), TASK_TYPE_GREETING)
         elif cmd_name == "file_chunk":
+            # the collection is about to change
+            self.invalidate_query_cache(ten, self.collection_name)
             self.collection_name = ""  # clear current collection
+            self.discard_speculative()
 
             # notify user
             file_chunk_text = "Your document has been received. Please wait a moment while we process it for you.  "
             # self._send_text_data(ten, file_chunk_text, True)
-            self.queue.put((file_chunk_text, datetime.now(), TASK_TYPE_GREETING))
+            self.put_turn(ten, file_chunk_text, datetime.now(), TASK_TYPE_GREETING)
         elif cmd_name == "update_querying_collection":
             coll = cmd.get_property_string("collection")
             ten.log_info(
                 f"collection for querying has been updated from {self.collection_name} to {coll}"
             )
             self.collection_name = coll
+            self.discard_speculative()
 
             # notify user
             update_querying_collection_text = "Your document has been updated. "
@@ -141,10 +295,23 @@ class LlamaIndexExtension(Extension):
                     "You can now start asking questions about your document. "
                 )
             # self._send_text_data(ten, update_querying_collection_text, True)
-            self.queue.put(
-                (update_querying_collection_text, datetime.now(), TASK_TYPE_GREETING)
+            self.put_turn(
+                ten, update_querying_collection_text, datetime.now(), TASK_TYPE_GREETING
             )
 
+        elif cmd_name == "upsert_text":
+            self.invalidate_query_cache(ten, cmd.get_property_string("collection_name"))
+            if self.bm25_store is not None:
+                coll = cmd.get_property_string("collection_name")
+                file_name = cmd.get_property_string("file_name")
+                texts = json.loads(cmd.get_property_string("content"))
+                self.bm25_store.replace_file(coll, file_name, texts)
+                ten.log_info(
+                    f"bm25 index of collection {coll} updated with {len(texts)} chunks of {file_name}"
+                )
+                # the index may be new to the engine of the collection
+                self.drop_chat_engine(coll)
+
         elif cmd_name == "flush":
             self.flush()
             ten.send_cmd(Cmd.create("flush"), None)
@@ -156,6 +323,11 @@ class LlamaIndexExtension(Extension):
     def on_data(self, ten: TenEnv, data: Data) -> None:
         is_final = data.get_property_bool("is_final")
         if not is_final:
+            if self.speculative is not None and self.loop is not None:
+                self.loop.call_soon_threadsafe(
+                    self.on_interim, ten, data.get_property_string("text")
+                )
+                return
             ten.log_info("on_data ignore non final")
             return
 
@@ -167,105 +339,210 @@ class LlamaIndexExtension(Extension):
         ts = datetime.now()
 
         ten.log_info("on_data text [%s], ts [%s]", inputText, ts)
-        self.queue.put((inputText, ts, TASK_TYPE_CHAT_REQUEST))
+        self.put_turn(ten, inputText, ts, TASK_TYPE_CHAT_REQUEST)
 
-    def async_handle(self, ten: TenEnv):
-        ten.log_info("async_handle started")
-        while not self.stop:
-            try:
-                value = self.queue.get()
-                if value is None:
-                    break
-                input_text, ts, task_type = value
-
-                if ts < self.get_outdated_ts():
-                    ten.log_info(
-                        f"text [{input_text}] ts [{ts}] task_type [{task_type}] dropped due to outdated"
-                    )
-                    continue
-
-                if task_type == TASK_TYPE_GREETING:
-                    # send greeting text directly
-                    self._send_text_data(ten, input_text, True)
-                    continue
-
-                ten.log_info("process input text [%s] ts [%s]", input_text, ts)
-
-                # lazy import packages which requires long time to load
-                from .llama_llm import LlamaLLM
-                from .llama_retriever import LlamaRetriever
-
-                # prepare chat engine
-                chat_engine = None
-                if len(self.collection_name) > 0:
-                    from llama_index.core.chat_engine import ContextChatEngine
-
-                    chat_engine = ContextChatEngine.from_defaults(
-                        llm=LlamaLLM(ten=ten),
-                        retriever=LlamaRetriever(ten=ten, coll=self.collection_name),
-                        memory=self.chat_memory,
-                        system_prompt=(
-                            # "You are an expert Q&A system that is trusted around the world.\n"
-                            "You are a voice assistant who talks in a conversational way and can chat with me like my friends. \n"
-                            "I will speak to you in English or Chinese, and you will answer in the corrected and improved version of my text with the language I use. \n"
-                            "Don’t talk like a robot, instead I would like you to talk like a real human with emotions. \n"
-                            "I will use your answer for text-to-speech, so don’t return me any meaningless characters. \n"
-                            "I want you to be helpful, when I’m asking you for advice, give me precise, practical and useful advice instead of being vague. \n"
-                            "When giving me a list of options, express the options in a narrative way instead of bullet points.\n"
-                            "Always answer the query using the provided context information, "
-                            "and not prior knowledge.\n"
-                            "Some rules to follow:\n"
-                            "1. Never directly reference the given context in your answer.\n"
-                            "2. Avoid statements like 'Based on the context, ...' or "
-                            "'The context information ...' or anything along "
-                            "those lines."
-                        ),
-                    )
+    def put_turn(self, ten: TenEnv, input_text: str, ts: datetime, task_type: str):
+        if self.loop is None:
+            ten.log_warn(f"text [{input_text}] dropped before start")
+            return
+        self.loop.call_soon_threadsafe(
+            self.start_turn, ten, input_text, ts, task_type
+        )
+
+    def on_interim(self, ten: TenEnv, text: str):
+        # without a collection there is nothing to retrieve
+        if len(self.collection_name) > 0:
+            self.speculative.on_interim(text)
+
+    async def speculate(self, ten: TenEnv, text: str):
+        _, retriever = self.get_chat_engine(ten)
+        if retriever is None:
+            return []
+        ten.log_info(f"speculative retrieval for interim text [{text}]")
+        return await retriever.aretrieve_text(text)
+
+    def start_turn(self, ten: TenEnv, input_text: str, ts: datetime, task_type: str):
+        retriever = None
+        if task_type == TASK_TYPE_CHAT_REQUEST and self.speculative is not None:
+            speculated = self.speculative.take(input_text)
+            ten.log_info(
+                f"speculative retrieval {'used' if speculated else 'missed'} for [{input_text}], metrics {self.speculative.metrics()}"
+            )
+            if speculated is not None:
+                # speculations are discarded when the collection changes, so
+                # this one retrieved from the current collection
+                _, retriever = self.get_chat_engine(ten)
+                if retriever is not None:
+                    retriever.prefetch(input_text, speculated)
                 else:
-                    from llama_index.core.chat_engine import SimpleChatEngine
-
-                    chat_engine = SimpleChatEngine.from_defaults(
-                        llm=LlamaLLM(ten=ten),
-                        system_prompt=(
-                            "You are a voice assistant who talks in a conversational way and can chat with me like my friends. \n"
-                            "I will speak to you in English or Chinese, and you will answer in the corrected and improved version of my text with the language I use. \n"
-                            "Don’t talk like a robot, instead I would like you to talk like a real human with emotions. \n"
-                            "I will use your answer for text-to-speech, so don’t return me any meaningless characters. \n"
-                            "I want you to be helpful, when I’m asking you for advice, give me precise, practical and useful advice instead of being vague. \n"
-                            "When giving me a list of options, express the options in a narrative way instead of bullet points.\n"
-                        ),
-                        memory=self.chat_memory,
-                    )
-
-                resp = chat_engine.stream_chat(input_text)
-                for cur_token in resp.response_gen:
-                    if self.stop:
-                        break
-                    if ts < self.get_outdated_ts():
-                        ten.log_info(
-                            "stream_chat coming responses dropped due to outdated for input text [%s] ts [%s] ",
-                            input_text,
-                            ts,
-                        )
-                        break
-                    text = str(cur_token)
-
-                    # send out
-                    self._send_text_data(ten, text, False)
-
-                # send out end_of_segment
-                self._send_text_data(ten, "", True)
+                    speculated.cancel()
+
+        # turns answer in order, each waits for the previous one
+        self.last_turn = asyncio.ensure_future(
+            self.run_turn(ten, input_text, ts, task_type, self.last_turn, retriever)
+        )
+
+    async def run_turn(
+        self,
+        ten: TenEnv,
+        input_text: str,
+        ts: datetime,
+        task_type: str,
+        previous: asyncio.Future | None,
+        retriever=None,
+    ):
+        if (
+            retriever is None
+            and task_type == TASK_TYPE_CHAT_REQUEST
+            and self.prefetch_retrieval
+            and previous is not None
+            and not previous.done()
+        ):
+            try:
+                _, retriever = self.get_chat_engine(ten)
+                if retriever is not None:
+                    retriever.prefetch(input_text)
             except Exception as e:
-                ten.log_error(str(e))
-        ten.log_info("async_handle stoped")
+                ten.log_error(f"prefetch failed, err: {e}")
+                retriever = None
+
+        if previous is not None:
+            await asyncio.wait([previous])
+
+        try:
+            await self.answer(ten, input_text, ts, task_type)
+        except Exception as e:
+            ten.log_error(str(e))
+        finally:
+            if retriever is not None:
+                retriever.discard_prefetch(input_text)
+
+    async def answer(self, ten: TenEnv, input_text: str, ts: datetime, task_type: str):
+        if ts < self.get_outdated_ts():
+            ten.log_info(
+                f"text [{input_text}] ts [{ts}] task_type [{task_type}] dropped due to outdated"
+            )
+            return
+
+        if task_type == TASK_TYPE_GREETING:
+            # send greeting text directly
+            self._send_text_data(ten, input_text, True)
+            return
+
+        ten.log_info("process input text [%s] ts [%s]", input_text, ts)
+        start = time.perf_counter()
+        chat_engine, _ = self.get_chat_engine(ten)
+
+        resp = await chat_engine.astream_chat(input_text)
+        completed = True
+        first_token = True
+        async for cur_token in resp.async_response_gen():
+            if self.stop:
+                completed = False
+                break
+            if ts < self.get_outdated_ts():
+                ten.log_info(
+                    "stream_chat coming responses dropped due to outdated for input text [%s] ts [%s] ",
+                    input_text,
+                    ts,
+                )
+                completed = False
+                break
+            if first_token:
+                first_token = False
+                ten.log_info(
+                    f"first token of [{input_text}] in {int((time.perf_counter() - start) * 1000)}ms"
+                )
+            text = str(cur_token)
+
+            # send out
+            self._send_text_data(ten, text, False)
+
+        # send out end_of_segment
+        self._send_text_data(ten, "", True)
+
+        # the next turn reads the chat memory this answer is written to
+        if completed and resp.awrite_response_to_history_task is not None:
+            await resp.awrite_response_to_history_task
+
+    def get_chat_engine(self, ten: TenEnv):
+        """The chat engine of the current collection and its retriever."""
+        collection = self.collection_name
+        if collection in self.engines:
+            return self.engines[collection], self.retrievers.get(collection)
+
+        # lazy import packages which requires long time to load
+        from .llama_llm import LlamaLLM
+        from .llama_retriever import LlamaRetriever
+
+        retriever = None
+        if len(collection) > 0:
+            from llama_index.core.chat_engine import ContextChatEngine
+
+            retriever = LlamaRetriever(
+                ten=ten,
+                coll=collection,
+                embedding_format=self.embedding_format,
+                vector_top_k=self.vector_top_k,
+                bm25=(
+                    self.bm25_store.get(collection)
+                    if self.bm25_store is not None
+                    else None
+                ),
+                bm25_top_k=self.bm25_top_k,
+                bm25_budget_ms=self.bm25_budget_ms,
+                rrf_k=self.rrf_k,
+                top_k=self.retrieval_top_k,
+                query_cache=self.query_cache,
+                context_token_budget=self.context_token_budget,
+                candidates=self.retrieval_candidates,
+                mmr_lambda=self.mmr_lambda,
+            )
+            chat_engine = ContextChatEngine.from_defaults(
+                llm=LlamaLLM(ten=ten),
+                retriever=retriever,
+                memory=self.chat_memory,
+                system_prompt=CONTEXT_SYSTEM_PROMPT,
+            )
+        else:
+            from llama_index.core.chat_engine import SimpleChatEngine
+
+            chat_engine = SimpleChatEngine.from_defaults(
+                llm=LlamaLLM(ten=ten),
+                system_prompt=SIMPLE_SYSTEM_PROMPT,
+                memory=self.chat_memory,
+            )
+        ten.log_info(f"chat engine of collection [{collection}] created")
+
+        self.engines[collection] = chat_engine
+        self.retrievers[collection] = retriever
+        return chat_engine, retriever
+
+    def drop_chat_engine(self, collection: str):
+        def drop():
+            self.engines.pop(collection, None)
+            self.retrievers.pop(collection, None)
+            if self.speculative is not None:
+                self.speculative.discard()
+
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(drop)
+
+    def discard_speculative(self):
+        # speculations retrieved from the previous collection
+        if self.speculative is not None and self.loop is not None:
+            self.loop.call_soon_threadsafe(self.speculative.discard)
+
+    def invalidate_query_cache(self, ten: TenEnv, collection: str):
+        if self.query_cache is None or not collection:
+            return
+        self.query_cache.invalidate(collection)
+        ten.log_info(f"query cache of collection {collection} invalidated")
 
     def flush(self):
         with self.outdate_ts_lock:
             self.outdate_ts = datetime.now()
 
-        while not self.queue.empty():
-            self.queue.get()
-
     def get_outdated_ts(self):
         with self.outdate_ts_lock:
             return self.outdate_ts
@@ -1,4 +1,4 @@
-from typing import Any, List
+from typing import Any, List, Optional
 import threading
 from llama_index.core.embeddings import BaseEmbedding
 import json
@@ -7,34 +7,67 @@ from ten import (
     CmdResult,
     TenEnv,
 )
+from ten_ai_base.embedding import (
+    BINARY_EMBEDDING_FORMATS,
+    PROPERTY_EMBEDDING_FORMAT,
+    decode_embedding,
+    embedding_format_of,
+)
+
+from .async_cmd import send_cmd_async
 
 EMBED_CMD = "embed"
 
 
 def embed_from_resp(cmd_result: CmdResult) -> List[float]:
+    if embedding_format_of(cmd_result) in BINARY_EMBEDDING_FORMATS:
+        return decode_embedding(cmd_result.get_property_buf("embedding_buf"))
     embedding_output_json = cmd_result.get_property_to_json("embedding")
     return json.loads(embedding_output_json)
 
 
 class LlamaEmbedding(BaseEmbedding):
     ten: Any
-
-    def __init__(self, ten: TenEnv):
-        """Creates a new Llama embedding interface."""
-        super().__init__()
+    embedding_format: str = ""
+    query_cache: Any = None
+
+    def __init__(
+        self,
+        ten: TenEnv,
+        embedding_format: str = "",
+        query_cache: Optional[Any] = None,
+    ):
+        """Creates a new Llama embedding interface, query_cache is a QueryCache."""
+        super().__init__(ten=ten)
         self.ten = ten
+        self.embedding_format = embedding_format
+        self.query_cache = query_cache
 
     @classmethod
     def class_name(cls) -> str:
         return "llama_embedding"
 
     async def _aget_query_embedding(self, query: str) -> List[float]:
-        return self._get_query_embedding(query)
+        cached = self._cached(query)
+        if cached is not None:
+            return cached
+
+        self.ten.log_info(f"LlamaEmbedding generate embeddings for the query: {query}")
+        result = await send_cmd_async(self.ten, self._embed_cmd(query))
+        self.ten.log_debug("LlamaEmbedding embedding received")
+        resp = embed_from_resp(result)
+        if self.query_cache is not None and resp:
+            self.query_cache.put_embedding(query, resp)
+        return resp
 
     async def _aget_text_embedding(self, text: str) -> List[float]:
-        return self._get_text_embedding(text)
+        return await self._aget_query_embedding(text)
 
     def _get_query_embedding(self, query: str) -> List[float]:
+        cached = self._cached(query)
+        if cached is not None:
+            return cached
+
         self.ten.log_info(f"LlamaEmbedding generate embeddings for the query: {query}")
         wait_event = threading.Event()
         resp: List[float]
@@ -47,13 +80,27 @@ class LlamaEmbedding(BaseEmbedding):
             resp = embed_from_resp(result)
             wait_event.set()
 
-        cmd_out = Cmd.create(EMBED_CMD)
-        cmd_out.set_property_string("input", query)
-
-        self.ten.send_cmd(cmd_out, callback)
+        self.ten.send_cmd(self._embed_cmd(query), callback)
         wait_event.wait()
+        if self.query_cache is not None and resp:
+            self.query_cache.put_embedding(query, resp)
         return resp
 
+    def _cached(self, query: str) -> Optional[List[float]]:
+        if self.query_cache is None:
+            return None
+        cached = self.query_cache.get_embedding(query)
+        if cached is not None:
+            self.ten.log_info(f"LlamaEmbedding cached embeddings for the query: {query}")
+        return cached
+
+    def _embed_cmd(self, query: str) -> Cmd:
+        cmd_out = Cmd.create(EMBED_CMD)
+        cmd_out.set_property_string("input", query)
+        if self.embedding_format:
+            cmd_out.set_property_string(PROPERTY_EMBEDDING_FORMAT, self.embedding_format)
+        return cmd_out
+
     def _get_text_embedding(self, text: str) -> List[float]:
         return self._get_query_embedding(text)
 
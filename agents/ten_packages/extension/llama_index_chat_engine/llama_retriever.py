@@ -1,20 +1,35 @@
-import json, threading
-from typing import Any, List
+import asyncio, json, threading, time
+from typing import Any, Dict, List, Optional, Tuple
 from llama_index.core.schema import QueryBundle, TextNode
 from llama_index.core.schema import NodeWithScore
 from llama_index.core.retrievers import BaseRetriever
 
+from .async_cmd import send_cmd_async
+from .bm25_index import BM25Index, reciprocal_rank_fusion
+from .context_packer import Candidate, pack
 from .llama_embedding import LlamaEmbedding
+from .query_cache import QueryCache
 from ten import (
     TenEnv,
     Cmd,
     StatusCode,
     CmdResult,
 )
+from ten_ai_base.embedding import (
+    BINARY_EMBEDDING_FORMATS,
+    PROPERTY_EMBEDDING_FORMAT,
+    decode_embeddings,
+    embedding_format_of,
+    encode_embedding,
+)
+
+# file name of a chunk, kept out of the LLM context
+METADATA_FILE_NAME = "file_name"
 
 
 def format_node_result(ten: TenEnv, cmd_result: CmdResult) -> List[NodeWithScore]:
-    ten.log_info(f"LlamaRetriever retrieve response {cmd_result.to_json()}")
+    # the response may carry the embeddings of the chunks
+    ten.log_debug(f"LlamaRetriever retrieve response {cmd_result.to_json()}")
     status = cmd_result.get_status_code()
     try:
         contents_json = cmd_result.get_property_to_json("response")
@@ -35,12 +50,21 @@ def format_node_result(ten: TenEnv, cmd_result: CmdResult) -> List[NodeWithScore
             )
         ]
 
+    embeddings = [result.get("embedding") for result in contents]
+    if embedding_format_of(cmd_result) in BINARY_EMBEDDING_FORMATS:
+        embeddings = decode_embeddings(cmd_result.get_property_buf("embeddings_buf"))
+
     nodes = []
-    for result in contents:
+    for result, embedding in zip(contents, embeddings):
         text_node = TextNode(
             text=result["content"],
+            embedding=embedding,
+            metadata={METADATA_FILE_NAME: result.get("file_name", "")},
+            excluded_llm_metadata_keys=[METADATA_FILE_NAME],
+            excluded_embed_metadata_keys=[METADATA_FILE_NAME],
         )
         nodes.append(NodeWithScore(node=text_node, score=result["score"]))
+    ten.log_info(f"LlamaRetriever retrieve response {len(nodes)} nodes")
     return nodes
 
 
@@ -48,18 +72,131 @@ class LlamaRetriever(BaseRetriever):
     ten: Any
     embed_model: LlamaEmbedding
 
-    def __init__(self, ten: TenEnv, coll: str):
+    def __init__(
+        self,
+        ten: TenEnv,
+        coll: str,
+        embedding_format: str = "",
+        vector_top_k: int = 3,
+        bm25: Optional[BM25Index] = None,
+        bm25_top_k: int = 10,
+        bm25_budget_ms: float = 20,
+        rrf_k: int = 60,
+        top_k: int = 3,
+        query_cache: Optional[QueryCache] = None,
+        context_token_budget: int = 0,
+        candidates: int = 12,
+        mmr_lambda: float = 0.7,
+    ):
+        """
+        Vector retrieval through the vector storage cmds. With a BM25 index, the
+        vector_top_k and bm25_top_k candidates are merged by reciprocal rank
+        fusion and the best top_k are kept. With a query cache, the query
+        embedding and the retrieved nodes are reused for a repeated query.
+
+        With a context_token_budget, candidates chunks are fetched with their
+        embeddings instead, ordered by maximal marginal relevance, merged when
+        adjacent in their file and kept as long as they fit the budget.
+        """
         super().__init__()
         try:
             self.ten = ten
-            self.embed_model = LlamaEmbedding(ten=ten)
+            self.embed_model = LlamaEmbedding(
+                ten=ten, embedding_format=embedding_format, query_cache=query_cache
+            )
             self.collection_name = coll
+            self.embedding_format = embedding_format
+            self.vector_top_k = vector_top_k
+            self.bm25 = bm25
+            self.bm25_top_k = bm25_top_k
+            self.bm25_budget_ms = bm25_budget_ms
+            self.rrf_k = rrf_k
+            self.top_k = top_k
+            self.query_cache = query_cache
+            self.context_token_budget = context_token_budget
+            self.candidates = candidates
+            self.mmr_lambda = mmr_lambda
+            self.prefetched: Dict[str, asyncio.Future] = {}
         except Exception as e:
             ten.log_error(f"Failed to initialize LlamaRetriever: {e}")
 
+    def prefetch(self, query: str, task: Optional[asyncio.Future] = None) -> None:
+        """
+        Starts retrieving for query on the running loop, or uses task already
+        retrieving for it, the chat engine then gets the result when it
+        retrieves for the same query.
+        """
+        if task is not None:
+            self.discard_prefetch(query)
+            self.prefetched[query] = task
+        elif query not in self.prefetched:
+            self.prefetched[query] = asyncio.ensure_future(self.aretrieve_text(query))
+
+    async def aretrieve_text(self, query: str) -> List[NodeWithScore]:
+        return await self._aretrieve_cached(QueryBundle(query))
+
+    def discard_prefetch(self, query: str) -> None:
+        task = self.prefetched.pop(query, None)
+        if task is not None and not task.done():
+            task.cancel()
+
     def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
         self.ten.log_info(f"LlamaRetriever retrieve: {query_bundle.to_json}")
 
+        cached, generation = self._cached(query_bundle)
+        if cached is not None:
+            return cached
+        nodes = self._retrieve_nodes(query_bundle)
+        self._store(query_bundle, nodes, generation)
+        return nodes
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        task = self.prefetched.pop(query_bundle.query_str, None)
+        if task is not None:
+            self.ten.log_info("LlamaRetriever use prefetched nodes")
+            try:
+                return await task
+            except Exception as e:
+                self.ten.log_warn(f"LlamaRetriever prefetch failed, retrieve again, err: {e}")
+        return await self._aretrieve_cached(query_bundle)
+
+    async def _aretrieve_cached(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        self.ten.log_info(f"LlamaRetriever aretrieve: {query_bundle.to_json}")
+
+        cached, generation = self._cached(query_bundle)
+        if cached is not None:
+            return cached
+        nodes = await self._aretrieve_nodes(query_bundle)
+        self._store(query_bundle, nodes, generation)
+        return nodes
+
+    def _cached(self, query_bundle: QueryBundle) -> Tuple[Optional[List[NodeWithScore]], int]:
+        if self.query_cache is None:
+            return None, 0
+        cached = self.query_cache.get_results(self.collection_name, query_bundle.query_str)
+        if cached is not None:
+            self.ten.log_info(
+                f"LlamaRetriever cached results, metrics {self.query_cache.metrics()}"
+            )
+            nodes = [
+                NodeWithScore(node=TextNode(text=text), score=score) for text, score in cached
+            ]
+            return nodes, 0
+        # results are only cached if the collection did not change meanwhile
+        return None, self.query_cache.generation(self.collection_name)
+
+    def _store(
+        self, query_bundle: QueryBundle, nodes: List[NodeWithScore], generation: int
+    ) -> None:
+        if self.query_cache is None:
+            return
+        results = [(n.node.get_content(), n.score) for n in nodes]
+        if results and all(text for text, _ in results):
+            self.query_cache.put_results(
+                self.collection_name, query_bundle.query_str, results, generation
+            )
+
+    def _retrieve_nodes(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
         wait_event = threading.Event()
         resp: List[NodeWithScore] = []
 
@@ -71,15 +208,101 @@ class LlamaRetriever(BaseRetriever):
             self.ten.log_debug("LlamaRetriever callback done")
 
         embedding = self.embed_model.get_query_embedding(query=query_bundle.query_str)
+        self.ten.send_cmd(self._query_cmd(embedding), cmd_callback)
+
+        # keyword search runs while the vector storage answers
+        keyword_texts = self._keyword_search(query_bundle)
+
+        wait_event.wait()
+        return self._fuse(resp, keyword_texts)
 
+    async def _aretrieve_nodes(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        embedding = await self.embed_model.aget_query_embedding(query_bundle.query_str)
+        result = send_cmd_async(self.ten, self._query_cmd(embedding))
+
+        # keyword search runs while the vector storage answers
+        keyword_texts = self._keyword_search(query_bundle)
+
+        resp = format_node_result(self.ten, await result)
+        self.ten.log_debug("LlamaRetriever query done")
+        return self._fuse(resp, keyword_texts)
+
+    def _query_cmd(self, embedding: List[float]) -> Cmd:
         query_cmd = Cmd.create("query_vector")
         query_cmd.set_property_string("collection_name", self.collection_name)
-        query_cmd.set_property_int("top_k", 3)
-        query_cmd.set_property_from_json("embedding", json.dumps(embedding))
+        if self.context_token_budget > 0:
+            query_cmd.set_property_int("top_k", max(self.vector_top_k, self.candidates))
+            query_cmd.set_property_bool("include_embedding", True)
+        else:
+            query_cmd.set_property_int("top_k", self.vector_top_k)
+        if self.embedding_format:
+            query_cmd.set_property_string(PROPERTY_EMBEDDING_FORMAT, self.embedding_format)
+            query_cmd.set_property_buf(
+                "embedding_buf", encode_embedding(embedding, self.embedding_format)
+            )
+        else:
+            query_cmd.set_property_from_json("embedding", json.dumps(embedding))
         self.ten.log_info(
             f"LlamaRetriever send_cmd, collection_name: {self.collection_name}, embedding len: {len(embedding)}"
         )
-        self.ten.send_cmd(query_cmd, cmd_callback)
+        return query_cmd
 
-        wait_event.wait()
-        return resp
+    def _keyword_search(self, query_bundle: QueryBundle) -> List[str]:
+        if self.bm25 is None:
+            return []
+        start = time.perf_counter()
+        matches = self.bm25.search(
+            query_bundle.query_str, self.bm25_top_k, self.bm25_budget_ms
+        )
+        self.ten.log_debug(
+            f"LlamaRetriever bm25 matches {len(matches)}, cost {int((time.perf_counter() - start) * 1000)}ms"
+        )
+        return [text for text, _ in matches]
+
+    def _fuse(
+        self, resp: List[NodeWithScore], keyword_texts: List[str]
+    ) -> List[NodeWithScore]:
+        if self.bm25 is None:
+            return self._pack(resp)
+
+        vector_texts = [n.node.get_content() for n in resp if n.node.get_content()]
+        # packing picks from all candidates
+        fused = reciprocal_rank_fusion(
+            [vector_texts, keyword_texts],
+            k=self.rrf_k,
+            top_k=0 if self.context_token_budget > 0 else self.top_k,
+        )
+        self.ten.log_info(
+            f"LlamaRetriever fused {len(vector_texts)} vector and {len(keyword_texts)} bm25 candidates"
+        )
+        if not fused:
+            return self._pack(resp)
+        vector_nodes = {n.node.get_content(): n.node for n in resp}
+        return self._pack(
+            [
+                NodeWithScore(node=vector_nodes.get(text) or TextNode(text=text), score=score)
+                for text, score in fused
+            ]
+        )
+
+    def _pack(self, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        if self.context_token_budget <= 0:
+            return nodes
+        candidates = [
+            Candidate(
+                text=n.node.get_content(),
+                score=n.score or 0.0,
+                file_name=n.node.metadata.get(METADATA_FILE_NAME, ""),
+                embedding=n.node.embedding,
+            )
+            for n in nodes
+            if n.node.get_content()
+        ]
+        if not candidates:
+            return nodes
+        start = time.perf_counter()
+        packed = pack(candidates, self.context_token_budget, self.mmr_lambda)
+        self.ten.log_info(
+            f"LlamaRetriever packed {len(packed)} chunks of {len(candidates)} candidates in {self.context_token_budget} tokens, cost {int((time.perf_counter() - start) * 1000)}ms"
+        )
+        return [NodeWithScore(node=TextNode(text=c.text), score=c.score) for c in packed]
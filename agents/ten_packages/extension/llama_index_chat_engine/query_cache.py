@@ -0,0 +1,278 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+_SPACES = re.compile(r"\s+")
+# punctuation ASR adds or drops between two takes of the same question
+_EDGE_PUNCTUATION = re.compile(r"^[\s\W_]+|[\s\W_]+$")
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, single spaces and no leading or trailing punctuation."""
+    return _SPACES.sub(" ", _EDGE_PUNCTUATION.sub("", text.lower()))
+
+
+class LRUCache:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.items: "OrderedDict[Any, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self.lock:
+            value = self.items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Any, value: Any) -> None:
+        if self.capacity <= 0:
+            return
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.capacity:
+                self.items.popitem(last=False)
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ResultCache:
+    """
+    Retrieval results by collection and query, kept ttl_ms at most and dropped
+    as soon as the collection changes. A result computed while the collection
+    changed is not stored, as it may predate the change.
+    """
+
+    def __init__(self, capacity: int, ttl_ms: float):
+        self.ttl = ttl_ms / 1000
+        self.entries = LRUCache(capacity)
+        self.generations: Dict[str, int] = {}
+        self.expired = 0
+        self.invalidations = 0
+
+    def generation(self, collection: str) -> int:
+        with self.entries.lock:
+            return self.generations.get(collection, 0)
+
+    def get(self, collection: str, query: str) -> Optional[List[Tuple[str, float]]]:
+        if self.ttl <= 0 or self.entries.capacity <= 0:
+            return None
+        entry = self.entries.get((collection, query))
+        if entry is None:
+            return None
+        expires, generation, results = entry
+        if time.monotonic() > expires or generation != self.generation(collection):
+            with self.entries.lock:
+                self.entries.items.pop((collection, query), None)
+                self.entries.hits -= 1
+                self.entries.misses += 1
+                self.expired += 1
+            return None
+        return results
+
+    def put(
+        self,
+        collection: str,
+        query: str,
+        results: List[Tuple[str, float]],
+        generation: int,
+    ) -> None:
+        if self.ttl <= 0 or generation != self.generation(collection):
+            return
+        self.entries.put(
+            (collection, query), (time.monotonic() + self.ttl, generation, results)
+        )
+
+    def invalidate(self, collection: str) -> None:
+        with self.entries.lock:
+            self.generations[collection] = self.generations.get(collection, 0) + 1
+            stale = [key for key in self.entries.items if key[0] == collection]
+            for key in stale:
+                del self.entries.items[key]
+            self.invalidations += 1
+
+
+class QueryCache:
+    """
+    Query embeddings by normalized text, and retrieval results by collection
+    and normalized text. A capacity or ttl of 0 disables either.
+    """
+
+    def __init__(
+        self,
+        embedding_capacity: int = 256,
+        result_capacity: int = 256,
+        result_ttl_ms: float = 60000,
+    ):
+        self.embeddings = LRUCache(embedding_capacity)
+        self.results = ResultCache(result_capacity, result_ttl_ms)
+
+    def get_embedding(self, query: str) -> Optional[List[float]]:
+        if self.embeddings.capacity <= 0:
+            return None
+        return self.embeddings.get(normalize_query(query))
+
+    def put_embedding(self, query: str, embedding: List[float]) -> None:
+        self.embeddings.put(normalize_query(query), embedding)
+
+    def generation(self, collection: str) -> int:
+        """To pass back to put_results, taken before retrieving."""
+        return self.results.generation(collection)
+
+    def get_results(self, collection: str, query: str) -> Optional[List[Tuple[str, float]]]:
+        return self.results.get(collection, normalize_query(query))
+
+    def put_results(
+        self,
+        collection: str,
+        query: str,
+        results: List[Tuple[str, float]],
+        generation: int,
+    ) -> None:
+        self.results.put(collection, normalize_query(query), results, generation)
+
+    def invalidate(self, collection: str) -> None:
+        self.results.invalidate(collection)
+
+    def metrics(self) -> dict:
+        return {
+            "embedding_hits": self.embeddings.hits,
+            "embedding_misses": self.embeddings.misses,
+            "embedding_hit_rate": round(self.embeddings.hit_rate(), 3),
+            "result_hits": self.results.entries.hits,
+            "result_misses": self.results.entries.misses,
+            "result_hit_rate": round(self.results.entries.hit_rate(), 3),
+            "result_expired": self.results.expired,
+            "invalidations": self.results.invalidations,
+        }
+
+
+class _Speculation:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        task.add_done_callback(self._done)
+
+    def _done(self, _):
+        self.finished = time.monotonic()
+
+    def elapsed_ms(self) -> float:
+        end = self.finished if self.finished is not None else time.monotonic()
+        return (end - self.started) * 1000
+
+
+class SpeculativeRetrieval:
+    """
+    Retrieval started on interim transcripts, before the final one. An interim
+    text unchanged for stable_ms, once normalized, starts retrieve(text); the
+    final transcript takes the retrieval of its normalized text, already done
+    or under way, and the others are cancelled as wasted. At most max_pending
+    retrievals run, the oldest is cancelled first.
+
+    All methods are called on the loop the retrievals run on.
+    """
+
+    def __init__(
+        self,
+        retrieve: Callable[[str], Awaitable[Any]],
+        stable_ms: float = 300,
+        min_chars: int = 4,
+        max_pending: int = 2,
+    ):
+        self.retrieve = retrieve
+        self.stable_ms = stable_ms
+        self.min_chars = min_chars
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[str, _Speculation]" = OrderedDict()
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.interim = ""
+
+        self.started = 0
+        self.used = 0
+        self.wasted = 0
+        self.missed = 0
+        self.saved_ms = 0.0
+
+    def on_interim(self, text: str) -> None:
+        key = normalize_query(text)
+        if key == self.interim:
+            return
+        self.interim = key
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if len(key) < self.min_chars or key in self.pending:
+            return
+        self.timer = asyncio.get_running_loop().call_later(
+            self.stable_ms / 1000, self._start, text
+        )
+
+    def take(self, text: str) -> Optional[asyncio.Future]:
+        """
+        The retrieval of the final transcript text if it was speculated, and
+        None otherwise. Either way the other speculations are discarded.
+        """
+        self._reset_interim()
+        speculation = self.pending.pop(normalize_query(text), None)
+        self.discard()
+        if speculation is None:
+            self.missed += 1
+            return None
+        self.used += 1
+        self.saved_ms += speculation.elapsed_ms()
+        return speculation.task
+
+    def discard(self) -> None:
+        self._reset_interim()
+        while self.pending:
+            _, speculation = self.pending.popitem(last=False)
+            self._cancel(speculation)
+
+    def metrics(self) -> dict:
+        return {
+            "started": self.started,
+            "used": self.used,
+            "wasted": self.wasted,
+            "missed": self.missed,
+            "saved_ms": int(self.saved_ms),
+            "saved_ms_per_use": int(self.saved_ms / self.used) if self.used else 0,
+        }
+
+    def _start(self, text: str) -> None:
+        self.timer = None
+        key = normalize_query(text)
+        if key in self.pending:
+            return
+        while len(self.pending) >= self.max_pending:
+            _, speculation = self.pending.popitem(last=False)
+            self._cancel(speculation)
+        self.pending[key] = _Speculation(asyncio.ensure_future(self.retrieve(text)))
+        self.started += 1
+
+    def _cancel(self, speculation: _Speculation) -> None:
+        self.wasted += 1
+        if not speculation.task.done():
+            speculation.task.cancel()
+
+    def _reset_interim(self) -> None:
+        self.interim = ""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
@@ -0,0 +1,313 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+RAG turns per second of the chat engine against local fake embedding, vector
+storage and LLM extensions, which answer their cmds from a scheduler thread
+after --embed-ms, --query-ms and, for the LLM, --first-token-ms then one of
+--tokens tokens every --token-ms.
+
+Every session is an extension instance that gets --turns questions at once,
+as queued by ASR. Modes:
+  legacy    the previous behavior, a chat engine built for every turn and the
+            blocking stream_chat on the thread of the session
+  async     persistent chat engines, turns on the loop of the session
+  prefetch  async, and retrieval of a turn overlaps the previous answer
+
+The ten runtime is replaced by a minimal in-process one, ten_ai_base by its
+embedding module, so that only llama_index is needed.
+
+    python tests/bench_chat_engine.py [--sessions 4] [--turns 20]
+"""
+import argparse
+import heapq
+import json
+import statistics
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+EXTENSION_DIR = Path(__file__).resolve().parent.parent
+BASE_DIR = EXTENSION_DIR.parents[1] / "system" / "ten_ai_base" / "interface" / "ten_ai_base"
+
+
+class StatusCode:
+    OK = 0
+    ERROR = 1
+
+
+class _Msg:
+    def __init__(self, name=""):
+        self.name = name
+        self.properties = {}
+
+    def get_name(self):
+        return self.name
+
+    def set_property_string(self, key, value):
+        self.properties[key] = value
+
+    set_property_int = set_property_bool = set_property_buf = set_property_string
+
+    def set_property_from_json(self, key, value):
+        self.properties[key] = json.loads(value)
+
+    def get_property_string(self, key):
+        if key not in self.properties:
+            raise KeyError(key)
+        return self.properties[key]
+
+    get_property_int = get_property_bool = get_property_buf = get_property_string
+
+    def get_property_to_json(self, key):
+        return json.dumps(self.get_property_string(key))
+
+    def to_json(self):
+        return "{}"
+
+
+class Cmd(_Msg):
+    @staticmethod
+    def create(name):
+        return Cmd(name)
+
+
+class Data(_Msg):
+    @staticmethod
+    def create(name):
+        return Data(name)
+
+
+class CmdResult(_Msg):
+    def __init__(self, status):
+        super().__init__()
+        self.status = status
+        self.final = True
+
+    @staticmethod
+    def create(status):
+        return CmdResult(status)
+
+    def get_status_code(self):
+        return self.status
+
+    def set_is_final(self, final):
+        self.final = final
+
+    def get_is_final(self):
+        return self.final
+
+
+class Extension:
+    def __init__(self, name):
+        self.name = name
+
+
+def install_runtime():
+    ten = types.ModuleType("ten")
+    for obj in (StatusCode, Cmd, Data, CmdResult, Extension):
+        setattr(ten, obj.__name__, obj)
+    ten.TenEnv = object
+    ten.AsyncTenEnv = object
+    ten.Addon = object
+    ten.register_addon_as_extension = lambda name: (lambda cls: cls)
+    sys.modules["ten"] = ten
+
+    # the package without its __init__, which needs the full runtime
+    base = types.ModuleType("ten_ai_base")
+    base.__path__ = [str(BASE_DIR)]
+    sys.modules["ten_ai_base"] = base
+
+    sys.path.insert(0, str(EXTENSION_DIR.parent))
+
+
+class Scheduler:
+    """Runs callbacks at their due time on one thread, as the runtime would."""
+
+    def __init__(self):
+        self.heap = []
+        self.seq = 0
+        self.cond = threading.Condition()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def call_later(self, delay_ms, fn, *args):
+        with self.cond:
+            self.seq += 1
+            heapq.heappush(self.heap, (time.monotonic() + delay_ms / 1000, self.seq, fn, args))
+            self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.heap or self.heap[0][0] > time.monotonic():
+                    self.cond.wait(self.heap[0][0] - time.monotonic() if self.heap else None)
+                _, _, fn, args = heapq.heappop(self.heap)
+            fn(*args)
+
+
+class FakeTenEnv:
+    """The graph of a session: the chat engine and the fake extensions."""
+
+    def __init__(self, args, scheduler, properties):
+        self.args = args
+        self.scheduler = scheduler
+        self.properties = properties
+        self.started = threading.Event()
+        self.answered = threading.Semaphore(0)
+        self.first_tokens = []
+        self.turn_start = None
+        self.lock = threading.Lock()
+
+    def get_property_string(self, key):
+        if key not in self.properties:
+            raise KeyError(key)
+        return self.properties[key]
+
+    get_property_int = get_property_bool = get_property_string
+
+    def on_start_done(self):
+        self.started.set()
+
+    def on_stop_done(self):
+        pass
+
+    def log_debug(self, *_):
+        pass
+
+    log_info = log_warn = log_error = log_debug
+
+    def return_result(self, *_):
+        pass
+
+    def send_data(self, data):
+        with self.lock:
+            if data.properties["end_of_segment"]:
+                # the answer of the next turn starts now
+                self.turn_start = time.perf_counter()
+                self.answered.release()
+            elif self.turn_start is not None:
+                self.first_tokens.append((time.perf_counter() - self.turn_start) * 1000)
+                self.turn_start = None
+
+    def send_cmd(self, cmd, callback):
+        args = self.args
+        name = cmd.get_name()
+        if name == "embed":
+            result = CmdResult.create(StatusCode.OK)
+            result.set_property_string("embedding", [0.1] * args.dim)
+            self.scheduler.call_later(args.embed_ms, callback, self, result, None)
+        elif name == "query_vector":
+            result = CmdResult.create(StatusCode.OK)
+            result.set_property_string(
+                "response",
+                [{"content": f"chunk {i} of the manual", "score": 0.9} for i in range(3)],
+            )
+            self.scheduler.call_later(args.query_ms, callback, self, result, None)
+        elif name == "call_chat":
+            for i in range(args.tokens):
+                result = CmdResult.create(StatusCode.OK)
+                result.set_property_string("text", f"word{i} ")
+                result.set_is_final(i == args.tokens - 1)
+                delay = args.first_token_ms + i * args.token_ms
+                self.scheduler.call_later(delay, callback, self, result, None)
+        elif callback is not None:
+            self.scheduler.call_later(0, callback, self, CmdResult.create(StatusCode.OK), None)
+
+
+def legacy_session(extension, ten, questions):
+    """One thread per session, as the queue thread of the previous version."""
+    from llama_index.core.chat_engine import ContextChatEngine
+    from llama_index_chat_engine.extension import CONTEXT_SYSTEM_PROMPT
+    from llama_index_chat_engine.llama_llm import LlamaLLM
+    from llama_index_chat_engine.llama_retriever import LlamaRetriever
+
+    for question in questions:
+        chat_engine = ContextChatEngine.from_defaults(
+            llm=LlamaLLM(ten=ten),
+            retriever=LlamaRetriever(ten=ten, coll="manual", query_cache=extension.query_cache),
+            memory=extension.chat_memory,
+            system_prompt=CONTEXT_SYSTEM_PROMPT,
+        )
+        resp = chat_engine.stream_chat(question)
+        for token in resp.response_gen:
+            extension._send_text_data(ten, str(token), False)
+        extension._send_text_data(ten, "", True)
+
+
+def run(args, mode):
+    from llama_index_chat_engine.extension import LlamaIndexExtension
+
+    scheduler = Scheduler()
+    sessions = []
+    for s in range(args.sessions):
+        ten = FakeTenEnv(
+            args,
+            scheduler,
+            {"prefetch_retrieval": mode == "prefetch", "query_result_cache_ttl_ms": 0},
+        )
+        extension = LlamaIndexExtension(f"session{s}")
+        extension.on_start(ten)
+        ten.started.wait()
+        extension.collection_name = "manual"
+        questions = [f"question {t} of session {s}" for t in range(args.turns)]
+        sessions.append((extension, ten, questions))
+
+    start = time.perf_counter()
+    threads = []
+    for extension, ten, questions in sessions:
+        ten.turn_start = start
+        if mode == "legacy":
+            thread = threading.Thread(target=legacy_session, args=(extension, ten, questions))
+            thread.start()
+            threads.append(thread)
+            continue
+
+        for question in questions:
+            data = Data.create("text_data")
+            data.set_property_bool("is_final", True)
+            data.set_property_string("text", question)
+            extension.on_data(ten, data)
+
+    for extension, ten, _ in sessions:
+        for _ in range(args.turns):
+            ten.answered.acquire()
+    elapsed = time.perf_counter() - start
+    for thread in threads:
+        thread.join()
+    for extension, ten, _ in sessions:
+        extension.on_stop(ten)
+
+    first_tokens = [ms for _, ten, _ in sessions for ms in ten.first_tokens]
+    return args.sessions * args.turns / elapsed, statistics.mean(first_tokens)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--embed-ms", type=float, default=60)
+    parser.add_argument("--query-ms", type=float, default=40)
+    parser.add_argument("--first-token-ms", type=float, default=150)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--token-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    install_runtime()
+    print(
+        f"{args.sessions} sessions x {args.turns} turns, embed {args.embed_ms}ms, "
+        f"query {args.query_ms}ms, first token {args.first_token_ms}ms, "
+        f"{args.tokens} tokens every {args.token_ms}ms"
+    )
+    print(f"{'mode':<10}{'turns/s':>9}{'first token':>13}")
+    for mode in ("legacy", "async", "prefetch"):
+        turns_per_sec, first_token = run(args, mode)
+        print(f"{mode:<10}{turns_per_sec:>9.2f}{first_token:>11.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
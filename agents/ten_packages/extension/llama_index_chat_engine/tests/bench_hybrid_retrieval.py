@@ -0,0 +1,166 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Offline relevance and latency of vector, BM25 and hybrid (reciprocal rank
+fusion) retrieval on a synthetic corpus.
+
+Chunks are made of topic concepts, filler words and, for some, a product code.
+Every concept has two spellings: chunks use one, half of the words of a
+semantic query use the other, a gap only the embedding bridges. The embedding
+is a random projection of the concepts; product codes only weigh a little in
+it, as subword embeddings blur them, and are what identifier queries ask for.
+
+    python tests/bench_hybrid_retrieval.py [--chunks 20000] [--queries 300]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bm25_index import BM25Index, reciprocal_rank_fusion  # noqa: E402
+
+DIM = 256
+CODE_WEIGHT = 0.3
+
+
+class Corpus:
+    def __init__(self, args):
+        self.rng = random.Random(0)
+        np_rng = np.random.default_rng(0)
+        syllables = [c + v for c in "bcdfghklmnprstvz" for v in "aeiou"]
+
+        def word(n):
+            return "".join(self.rng.choice(syllables) for _ in range(n))
+
+        self.concepts = [(word(3), word(3)) for _ in range(args.topics * 30)]
+        self.concept_vectors = np_rng.normal(size=(len(self.concepts), DIM))
+        self.fillers = [word(2) for _ in range(300)]
+        self.topic_of = [i // 30 for i in range(len(self.concepts))]
+        self.code_vectors = {}
+
+        self.chunks = []
+        self.chunk_concepts = []
+        self.codes = {}
+        for i in range(args.chunks):
+            topic = self.rng.randrange(args.topics)
+            concepts = self.rng.sample(range(topic * 30, topic * 30 + 30), 8)
+            words = [self.concepts[c][0] for c in concepts]
+            words += self.rng.choices(self.fillers, k=12)
+            if self.rng.random() < 0.3:
+                code = f"{word(1).upper()}{self.rng.choice('KXQ')}-{self.rng.randrange(1000, 9999)}"
+                self.codes[i] = code
+                self.code_vectors[code.lower()] = np_rng.normal(size=DIM)
+                words.append(code)
+            self.rng.shuffle(words)
+            self.chunks.append(" ".join(words))
+            self.chunk_concepts.append(concepts)
+
+        self.by_spelling = {}
+        for c, (a, b) in enumerate(self.concepts):
+            self.by_spelling[a] = c
+            self.by_spelling[b] = c
+        self.embeddings = np.stack([self.embed(t) for t in self.chunks])
+
+    def embed(self, text):
+        v = np.zeros(DIM)
+        for w in text.lower().split():
+            if w in self.by_spelling:
+                v += self.concept_vectors[self.by_spelling[w]]
+            elif w in self.code_vectors:
+                v += CODE_WEIGHT * self.code_vectors[w]
+        return v / max(np.linalg.norm(v), 1e-9)
+
+    def semantic_query(self):
+        i = self.rng.randrange(len(self.chunks))
+        concepts = self.rng.sample(self.chunk_concepts[i], 5)
+        words = [self.concepts[c][self.rng.random() < 0.5] for c in concepts]
+        return " ".join(words + self.rng.choices(self.fillers, k=2)), i
+
+    def code_query(self):
+        i = self.rng.choice(list(self.codes))
+        topic = self.topic_of[self.chunk_concepts[i][0]]
+        concept = self.rng.randrange(topic * 30, topic * 30 + 30)
+        words = [self.codes[i], self.concepts[concept][1]] + self.rng.choices(self.fillers, k=2)
+        return " ".join(words), i
+
+
+def evaluate(corpus, index, queries, args):
+    stages = {"vector": [], f"vector top{args.raise_top_k}": [], "bm25": [], "hybrid": []}
+    latencies = {"bm25": [], "fusion": []}
+    for query, relevant in queries:
+        target = corpus.chunks[relevant]
+        sims = corpus.embeddings @ corpus.embed(query)
+        top = np.argsort(-sims)[: max(args.vector_top_k, args.raise_top_k)]
+        vector = [corpus.chunks[i] for i in top]
+
+        start = time.perf_counter()
+        keyword = [t for t, _ in index.search(query, args.bm25_top_k, args.budget_ms)]
+        latencies["bm25"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        fused = reciprocal_rank_fusion(
+            [vector[: args.vector_top_k], keyword], k=args.rrf_k, top_k=args.top_k
+        )
+        latencies["fusion"].append(time.perf_counter() - start)
+
+        for name, ranking in (
+            ("vector", vector[: args.top_k]),
+            (f"vector top{args.raise_top_k}", vector[: args.raise_top_k]),
+            ("bm25", keyword[: args.top_k]),
+            ("hybrid", [t for t, _ in fused]),
+        ):
+            rank = ranking.index(target) + 1 if target in ranking else 0
+            stages[name].append(1 / rank if rank else 0)
+    return stages, latencies
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[max(0, int(len(values) * p) - 1)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--vector-top-k", type=int, default=10)
+    parser.add_argument("--bm25-top-k", type=int, default=10)
+    parser.add_argument("--raise-top-k", type=int, default=10)
+    parser.add_argument("--rrf-k", type=int, default=60)
+    parser.add_argument("--budget-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    corpus = Corpus(args)
+    index = BM25Index()
+    start = time.perf_counter()
+    for i in range(0, len(corpus.chunks), 5):
+        index.replace_file(f"file{i}", corpus.chunks[i : i + 5])
+    build = time.perf_counter() - start
+    print(f"{len(corpus.chunks)} chunks, bm25 index built in {build:.1f}s")
+
+    for kind, make in (("semantic", corpus.semantic_query), ("identifier", corpus.code_query)):
+        queries = [make() for _ in range(args.queries)]
+        stages, latencies = evaluate(corpus, index, queries, args)
+        print(f"\n{kind} queries, {args.queries}")
+        print(f"{'retrieval':<16}{'chunks':>7}{'hit rate':>10}{'MRR':>8}")
+        for name, rr in stages.items():
+            chunks = args.raise_top_k if name.startswith("vector top") else args.top_k
+            hit = sum(1 for r in rr if r) / len(rr)
+            print(f"{name:<16}{chunks:>7}{hit:>10.3f}{statistics.mean(rr):>8.3f}")
+        for name, values in latencies.items():
+            print(f"{name} p50 {percentile(values, 0.5):.2f}ms p99 {percentile(values, 0.99):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Retrieval latency with and without the query cache on a repeated-query
+workload. Questions are drawn from a Zipf distribution over --questions
+distinct ones, --retry of them right after the previous one as after an
+interruption, and ASR spells them with varying case and punctuation. The
+collection gets an upsert every --upsert-every queries.
+
+The embed and query_vector cmds are not run: a miss costs --embed-ms and
+--query-ms, to which the measured cache overhead is added.
+
+    python tests/bench_query_cache.py [--queries 5000] [--questions 300]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from query_cache import QueryCache  # noqa: E402
+
+
+def workload(args):
+    rng = random.Random(0)
+    questions = [f"question number {i} about the manual" for i in range(args.questions)]
+    weights = [1 / (i + 1) ** args.zipf for i in range(args.questions)]
+    spellings = [
+        lambda q: q,
+        lambda q: q.capitalize() + "?",
+        lambda q: " " + q.upper() + ".",
+        lambda q: q + " ?",
+    ]
+    queries = []
+    previous = None
+    for _ in range(args.queries):
+        if previous is not None and rng.random() < args.retry:
+            question = previous
+        else:
+            question = rng.choices(questions, weights)[0]
+        queries.append(rng.choice(spellings)(question))
+        previous = question
+    return queries
+
+
+def run(args, queries, cache):
+    latencies = []
+    for i, query in enumerate(queries):
+        if i and i % args.upsert_every == 0 and cache is not None:
+            cache.invalidate("manual")
+
+        cost = 0.0
+        start = time.perf_counter()
+        results = cache.get_results("manual", query) if cache is not None else None
+        if results is None:
+            generation = cache.generation("manual") if cache is not None else 0
+            embedding = cache.get_embedding(query) if cache is not None else None
+            if embedding is None:
+                cost += args.embed_ms
+                embedding = [0.0] * 8
+                if cache is not None:
+                    cache.put_embedding(query, embedding)
+            cost += args.query_ms
+            results = [("chunk", 0.9)]
+            if cache is not None:
+                cache.put_results("manual", query, results, generation)
+        latencies.append(cost + (time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+
+def percentile(values, p):
+    return values[max(0, int(len(values) * p) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--retry", type=float, default=0.15)
+    parser.add_argument("--upsert-every", type=int, default=500)
+    parser.add_argument("--embed-ms", type=float, default=60)
+    parser.add_argument("--query-ms", type=float, default=40)
+    parser.add_argument("--ttl-ms", type=float, default=60000)
+    args = parser.parse_args()
+
+    queries = workload(args)
+    print(
+        f"{args.queries} queries over {args.questions} questions, zipf {args.zipf}, "
+        f"retry {args.retry:.0%}, upsert every {args.upsert_every}"
+    )
+    print(f"{'cache':<8}{'mean':>9}{'p50':>9}{'p95':>9}  metrics")
+    for name, cache in (("none", None), ("query", QueryCache(result_ttl_ms=args.ttl_ms))):
+        latencies = run(args, queries, cache)
+        mean = sum(latencies) / len(latencies)
+        metrics = cache.metrics() if cache is not None else {}
+        print(
+            f"{name:<8}{mean:>7.1f}ms{percentile(latencies, 0.5):>7.1f}ms"
+            f"{percentile(latencies, 0.95):>7.1f}ms  {metrics}"
+        )
+
+
+if __name__ == "__main__":
+    main()
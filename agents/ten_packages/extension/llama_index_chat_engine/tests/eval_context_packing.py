@@ -0,0 +1,158 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Offline evaluation of context packing against plain top-k retrieval, on a
+synthetic corpus chunked as file_chunker does: 200 characters with 20 of
+overlap.
+
+Every file is a run of topics, each of a few fact sentences that span some
+adjacent chunks. A second revision of some files repeats their text, as a
+re-uploaded manual does, and other files mention the topics once more. A
+chunk embeds as the mean of the topics of its characters plus noise, a query
+as its topic plus noise.
+
+Fact recall is the share of the facts of the query topic whose sentence is
+whole in the context. Tokens are those the context takes in the prompt.
+
+    python tests/eval_context_packing.py [--files 40] [--queries 300]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from context_packer import Candidate, estimate_tokens, pack  # noqa: E402
+
+CHUNK_SIZE = 200
+CHUNK_OVERLAP = 20
+DIM = 128
+
+
+def chunk(text):
+    step = CHUNK_SIZE - CHUNK_OVERLAP
+    return [text[i : i + CHUNK_SIZE] for i in range(0, max(1, len(text) - CHUNK_OVERLAP), step)]
+
+
+class Corpus:
+    def __init__(self, args):
+        rng = random.Random(0)
+        np_rng = np.random.default_rng(0)
+        words = [a + b for a in "bdfgklmnprstvz" for b in ("a", "e", "i", "o", "u", "an", "or")]
+        self.topics = np_rng.normal(size=(args.files * args.topics, DIM))
+        self.facts = {}  # topic -> sentences
+        # chunk text, file name, embedding
+        self.chunks = []
+
+        def sentence(topic, i):
+            filler = " ".join(rng.choice(words) for _ in range(rng.randint(6, 12)))
+            return f"Fact {i} of topic {topic} is {filler}. "
+
+        def add_file(name, spans):
+            text = "".join(s for _, s in spans)
+            owners = np.zeros(len(text), dtype=np.int64)
+            pos = 0
+            for topic, s in spans:
+                owners[pos : pos + len(s)] = topic
+                pos += len(s)
+            for start, piece in zip(range(0, len(text), CHUNK_SIZE - CHUNK_OVERLAP), chunk(text)):
+                counts = np.bincount(owners[start : start + len(piece)], minlength=len(self.topics))
+                vector = counts @ self.topics / len(piece)
+                vector = vector / np.linalg.norm(vector) + args.noise * np_rng.normal(size=DIM) / np.sqrt(DIM)
+                self.chunks.append((piece, name, vector))
+
+        topic = 0
+        for f in range(args.files):
+            spans = []
+            for _ in range(args.topics):
+                sentences = [sentence(topic, i) for i in range(rng.randint(3, 6))]
+                self.facts[topic] = sentences
+                spans += [(topic, s) for s in sentences]
+                topic += 1
+            add_file(f"manual{f}.pdf", spans)
+            if rng.random() < args.revisions:
+                add_file(f"manual{f}_v2.pdf", spans)
+        # mentions of topics in other files
+        for f in range(args.files // 2):
+            picked = rng.sample(range(topic), args.topics)
+            spans = [(t, rng.choice(self.facts[t])) for t in picked]
+            add_file(f"notes{f}.pdf", spans)
+
+        self.vectors = np.array([v / np.linalg.norm(v) for _, _, v in self.chunks], dtype=np.float32)
+
+    def query(self, topic, noise, rng):
+        q = self.topics[topic] / np.linalg.norm(self.topics[topic])
+        q = q + noise * rng.normal(size=DIM) / np.sqrt(DIM)
+        return q / np.linalg.norm(q)
+
+    def search(self, q, k):
+        scores = self.vectors @ q
+        top = np.argsort(-scores)[:k]
+        return [
+            Candidate(self.chunks[i][0], float(scores[i]), self.chunks[i][1], self.vectors[i])
+            for i in top
+        ]
+
+
+def recall(corpus, topic, texts):
+    context = "\n".join(texts)
+    facts = corpus.facts[topic]
+    return sum(1 for fact in facts if fact.strip() in context) / len(facts)
+
+
+def evaluate(args, corpus, method):
+    rng = np.random.default_rng(1)
+    topics = random.Random(1).choices(range(len(corpus.facts)), k=args.queries)
+    recalls, tokens, costs = [], [], []
+    for topic in topics:
+        q = corpus.query(topic, args.query_noise, rng)
+        start = time.perf_counter()
+        texts = method(corpus, q)
+        costs.append((time.perf_counter() - start) * 1000)
+        recalls.append(recall(corpus, topic, texts))
+        tokens.append(sum(estimate_tokens(t) for t in texts))
+    return statistics.mean(recalls), statistics.mean(tokens), max(tokens), statistics.median(costs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--topics", type=int, default=8, help="topics per file")
+    parser.add_argument("--revisions", type=float, default=0.5)
+    parser.add_argument("--noise", type=float, default=0.3)
+    parser.add_argument("--query-noise", type=float, default=0.8)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--candidates", type=int, default=12)
+    parser.add_argument("--mmr-lambda", type=float, default=0.7)
+    args = parser.parse_args()
+
+    corpus = Corpus(args)
+    print(f"{len(corpus.chunks)} chunks of {len(corpus.facts)} topics, {args.queries} queries")
+    methods = []
+    for k in (3, 6):
+        methods.append((f"top {k}", lambda c, q, k=k: [x.text for x in c.search(q, k)]))
+    for budget in (150, 300):
+        methods.append(
+            (
+                f"packed {budget}",
+                lambda c, q, budget=budget: [
+                    x.text for x in pack(c.search(q, args.candidates), budget, args.mmr_lambda)
+                ],
+            )
+        )
+    print(f"{'method':<12}{'recall':>8}{'tokens':>8}{'max':>6}{'cost':>9}")
+    for name, method in methods:
+        fact_recall, mean_tokens, max_tokens, cost = evaluate(args, corpus, method)
+        print(f"{name:<12}{fact_recall:>8.3f}{mean_tokens:>8.0f}{max_tokens:>6}{cost:>7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+from bench_chat_engine import (
+    Cmd,
+    CmdResult,
+    Data,
+    FakeTenEnv,
+    Scheduler,
+    StatusCode,
+    install_runtime,
+)
+
+install_runtime()
+
+from llama_index_chat_engine.async_cmd import send_cmd_stream  # noqa: E402
+from llama_index_chat_engine.extension import LlamaIndexExtension  # noqa: E402
+
+
+class RecordingTenEnv(FakeTenEnv):
+    """Records the cmds and answers, the tokens of an answer name its question."""
+
+    def __init__(self, scheduler, properties):
+        args = SimpleNamespace(
+            dim=8, embed_ms=5, query_ms=5, first_token_ms=20, tokens=4, token_ms=30
+        )
+        super().__init__(args, scheduler, properties)
+        self.cmds = []
+        self.texts = []
+        self.first_token = threading.Event()
+        # callbacks not run yet, they fail once the loop of the extension is closed
+        self.pending = 0
+        self.idle = threading.Condition()
+
+    def send_data(self, data):
+        text = data.properties["text"]
+        self.texts.append((text, data.properties["end_of_segment"]))
+        if text:
+            self.first_token.set()
+        super().send_data(data)
+
+    def send_cmd(self, cmd, callback):
+        self.cmds.append(cmd.get_name())
+        if callback is not None:
+            callback = self.tracked(callback)
+        if cmd.get_name() != "call_chat":
+            if callback is not None:
+                self.expect(1)
+            super().send_cmd(cmd, callback)
+            return
+
+        question = json.loads(cmd.properties["messages"])[-1]["content"]
+        for i in range(self.args.tokens):
+            result = CmdResult.create(StatusCode.OK)
+            result.set_property_string("text", f"{question}:{i} ")
+            result.set_is_final(i == self.args.tokens - 1)
+            delay = self.args.first_token_ms + i * self.args.token_ms
+            self.expect(1)
+            self.scheduler.call_later(delay, callback, self, result, None)
+
+    def expect(self, count):
+        with self.idle:
+            self.pending += count
+
+    def tracked(self, callback):
+        def run(*args):
+            callback(*args)
+            with self.idle:
+                self.pending -= 1
+                self.idle.notify_all()
+
+        return run
+
+    def answers(self):
+        answers, current = [], []
+        for text, end_of_segment in self.texts:
+            if text:
+                current.append(text)
+            if end_of_segment:
+                answers.append(current)
+                current = []
+        return answers
+
+
+def start(prefetch_retrieval=True):
+    ten = RecordingTenEnv(
+        Scheduler(),
+        {"prefetch_retrieval": prefetch_retrieval, "query_result_cache_ttl_ms": 0},
+    )
+    extension = LlamaIndexExtension("llama_index")
+    extension.on_start(ten)
+    ten.started.wait()
+    extension.collection_name = "manual"
+    return extension, ten
+
+
+def stop(extension, ten):
+    with ten.idle:
+        assert ten.idle.wait_for(lambda: ten.pending == 0, timeout=5)
+    extension.on_stop(ten)
+
+
+def ask(extension, ten, question):
+    data = Data.create("text_data")
+    data.set_property_bool("is_final", True)
+    data.set_property_string("text", question)
+    extension.on_data(ten, data)
+
+
+def wait_answers(ten, count):
+    for _ in range(count):
+        assert ten.answered.acquire(timeout=5)
+
+
+def full_answer(question, tokens=4):
+    return [f"{question}:{i} " for i in range(tokens)]
+
+
+def test_turns_answer_in_order():
+    extension, ten = start()
+    for question in ("q0", "q1", "q2"):
+        ask(extension, ten, question)
+    wait_answers(ten, 3)
+    stop(extension, ten)
+
+    assert ten.answers() == [full_answer("q0"), full_answer("q1"), full_answer("q2")]
+    assert ten.cmds.count("call_chat") == 3
+
+
+def test_flush_drops_outdated_turns():
+    extension, ten = start()
+    for question in ("q0", "q1", "q2"):
+        ask(extension, ten, question)
+    assert ten.first_token.wait(5)
+    extension.on_cmd(ten, Cmd.create("flush"))
+    ask(extension, ten, "q3")
+    wait_answers(ten, 2)
+    stop(extension, ten)
+
+    answers = ten.answers()
+    # the answer of q0 is cut, q1 and q2 are not answered at all
+    assert len(answers) == 2
+    assert 0 < len(answers[0]) < 4
+    assert answers[0] == full_answer("q0")[: len(answers[0])]
+    assert answers[1] == full_answer("q3")
+    assert ten.cmds.count("call_chat") == 2
+    assert "flush" in ten.cmds
+
+
+def test_prefetched_retrieval_is_used():
+    extension, ten = start()
+    ask(extension, ten, "q0")
+    ask(extension, ten, "q1")
+    wait_answers(ten, 2)
+    stop(extension, ten)
+
+    # q1 retrieved while q0 was answered, and not again when answered
+    assert ten.cmds.index("call_chat") > ten.cmds.index("embed", 1)
+    assert ten.cmds.count("embed") == 2
+    assert ten.cmds.count("query_vector") == 2
+    assert extension.retrievers["manual"].prefetched == {}
+
+
+def test_prefetched_retrieval_of_dropped_turns_is_discarded():
+    extension, ten = start()
+    for question in ("q0", "q1", "q2"):
+        ask(extension, ten, question)
+    assert ten.first_token.wait(5)
+    extension.flush()
+    wait_answers(ten, 1)
+    stop(extension, ten)
+
+    assert ten.cmds.count("embed") == 3
+    assert ten.cmds.count("call_chat") == 1
+    assert extension.retrievers["manual"].prefetched == {}
+
+
+def test_turns_without_prefetch_retrieve_when_answered():
+    extension, ten = start(prefetch_retrieval=False)
+    ask(extension, ten, "q0")
+    ask(extension, ten, "q1")
+    wait_answers(ten, 2)
+    stop(extension, ten)
+
+    assert ten.answers() == [full_answer("q0"), full_answer("q1")]
+    assert ten.cmds.index("embed", 1) > ten.cmds.index("call_chat")
+
+
+class StreamTenEnv:
+    def __init__(self, *statuses):
+        self.statuses = statuses
+
+    def send_cmd(self, cmd, callback):
+        for i, (status, final) in enumerate(self.statuses):
+            result = CmdResult.create(status)
+            result.set_property_string("text", str(i))
+            result.set_is_final(final)
+            callback(self, result, None)
+
+
+def stream(ten):
+    async def main():
+        return [r async for r in send_cmd_stream(ten, Cmd.create("call_chat"))]
+
+    return asyncio.run(main())
+
+
+def test_send_cmd_stream_stops_on_the_final_result():
+    ten = StreamTenEnv(
+        (StatusCode.OK, False), (StatusCode.OK, True), (StatusCode.OK, False)
+    )
+    results = stream(ten)
+    assert [r.get_property_string("text") for r in results] == ["0", "1"]
+
+
+def test_send_cmd_stream_stops_on_a_failed_result():
+    ten = StreamTenEnv(
+        (StatusCode.OK, False), (StatusCode.ERROR, False), (StatusCode.OK, True)
+    )
+    results = stream(ten)
+    assert [r.get_status_code() for r in results] == [StatusCode.OK, StatusCode.ERROR]
@@ -0,0 +1,72 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bm25_index import (  # noqa: E402
+    BM25Index,
+    BM25Store,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+
+def test_tokenize_identifiers_and_cjk():
+    assert tokenize("Order XK-4821, v2.1") == ["order", "xk-4821", "xk", "4821", "v2.1", "v2", "1"]
+    assert tokenize("产品价格") == ["产品", "品价", "价格"]
+
+
+def test_identifier_query_ranks_its_chunk_first():
+    index = BM25Index()
+    index.replace_file(
+        "manual.pdf",
+        [
+            "The pump model XK-4821 runs at 30 bar.",
+            "Pumps need yearly maintenance of the seals.",
+            "The pump model ZT-1100 is discontinued.",
+            "Seals and pumps are sold separately.",
+        ],
+    )
+    matches = index.search("what pressure does the xk-4821 pump run at", 2)
+    assert matches[0][0] == "The pump model XK-4821 runs at 30 bar."
+    assert matches[0][1] > matches[1][1]
+
+
+def test_replace_file_drops_previous_chunks():
+    index = BM25Index()
+    index.replace_file("a.pdf", ["alpha beta", "gamma delta"])
+    index.replace_file("b.pdf", ["gamma epsilon"])
+    index.replace_file("a.pdf", ["alpha zeta"])
+
+    assert len(index) == 2
+    assert [t for t, _ in index.search("gamma", 5)] == ["gamma epsilon"]
+    assert [t for t, _ in index.search("beta", 5)] == []
+    assert index.total_length == 4
+    index.remove_file("b.pdf")
+    assert "epsilon" not in index.postings
+
+
+def test_budget_keeps_rarest_terms():
+    index = BM25Index()
+    index.replace_file("f", [f"common filler {i}" for i in range(20000)] + ["common rare"])
+    matches = index.search("rare common", 1, budget_ms=0.001)
+    assert matches[0][0] == "common rare"
+
+
+def test_store_by_collection():
+    store = BM25Store()
+    store.replace_file("coll_a", "a.pdf", ["hello world"])
+    assert store.get("coll_b") is None
+    assert store.get("coll_a").search("world", 1)[0][0] == "hello world"
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=60, top_k=3)
+    assert [t for t, _ in fused] == ["c", "a", "b"]
+    assert fused[0][1] == 1 / 63 + 1 / 61
+    assert reciprocal_rank_fusion([[], []]) == []
@@ -0,0 +1,81 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from context_packer import (  # noqa: E402
+    Candidate,
+    estimate_tokens,
+    merge_adjacent,
+    mmr,
+    overlap,
+    pack,
+)
+
+DOC = (
+    "The XK-4821 pump ships with a two year warranty covering parts and labor. "
+    "Claims need the serial number printed under the base of the pump. "
+    "Replacement seals are sold separately and are not covered by the warranty."
+)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("保修期多久") == 5
+
+
+def test_overlap():
+    assert overlap(DOC[:120], DOC[90:200]) == 30
+    assert overlap("completely different text here", "and another one entirely") == 0
+    # too short to tell an overlap from a coincidence
+    assert overlap("ends with the pump", "pump starts here") == 0
+
+
+def test_mmr_prefers_diverse_candidates():
+    candidates = [
+        Candidate("a", 1.0, embedding=[1.0, 0.0]),
+        Candidate("a again", 0.95, embedding=[1.0, 0.01]),
+        Candidate("b", 0.8, embedding=[0.0, 1.0]),
+    ]
+    assert [c.text for c in mmr(candidates, 0.5)] == ["a", "b", "a again"]
+    # relevance only
+    assert [c.text for c in mmr(candidates, 1.0)] == ["a", "a again", "b"]
+
+
+def test_merge_adjacent_chunks_of_a_file():
+    chunks = [
+        Candidate(DOC[90:200], 0.9, "manual.pdf"),
+        Candidate(DOC[:120], 0.8, "manual.pdf"),
+        Candidate(DOC[:120], 0.7, "other.pdf"),
+        Candidate(DOC[180:], 0.6, "manual.pdf"),
+    ]
+    merged = merge_adjacent(chunks)
+    assert [(c.text, c.score, c.file_name) for c in merged] == [
+        (DOC, 0.9, "manual.pdf"),
+        (DOC[:120], 0.7, "other.pdf"),
+    ]
+
+
+def test_pack_fits_the_budget():
+    candidates = [
+        Candidate(f"chunk {i} " + "x" * 80, 1.0 - i / 10, f"f{i}.pdf") for i in range(8)
+    ]
+    packed = pack(candidates, token_budget=70)
+    assert [c.text[:7] for c in packed] == ["chunk 0", "chunk 1", "chunk 2"]
+    assert sum(estimate_tokens(c.text) for c in packed) <= 70
+
+
+def test_pack_merges_overlapping_chunks_within_budget():
+    first, second = DOC[:120], DOC[90:]
+    budget = estimate_tokens(DOC)
+    assert estimate_tokens(first) + estimate_tokens(second) > budget
+    packed = pack(
+        [Candidate(first, 0.9, "manual.pdf"), Candidate(second, 0.8, "manual.pdf")],
+        token_budget=budget,
+    )
+    assert [c.text for c in packed] == [DOC]
@@ -0,0 +1,140 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from query_cache import (  # noqa: E402
+    LRUCache,
+    QueryCache,
+    SpeculativeRetrieval,
+    normalize_query,
+)
+
+
+def test_normalize_query():
+    assert normalize_query("  What is  the XK-4821 pump? ") == "what is the xk-4821 pump"
+    assert normalize_query("产品价格是多少？") == "产品价格是多少"
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_embedding_shared_by_variants_of_a_query():
+    cache = QueryCache()
+    cache.put_embedding("How long is the warranty?", [0.1, 0.2])
+    assert cache.get_embedding("how long is the warranty") == [0.1, 0.2]
+    assert cache.get_embedding("how long is the battery life") is None
+    assert cache.metrics()["embedding_hit_rate"] == 0.5
+
+
+def test_results_invalidated_by_collection_change():
+    cache = QueryCache()
+    generation = cache.generation("coll")
+    cache.put_results("coll", "q", [("chunk", 0.9)], generation)
+    cache.put_results("other", "q", [("other chunk", 0.8)], cache.generation("other"))
+    assert cache.get_results("coll", "Q?") == [("chunk", 0.9)]
+
+    cache.invalidate("coll")
+    assert cache.get_results("coll", "q") is None
+    assert cache.get_results("other", "q") == [("other chunk", 0.8)]
+
+
+def test_results_retrieved_across_a_change_are_not_stored():
+    cache = QueryCache()
+    generation = cache.generation("coll")
+    cache.invalidate("coll")
+    cache.put_results("coll", "q", [("stale", 0.9)], generation)
+    assert cache.get_results("coll", "q") is None
+
+
+def test_results_expire():
+    cache = QueryCache(result_ttl_ms=20)
+    cache.put_results("coll", "q", [("chunk", 0.9)], 0)
+    time.sleep(0.03)
+    assert cache.get_results("coll", "q") is None
+    metrics = cache.metrics()
+    assert (metrics["result_hits"], metrics["result_expired"]) == (0, 1)
+
+
+def test_disabled_caches():
+    cache = QueryCache(embedding_capacity=0, result_ttl_ms=0)
+    cache.put_embedding("q", [0.1])
+    cache.put_results("coll", "q", [("chunk", 0.9)], 0)
+    assert cache.get_embedding("q") is None
+    assert cache.get_results("coll", "q") is None
+    assert cache.metrics()["embedding_misses"] == 0
+
+
+class Retrieval:
+    def __init__(self, ms=20):
+        self.ms = ms
+        self.texts = []
+
+    async def __call__(self, text):
+        self.texts.append(text)
+        await asyncio.sleep(self.ms / 1000)
+        return [(f"chunk for {text}", 0.9)]
+
+
+def test_speculation_used_by_matching_final():
+    async def run():
+        retrieve = Retrieval()
+        speculative = SpeculativeRetrieval(retrieve, stable_ms=10)
+        speculative.on_interim("what is the")
+        speculative.on_interim("what is the warranty")
+        await asyncio.sleep(0.05)
+        task = speculative.take("What is the warranty?")
+        assert await task == [("chunk for what is the warranty", 0.9)]
+        return retrieve, speculative.metrics()
+
+    retrieve, metrics = asyncio.run(run())
+    # the first interim changed before it was stable
+    assert retrieve.texts == ["what is the warranty"]
+    assert (metrics["started"], metrics["used"], metrics["wasted"]) == (1, 1, 0)
+    assert metrics["saved_ms"] >= 20
+
+
+def test_speculation_discarded_by_other_final():
+    async def run():
+        speculative = SpeculativeRetrieval(Retrieval(ms=1000), stable_ms=0)
+        speculative.on_interim("how long is the battery")
+        await asyncio.sleep(0.01)
+        pending = next(iter(speculative.pending.values())).task
+        assert speculative.take("how long is the warranty") is None
+        await asyncio.sleep(0)
+        return pending, speculative.metrics()
+
+    pending, metrics = asyncio.run(run())
+    assert pending.cancelled()
+    assert (metrics["wasted"], metrics["missed"], metrics["saved_ms"]) == (1, 1, 0)
+
+
+def test_speculation_bounded_and_short_interims_ignored():
+    async def run():
+        retrieve = Retrieval(ms=1000)
+        speculative = SpeculativeRetrieval(retrieve, stable_ms=0, max_pending=2)
+        for text in ("hi", "what is", "what is the", "what is the price"):
+            speculative.on_interim(text)
+            await asyncio.sleep(0.01)
+        pending = list(speculative.pending)
+        speculative.discard()
+        return retrieve, pending, speculative.metrics()
+
+    retrieve, pending, metrics = asyncio.run(run())
+    assert retrieve.texts == ["what is", "what is the", "what is the price"]
+    assert pending == ["what is the", "what is the price"]
+    assert (metrics["started"], metrics["wasted"]) == (3, 3)
@@ -0,0 +1 @@
+from . import vector_storage_addon
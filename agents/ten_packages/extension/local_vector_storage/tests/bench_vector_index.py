@@ -0,0 +1,104 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Benchmark recall@k against query latency of the local indexes on synthetic
+clustered vectors, queries being perturbed copies of indexed vectors like a
+question close to a chunk. Ground truth is an exact float32 scan.
+
+Vectors are upserted in batches of --batch like file_chunker does, and build
+time includes the index maintenance.
+
+    python tests/bench_vector_index.py [--n 10000] [--dim 384] [--queries 200]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from vector_index import Collection, normalize  # noqa: E402
+
+
+def dataset(args):
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(args.clusters, args.dim))
+    vectors = normalize(
+        centers[rng.integers(0, args.clusters, args.n)] + 0.5 * rng.normal(size=(args.n, args.dim))
+    )
+    picked = vectors[rng.integers(0, args.n, args.queries)]
+    queries = normalize(picked + 0.3 * rng.normal(size=picked.shape))
+    truth = [set(np.argsort(-(vectors @ q))[: args.k].tolist()) for q in queries]
+    return vectors, queries, truth
+
+
+def build(args, vectors, index, quantization):
+    collection = Collection(None, args.dim, index, quantization)
+    texts = [str(i) for i in range(len(vectors))]
+    start = time.perf_counter()
+    for i in range(0, len(vectors), args.batch):
+        collection.add("doc", texts[i : i + args.batch], vectors[i : i + args.batch])
+    return collection, time.perf_counter() - start
+
+
+def evaluate(args, collection, queries, truth):
+    latencies = []
+    hits = 0
+    for q, expected in zip(queries, truth):
+        start = time.perf_counter()
+        matches = collection.search(q, args.k)
+        latencies.append(time.perf_counter() - start)
+        hits += len({int(text) for text, _ in matches} & expected)
+
+    latencies.sort()
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    return hits / (args.k * len(queries)), statistics.median(latencies) * 1000, p99 * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=5)
+    parser.add_argument("--skip-hnsw", action="store_true")
+    args = parser.parse_args()
+
+    vectors, queries, truth = dataset(args)
+    # search time knob of each index, swept on the same built index
+    sweeps = [("flat", None, [None]), ("ivf", "nprobe", [2, 4, 8, 16])]
+    if not args.skip_hnsw:
+        sweeps.append(("hnsw", "ef_search", [16, 32, 64, 128]))
+
+    print(f"{args.n} vectors x {args.dim} dims, {args.queries} queries, recall@{args.k}")
+    print(
+        f"{'index':<18}{'quant':>6}{'recall':>8}{'p50':>9}{'p99':>9}{'build':>9}{'bytes/vec':>11}"
+    )
+    for index, knob, values in sweeps:
+        for quantization in ("none", "int8"):
+            collection, build_time = build(args, vectors, index, quantization)
+            vector_bytes = collection.storage.codes.data[:1].nbytes
+            if collection.storage.scales is not None:
+                vector_bytes += 4
+            for value in values:
+                name = index
+                if knob:
+                    setattr(collection.index, knob, value)
+                    name = f"{index} {knob}={value}"
+                rec, p50, p99 = evaluate(args, collection, queries, truth)
+                print(
+                    f"{name:<18}{quantization:>6}{rec:>8.3f}{p50:>7.2f}ms{p99:>7.2f}ms"
+                    f"{build_time:>8.1f}s{vector_bytes:>11}"
+                )
+
+
+if __name__ == "__main__":
+    main()
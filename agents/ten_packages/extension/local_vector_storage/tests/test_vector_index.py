@@ -0,0 +1,155 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import os
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from vector_index import (  # noqa: E402
+    Collection,
+    CollectionStore,
+    normalize,
+)
+
+DIM = 32
+
+
+def clustered(n, seed=0, clusters=20):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, DIM))
+    return normalize(centers[rng.integers(0, clusters, n)] + 0.4 * rng.normal(size=(n, DIM)))
+
+
+def near(vectors, n, seed=1):
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.integers(0, len(vectors), n)]
+    return normalize(picked + 0.2 * rng.normal(size=picked.shape))
+
+
+def recall(collection, vectors, queries, k=10):
+    hits = 0
+    for q in queries:
+        truth = set(np.argsort(-(vectors @ q))[:k].tolist())
+        hits += len({int(text) for text, _ in collection.search(q, k)} & truth)
+    return hits / (k * len(queries))
+
+
+@pytest.mark.parametrize(
+    "index,quantization,params",
+    [
+        ("flat", "none", {}),
+        ("flat", "int8", {}),
+        ("ivf", "none", {"train_size": 1000, "nprobe": 6}),
+        ("ivf", "int8", {"train_size": 1000, "nprobe": 6}),
+        ("hnsw", "none", {"m": 8, "ef_construction": 64, "ef_search": 32}),
+        ("hnsw", "int8", {"m": 8, "ef_construction": 64, "ef_search": 32}),
+    ],
+)
+def test_search_recall(index, quantization, params):
+    vectors = clustered(2000)
+    collection = Collection(None, DIM, index, quantization, params)
+    for i in range(0, len(vectors), 50):
+        collection.add("doc", [str(j) for j in range(i, i + 50)], vectors[i : i + 50])
+
+    queries = near(vectors, 50)
+    assert recall(collection, vectors, queries) >= 0.9
+    text, score = collection.search(vectors[7], 1)[0]
+    assert text == "7" and score == pytest.approx(1.0, abs=0.01)
+
+
+@pytest.mark.parametrize("quantization", ["none", "int8"])
+def test_search_rows_with_vectors(quantization):
+    vectors = clustered(100)
+    collection = Collection(None, DIM, "flat", quantization)
+    collection.add("a.pdf", [str(i) for i in range(50)], vectors[:50])
+    collection.add("b.pdf", [str(i) for i in range(50, 100)], vectors[50:])
+
+    rows = collection.search_rows(vectors[70], 3, include_vectors=True)
+    file_name, text, score, vector = rows[0]
+    assert (file_name, text) == ("b.pdf", "70")
+    assert [(t, s) for _, t, s, _ in rows] == collection.search(vectors[70], 3)
+    assert np.allclose(vector, vectors[70], atol=0.02)
+    assert collection.search_rows(vectors[70], 1)[0][3] is None
+
+
+@pytest.mark.parametrize("index", ["flat", "ivf", "hnsw"])
+def test_delete_and_reopen(tmp_path, index):
+    path = str(tmp_path / "coll")
+    vectors = clustered(300)
+    params = {"ivf": {"train_size": 100}}.get(index, {})
+    collection = Collection(path, DIM, index, "int8", params)
+    collection.add("a.pdf", [str(i) for i in range(200)], vectors[:200])
+    collection.add("b.pdf", [str(i) for i in range(200, 300)], vectors[200:])
+    assert collection.delete("a.pdf", ["5", "6", "250"]) == 2
+    before = collection.search(vectors[10], 5)
+    collection.close()
+
+    reopened = Collection(path, 0)
+    assert (reopened.dim, reopened.index_type, reopened.quantization) == (DIM, index, "int8")
+    assert reopened.size() == 298
+    assert reopened.search(vectors[10], 5) == before
+    assert reopened.search(vectors[5], 1)[0][0] != "5"
+
+    # rows written after the last commit are dropped
+    with open(os.path.join(path, "rows.jsonl"), "a", encoding="utf-8") as f:
+        f.write('["c.pdf", "uncommitted"]\n')
+    reopened.close()
+    reopened = Collection(path, 0)
+    reopened.add("c.pdf", ["300"], vectors[:1])
+    assert reopened.size() == 299
+    assert reopened.search(vectors[0], 2)[1][0] in ("0", "300")
+    reopened.close()
+
+
+def test_concurrent_readers_during_upserts():
+    vectors = clustered(1500)
+    collection = Collection(None, DIM, "hnsw", params={"m": 8, "ef_construction": 32})
+    collection.add("doc", [str(i) for i in range(100)], vectors[:100])
+    errors = []
+    stop = threading.Event()
+
+    def read():
+        rng = np.random.default_rng()
+        while not stop.is_set():
+            try:
+                i = int(rng.integers(0, 100))
+                results = collection.search(vectors[i], 5)
+                assert len(results) == 5 and all(0 <= int(t) < 1500 for t, _ in results)
+            except Exception as e:
+                errors.append(e)
+                return
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for t in readers:
+        t.start()
+    for i in range(100, 1500, 20):
+        collection.add("doc", [str(j) for j in range(i, i + 20)], vectors[i : i + 20])
+    stop.set()
+    for t in readers:
+        t.join()
+
+    assert not errors
+    assert collection.size() == 1500
+    assert recall(collection, vectors, near(vectors, 20)) >= 0.9
+
+
+def test_store(tmp_path):
+    store = CollectionStore(str(tmp_path), "flat")
+    store.create("coll_a", DIM).add("doc", ["x"], clustered(1))
+    store.close()
+
+    store = CollectionStore(str(tmp_path), "flat")
+    assert store.get("coll_a").size() == 1
+    assert store.get("coll_b") is None
+    with pytest.raises(ValueError):
+        store.get("../coll_a")
+    assert store.drop("coll_a")
+    assert store.get("coll_a") is None and not os.path.exists(tmp_path / "coll_a")
@@ -0,0 +1,661 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import heapq
+import json
+import math
+import os
+import random
+import re
+import shutil
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+INDEX_FLAT = "flat"
+INDEX_IVF = "ivf"
+INDEX_HNSW = "hnsw"
+INDEX_TYPES = (INDEX_FLAT, INDEX_IVF, INDEX_HNSW)
+
+QUANTIZATION_NONE = "none"
+QUANTIZATION_INT8 = "int8"
+QUANTIZATIONS = (QUANTIZATION_NONE, QUANTIZATION_INT8)
+
+META_FILE = "meta.json"
+ROWS_FILE = "rows.jsonl"
+FORMAT_VERSION = 1
+
+_COLLECTION_NAME = re.compile(r"^[A-Za-z0-9_\-]+$")
+_NO_LINKS = np.empty(0, dtype=np.int32)
+
+
+def normalize(vectors) -> np.ndarray:
+    v = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(v, axis=-1, keepdims=True)
+    return v / np.maximum(norms, 1e-12)
+
+
+def _file(path: Optional[str], name: str) -> Optional[str]:
+    return os.path.join(path, name) if path else None
+
+
+def _write_atomic(path: str, write) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+class GrowableArray:
+    """
+    Rows of a fixed shape, doubling the capacity when full. With a path the rows
+    live in a memory-mapped .npy file, otherwise in memory. A reader holding `data`
+    keeps a valid array when it grows, it only misses the rows added afterwards.
+    """
+
+    def __init__(self, path: Optional[str], dtype, row_shape=(), fill=0, capacity=256):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.row_shape = tuple(row_shape)
+        self.fill = fill
+        if path and os.path.exists(path):
+            self.data = np.load(path, mmap_mode="r+")
+        else:
+            self.data = self._allocate(capacity, path)
+
+    def _allocate(self, capacity: int, path: Optional[str]) -> np.ndarray:
+        shape = (capacity,) + self.row_shape
+        if path:
+            data = np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype, shape=shape)
+        else:
+            data = np.empty(shape, dtype=self.dtype)
+        data[:] = self.fill
+        return data
+
+    def reserve(self, size: int) -> None:
+        old = self.data
+        if size <= len(old):
+            return
+        tmp = self.path + ".tmp" if self.path else None
+        data = self._allocate(max(size, 2 * len(old)), tmp)
+        data[: len(old)] = old
+        if self.path:
+            data.flush()
+            os.replace(tmp, self.path)
+        self.data = data
+
+    def flush(self) -> None:
+        if isinstance(self.data, np.memmap):
+            self.data.flush()
+
+
+class VectorStorage:
+    """
+    Unit vectors stored as float32, or as int8 with one float32 scale per vector,
+    which takes a quarter of the memory for a small loss of precision.
+    """
+
+    def __init__(self, path: Optional[str], dim: int, quantization: str):
+        self.dim = dim
+        self.quantized = quantization == QUANTIZATION_INT8
+        dtype = np.int8 if self.quantized else np.float32
+        self.codes = GrowableArray(_file(path, "vectors.npy"), dtype, (dim,))
+        self.scales = (
+            GrowableArray(_file(path, "scales.npy"), np.float32, fill=1)
+            if self.quantized
+            else None
+        )
+        self.deleted = GrowableArray(_file(path, "deleted.npy"), np.bool_, fill=False)
+
+    def arrays(self) -> List[GrowableArray]:
+        return [a for a in (self.codes, self.scales, self.deleted) if a is not None]
+
+    def reserve(self, size: int) -> None:
+        for a in self.arrays():
+            a.reserve(size)
+
+    def put(self, start: int, vectors: np.ndarray) -> None:
+        end = start + len(vectors)
+        if not self.quantized:
+            self.codes.data[start:end] = vectors
+            return
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        self.codes.data[start:end] = np.round(vectors / scales[:, None]).astype(np.int8)
+        self.scales.data[start:end] = scales
+
+    def vectors(self, ids: np.ndarray) -> np.ndarray:
+        codes = np.asarray(self.codes.data[ids], dtype=np.float32)
+        if self.quantized:
+            codes *= self.scales.data[ids][:, None]
+        return codes
+
+    def similarities(self, ids: np.ndarray, q: np.ndarray) -> np.ndarray:
+        sims = self.codes.data[ids] @ q
+        if self.quantized:
+            sims *= self.scales.data[ids]
+        return sims
+
+    def scan(self, n: int, q: np.ndarray) -> np.ndarray:
+        sims = self.codes.data[:n] @ q
+        if self.quantized:
+            sims *= self.scales.data[:n]
+        return sims
+
+
+class FlatIndex:
+    """Exact search, a scan of all the vectors."""
+
+    def __init__(self, storage: VectorStorage, path: Optional[str], state: dict):
+        self.storage = storage
+
+    def arrays(self) -> List[GrowableArray]:
+        return []
+
+    def state(self) -> dict:
+        return {}
+
+    def add(self, start: int, end: int) -> None:
+        pass
+
+    def search(self, q: np.ndarray, k: int, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        return np.arange(n), self.storage.scan(n, q)
+
+
+class IVFIndex:
+    """
+    Inverted file index. Vectors are assigned to the nearest of nlist centroids,
+    learned by spherical k-means once train_size vectors were added, and a query
+    scans the vectors of its nprobe nearest centroids. Exact until trained.
+    """
+
+    def __init__(
+        self,
+        storage: VectorStorage,
+        path: Optional[str],
+        state: dict,
+        nlist: int = 0,
+        nprobe: int = 8,
+        train_size: int = 4096,
+    ):
+        self.storage = storage
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self.assign = GrowableArray(_file(path, "ivf_assign.npy"), np.int32, fill=-1)
+        self.centroids_path = _file(path, "ivf_centroids.npy")
+        self.centroids: Optional[np.ndarray] = None
+        if self.centroids_path and os.path.exists(self.centroids_path):
+            self.centroids = np.load(self.centroids_path)
+
+    def arrays(self) -> List[GrowableArray]:
+        return [self.assign]
+
+    def state(self) -> dict:
+        return {}
+
+    def add(self, start: int, end: int) -> None:
+        self.assign.reserve(end)
+        centroids = self.centroids
+        if centroids is None:
+            if end < self.train_size:
+                return
+            centroids = self._train(end)
+            start = 0
+        self._assign(centroids, start, end)
+        # published once every vector is assigned to one of them
+        self.centroids = centroids
+
+    def _assign(self, centroids: np.ndarray, start: int, end: int, step: int = 4096) -> None:
+        for i in range(start, end, step):
+            ids = np.arange(i, min(i + step, end))
+            sims = self.storage.vectors(ids) @ centroids.T
+            self.assign.data[ids] = np.argmax(sims, axis=1)
+
+    def _train(self, n: int, iterations: int = 10) -> np.ndarray:
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(n, min(n, self.train_size), replace=False))
+        x = self.storage.vectors(sample)
+        nlist = min(self.nlist or max(1, int(math.sqrt(n))), len(x))
+        centroids = x[rng.choice(len(x), nlist, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(x @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, x)
+            empty = np.bincount(assign, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize(sums)
+        if self.centroids_path:
+            _write_atomic(self.centroids_path, lambda f: np.save(f, centroids))
+        return centroids
+
+    def search(self, q: np.ndarray, k: int, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        centroids = self.centroids
+        if centroids is None:
+            return np.arange(n), self.storage.scan(n, q)
+        probes = np.argsort(-(centroids @ q))[: self.nprobe]
+        ids = np.flatnonzero(np.isin(self.assign.data[:n], probes))
+        return ids, self.storage.similarities(ids, q)
+
+
+class HNSWIndex:
+    """
+    Hierarchical navigable small world graph. Every vector links to at most 2 * m
+    neighbours on level 0 and m on the upper levels, neighbours are picked with the
+    heuristic of the paper and a query walks down from the top level entry point,
+    keeping ef_search candidates on level 0.
+
+    Nodes are linked one at a time by the writer. A reader reads the entry point,
+    then the number of linked nodes, and ignores links to nodes beyond it.
+    """
+
+    def __init__(
+        self,
+        storage: VectorStorage,
+        path: Optional[str],
+        state: dict,
+        m: int = 16,
+        ef_construction: int = 100,
+        ef_search: int = 64,
+    ):
+        self.storage = storage
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.level_mult = 1 / math.log(m)
+
+        self.links0 = GrowableArray(_file(path, "hnsw_links0.npy"), np.int32, (self.m0,), fill=-1)
+        self.upper_links = GrowableArray(
+            _file(path, "hnsw_upper_links.npy"), np.int32, (m,), fill=-1, capacity=16
+        )
+        # (node, level) of each row of upper_links
+        self.upper_keys = GrowableArray(
+            _file(path, "hnsw_upper_keys.npy"), np.int32, (2,), fill=-1, capacity=16
+        )
+        self.upper_count = state.get("upper_count", 0)
+        self.upper_rows: Dict[Tuple[int, int], int] = {
+            (int(node), int(level)): row
+            for row, (node, level) in enumerate(self.upper_keys.data[: self.upper_count])
+        }
+        self.entry = (state.get("entry", -1), state.get("max_level", -1))
+        self.size = state.get("size", 0)
+        self.rng = random.Random(self.size)
+
+    def arrays(self) -> List[GrowableArray]:
+        return [self.links0, self.upper_links, self.upper_keys]
+
+    def state(self) -> dict:
+        entry, max_level = self.entry
+        return {
+            "entry": entry,
+            "max_level": max_level,
+            "size": self.size,
+            "upper_count": self.upper_count,
+        }
+
+    def add(self, start: int, end: int) -> None:
+        self.links0.reserve(end)
+        for node in range(start, end):
+            self._insert(node)
+
+    def search(self, q: np.ndarray, k: int, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        entry, max_level = self.entry
+        size = self.size
+        if entry < 0:
+            return _NO_LINKS, np.empty(0, dtype=np.float32)
+
+        ep, eps = self._descend(q, entry, max_level, 0, size)
+        found = self._search_layer(q, ep, eps, max(self.ef_search, k), 0, size)
+        ids = np.fromiter((i for _, i in found), dtype=np.int64, count=len(found))
+        sims = np.fromiter((s for s, _ in found), dtype=np.float32, count=len(found))
+        return ids, sims
+
+    def _insert(self, node: int) -> None:
+        q = self.storage.vectors(np.array([node]))[0]
+        level = int(-math.log(1.0 - self.rng.random()) * self.level_mult)
+        for l in range(1, level + 1):
+            self._set_links(node, l, _NO_LINKS)
+
+        entry, max_level = self.entry
+        if entry >= 0:
+            ep, eps = self._descend(q, entry, max_level, level, node)
+            for l in range(min(level, max_level), -1, -1):
+                found = self._search_layer(q, ep, eps, self.ef_construction, l, node)
+                ids = np.array([i for _, i in found], dtype=np.int32)
+                sims = np.array([s for s, _ in found], dtype=np.float32)
+                selected = self._select(ids, sims, self.m)
+                self._set_links(node, l, selected)
+                width = self.m0 if l == 0 else self.m
+                for neighbour in selected.tolist():
+                    self._link(neighbour, node, l, width)
+                ep, eps = ids.tolist(), sims.tolist()
+
+        self.size = node + 1
+        if level > max_level:
+            self.entry = (node, level)
+
+    def _descend(self, q, entry, max_level, level, n) -> Tuple[List[int], List[float]]:
+        """Greedy walk from the entry point down to the level above `level`."""
+        ep = [entry]
+        eps = self.storage.similarities(np.array(ep), q).tolist()
+        for l in range(max_level, level, -1):
+            sim, nearest = max(self._search_layer(q, ep, eps, 1, l, n))
+            ep, eps = [nearest], [sim]
+        return ep, eps
+
+    def _search_layer(self, q, ep, eps, ef, level, n) -> List[Tuple[float, int]]:
+        # plain python is faster than numpy on rows of a few dozen links
+        visited = set(ep)
+        candidates = [(-s, i) for i, s in zip(ep, eps)]
+        heapq.heapify(candidates)
+        found = [(s, i) for i, s in zip(ep, eps)]
+        heapq.heapify(found)
+        while len(found) > ef:
+            heapq.heappop(found)
+
+        while candidates:
+            neg_sim, node = heapq.heappop(candidates)
+            if len(found) >= ef and -neg_sim < found[0][0]:
+                break
+            links = [
+                i
+                for i in self._neighbours(node, level).tolist()
+                if 0 <= i < n and i not in visited
+            ]
+            if not links:
+                continue
+            visited.update(links)
+            sims = self.storage.similarities(links, q)
+            for sim, i in zip(sims.tolist(), links):
+                if len(found) < ef or sim > found[0][0]:
+                    heapq.heappush(candidates, (-sim, i))
+                    heapq.heappush(found, (sim, i))
+                    if len(found) > ef:
+                        heapq.heappop(found)
+        return found
+
+    def _select(self, ids: np.ndarray, sims: np.ndarray, m: int) -> np.ndarray:
+        """Keep a candidate only if it is closer to the new node than to any kept one."""
+        order = np.argsort(-sims)
+        ids, sims = ids[order], sims[order]
+        if len(ids) <= m:
+            return ids
+        vectors = self.storage.vectors(ids)
+        gram = vectors @ vectors.T
+        # similarity of each candidate to its closest kept one
+        closest = np.full(len(ids), -np.inf, dtype=np.float32)
+        kept: List[int] = []
+        for i in range(len(ids)):
+            if closest[i] > sims[i]:
+                continue
+            kept.append(i)
+            if len(kept) == m:
+                break
+            np.maximum(closest, gram[i], out=closest)
+        return ids[kept]
+
+    def _neighbours(self, node: int, level: int) -> np.ndarray:
+        if level == 0:
+            return self.links0.data[node]
+        row = self.upper_rows.get((node, level))
+        return _NO_LINKS if row is None else self.upper_links.data[row]
+
+    def _set_links(self, node: int, level: int, links: np.ndarray) -> None:
+        if level == 0:
+            row = np.full(self.m0, -1, dtype=np.int32)
+            row[: len(links)] = links
+            self.links0.data[node] = row
+            return
+
+        row = np.full(self.m, -1, dtype=np.int32)
+        row[: len(links)] = links
+        index = self.upper_rows.get((node, level))
+        if index is not None:
+            self.upper_links.data[index] = row
+            return
+        index = self.upper_count
+        self.upper_links.reserve(index + 1)
+        self.upper_keys.reserve(index + 1)
+        self.upper_links.data[index] = row
+        self.upper_keys.data[index] = (node, level)
+        self.upper_count += 1
+        self.upper_rows[(node, level)] = index
+
+    def _link(self, node: int, new: int, level: int, width: int) -> None:
+        links = self._neighbours(node, level)
+        used = int((links >= 0).sum())
+        if used < width:
+            links[used] = new
+            return
+        # full, pick again among the links and the new node
+        candidates = np.append(links, new)
+        sims = self.storage.similarities(candidates, self.storage.vectors(np.array([node]))[0])
+        self._set_links(node, level, self._select(candidates, sims, width))
+
+
+class Collection:
+    """
+    Vectors of one collection with the file name and the content they were
+    upserted with, searched by cosine similarity.
+
+    There is one writer at a time. Queries take no lock: each vector, its row and
+    its index entry are written before the count that makes them visible.
+    With a path, vectors and index are memory-mapped files and every write ends
+    with a flush and meta.json, holding the committed count, written last.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        dim: int,
+        index: str = INDEX_HNSW,
+        quantization: str = QUANTIZATION_NONE,
+        params: Optional[dict] = None,
+    ):
+        self.path = path
+        meta = {}
+        if path:
+            os.makedirs(path, exist_ok=True)
+            meta_path = os.path.join(path, META_FILE)
+            if os.path.exists(meta_path):
+                with open(meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+        if index not in INDEX_TYPES:
+            raise ValueError(f"unknown index type {index}")
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"unknown quantization {quantization}")
+
+        # an existing collection keeps the settings it was created with
+        self.dim = meta.get("dim", dim)
+        self.index_type = meta.get("index", index)
+        self.quantization = meta.get("quantization", quantization)
+        self.params = meta.get("params", params or {})
+        self.count = meta.get("count", 0)
+
+        self.storage = VectorStorage(path, self.dim, self.quantization)
+        index_class = {INDEX_FLAT: FlatIndex, INDEX_IVF: IVFIndex, INDEX_HNSW: HNSWIndex}
+        self.index = index_class[self.index_type](
+            self.storage, path, meta.get("index_state", {}), **self.params
+        )
+
+        self.rows: List[Tuple[str, str]] = []
+        self.keys: Dict[Tuple[str, str], List[int]] = {}
+        self.rows_file = None
+        if path:
+            self._load_rows(os.path.join(path, ROWS_FILE))
+        self.lock = threading.Lock()
+
+    def _load_rows(self, rows_path: str) -> None:
+        lines = []
+        if os.path.exists(rows_path):
+            with open(rows_path, encoding="utf-8") as f:
+                lines = f.readlines()
+        if len(lines) != self.count:
+            # rows written after the last commit
+            lines = lines[: self.count]
+            with open(rows_path, "w", encoding="utf-8") as f:
+                f.writelines(lines)
+        deleted = self.storage.deleted.data
+        for i, line in enumerate(lines):
+            file_name, content = json.loads(line)
+            self.rows.append((file_name, content))
+            if not deleted[i]:
+                self.keys.setdefault((file_name, content), []).append(i)
+        self.rows_file = open(rows_path, "a", encoding="utf-8")
+
+    def add(self, file_name: str, texts: Sequence[str], vectors) -> None:
+        vectors = normalize(vectors)
+        if vectors.ndim != 2 or vectors.shape != (len(texts), self.dim):
+            raise ValueError(
+                f"expected {len(texts)} vectors of dimension {self.dim}, got {vectors.shape}"
+            )
+        if not len(texts):
+            return
+        with self.lock:
+            start = self.count
+            end = start + len(texts)
+            self.storage.reserve(end)
+            self.storage.put(start, vectors)
+            for i, text in enumerate(texts, start):
+                self.rows.append((file_name, text))
+                self.keys.setdefault((file_name, text), []).append(i)
+            if self.rows_file:
+                self.rows_file.writelines(
+                    json.dumps([file_name, text], ensure_ascii=False) + "\n" for text in texts
+                )
+            self.index.add(start, end)
+            self.count = end
+            self._commit()
+
+    def delete(self, file_name: str, texts: Sequence[str]) -> int:
+        with self.lock:
+            ids = [i for text in texts for i in self.keys.pop((file_name, text), [])]
+            self.storage.deleted.data[ids] = True
+            self._commit()
+            return len(ids)
+
+    def search(self, vector, top_k: int) -> List[Tuple[str, float]]:
+        ids, sims = self._search(vector, top_k)
+        return [(self.rows[i][1], float(sim)) for i, sim in zip(ids, sims)]
+
+    def search_rows(
+        self, vector, top_k: int, include_vectors: bool = False
+    ) -> List[Tuple[str, str, float, Optional[np.ndarray]]]:
+        """Matches as file name, content, score and, if asked, the stored vector."""
+        ids, sims = self._search(vector, top_k)
+        vectors = self.storage.vectors(ids) if include_vectors else [None] * len(ids)
+        return [
+            (*self.rows[i], float(sim), v) for i, sim, v in zip(ids, sims, vectors)
+        ]
+
+    def _search(self, vector, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        q = normalize(vector)
+        if q.shape != (self.dim,):
+            raise ValueError(f"expected a vector of dimension {self.dim}, got {q.shape}")
+        ids, sims = self.index.search(q, top_k, self.count)
+        alive = ~self.storage.deleted.data[ids]
+        ids, sims = ids[alive], sims[alive]
+        if len(ids) > top_k:
+            top = np.argpartition(-sims, top_k - 1)[:top_k]
+            ids, sims = ids[top], sims[top]
+        order = np.argsort(-sims)
+        return ids[order], sims[order]
+
+    def size(self) -> int:
+        return self.count - int(self.storage.deleted.data[: self.count].sum())
+
+    def _commit(self) -> None:
+        if not self.path:
+            return
+        self.rows_file.flush()
+        for a in self.storage.arrays() + self.index.arrays():
+            a.flush()
+        meta = {
+            "version": FORMAT_VERSION,
+            "dim": self.dim,
+            "index": self.index_type,
+            "quantization": self.quantization,
+            "params": self.params,
+            "count": self.count,
+            "index_state": self.index.state(),
+        }
+        _write_atomic(
+            os.path.join(self.path, META_FILE), lambda f: f.write(json.dumps(meta).encode())
+        )
+
+    def close(self) -> None:
+        with self.lock:
+            self._commit()
+            if self.rows_file:
+                self.rows_file.close()
+                self.rows_file = None
+
+
+class CollectionStore:
+    """Collections by name, each in a directory of data_dir, or in memory without it."""
+
+    def __init__(
+        self,
+        data_dir: str = "",
+        index: str = INDEX_HNSW,
+        quantization: str = QUANTIZATION_NONE,
+        index_params: Optional[Dict[str, dict]] = None,
+    ):
+        if index not in INDEX_TYPES:
+            raise ValueError(f"unknown index type {index}")
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"unknown quantization {quantization}")
+        self.data_dir = data_dir
+        self.index = index
+        self.quantization = quantization
+        self.index_params = index_params or {}
+        self.collections: Dict[str, Collection] = {}
+        self.lock = threading.Lock()
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+
+    def _path(self, name: str) -> Optional[str]:
+        if not _COLLECTION_NAME.match(name):
+            raise ValueError(f"invalid collection name {name}")
+        return os.path.join(self.data_dir, name) if self.data_dir else None
+
+    def create(self, name: str, dim: int) -> Collection:
+        path = self._path(name)
+        with self.lock:
+            collection = self.collections.get(name)
+            if collection is None:
+                collection = Collection(
+                    path, dim, self.index, self.quantization, self.index_params.get(self.index)
+                )
+                self.collections[name] = collection
+            return collection
+
+    def get(self, name: str) -> Optional[Collection]:
+        path = self._path(name)
+        with self.lock:
+            collection = self.collections.get(name)
+            if collection is None and path and os.path.exists(os.path.join(path, META_FILE)):
+                collection = Collection(path, 0)
+                self.collections[name] = collection
+            return collection
+
+    def drop(self, name: str) -> bool:
+        path = self._path(name)
+        with self.lock:
+            collection = self.collections.pop(name, None)
+            if collection is not None:
+                collection.close()
+            if path and os.path.isdir(path):
+                shutil.rmtree(path)
+                return True
+            return collection is not None
+
+    def close(self) -> None:
+        with self.lock:
+            for collection in self.collections.values():
+                collection.close()
+            self.collections.clear()
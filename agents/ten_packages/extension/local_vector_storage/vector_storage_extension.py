@@ -0,0 +1,226 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from ten import (
+    Extension,
+    TenEnv,
+    Cmd,
+    Data,
+    StatusCode,
+    CmdResult,
+)
+
+from ten_ai_base.embedding import (
+    BINARY_EMBEDDING_FORMATS,
+    PROPERTY_EMBEDDING_FORMAT,
+    decode_embedding,
+    decode_embeddings,
+    embedding_format_of,
+    encode_embeddings,
+)
+
+from .vector_index import (
+    INDEX_HNSW,
+    INDEX_IVF,
+    QUANTIZATION_NONE,
+    CollectionStore,
+)
+
+DEFAULT_DIMENSION = 1024
+QUERY_THREADS = 4
+
+
+class LocalVectorStorageExtension(Extension):
+    """
+    In-process replacement of aliyun_analyticdb_vector_storage, same cmds.
+
+    Writes (create/delete collection, upsert/delete vector) run one at a time
+    on a writer thread, queries on a pool of reader threads that never wait for
+    the writer.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.store: CollectionStore = None
+        self.writer: ThreadPoolExecutor = None
+        self.readers: ThreadPoolExecutor = None
+
+    def on_start(self, ten: TenEnv) -> None:
+        ten.log_info("on_start")
+        index = self.get_property_string(ten, "index_type", INDEX_IVF)
+        index_params = {
+            INDEX_IVF: {
+                "nlist": self.get_property_int(ten, "ivf_nlist", 0),
+                "nprobe": self.get_property_int(ten, "ivf_nprobe", 8),
+                "train_size": self.get_property_int(ten, "ivf_train_size", 4096),
+            },
+            INDEX_HNSW: {
+                "m": self.get_property_int(ten, "hnsw_m", 16),
+                "ef_construction": self.get_property_int(ten, "hnsw_ef_construction", 100),
+                "ef_search": self.get_property_int(ten, "hnsw_ef_search", 64),
+            },
+        }
+        # empty keeps the collections in memory
+        data_dir = self.get_property_string(ten, "data_dir", "")
+        self.store = CollectionStore(
+            data_dir,
+            index,
+            self.get_property_string(ten, "quantization", QUANTIZATION_NONE),
+            index_params,
+        )
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vector_writer")
+        self.readers = ThreadPoolExecutor(
+            max_workers=self.get_property_int(ten, "query_threads", QUERY_THREADS) or QUERY_THREADS,
+            thread_name_prefix="vector_reader",
+        )
+        ten.log_info(f"local vector storage, index {index}, data_dir {data_dir or '(memory)'}")
+        ten.on_start_done()
+
+    def on_stop(self, ten: TenEnv) -> None:
+        ten.log_info("on_stop")
+        for executor in (self.writer, self.readers):
+            if executor is not None:
+                executor.shutdown(wait=True)
+        self.writer = None
+        self.readers = None
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        ten.on_stop_done()
+
+    def on_data(self, ten: TenEnv, data: Data) -> None:
+        pass
+
+    def on_cmd(self, ten: TenEnv, cmd: Cmd) -> None:
+        cmd_name = cmd.get_name()
+        ten.log_info(f"on_cmd [{cmd_name}]")
+        handler = {
+            "create_collection": self.create_collection,
+            "delete_collection": self.delete_collection,
+            "upsert_vector": self.upsert_vector,
+            "delete_vector": self.delete_vector,
+            "query_vector": self.query_vector,
+        }.get(cmd_name)
+        if handler is None:
+            ten.return_result(CmdResult.create(StatusCode.ERROR), cmd)
+            return
+        executor = self.readers if cmd_name == "query_vector" else self.writer
+        executor.submit(self.handle, handler, ten, cmd)
+
+    def handle(self, handler, ten: TenEnv, cmd: Cmd) -> None:
+        try:
+            handler(ten, cmd)
+        except Exception as e:
+            ten.log_error(f"{cmd.get_name()} failed, err: {e}")
+            ten.return_result(CmdResult.create(StatusCode.ERROR), cmd)
+
+    def create_collection(self, ten: TenEnv, cmd: Cmd) -> None:
+        collection = cmd.get_property_string("collection_name")
+        dimension = DEFAULT_DIMENSION
+        try:
+            dimension = cmd.get_property_int("dimension")
+        except Exception as e:
+            ten.log_warn(f"Error: {e}")
+        self.store.create(collection, dimension)
+        ten.return_result(CmdResult.create(StatusCode.OK), cmd)
+
+    def delete_collection(self, ten: TenEnv, cmd: Cmd) -> None:
+        collection = cmd.get_property_string("collection_name")
+        found = self.store.drop(collection)
+        ten.log_info(f"delete_collection {collection}, found {found}")
+        ten.return_result(CmdResult.create(StatusCode.OK), cmd)
+
+    def upsert_vector(self, ten: TenEnv, cmd: Cmd) -> None:
+        start_time = datetime.now()
+        collection = cmd.get_property_string("collection_name")
+        file = cmd.get_property_string("file_name")
+        obj = json.loads(cmd.get_property_string("content"))
+        if embedding_format_of(cmd) in BINARY_EMBEDDING_FORMATS:
+            embeddings = decode_embeddings(cmd.get_property_buf("embeddings_buf"))
+        else:
+            embeddings = [item["embedding"] for item in obj]
+
+        coll = self.store.get(collection)
+        if coll is None:
+            ten.log_warn(f"upsert_vector on unknown collection {collection}")
+            ten.return_result(CmdResult.create(StatusCode.ERROR), cmd)
+            return
+        coll.add(file, [item["text"] for item in obj], embeddings)
+        ten.log_info(
+            f"upsert_vector finished for file {file}, collection {collection}, rows len {len(obj)}, cost {int((datetime.now() - start_time).total_seconds() * 1000)}ms"
+        )
+        ten.return_result(CmdResult.create(StatusCode.OK), cmd)
+
+    def delete_vector(self, ten: TenEnv, cmd: Cmd) -> None:
+        collection = cmd.get_property_string("collection_name")
+        file = cmd.get_property_string("file_name")
+        contents = json.loads(cmd.get_property_string("content"))
+        coll = self.store.get(collection)
+        deleted = coll.delete(file, contents) if coll is not None else 0
+        ten.log_info(
+            f"delete_vector finished for file {file}, collection {collection}, rows len {deleted}"
+        )
+        ten.return_result(CmdResult.create(StatusCode.OK), cmd)
+
+    def query_vector(self, ten: TenEnv, cmd: Cmd) -> None:
+        start_time = datetime.now()
+        collection = cmd.get_property_string("collection_name")
+        top_k = cmd.get_property_int("top_k")
+        if embedding_format_of(cmd) in BINARY_EMBEDDING_FORMATS:
+            vector = decode_embedding(cmd.get_property_buf("embedding_buf"))
+        else:
+            vector = json.loads(cmd.get_property_to_json("embedding"))
+
+        coll = self.store.get(collection)
+        if coll is None:
+            ten.log_warn(f"query_vector on unknown collection {collection}")
+            ten.return_result(CmdResult.create(StatusCode.ERROR), cmd)
+            return
+        include_embedding = self.get_cmd_bool(cmd, "include_embedding")
+        matches = coll.search_rows(vector, top_k, include_embedding)
+        ten.log_info(
+            f"query_vector finished for collection {collection}, rows {coll.size()}, matches {len(matches)}, cost {int((datetime.now() - start_time).total_seconds() * 1000)}ms"
+        )
+        ret = CmdResult.create(StatusCode.OK)
+        response = [
+            {"content": content, "score": score, "file_name": file_name}
+            for file_name, content, score, _ in matches
+        ]
+        if include_embedding:
+            # stored vectors, for the consumer to re-rank without embedding again
+            embeddings = [v.tolist() for _, _, _, v in matches]
+            fmt = embedding_format_of(cmd)
+            if fmt in BINARY_EMBEDDING_FORMATS and embeddings:
+                ret.set_property_string(PROPERTY_EMBEDDING_FORMAT, fmt)
+                ret.set_property_buf("embeddings_buf", encode_embeddings(embeddings, fmt))
+            else:
+                for item, embedding in zip(response, embeddings):
+                    item["embedding"] = embedding
+        ret.set_property_from_json("response", json.dumps(response))
+        ten.return_result(ret, cmd)
+
+    def get_cmd_bool(self, cmd: Cmd, key: str) -> bool:
+        try:
+            return cmd.get_property_bool(key)
+        except Exception:
+            return False
+
+    def get_property_string(self, ten: TenEnv, key, default):
+        try:
+            return ten.get_property_string(key)
+        except Exception as e:
+            ten.log_warn(f"err: {e}")
+            return default
+
+    def get_property_int(self, ten: TenEnv, key, default):
+        try:
+            return ten.get_property_int(key)
+        except Exception as e:
+            ten.log_warn(f"err: {e}")
+            return default
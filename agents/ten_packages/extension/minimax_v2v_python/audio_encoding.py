@@ -0,0 +1,68 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+AUDIO_FORMAT_PCM = "pcm"
+AUDIO_FORMAT_MP3 = "mp3"
+
+AUDIO_FORMATS = (AUDIO_FORMAT_PCM, AUDIO_FORMAT_MP3)
+
+
+def encode_mp3(pcm: bytes, sample_rate: int, bitrate_kbps: int) -> bytes:
+    """Encode 16bit mono pcm into mp3 with lame."""
+    import lameenc
+
+    encoder = lameenc.Encoder()
+    encoder.set_bit_rate(bitrate_kbps)
+    encoder.set_in_sample_rate(sample_rate)
+    encoder.set_channels(1)
+    encoder.set_quality(7)  # 2 is the best, 7 is the fastest
+    return bytes(encoder.encode(bytes(pcm)) + encoder.flush())
+
+
+class InputAudioEncoder:
+    """
+    Encode the user utterance before upload.
+    Raw pcm is passed through, other formats are encoded on a worker thread to keep the loop responsive.
+    """
+
+    def __init__(
+        self,
+        audio_format: str = AUDIO_FORMAT_PCM,
+        sample_rate: int = 16000,
+        bitrate_kbps: int = 32,
+    ):
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"unsupported input audio format: {audio_format}")
+        if audio_format == AUDIO_FORMAT_MP3:
+            import lameenc  # noqa: F401, fail early if the encoder is missing
+
+        self.audio_format = audio_format
+        self.sample_rate = sample_rate
+        self.bitrate_kbps = bitrate_kbps
+        self.executor = None
+        if audio_format != AUDIO_FORMAT_PCM:
+            self.executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="input_audio_encoder"
+            )
+
+    async def encode(self, pcm: bytes) -> Tuple[bytes, str]:
+        """Return the encoded payload and its format name."""
+        if self.audio_format == AUDIO_FORMAT_PCM:
+            return pcm, AUDIO_FORMAT_PCM
+
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(
+            self.executor, encode_mp3, pcm, self.sample_rate, self.bitrate_kbps
+        )
+        return data, self.audio_format
+
+    def close(self) -> None:
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
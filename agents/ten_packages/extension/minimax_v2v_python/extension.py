@@ -16,6 +16,8 @@ from ten import (
 )
 from .util import duration_in_ms, duration_in_ms_since, Role
 from .chat_memory import ChatMemory
+from .turn_scheduler import Turn, TurnScheduler
+from .audio_encoding import AUDIO_FORMAT_PCM, InputAudioEncoder
 from dataclasses import dataclass, fields
 import builtins
 import httpx
@@ -30,6 +32,7 @@ import json
 @dataclass
 class MinimaxV2VConfig:
     token: str = ""
+    url: str = "https://api.minimax.chat/v1/text/chatcompletion_v2"
     max_tokens: int = 1024
     model: str = "abab6.5s-chat"
     voice_model: str = "speech-01-turbo-240228"
@@ -42,6 +45,13 @@ class MinimaxV2VConfig:
     greeting: str = ""
     max_memory_length: int = 10
     dump: bool = False
+    # a newer user segment cancels the in-flight response
+    supersede_turns: bool = True
+    # merge segments arriving within this window before any audio is out, 0 to disable
+    merge_window_ms: int = 0
+    # upload format of the user utterance, pcm or mp3
+    input_audio_format: str = AUDIO_FORMAT_PCM
+    input_audio_bitrate_kbps: int = 32
 
     async def read_from_property(self, ten_env: AsyncTenEnv):
         for field in fields(self):
@@ -79,12 +89,8 @@ class MinimaxV2VExtension(AsyncExtension):
         self.remote_stream_id = 0
         self.ten_env = None
 
-        # able to cancel
-        self.curr_task = None
-
-        # make sure tasks processing in order
-        self.process_input_task = None
-        self.queue = asyncio.Queue()
+        self.scheduler: TurnScheduler = None
+        self.encoder: InputAudioEncoder = None
 
     async def on_init(self, ten_env: AsyncTenEnv) -> None:
         await self.config.read_from_property(ten_env=ten_env)
@@ -94,18 +100,30 @@ class MinimaxV2VExtension(AsyncExtension):
         self.ten_env = ten_env
 
     async def on_start(self, ten_env: AsyncTenEnv) -> None:
-        self.process_input_task = asyncio.create_task(
-            self._process_input(ten_env=ten_env, queue=self.queue), name="process_input"
+        try:
+            self.encoder = InputAudioEncoder(
+                audio_format=self.config.input_audio_format,
+                sample_rate=self.config.in_sample_rate,
+                bitrate_kbps=self.config.input_audio_bitrate_kbps,
+            )
+        except Exception as e:
+            ten_env.log_warn(
+                f"input audio format {self.config.input_audio_format} unavailable, fallback to pcm, err {e}"
+            )
+            self.encoder = InputAudioEncoder(sample_rate=self.config.in_sample_rate)
+
+        self.scheduler = TurnScheduler(
+            ten_env=ten_env,
+            run_turn=self._complete_with_history,
+            on_superseded=self._on_turn_superseded,
+            on_turn_done=self._on_turn_done,
+            supersede=self.config.supersede_turns,
+            merge_window_ms=self.config.merge_window_ms,
+            out_bytes_per_ms=self.config.out_sample_rate * 2 / 1000,
         )
 
     async def on_stop(self, ten_env: AsyncTenEnv) -> None:
-
         await self._flush(ten_env=ten_env)
-        self.queue.put_nowait(None)
-        if self.process_input_task:
-            self.process_input_task.cancel()
-            await asyncio.gather(self.process_input_task, return_exceptions=True)
-            self.process_input_task = None
 
     async def on_deinit(self, ten_env: AsyncTenEnv) -> None:
         ten_env.log_debug("on_deinit")
@@ -113,6 +131,9 @@ class MinimaxV2VExtension(AsyncExtension):
         if self.client:
             await self.client.aclose()
             self.client = None
+        if self.encoder:
+            self.encoder.close()
+            self.encoder = None
         self.ten_env = None
 
     async def on_cmd(self, ten_env: AsyncTenEnv, cmd: Cmd) -> None:
@@ -155,9 +176,9 @@ class MinimaxV2VExtension(AsyncExtension):
             ten_env.log_debug(f"on audio frame {len(frame_buf)} {stream_id}")
 
             # process audio frame, must be after vad
-            # put_nowait to make sure put in_order
-            self.queue.put_nowait((ts, frame_buf))
-            # await self._complete_with_history(ts, frame_buf)
+            # submit synchronously to make sure segments are scheduled in order
+            if self.scheduler:
+                self.scheduler.submit(ts, frame_buf)
 
             # dump input audio if need
             await self._dump_audio_if_need(frame_buf, "in")
@@ -174,33 +195,23 @@ class MinimaxV2VExtension(AsyncExtension):
     ) -> None:
         pass
 
-    async def _process_input(self, ten_env: AsyncTenEnv, queue: asyncio.Queue):
-        ten_env.log_info("process_input started")
-
-        while True:
-            item = await queue.get()
-            if not item:
-                break
-
-            (ts, frame_buf) = item
-            ten_env.log_debug(f"start process task {ts} {len(frame_buf)}")
-
-            try:
-                self.curr_task = asyncio.create_task(
-                    self._complete_with_history(ts, frame_buf)
-                )
-                await self.curr_task
-                self.curr_task = None
-            except asyncio.CancelledError:
-                ten_env.log_warn("task cancelled")
-            except Exception as e:
-                ten_env.log_warn(f"task failed, err {e}")
-            finally:
-                queue.task_done()
-
-        ten_env.log_info("process_input exit")
+    async def _on_turn_superseded(self, turn: Turn) -> None:
+        # drop the audio of the stale response still buffered downstream
+        self.ten_env.log_info(f"turn {turn.id} superseded, flush")
+        await self.ten_env.send_cmd(Cmd.create("flush"))
+
+    def _on_turn_done(self, turn: Turn) -> None:
+        m = self.scheduler.metrics
+        state = "merged" if turn.merged else "superseded" if turn.superseded else "done"
+        self.ten_env.log_info(
+            f"turn {turn.id} {state}, segments {len(turn.segments)}, queued {turn.queued_ms()}ms, "
+            f"audio_ttfb {turn.audio_ttfb_ms()}ms, duration {turn.duration_ms()}ms, audio_bytes {turn.audio_bytes}; "
+            f"total turns {m.turns}, completed {m.completed}, superseded {m.superseded}, merged {m.merged}, "
+            f"wasted_audio {m.wasted_audio_ms}ms"
+        )
 
-    async def _complete_with_history(self, ts: datetime, buff: bytearray):
+    async def _complete_with_history(self, turn: Turn):
+        ts, buff = turn.ts, turn.buff
         start_time = datetime.now()
         ten_env = self.ten_env
         ten_env.log_debug(
@@ -213,12 +224,17 @@ class MinimaxV2VExtension(AsyncExtension):
             messages.append({"role": Role.System, "content": self.config.prompt})
         messages.extend(self.memory.get())
         ten_env.log_debug(f"messages without audio: [{messages}]")
+        encode_start_time = datetime.now()
+        (audio_data, audio_format) = await self.encoder.encode(buff)
+        ten_env.log_debug(
+            f"input audio {audio_format} {len(buff)} -> {len(audio_data)} bytes, encode cost {duration_in_ms_since(encode_start_time)}ms"
+        )
         messages.append(
-            self._create_input_audio_message(buff=buff)
+            self._create_input_audio_message(buff=audio_data, audio_format=audio_format)
         )  # don't print audio message
 
         # prepare request
-        url = "https://api.minimax.chat/v1/text/chatcompletion_v2"
+        url = self.config.url
         (headers, payload) = self._create_request(messages)
 
         # vars to calculate Time to first byte
@@ -246,13 +262,7 @@ class MinimaxV2VExtension(AsyncExtension):
                 i = 0
                 async for line in response.aiter_lines():
                     # ten_env.log_info(f"-> line {line}")
-                    # if self._need_interrupt(ts):
-                    #     ten_env.log_warn(f"trace-id: {trace_id}, interrupted")
-                    #     if self.transcript:
-                    #         self.transcript += "[interrupted]"
-                    #         self._append_message("assistant", self.transcript)
-                    #         self._send_transcript("", "assistant", True)
-                    #     break
+                    # a newer segment cancels this task, see TurnScheduler
 
                     if not line.startswith("data:"):
                         ten_env.log_debug(f"ignore line {len(line)}")
@@ -310,6 +320,7 @@ class MinimaxV2VExtension(AsyncExtension):
                                 await self._send_audio_frame(
                                     ten_env=ten_env, audio_data=buff
                                 )
+                                turn.on_audio_out(len(buff))
 
                             # tool calls
                             if delta.get("tool_calls"):
@@ -351,6 +362,12 @@ class MinimaxV2VExtension(AsyncExtension):
             ten_env.log_info(
                 f"http loop done, cost_time {duration_in_ms_since(start_time)}ms"
             )
+            if turn.merged:
+                # the audio is sent again within the next turn
+                user_transcript = ""
+                assistant_transcript = ""
+            elif turn.superseded and assistant_transcript:
+                assistant_transcript += "[interrupted]"
             if user_transcript:
                 self.memory.put({"role": Role.User, "content": user_transcript})
             if assistant_transcript:
@@ -364,20 +381,25 @@ class MinimaxV2VExtension(AsyncExtension):
                     end_of_segment=True,
                 )
 
-    def _create_input_audio_message(self, buff: bytearray) -> Dict[str, Any]:
+    def _create_input_audio_message(
+        self, buff: bytearray, audio_format: str = AUDIO_FORMAT_PCM
+    ) -> Dict[str, Any]:
+        input_audio = {
+            "data": base64.b64encode(buff).decode("utf-8"),
+            "format": audio_format,
+            "sample_rate": self.config.in_sample_rate,
+            "channel": 1,
+            "encode": "base64",
+        }
+        if audio_format == AUDIO_FORMAT_PCM:
+            input_audio["bit_depth"] = 16
+
         message = {
             "role": "user",
             "content": [
                 {
                     "type": "input_audio",
-                    "input_audio": {
-                        "data": base64.b64encode(buff).decode("utf-8"),
-                        "format": "pcm",
-                        "sample_rate": self.config.in_sample_rate,
-                        "bit_depth": 16,
-                        "channel": 1,
-                        "encode": "base64",
-                    },
+                    "input_audio": input_audio,
                 }
             ],
         }
@@ -461,19 +483,9 @@ class MinimaxV2VExtension(AsyncExtension):
             )
 
     async def _flush(self, ten_env: AsyncTenEnv) -> None:
-        # clear queue
-        while not self.queue.empty():
-            try:
-                self.queue.get_nowait()
-                self.queue.task_done()
-            except Exception as e:
-                ten_env.log_warn(f"flush queue error {e}")
-
-        # cancel current task
-        if self.curr_task:
-            self.curr_task.cancel()
-            await asyncio.gather(self.curr_task, return_exceptions=True)
-            self.curr_task = None
+        # cancel in-flight and waiting turns
+        if self.scheduler:
+            await self.scheduler.flush()
 
     async def _dump_audio_if_need(self, buf: bytearray, suffix: str) -> None:
         if not self.config.dump:
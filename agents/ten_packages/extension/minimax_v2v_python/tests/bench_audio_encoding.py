@@ -0,0 +1,85 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Benchmark the input audio upload payload per second of speech for each format.
+
+    python tests/bench_audio_encoding.py [--seconds 5] [--sample-rate 16000]
+
+The payload size is measured after base64 as sent in the json body.
+"""
+import argparse
+import asyncio
+import base64
+import math
+import random
+import sys
+import time
+from array import array
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from audio_encoding import AUDIO_FORMATS, InputAudioEncoder  # noqa: E402
+
+
+def synthetic_speech(seconds: float, sample_rate: int) -> bytes:
+    """Voiced-like harmonics with a wobbling pitch, syllable envelope and some noise."""
+    rnd = random.Random(0)
+    samples = array("h")
+    phase = 0.0
+    for i in range(int(seconds * sample_rate)):
+        t = i / sample_rate
+        f0 = 140 + 30 * math.sin(2 * math.pi * 0.7 * t)
+        phase += 2 * math.pi * f0 / sample_rate
+        envelope = max(0.0, math.sin(2 * math.pi * 2.5 * t)) ** 0.5
+        voiced = sum(math.sin(k * phase) / k for k in range(1, 6))
+        value = 6000 * envelope * voiced + rnd.gauss(0, 300)
+        samples.append(max(-32768, min(32767, int(value))))
+    return samples.tobytes()
+
+
+async def bench(audio_format: str, pcm: bytes, seconds: float, sample_rate: int, bitrate: int, rounds: int):
+    encoder = InputAudioEncoder(audio_format, sample_rate=sample_rate, bitrate_kbps=bitrate)
+    try:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            data, _ = await encoder.encode(pcm)
+        cost = (time.perf_counter() - start) / rounds
+    finally:
+        encoder.close()
+
+    payload = len(base64.b64encode(data))
+    return payload / seconds, cost * 1000 / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--bitrate", type=int, nargs="+", default=[16, 32, 48])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    pcm = synthetic_speech(args.seconds, args.sample_rate)
+    print(f"{args.seconds}s utterance, {args.sample_rate}Hz 16bit mono, {len(pcm)} bytes raw")
+    print(f"{'format':<12}{'KB/s payload':>14}{'encode ms/s':>14}")
+
+    for audio_format in AUDIO_FORMATS:
+        bitrates = args.bitrate if audio_format != "pcm" else [0]
+        for bitrate in bitrates:
+            name = audio_format if not bitrate else f"{audio_format}@{bitrate}k"
+            try:
+                size, cost = asyncio.run(
+                    bench(audio_format, pcm, args.seconds, args.sample_rate, bitrate or 32, args.rounds)
+                )
+            except ImportError as e:
+                print(f"{name:<12}  skipped, {e}")
+                break
+            print(f"{name:<12}{size / 1024:>14.1f}{cost:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import base64
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from turn_scheduler import Turn, TurnScheduler  # noqa: E402
+
+CHUNK = bytes(3200)  # 50ms of 32kHz 16bit mono
+CHUNKS_PER_RESPONSE = 10
+
+
+class FakeSSEServer:
+    """Minimal chatcompletion_v2 lookalike streaming audio deltas over SSE."""
+
+    def __init__(self, first_chunk_delay: float = 0.0, chunk_interval: float = 0.02):
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_interval = chunk_interval
+        self.requests = []
+        self.chunks_sent = []
+        self.server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v1/text/chatcompletion_v2"
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *args):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        index = len(self.requests)
+        self.chunks_sent.append(0)
+        try:
+            header = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in header.decode().split("\r\n"):
+                if line.lower().startswith("content-length:"):
+                    length = int(line.split(":", 1)[1])
+            self.requests.append(json.loads(await reader.readexactly(length)))
+
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                b"Connection: close\r\n\r\n"
+            )
+            await writer.drain()
+            await asyncio.sleep(self.first_chunk_delay)
+
+            audio = base64.b64encode(CHUNK).decode()
+            for _ in range(CHUNKS_PER_RESPONSE):
+                delta = {"role": "assistant", "audio_content": audio}
+                writer.write(f"data: {json.dumps({'choices': [{'delta': delta}]})}\n\n".encode())
+                await writer.drain()
+                self.chunks_sent[index] += 1
+                await asyncio.sleep(self.chunk_interval)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+class Logger:
+    def __init__(self):
+        self.errors = []
+
+    def log_debug(self, _):
+        pass
+
+    log_info = log_warn = log_debug
+
+    def log_error(self, msg):
+        self.errors.append(msg)
+
+
+def _make_run_turn(client: httpx.AsyncClient, url: str):
+    async def run_turn(turn: Turn) -> None:
+        payload = {"audio": base64.b64encode(turn.buff).decode()}
+        async with client.stream("POST", url, json=payload) as response:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                delta = json.loads(line[5:])["choices"][0]["delta"]
+                turn.on_audio_out(len(base64.b64decode(delta["audio_content"])))
+
+    return run_turn
+
+
+async def _wait_for(predicate, timeout: float = 2.0):
+    async def poll():
+        while not predicate():
+            await asyncio.sleep(0.005)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+def test_newer_segment_supersedes_inflight_turn():
+    async def run():
+        superseded = []
+
+        async def on_superseded(turn: Turn):
+            superseded.append(turn.id)
+
+        async with FakeSSEServer() as server, httpx.AsyncClient() as client:
+            scheduler = TurnScheduler(
+                ten_env=Logger(),
+                run_turn=_make_run_turn(client, server.url),
+                on_superseded=on_superseded,
+                out_bytes_per_ms=64,
+            )
+            first = scheduler.submit(datetime.now(), b"\x01" * 320)
+            await _wait_for(lambda: first.audio_bytes >= 2 * len(CHUNK))
+
+            second = scheduler.submit(datetime.now(), b"\x02" * 320)
+            await second.task
+
+            assert first.superseded and first.task.cancelled()
+            assert superseded == [first.id]
+            assert first.audio_bytes < CHUNKS_PER_RESPONSE * len(CHUNK)
+            assert second.audio_bytes == CHUNKS_PER_RESPONSE * len(CHUNK)
+            assert second.audio_ttfb_ms() >= 0
+
+            # the stale stream is torn down instead of being read to the end
+            await asyncio.sleep(0.1)
+            assert server.chunks_sent[0] < CHUNKS_PER_RESPONSE
+
+            m = scheduler.metrics
+            assert (m.turns, m.completed, m.superseded, m.merged) == (2, 1, 1, 0)
+            assert m.wasted_audio_bytes == first.audio_bytes
+            assert m.wasted_audio_ms == first.audio_bytes // 64
+
+    asyncio.run(run())
+
+
+def test_close_segments_are_merged():
+    async def run():
+        async with FakeSSEServer(first_chunk_delay=0.2) as server, httpx.AsyncClient() as client:
+            scheduler = TurnScheduler(
+                ten_env=Logger(),
+                run_turn=_make_run_turn(client, server.url),
+                merge_window_ms=500,
+            )
+            first = scheduler.submit(datetime.now(), b"\x01" * 320)
+            await _wait_for(lambda: len(server.requests) == 1)
+
+            second = scheduler.submit(datetime.now(), b"\x02" * 320)
+            await second.task
+
+            assert first.merged and not first.superseded
+            assert second.segments == first.segments + [b"\x02" * 320]
+            assert second.ts == first.ts
+            assert base64.b64decode(server.requests[-1]["audio"]) == b"\x01" * 320 + b"\x02" * 320
+
+            m = scheduler.metrics
+            assert (m.turns, m.completed, m.superseded, m.merged) == (2, 1, 0, 1)
+            assert m.wasted_audio_bytes == 0
+
+    asyncio.run(run())
+
+
+def test_segment_after_audio_out_is_not_merged():
+    async def run():
+        async with FakeSSEServer() as server, httpx.AsyncClient() as client:
+            scheduler = TurnScheduler(
+                ten_env=Logger(),
+                run_turn=_make_run_turn(client, server.url),
+                merge_window_ms=5000,
+            )
+            first = scheduler.submit(datetime.now(), b"\x01" * 320)
+            await _wait_for(lambda: first.audio_bytes > 0)
+
+            second = scheduler.submit(datetime.now(), b"\x02" * 320)
+            await second.task
+
+            assert first.superseded and not first.merged
+            assert second.segments == [b"\x02" * 320]
+
+    asyncio.run(run())
+
+
+def test_turns_run_serially_without_supersede():
+    async def run():
+        async with FakeSSEServer(chunk_interval=0.005) as server, httpx.AsyncClient() as client:
+            scheduler = TurnScheduler(
+                ten_env=Logger(),
+                run_turn=_make_run_turn(client, server.url),
+                supersede=False,
+            )
+            first = scheduler.submit(datetime.now(), b"\x01" * 320)
+            second = scheduler.submit(datetime.now(), b"\x02" * 320)
+            await second.task
+
+            assert first.task.done() and not first.cancelled
+            assert first.finished_at <= second.started_at
+            assert first.audio_bytes == second.audio_bytes == CHUNKS_PER_RESPONSE * len(CHUNK)
+            assert scheduler.metrics.completed == 2
+
+    asyncio.run(run())
+
+
+def test_flush_cancels_inflight_turn():
+    async def run():
+        async with FakeSSEServer() as server, httpx.AsyncClient() as client:
+            scheduler = TurnScheduler(
+                ten_env=Logger(), run_turn=_make_run_turn(client, server.url)
+            )
+            turn = scheduler.submit(datetime.now(), b"\x01" * 320)
+            await _wait_for(lambda: turn.audio_bytes > 0)
+
+            await scheduler.flush()
+
+            assert turn.task.cancelled() and turn.superseded
+            assert scheduler.metrics.superseded == 1
+
+    asyncio.run(run())
+
+
+def test_failed_turn_is_logged_and_the_next_turn_runs():
+    async def run():
+        async with FakeSSEServer(chunk_interval=0.005) as server, httpx.AsyncClient() as client:
+            run_turn = _make_run_turn(client, server.url)
+
+            async def failing_run_turn(turn: Turn) -> None:
+                if turn.id == 1:
+                    raise ValueError("bad response")
+                await run_turn(turn)
+
+            logger = Logger()
+            scheduler = TurnScheduler(ten_env=logger, run_turn=failing_run_turn)
+            first = scheduler.submit(datetime.now(), b"\x01" * 320)
+            await first.task
+            assert len(logger.errors) == 1
+            assert "ValueError: bad response" in logger.errors[0]
+
+            second = scheduler.submit(datetime.now(), b"\x02" * 320)
+            await second.task
+            assert second.audio_bytes == CHUNKS_PER_RESPONSE * len(CHUNK)
+            assert len(logger.errors) == 1
+
+    asyncio.run(run())
@@ -0,0 +1,183 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import itertools
+import time
+import traceback
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, List, Optional
+
+
+@dataclass(eq=False)
+class Turn:
+    id: int
+    ts: datetime
+    segments: List[bytes]
+    submitted_at: float = field(default_factory=time.monotonic)
+    last_segment_at: float = field(default_factory=time.monotonic)
+
+    started_at: float = 0.0
+    first_audio_at: float = 0.0
+    finished_at: float = 0.0
+    audio_bytes: int = 0
+
+    # set when a newer segment cancels this turn
+    superseded: bool = False
+    # set when this turn is cancelled and its audio is merged into the next turn
+    merged: bool = False
+
+    task: Optional[asyncio.Task] = None
+
+    @property
+    def buff(self) -> bytes:
+        if len(self.segments) == 1:
+            return self.segments[0]
+        return b"".join(self.segments)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.superseded or self.merged
+
+    def on_audio_out(self, size: int) -> None:
+        if not self.first_audio_at:
+            self.first_audio_at = time.monotonic()
+        self.audio_bytes += size
+
+    def queued_ms(self) -> int:
+        return _ms(self.submitted_at, self.started_at)
+
+    def audio_ttfb_ms(self) -> int:
+        return _ms(self.started_at, self.first_audio_at)
+
+    def duration_ms(self) -> int:
+        return _ms(self.started_at, self.finished_at)
+
+
+@dataclass
+class TurnMetrics:
+    turns: int = 0
+    completed: int = 0
+    superseded: int = 0
+    merged: int = 0
+    wasted_audio_bytes: int = 0
+    wasted_audio_ms: int = 0
+
+
+def _ms(start: float, end: float) -> int:
+    if not start or not end:
+        return -1
+    return int((end - start) * 1000)
+
+
+class TurnScheduler:
+    """
+    Run one request per user segment, newest segment wins.
+
+    A segment submitted while an earlier turn is still streaming cancels that turn.
+    If merge_window_ms > 0 and the earlier turn has not produced any audio yet while
+    the new segment arrives within the window, both segments are merged into a single
+    request instead, so a user pausing briefly mid-sentence is answered once.
+    With supersede disabled turns run one after another, as before.
+    """
+
+    def __init__(
+        self,
+        ten_env: Any,
+        run_turn: Callable[[Turn], Awaitable[None]],
+        on_superseded: Optional[Callable[[Turn], Awaitable[None]]] = None,
+        on_turn_done: Optional[Callable[[Turn], None]] = None,
+        supersede: bool = True,
+        merge_window_ms: int = 0,
+        out_bytes_per_ms: float = 64.0,
+    ):
+        self.ten_env = ten_env
+        self.run_turn = run_turn
+        self.on_superseded = on_superseded
+        self.on_turn_done = on_turn_done
+        self.supersede = supersede
+        self.merge_window = merge_window_ms / 1000
+        self.out_bytes_per_ms = out_bytes_per_ms
+
+        self.metrics = TurnMetrics()
+        self.current: Optional[Turn] = None
+        self._pending: set[Turn] = set()
+        self._ids = itertools.count(1)
+
+    def submit(self, ts: datetime, buff: bytes) -> Turn:
+        """Schedule a new user segment. Must be called on the event loop."""
+        now = time.monotonic()
+        prev = self.current
+        segments = [buff]
+
+        if prev and not prev.task.done():
+            if (
+                self.merge_window > 0
+                and prev.audio_bytes == 0
+                and now - prev.last_segment_at <= self.merge_window
+            ):
+                prev.merged = True
+                segments = prev.segments + segments
+                ts = prev.ts
+                prev.task.cancel()
+            elif self.supersede:
+                prev.superseded = True
+                prev.task.cancel()
+
+        turn = Turn(id=next(self._ids), ts=ts, segments=segments)
+        turn.submitted_at = prev.submitted_at if prev and prev.merged else now
+        turn.last_segment_at = now
+        self.metrics.turns += 1
+
+        turn.task = asyncio.create_task(self._run(turn, prev))
+        self._pending.add(turn)
+        self.current = turn
+        return turn
+
+    async def flush(self) -> None:
+        """Cancel the in-flight and all waiting turns, e.g. on an external flush cmd."""
+        tasks = []
+        for turn in self._pending:
+            if not turn.task.done():
+                turn.superseded = True
+                turn.task.cancel()
+                tasks.append(turn.task)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, turn: Turn, prev: Optional[Turn]) -> None:
+        try:
+            if prev and not prev.task.done():
+                # let the previous turn unwind (memory, transcripts) before starting,
+                # asyncio.wait so that cancelling this turn leaves the previous one alone
+                await asyncio.wait({prev.task})
+            if prev and prev.superseded and prev.audio_bytes and self.on_superseded:
+                await self.on_superseded(prev)
+
+            turn.started_at = time.monotonic()
+            await self.run_turn(turn)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.ten_env.log_error(f"turn {turn.id} failed: {traceback.format_exc()}")
+        finally:
+            turn.finished_at = time.monotonic()
+            self._pending.discard(turn)
+            self._account(turn)
+
+    def _account(self, turn: Turn) -> None:
+        m = self.metrics
+        if turn.merged:
+            m.merged += 1
+        elif turn.superseded:
+            m.superseded += 1
+            m.wasted_audio_bytes += turn.audio_bytes
+            m.wasted_audio_ms = int(m.wasted_audio_bytes / self.out_bytes_per_ms)
+        else:
+            m.completed += 1
+
+        if self.on_turn_done:
+            self.on_turn_done(turn)
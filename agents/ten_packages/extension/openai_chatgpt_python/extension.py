@@ -7,6 +7,7 @@
 #
 import asyncio
 import json
+import time
 import traceback
 from typing import Iterable
 
@@ -17,7 +18,7 @@ from ten_ai_base.helper import (
     get_property_bool,
     get_property_string,
 )
-from ten_ai_base import AsyncLLMBaseExtension
+from ten_ai_base import AsyncLLMBaseExtension, LLMRouter
 from ten_ai_base.types import (
     LLMCallCompletionArgs,
     LLMChatCompletionContentPartParam,
@@ -82,6 +83,13 @@ class OpenAIChatGPTExtension(AsyncLLMBaseExtension):
         except Exception as err:
             async_ten_env.log_info(f"Failed to initialize OpenAIChatGPT: {err}")
 
+        if self.config.model_routing:
+            try:
+                self.router = LLMRouter.from_config(self.config.model_routing)
+                async_ten_env.log_info(f"model routing: {list(self.router.profiles)}")
+            except Exception as err:
+                async_ten_env.log_error(f"Failed to initialize model routing: {err}")
+
     async def on_stop(self, async_ten_env: AsyncTenEnv) -> None:
         async_ten_env.log_info("on_stop")
         await super().on_stop(async_ten_env)
@@ -174,6 +182,9 @@ class OpenAIChatGPTExtension(AsyncLLMBaseExtension):
 
         self.memory_cache = []
         memory = self.memory
+        profile = None
+        start_time = time.time()
+        first_token_time = None
         try:
             async_ten_env.log_info(f"for input text: [{messages}] memory: {memory}")
             tools = None
@@ -284,6 +295,9 @@ class OpenAIChatGPTExtension(AsyncLLMBaseExtension):
                 self.tool_task_future.set_result(None)
 
             async def handle_content_update(content: str):
+                nonlocal first_token_time
+                if first_token_time is None:
+                    first_token_time = time.time()
                 # Append the content to the last assistant message
                 for item in reversed(self.memory_cache):
                     if item.get("role") == "assistant":
@@ -306,20 +320,34 @@ class OpenAIChatGPTExtension(AsyncLLMBaseExtension):
             listener.on("content_update", handle_content_update)
             listener.on("content_finished", handle_content_finished)
 
+            profile = self.select_model_profile(
+                async_ten_env, messages, history_length=len(memory), follow_up=no_tool
+            )
+
             # Make an async API call to get chat completions
             await self.client.get_chat_completions_stream(
-                memory + messages, tools, listener
+                memory + messages, tools, listener, profile
             )
 
             # Wait for the content to be finished
             await content_finished_event.wait()
 
+            self.record_model_latency(
+                async_ten_env,
+                profile,
+                first_token_latency=(
+                    first_token_time - start_time if first_token_time else None
+                ),
+                total_latency=time.time() - start_time,
+            )
+
             async_ten_env.log_info(
                 f"Chat completion finished for input text: {messages}"
             )
         except asyncio.CancelledError:
             async_ten_env.log_info(f"Task cancelled: {messages}")
         except Exception:
+            self.record_model_latency(async_ten_env, profile, error=True)
             async_ten_env.log_error(
                 f"Error in chat_completion: {traceback.format_exc()} for input text: {messages}"
             )
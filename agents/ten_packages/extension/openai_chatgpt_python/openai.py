@@ -6,7 +6,7 @@
 #
 #
 from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import random
 import requests
 from openai import AsyncOpenAI, AsyncAzureOpenAI
@@ -14,6 +14,7 @@ from openai.types.chat.chat_completion import ChatCompletion
 
 from ten.async_ten_env import AsyncTenEnv
 from ten_ai_base.config import BaseConfig
+from ten_ai_base.routing import LLMModelProfile
 
 
 @dataclass
@@ -38,6 +39,8 @@ class OpenAIChatGPTConfig(BaseConfig):
     vendor: str = "openai"
     azure_endpoint: str = ""
     azure_api_version: str = ""
+    # optional per-turn model routing, see ten_ai_base.routing.LLMRoutingConfig
+    model_routing: dict = field(default_factory=dict)
 
 class OpenAIChatGPT:
     client = None
@@ -46,16 +49,9 @@ class OpenAIChatGPT:
         self.config = config
         ten_env.log_info(f"OpenAIChatGPT initialized with config: {config.api_key}")
         if self.config.vendor == "azure":
-            self.client = AsyncAzureOpenAI(
-                api_key=config.api_key,
-                api_version=self.config.azure_api_version,
-                azure_endpoint=config.azure_endpoint,
-            )
             ten_env.log_info(
                 f"Using Azure OpenAI with endpoint: {config.azure_endpoint}, api_version: {config.azure_api_version}"
             )
-        else:
-            self.client = AsyncOpenAI(api_key=config.api_key, base_url=config.base_url)
         self.session = requests.Session()
         if config.proxy_url:
             proxies = {
@@ -64,9 +60,43 @@ class OpenAIChatGPT:
             }
             ten_env.log_info(f"Setting proxies: {proxies}")
             self.session.proxies.update(proxies)
-        self.client.session = self.session
+        self.client = self._create_client(config.api_key, "")
+        self.profile_clients = {}
 
-    async def get_chat_completions(self, messages, tools=None) -> ChatCompletion:
+    def _create_client(self, api_key: str, base_url: str):
+        """Creates a client of the configured vendor, base_url overrides the configured endpoint."""
+        if self.config.vendor == "azure":
+            client = AsyncAzureOpenAI(
+                api_key=api_key,
+                api_version=self.config.azure_api_version,
+                azure_endpoint=base_url or self.config.azure_endpoint,
+            )
+        else:
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url or self.config.base_url)
+        client.session = self.session
+        return client
+
+    def _get_client(self, profile: LLMModelProfile | None):
+        if profile is None or not (profile.base_url or profile.api_key):
+            return self.client
+
+        key = (profile.base_url, profile.api_key)
+        if key not in self.profile_clients:
+            self.profile_clients[key] = self._create_client(
+                profile.api_key or self.config.api_key, profile.base_url
+            )
+        return self.profile_clients[key]
+
+    def _apply_profile(self, req: dict, profile: LLMModelProfile | None) -> dict:
+        if profile:
+            req["model"] = profile.model
+            if profile.max_tokens:
+                req["max_tokens"] = profile.max_tokens
+        return req
+
+    async def get_chat_completions(
+        self, messages, tools=None, profile: LLMModelProfile | None = None
+    ) -> ChatCompletion:
         req = {
             "model": self.config.model,
             "messages": [
@@ -86,13 +116,17 @@ class OpenAIChatGPT:
         }
 
         try:
-            response = await self.client.chat.completions.create(**req)
+            response = await self._get_client(profile).chat.completions.create(
+                **self._apply_profile(req, profile)
+            )
         except Exception as e:
             raise RuntimeError(f"CreateChatCompletion failed, err: {e}") from e
 
         return response
 
-    async def get_chat_completions_stream(self, messages, tools=None, listener=None):
+    async def get_chat_completions_stream(
+        self, messages, tools=None, listener=None, profile: LLMModelProfile | None = None
+    ):
         req = {
             "model": self.config.model,
             "messages": [
@@ -113,7 +147,9 @@ class OpenAIChatGPT:
         }
 
         try:
-            response = await self.client.chat.completions.create(**req)
+            response = await self._get_client(profile).chat.completions.create(
+                **self._apply_profile(req, profile)
+            )
         except Exception as e:
             raise RuntimeError(f"CreateChatCompletionStream failed, err: {e}") from e
 
@@ -1,5 +1,6 @@
 from ten_ai_base.tts import AsyncTTSBaseExtension
-from .polly_tts import PollyTTS, PollyTTSConfig
+from .polly_client import PollyTTS
+from .polly_tts import PollyTTSConfig
 import traceback
 from ten import (
     AsyncTenEnv,
@@ -41,7 +42,8 @@ class PollyTTSExtension(AsyncTTSBaseExtension):
         await super().on_stop(ten_env)
         ten_env.log_debug("on_stop")
 
-        # TODO: clean up resources
+        if self.client:
+            self.client.close()
 
     async def on_deinit(self, ten_env: AsyncTenEnv) -> None:
         await super().on_deinit(ten_env)
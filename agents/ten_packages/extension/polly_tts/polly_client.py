@@ -0,0 +1,158 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import json
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+
+class PollyTTS:
+    """
+    Polly synthesis off the event loop: the blocking boto3 calls and reads of
+    the audio stream run on a bounded executor, and the chunks come back to
+    the loop as they are read. Speech marks are requested alongside the audio
+    rather than after it. Clients are created once and reused by the workers.
+    """
+
+    def __init__(self, config: Any, ten_env: Any) -> None:
+        """
+        :param config: A PollyTTSConfig
+        """
+        ten_env.log_info("startinit polly tts")
+        self.config = config
+        self.ten_env = ten_env
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, config.max_workers), thread_name_prefix="polly_tts"
+        )
+        # a client per worker at most, created as workers need them
+        self.clients: queue.SimpleQueue = queue.SimpleQueue()
+        self.clients_lock = threading.Lock()
+        self.clients_created = 0
+
+        self.voice_metadata = None
+        self.frame_size = int(
+            int(config.sample_rate)
+            * self.config.number_of_channels
+            * self.config.bytes_per_sample
+            / 100
+        )
+
+    def _create_client(self) -> Any:
+        config = self.config
+        if config.access_key and config.secret_key:
+            return boto3.client(
+                service_name="polly",
+                region_name=config.region,
+                aws_access_key_id=config.access_key,
+                aws_secret_access_key=config.secret_key,
+            )
+        return boto3.client(service_name="polly", region_name=config.region)
+
+    def _acquire_client(self) -> Any:
+        try:
+            return self.clients.get_nowait()
+        except queue.Empty:
+            pass
+        # creating clients is not thread safe
+        with self.clients_lock:
+            self.clients_created += 1
+            return self._create_client()
+
+    def _release_client(self, client: Any) -> None:
+        self.clients.put(client)
+
+    def _request(self, text: str) -> dict:
+        kwargs = {
+            "Engine": self.config.engine,
+            "OutputFormat": self.config.audio_format,
+            "Text": text,
+            "VoiceId": self.config.voice,
+        }
+        if self.config.lang_code is not None:
+            kwargs["LanguageCode"] = self.config.lang_code
+        return kwargs
+
+    def _stream_audio(
+        self,
+        kwargs: dict,
+        loop: asyncio.AbstractEventLoop,
+        chunks: asyncio.Queue,
+        stop: threading.Event,
+    ) -> None:
+        """Synthesizes speech, put into chunks as read. Runs on the executor."""
+        client = self._acquire_client()
+        try:
+            response = client.synthesize_speech(**kwargs)
+            with closing(response["AudioStream"]) as stream:
+                for chunk in stream.iter_chunks(chunk_size=self.frame_size):
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+        except ClientError:
+            self.ten_env.log_error("Couldn't get audio stream.")
+            raise
+        finally:
+            self._release_client(client)
+            loop.call_soon_threadsafe(chunks.put_nowait, None)
+
+    def _speech_marks(self, kwargs: dict) -> List[dict]:
+        """The visemes of the speech. Runs on the executor."""
+        kwargs = dict(kwargs, OutputFormat="json", SpeechMarkTypes=["viseme"])
+        client = self._acquire_client()
+        try:
+            response = client.synthesize_speech(**kwargs)
+            with closing(response["AudioStream"]) as stream:
+                return [json.loads(v) for v in stream.read().decode().splitlines() if v]
+        finally:
+            self._release_client(client)
+
+    async def text_to_speech_stream(
+        self,
+        ten_env: Any,
+        text: str,
+        on_visemes: Optional[Callable[[List[dict]], None]] = None,
+    ) -> AsyncIterator[bytes]:
+        if len(text) == 0:
+            ten_env.log_warn("async_polly_handler: empty input detected.")
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        kwargs = self._request(text)
+        audio = loop.run_in_executor(
+            self.executor, self._stream_audio, kwargs, loop, chunks, stop
+        )
+        marks = None
+        if self.config.include_visemes:
+            marks = loop.run_in_executor(self.executor, self._speech_marks, kwargs)
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                yield chunk
+            await audio
+            if marks is not None:
+                visemes = await marks
+                ten_env.log_debug(f"Got {len(visemes)} visemes.")
+                if on_visemes is not None:
+                    on_visemes(visemes)
+        except Exception:
+            ten_env.log_error(traceback.format_exc())
+        finally:
+            # the worker stops reading at its next chunk
+            stop.set()
+            if marks is not None:
+                marks.cancel()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,183 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import boto3
+from botocore.awsrequest import AWSResponse
+from botocore.response import StreamingBody
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from polly_client import PollyTTS  # noqa: E402
+
+FIRST_BYTE_MS = 150
+CHUNK_MS = 5
+CHUNKS = 20
+VISEMES = [{"time": i * 50, "type": "viseme", "value": "p"} for i in range(8)]
+
+
+class Logger:
+    def log_debug(self, _):
+        pass
+
+    log_info = log_warn = log_error = log_debug
+
+
+class SlowStream:
+    """The body of a response, every read blocking as a socket would."""
+
+    def __init__(self, data: bytes, chunk: int) -> None:
+        self.data = data
+        self.chunk = chunk
+        self.pos = 0
+        self.closed = False
+
+    def read(self, amt=None):
+        time.sleep(CHUNK_MS / 1000)
+        amt = len(self.data) if amt is None else min(amt, self.chunk)
+        data = self.data[self.pos : self.pos + amt]
+        self.pos += len(data)
+        return data
+
+    def close(self):
+        self.closed = True
+
+
+class StubbedPollyTTS(PollyTTS):
+    """Polly clients answering from memory, after FIRST_BYTE_MS."""
+
+    def __init__(self, config) -> None:
+        super().__init__(config, Logger())
+        self.calls = []
+        self.bodies = []
+
+    def _create_client(self):
+        client = boto3.client(
+            "polly",
+            region_name="us-east-1",
+            aws_access_key_id="key",
+            aws_secret_access_key="secret",
+        )
+        client.meta.events.register(
+            "before-call.polly.SynthesizeSpeech", self._synthesize_speech
+        )
+        return client
+
+    def _synthesize_speech(self, params, **_):
+        output_format = json.loads(params["body"])["OutputFormat"]
+        self.calls.append((output_format, time.perf_counter()))
+        time.sleep(FIRST_BYTE_MS / 1000)
+        if output_format == "json":
+            data = "\n".join(json.dumps(v, separators=(",", ":")) for v in VISEMES).encode()
+        else:
+            data = bytes(self.frame_size * CHUNKS)
+        body = SlowStream(data, self.frame_size)
+        self.bodies.append(body)
+        parsed = {
+            "AudioStream": StreamingBody(body, len(data)),
+            "ContentType": "audio/pcm",
+            "RequestCharacters": 10,
+        }
+        return AWSResponse(None, 200, {}, None), parsed
+
+
+def make_tts(**kwargs):
+    config = SimpleNamespace(
+        region="us-east-1",
+        access_key="key",
+        secret_key="secret",
+        engine="generative",
+        voice="Matthew",
+        sample_rate=16000,
+        lang_code="en-US",
+        bytes_per_sample=2,
+        include_visemes=False,
+        number_of_channels=1,
+        audio_format="pcm",
+        max_workers=2,
+    )
+    config.__dict__.update(kwargs)
+    return StubbedPollyTTS(config)
+
+
+async def synthesize_with_ticker(tts, text, **kwargs):
+    """The audio of text and the largest lag of a 5ms ticker meanwhile."""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append((time.perf_counter() - start) * 1000 - 5)
+
+    task = asyncio.create_task(ticker())
+    audio = b"".join([c async for c in tts.text_to_speech_stream(Logger(), text, **kwargs)])
+    done.set()
+    await task
+    return audio, max(lags)
+
+
+def test_synthesis_does_not_block_the_loop():
+    tts = make_tts()
+    # the client and the first request of botocore hold the gil while they are
+    # set up, which is not what is measured
+    asyncio.run(synthesize_with_ticker(tts, "warm up"))
+    audio, lag = asyncio.run(synthesize_with_ticker(tts, "hello"))
+    tts.close()
+    assert len(audio) == tts.frame_size * CHUNKS
+    # a blocking call would hold the loop for the first byte and every read
+    assert lag < FIRST_BYTE_MS / 3
+
+
+def test_speech_marks_are_requested_with_the_audio():
+    tts = make_tts(include_visemes=True)
+    visemes = []
+    audio, _ = asyncio.run(
+        synthesize_with_ticker(tts, "hello", on_visemes=visemes.extend)
+    )
+    tts.close()
+    assert len(audio) == tts.frame_size * CHUNKS
+    assert visemes == VISEMES
+    (_, audio_start), (_, marks_start) = sorted(tts.calls)
+    assert abs(audio_start - marks_start) < FIRST_BYTE_MS / 1000 / 2
+
+
+def test_clients_are_reused_across_sentences():
+    tts = make_tts(include_visemes=True)
+
+    async def main():
+        for text in ("one", "two", "three"):
+            async for _ in tts.text_to_speech_stream(Logger(), text):
+                pass
+
+    asyncio.run(main())
+    tts.close()
+    assert len(tts.calls) == 6
+    assert tts.clients_created <= tts.config.max_workers
+
+
+def test_cancel_stops_reading_the_stream():
+    tts = make_tts()
+
+    async def main():
+        stream = tts.text_to_speech_stream(Logger(), "hello")
+        async for _ in stream:
+            break
+        await stream.aclose()
+        # the worker notices at its next read
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    tts.executor.shutdown(wait=True)
+    (body,) = tts.bodies
+    assert body.closed
+    assert body.pos < len(body.data)
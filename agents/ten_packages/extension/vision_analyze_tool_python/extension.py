@@ -12,9 +12,11 @@ from ten import (
     Data,
 )
 from PIL import Image
+from dataclasses import dataclass
 from io import BytesIO
 from base64 import b64encode
 
+from ten_ai_base.config import BaseConfig
 from ten_ai_base.const import CMD_CHAT_COMPLETION_CALL
 from ten_ai_base import AsyncLLMToolBaseExtension
 from ten_ai_base.types import (
@@ -24,6 +26,7 @@ from ten_ai_base.types import (
     LLMToolResult,
     LLMToolResultLLMResult,
 )
+from ten_ai_base.frame_capture import CAPTURE_MODE_ON_DEMAND, VideoFrameCapturer
 
 
 def rgb2base64jpeg(rgb_data, width, height):
@@ -84,16 +87,31 @@ def resize_image_keep_aspect(image, max_size=512):
     return resized_image
 
 
+@dataclass
+class VisionAnalyzeToolConfig(BaseConfig):
+    capture_mode: str = CAPTURE_MODE_ON_DEMAND
+    snapshot_interval_ms: int = 1000
+    capture_timeout_ms: int = 500
+
+
 class VisionAnalyzeToolExtension(AsyncLLMToolBaseExtension):
-    image_data = None
-    image_width = 0
-    image_height = 0
+    config: VisionAnalyzeToolConfig = None
+    capturer: VideoFrameCapturer = None
 
     async def on_init(self, ten_env: AsyncTenEnv) -> None:
         ten_env.log_debug("on_init")
 
     async def on_start(self, ten_env: AsyncTenEnv) -> None:
         ten_env.log_debug("on_start")
+
+        self.config = await VisionAnalyzeToolConfig.create_async(ten_env=ten_env)
+        ten_env.log_info(f"config: {self.config}")
+        self.capturer = VideoFrameCapturer(
+            mode=self.config.capture_mode,
+            snapshot_interval_ms=self.config.snapshot_interval_ms,
+            capture_timeout_ms=self.config.capture_timeout_ms,
+        )
+
         await super().on_start(ten_env)
 
     async def on_stop(self, ten_env: AsyncTenEnv) -> None:
@@ -126,9 +144,8 @@ class VisionAnalyzeToolExtension(AsyncLLMToolBaseExtension):
         video_frame_name = video_frame.get_name()
         ten_env.log_debug("on_video_frame name {}".format(video_frame_name))
 
-        self.image_data = video_frame.get_buf()
-        self.image_width = video_frame.get_width()
-        self.image_height = video_frame.get_height()
+        if self.capturer:
+            self.capturer.on_video_frame(video_frame)
 
     def get_tool_metadata(self, ten_env: AsyncTenEnv) -> list[LLMToolMetadata]:
         return [
@@ -150,7 +167,8 @@ class VisionAnalyzeToolExtension(AsyncLLMToolBaseExtension):
         self, ten_env: AsyncTenEnv, name: str, args: dict
     ) -> LLMToolResult | None:
         if name == "get_vision_chat_completion":
-            if self.image_data is None:
+            frame = await self.capturer.capture() if self.capturer else None
+            if frame is None:
                 raise ValueError("No image data available")
 
             if "query" not in args:
@@ -158,9 +176,7 @@ class VisionAnalyzeToolExtension(AsyncLLMToolBaseExtension):
 
             query = args["query"]
 
-            base64_image = rgb2base64jpeg(
-                self.image_data, self.image_width, self.image_height
-            )
+            base64_image = rgb2base64jpeg(frame.data, frame.width, frame.height)
             # return LLMToolResult(message=LLMCompletionArgsMessage(role="user", content=[result]))
             cmd: Cmd = Cmd.create(CMD_CHAT_COMPLETION_CALL)
             message: LLMChatCompletionUserMessageParam = (
@@ -13,9 +13,13 @@ from ten import (
     Data,
 )
 from PIL import Image
+from dataclasses import dataclass
 from io import BytesIO
 from base64 import b64encode
 
+from ten_ai_base.config import BaseConfig
+from ten_ai_base.frame_capture import CAPTURE_MODE_ON_DEMAND, VideoFrameCapturer
+
 
 def rgb2base64jpeg(rgb_data, width, height):
     # Convert the RGB image to a PIL Image
@@ -75,10 +79,16 @@ def resize_image_keep_aspect(image, max_size=512):
     return resized_image
 
 
+@dataclass
+class VisionToolConfig(BaseConfig):
+    capture_mode: str = CAPTURE_MODE_ON_DEMAND
+    snapshot_interval_ms: int = 1000
+    capture_timeout_ms: int = 500
+
+
 class VisionToolExtension(AsyncLLMToolBaseExtension):
-    image_data = None
-    image_width = 0
-    image_height = 0
+    config: VisionToolConfig = None
+    capturer: VideoFrameCapturer = None
 
     async def on_init(self, ten_env: AsyncTenEnv) -> None:
         ten_env.log_debug("on_init")
@@ -86,6 +96,15 @@ class VisionToolExtension(AsyncLLMToolBaseExtension):
 
     async def on_start(self, ten_env: AsyncTenEnv) -> None:
         ten_env.log_debug("on_start")
+
+        self.config = await VisionToolConfig.create_async(ten_env=ten_env)
+        ten_env.log_info(f"config: {self.config}")
+        self.capturer = VideoFrameCapturer(
+            mode=self.config.capture_mode,
+            snapshot_interval_ms=self.config.snapshot_interval_ms,
+            capture_timeout_ms=self.config.capture_timeout_ms,
+        )
+
         await super().on_start(ten_env)
 
     async def on_stop(self, ten_env: AsyncTenEnv) -> None:
@@ -117,9 +136,8 @@ class VisionToolExtension(AsyncLLMToolBaseExtension):
         video_frame_name = video_frame.get_name()
         ten_env.log_debug("on_video_frame name {}".format(video_frame_name))
 
-        self.image_data = video_frame.get_buf()
-        self.image_width = video_frame.get_width()
-        self.image_height = video_frame.get_height()
+        if self.capturer:
+            self.capturer.on_video_frame(video_frame)
 
     def get_tool_metadata(self, ten_env: AsyncTenEnv) -> list[LLMToolMetadata]:
         return [
@@ -134,12 +152,11 @@ class VisionToolExtension(AsyncLLMToolBaseExtension):
         self, ten_env: AsyncTenEnv, name: str, args: dict
     ) -> LLMToolResult | None:
         if name == "get_vision_tool":
-            if self.image_data is None:
+            frame = await self.capturer.capture() if self.capturer else None
+            if frame is None:
                 raise ValueError("No image data available")
 
-            base64_image = rgb2base64jpeg(
-                self.image_data, self.image_width, self.image_height
-            )
+            base64_image = rgb2base64jpeg(frame.data, frame.width, frame.height)
             return LLMToolResultRequery(
                 type="requery",
                 content=[
@@ -0,0 +1,82 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+
+from .types import (
+    LLMCallCompletionArgs,
+    LLMDataCompletionArgs,
+    LLMToolMetadata,
+    LLMToolResult,
+    LLMChatCompletionMessageParam,
+)
+from .usage import LLMUsage, LLMCompletionTokensDetails, LLMPromptTokensDetails
+from .chat_memory import ChatMemory, EVENT_MEMORY_APPENDED, EVENT_MEMORY_EXPIRED
+from .helper import AsyncQueue, AsyncEventEmitter
+from .config import BaseConfig
+from .llm import AsyncLLMBaseExtension
+from .llm_tool import AsyncLLMToolBaseExtension
+from .tts_merger import TTSFragmentMerger
+from .frame_capture import VideoFrameCapturer
+from .routing import (
+    LLMModelProfile,
+    LLMRouter,
+    LLMRoutingConfig,
+    LLMRoutingPolicy,
+    LLMRouteContext,
+    SizeAwareRoutingPolicy,
+    register_routing_policy,
+)
+from .embedding import (
+    BINARY_EMBEDDING_FORMATS,
+    EMBEDDING_FORMAT_FLOAT16,
+    EMBEDDING_FORMAT_FLOAT32,
+    EMBEDDING_FORMAT_JSON,
+    PROPERTY_EMBEDDING_FORMAT,
+    decode_embedding,
+    decode_embeddings,
+    embedding_format_of,
+    encode_embedding,
+    encode_embeddings,
+)
+
+# Specify what should be imported when a user imports * from the
+# ten_ai_base package.
+__all__ = [
+    "LLMToolMetadata",
+    "LLMToolResult",
+    "LLMCallCompletionArgs",
+    "LLMDataCompletionArgs",
+    "AsyncLLMBaseExtension",
+    "AsyncLLMToolBaseExtension",
+    "TTSFragmentMerger",
+    "VideoFrameCapturer",
+    "ChatMemory",
+    "AsyncQueue",
+    "AsyncEventEmitter",
+    "BaseConfig",
+    "LLMChatCompletionMessageParam",
+    "LLMUsage",
+    "LLMCompletionTokensDetails",
+    "LLMPromptTokensDetails",
+    "EVENT_MEMORY_APPENDED",
+    "EVENT_MEMORY_EXPIRED",
+    "LLMModelProfile",
+    "LLMRouter",
+    "LLMRoutingConfig",
+    "LLMRoutingPolicy",
+    "LLMRouteContext",
+    "SizeAwareRoutingPolicy",
+    "register_routing_policy",
+    "BINARY_EMBEDDING_FORMATS",
+    "EMBEDDING_FORMAT_FLOAT16",
+    "EMBEDDING_FORMAT_FLOAT32",
+    "EMBEDDING_FORMAT_JSON",
+    "PROPERTY_EMBEDDING_FORMAT",
+    "decode_embedding",
+    "decode_embeddings",
+    "embedding_format_of",
+    "encode_embedding",
+    "encode_embeddings",
+]
@@ -0,0 +1,22 @@
+CMD_TOOL_REGISTER = "tool_register"
+CMD_TOOL_CALL = "tool_call"
+CMD_PROPERTY_TOOL = "tool"
+CMD_PROPERTY_RESULT = "tool_result"
+CMD_CHAT_COMPLETION_CALL = "chat_completion_call"
+CMD_GENERATE_IMAGE_CALL = "generate_image_call"
+CMD_IN_FLUSH = "flush"
+CMD_OUT_FLUSH = "flush"
+
+DATA_OUT_NAME = "text_data"
+CONTENT_DATA_OUT_NAME = "content_data"
+DATA_OUT_PROPERTY_TEXT = "text"
+DATA_OUT_PROPERTY_TEXT = "text"
+DATA_OUT_PROPERTY_END_OF_SEGMENT = "end_of_segment"
+
+DATA_IN_PROPERTY_TEXT = "text"
+DATA_IN_PROPERTY_END_OF_SEGMENT = "end_of_segment"
+
+DATA_INPUT_NAME = "text_data"
+CONTENT_DATA_INPUT_NAME = "content_data"
+
+AUDIO_FRAME_OUTPUT_NAME = "pcm_frame"
\ No newline at end of file
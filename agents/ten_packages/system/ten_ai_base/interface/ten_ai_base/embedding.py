@@ -0,0 +1,104 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import struct
+import sys
+from array import array
+from typing import Iterable, List, Sequence
+
+# Embeddings are sent as JSON text by default. A consumer that sets the
+# EMBEDDING_FORMAT property of its cmd to a binary format gets them as a buffer
+# property instead, if the producer supports it, and the producer sets
+# EMBEDDING_FORMAT on its result. Consumers must accept both forms.
+PROPERTY_EMBEDDING_FORMAT = "embedding_format"
+
+EMBEDDING_FORMAT_JSON = ""
+EMBEDDING_FORMAT_FLOAT32 = "float32"
+EMBEDDING_FORMAT_FLOAT16 = "float16"
+BINARY_EMBEDDING_FORMATS = (EMBEDDING_FORMAT_FLOAT32, EMBEDDING_FORMAT_FLOAT16)
+
+_MAGIC = b"EV"
+_VERSION = 1
+_DTYPE_CODES = {EMBEDDING_FORMAT_FLOAT32: 1, EMBEDDING_FORMAT_FLOAT16: 2}
+_DTYPE_NAMES = {code: name for name, code in _DTYPE_CODES.items()}
+_DTYPE_SIZES = {EMBEDDING_FORMAT_FLOAT32: 4, EMBEDDING_FORMAT_FLOAT16: 2}
+
+# magic, version, dtype, count, dim
+_HEADER = struct.Struct("<2sBBII")
+
+
+def encode_embeddings(
+    vectors: Sequence[Sequence[float]], fmt: str = EMBEDDING_FORMAT_FLOAT32
+) -> bytes:
+    """
+    Pack vectors of the same dimension as little-endian float32 or float16,
+    after a 12 bytes header carrying the dtype, the vector count and the dimension.
+    """
+    if fmt not in _DTYPE_CODES:
+        raise ValueError(f"unsupported embedding format: {fmt}")
+    count = len(vectors)
+    dim = len(vectors[0]) if count else 0
+    if any(len(v) != dim for v in vectors):
+        raise ValueError("embeddings must have the same dimension")
+
+    header = _HEADER.pack(_MAGIC, _VERSION, _DTYPE_CODES[fmt], count, dim)
+    if fmt == EMBEDDING_FORMAT_FLOAT16:
+        return header + struct.pack(f"<{count * dim}e", *_flatten(vectors))
+
+    values = array("f", _flatten(vectors))
+    if sys.byteorder != "little":
+        values.byteswap()
+    return header + values.tobytes()
+
+
+def decode_embeddings(buf: bytes) -> List[List[float]]:
+    fmt, count, dim = embedding_header(buf)
+    end = _HEADER.size + count * dim * _DTYPE_SIZES[fmt]
+    if len(buf) < end:
+        raise ValueError(f"embedding buffer truncated, {len(buf)} < {end} bytes")
+
+    payload = memoryview(buf)[_HEADER.size : end]
+    if fmt == EMBEDDING_FORMAT_FLOAT16:
+        flat = struct.unpack(f"<{count * dim}e", payload)
+    else:
+        values = array("f")
+        values.frombytes(payload)
+        if sys.byteorder != "little":
+            values.byteswap()
+        flat = values.tolist()
+    return [list(flat[i * dim : (i + 1) * dim]) for i in range(count)]
+
+
+def encode_embedding(vector: Sequence[float], fmt: str = EMBEDDING_FORMAT_FLOAT32) -> bytes:
+    return encode_embeddings([vector], fmt)
+
+
+def decode_embedding(buf: bytes) -> List[float]:
+    vectors = decode_embeddings(buf)
+    if len(vectors) != 1:
+        raise ValueError(f"expected one embedding, got {len(vectors)}")
+    return vectors[0]
+
+
+def embedding_header(buf: bytes) -> tuple[str, int, int]:
+    """Return (format, count, dim) of an encoded buffer."""
+    if len(buf) < _HEADER.size:
+        raise ValueError("embedding buffer too short")
+    magic, version, code, count, dim = _HEADER.unpack_from(buf)
+    if magic != _MAGIC or version != _VERSION or code not in _DTYPE_NAMES:
+        raise ValueError("not an encoded embedding buffer")
+    return _DTYPE_NAMES[code], count, dim
+
+
+def embedding_format_of(msg) -> str:
+    """EMBEDDING_FORMAT property of a cmd or cmd result, JSON if not set."""
+    try:
+        return msg.get_property_string(PROPERTY_EMBEDDING_FORMAT)
+    except Exception:
+        return EMBEDDING_FORMAT_JSON
+
+
+def _flatten(vectors: Iterable[Sequence[float]]) -> List[float]:
+    return [x for v in vectors for x in v]
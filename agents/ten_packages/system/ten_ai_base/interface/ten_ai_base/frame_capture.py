@@ -0,0 +1,133 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+CAPTURE_MODE_EVERY_FRAME = "every_frame"
+CAPTURE_MODE_ON_DEMAND = "on_demand"
+CAPTURE_MODE_PERIODIC = "periodic"
+
+CAPTURE_MODES = (
+    CAPTURE_MODE_EVERY_FRAME,
+    CAPTURE_MODE_ON_DEMAND,
+    CAPTURE_MODE_PERIODIC,
+)
+
+
+@dataclass
+class CapturedFrame:
+    data: bytes
+    width: int
+    height: int
+    timestamp: int
+    captured_at: float
+
+
+class VideoFrameCapturer:
+    """
+    Decide which incoming video frames are copied out of the runtime.
+
+    - every_frame: copy every frame, the legacy behaviour.
+    - on_demand: only remember that frames are flowing, and copy the next
+      frame once a caller is waiting in capture().
+    - periodic: like on_demand, but additionally keep a low-rate snapshot
+      every snapshot_interval_ms so capture() can return without waiting.
+
+    Both on_video_frame and capture are expected to run on the same event loop.
+    """
+
+    def __init__(
+        self,
+        mode: str = CAPTURE_MODE_ON_DEMAND,
+        snapshot_interval_ms: int = 1000,
+        capture_timeout_ms: int = 500,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if mode not in CAPTURE_MODES:
+            raise ValueError(f"unknown capture mode: {mode}")
+
+        self.mode = mode
+        self.snapshot_interval = snapshot_interval_ms / 1000
+        self.capture_timeout = capture_timeout_ms / 1000
+        self.clock = clock
+
+        self.frames_seen = 0
+        self.frames_copied = 0
+
+        self._latest: CapturedFrame | None = None
+        self._last_frame_at = 0.0
+        self._last_frame_timestamp = 0
+        self._waiters: list[asyncio.Future] = []
+
+    @property
+    def last_frame_timestamp(self) -> int:
+        return self._last_frame_timestamp
+
+    def on_video_frame(self, video_frame) -> None:
+        now = self.clock()
+        self.frames_seen += 1
+        self._last_frame_at = now
+        self._last_frame_timestamp = video_frame.get_timestamp()
+
+        if not self._should_copy(now):
+            return
+
+        frame = CapturedFrame(
+            data=video_frame.get_buf(),
+            width=video_frame.get_width(),
+            height=video_frame.get_height(),
+            timestamp=self._last_frame_timestamp,
+            captured_at=now,
+        )
+        self.frames_copied += 1
+        self._latest = frame
+
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(frame)
+
+    async def capture(self) -> CapturedFrame | None:
+        """
+        Return a frame for the pending tool call, or None if no frame is available.
+        In the lazy modes this waits for the next incoming frame, falling back to
+        the last copied frame if the stream stalls for longer than capture_timeout.
+        """
+        if self.mode == CAPTURE_MODE_EVERY_FRAME:
+            return self._latest
+
+        now = self.clock()
+        if self.mode == CAPTURE_MODE_PERIODIC and self._is_fresh(now):
+            return self._latest
+
+        # No frame has arrived recently, so there is nothing worth waiting for.
+        if now - self._last_frame_at > self.capture_timeout:
+            return self._latest
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, self.capture_timeout)
+        except asyncio.TimeoutError:
+            return self._latest
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _should_copy(self, now: float) -> bool:
+        if self.mode == CAPTURE_MODE_EVERY_FRAME or self._waiters:
+            return True
+        if self.mode == CAPTURE_MODE_PERIODIC:
+            return not self._is_fresh(now)
+        return False
+
+    def _is_fresh(self, now: float) -> bool:
+        return (
+            self._latest is not None
+            and now - self._latest.captured_at < self.snapshot_interval
+        )
@@ -0,0 +1,200 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Iterable, Optional
+
+from pydantic import BaseModel, Field
+
+
+class LLMModelProfile(BaseModel):
+    name: str
+    model: str
+    """Model name sent to the vendor."""
+
+    base_url: str = ""
+    """Optional endpoint override, the extension default is used if empty."""
+
+    api_key: str = ""
+    """Optional api key override, the extension default is used if empty."""
+
+    max_tokens: int = 0
+    """Optional max_tokens override, the extension default is used if 0."""
+
+
+class LLMRoutingConfig(BaseModel):
+    policy: str = "size_aware"
+    profiles: list[LLMModelProfile] = Field(default_factory=list)
+    default_profile: str = ""
+    """Profile used when the policy gives no answer, the first profile if empty."""
+
+    options: dict[str, Any] = Field(default_factory=dict)
+    """Policy specific options."""
+
+
+class LLMRouteContext(BaseModel):
+    text: str = ""
+    """Text of the latest user message."""
+
+    history_length: int = 0
+    has_tools: bool = False
+    follow_up: bool = False
+    """Request issued after a tool call, e.g. to let the model read the tool result."""
+
+    @classmethod
+    def from_messages(
+        cls, messages: Iterable[dict], history_length: int = 0, **kwargs
+    ) -> "LLMRouteContext":
+        text = ""
+        for message in reversed(list(messages)):
+            if message.get("role") != "user":
+                continue
+            content = message.get("content")
+            if isinstance(content, str):
+                text = content
+            elif content:
+                text = " ".join(
+                    part.get("text", "") for part in content if part.get("type") == "text"
+                )
+            break
+        return cls(text=text, history_length=history_length, **kwargs)
+
+
+class LLMRoutingPolicy(ABC):
+    """Pick a model profile name for one turn. Implementations must be cheap and local."""
+
+    @abstractmethod
+    def route(self, context: LLMRouteContext, profiles: dict[str, LLMModelProfile]) -> str:
+        pass
+
+
+class SizeAwareRoutingPolicy(LLMRoutingPolicy):
+    """
+    Send short utterances like "yes", "stop" or "thanks" to a small model,
+    everything else, anything likely to trigger a tool and tool follow-ups to a large one.
+    """
+
+    DEFAULT_TOOL_KEYWORDS = [
+        "search",
+        "look up",
+        "weather",
+        "news",
+        "camera",
+        "see",
+        "picture",
+        "image",
+        "photo",
+        "draw",
+    ]
+
+    def __init__(
+        self,
+        small: str = "small",
+        large: str = "large",
+        max_small_chars: int = 24,
+        tool_keywords: Optional[list[str]] = None,
+    ):
+        self.small = small
+        self.large = large
+        self.max_small_chars = max_small_chars
+        keywords = tool_keywords if tool_keywords is not None else self.DEFAULT_TOOL_KEYWORDS
+        self.tool_keywords = [k.lower() for k in keywords]
+
+    def route(self, context: LLMRouteContext, profiles: dict[str, LLMModelProfile]) -> str:
+        if context.follow_up:
+            return self.large
+
+        text = context.text.strip().lower()
+        if context.has_tools and any(k in text for k in self.tool_keywords):
+            return self.large
+        if len(text) <= self.max_small_chars:
+            return self.small
+        return self.large
+
+
+ROUTING_POLICIES: dict[str, type[LLMRoutingPolicy]] = {
+    "size_aware": SizeAwareRoutingPolicy,
+}
+
+
+def register_routing_policy(name: str, policy: type[LLMRoutingPolicy]) -> None:
+    """Make a custom policy available to LLMRouter.from_config by name."""
+    ROUTING_POLICIES[name] = policy
+
+
+class LLMRouteStats:
+    def __init__(self, window: int = 100):
+        self.count = 0
+        self.errors = 0
+        self.first_token_latencies: deque[float] = deque(maxlen=window)
+        self.total_latencies: deque[float] = deque(maxlen=window)
+
+    def percentile(self, samples: Iterable[float], p: float) -> float:
+        values = sorted(samples)
+        if not values:
+            return 0.0
+        index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+        return values[index]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "ttft_p50_ms": int(self.percentile(self.first_token_latencies, 50) * 1000),
+            "ttft_p95_ms": int(self.percentile(self.first_token_latencies, 95) * 1000),
+            "total_p50_ms": int(self.percentile(self.total_latencies, 50) * 1000),
+        }
+
+
+class LLMRouter:
+    """Choose a model profile per turn with a pluggable policy and keep per-route latency stats."""
+
+    def __init__(
+        self,
+        profiles: list[LLMModelProfile],
+        policy: LLMRoutingPolicy,
+        default_profile: str = "",
+    ):
+        if not profiles:
+            raise ValueError("at least one model profile is required")
+        self.profiles = {p.name: p for p in profiles}
+        self.policy = policy
+        self.default_profile = default_profile or profiles[0].name
+        self.stats: dict[str, LLMRouteStats] = {name: LLMRouteStats() for name in self.profiles}
+
+    @classmethod
+    def from_config(cls, config: LLMRoutingConfig | dict) -> "LLMRouter":
+        if isinstance(config, dict):
+            config = LLMRoutingConfig.model_validate(config)
+        if config.policy not in ROUTING_POLICIES:
+            raise ValueError(f"unknown routing policy: {config.policy}")
+        policy = ROUTING_POLICIES[config.policy](**config.options)
+        return cls(config.profiles, policy, config.default_profile)
+
+    def select(self, context: LLMRouteContext) -> LLMModelProfile:
+        name = self.policy.route(context, self.profiles)
+        profile = self.profiles.get(name) or self.profiles[self.default_profile]
+        self.stats[profile.name].count += 1
+        return profile
+
+    def record(
+        self,
+        profile: LLMModelProfile,
+        first_token_latency: Optional[float] = None,
+        total_latency: Optional[float] = None,
+        error: bool = False,
+    ) -> None:
+        """Record latencies in seconds of a routed request."""
+        stats = self.stats[profile.name]
+        if error:
+            stats.errors += 1
+        if first_token_latency is not None:
+            stats.first_token_latencies.append(first_token_latency)
+        if total_latency is not None:
+            stats.total_latencies.append(total_latency)
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        return {name: stats.to_dict() for name, stats in self.stats.items()}
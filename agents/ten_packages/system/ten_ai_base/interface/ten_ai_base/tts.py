@@ -0,0 +1,230 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+from abc import ABC, abstractmethod
+import asyncio
+import traceback
+
+from ten import (
+    AsyncExtension,
+    Data,
+)
+from ten.async_ten_env import AsyncTenEnv
+from ten.audio_frame import AudioFrame, AudioFrameDataFmt
+from ten.cmd import Cmd
+from ten.cmd_result import CmdResult, StatusCode
+from ten_ai_base.const import (
+    CMD_IN_FLUSH,
+    CMD_OUT_FLUSH,
+    DATA_IN_PROPERTY_END_OF_SEGMENT,
+    DATA_IN_PROPERTY_TEXT,
+)
+from ten_ai_base.types import TTSPcmOptions
+from .helper import AsyncQueue, PCMWriter, get_property_bool, get_property_string
+from .tts_merger import (
+    MERGER_PROPERTIES,
+    PROPERTY_MERGE_FRAGMENTS,
+    TTSFragmentMerger,
+    fragment_merger_from_properties,
+)
+
+
+class AsyncTTSBaseExtension(AsyncExtension, ABC):
+    """
+    Base class for implementing a Text-to-Speech Extension.
+    This class provides a basic implementation for converting text to speech.
+    It automatically handles the processing of tts requests.
+    Use begin_send_audio_out, send_audio_out, end_send_audio_out to send the audio data to the output.
+    Override on_request_tts to implement the TTS logic.
+    Short fragments are merged into fewer requests by fragment_merger, tuned by the merge_*
+    properties. Set merge_fragments to false, or fragment_merger to None, to request every
+    fragment as it comes.
+    """
+
+    # Create the queue for message processing
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.queue = AsyncQueue()
+        self.current_task = None
+        self.loop_task = None
+        self.leftover_bytes = b""
+        self.fragment_merger: TTSFragmentMerger | None = TTSFragmentMerger()
+
+    async def on_init(self, ten_env: AsyncTenEnv) -> None:
+        await super().on_init(ten_env)
+
+    async def on_start(self, ten_env: AsyncTenEnv) -> None:
+        await super().on_start(ten_env)
+
+        if self.fragment_merger is not None:
+            self.fragment_merger = await self._create_fragment_merger(ten_env)
+
+        if self.loop_task is None:
+            self.loop = asyncio.get_event_loop()
+            self.loop_task = self.loop.create_task(self._process_queue(ten_env))
+
+    async def on_stop(self, ten_env: AsyncTenEnv) -> None:
+        await super().on_stop(ten_env)
+        self.loop_task.cancel()
+        if self.fragment_merger is not None:
+            ten_env.log_info(f"fragment merger: {self.fragment_merger.metrics()}")
+
+    async def on_deinit(self, ten_env: AsyncTenEnv) -> None:
+        await super().on_deinit(ten_env)
+
+    async def _create_fragment_merger(
+        self, ten_env: AsyncTenEnv
+    ) -> TTSFragmentMerger | None:
+        properties = {}
+        try:
+            properties[PROPERTY_MERGE_FRAGMENTS] = await ten_env.get_property_bool(
+                PROPERTY_MERGE_FRAGMENTS
+            )
+        except Exception:
+            pass
+        for key in MERGER_PROPERTIES:
+            try:
+                properties[key] = await ten_env.get_property_int(key)
+            except Exception:
+                pass
+        ten_env.log_info(f"fragment merger properties: {properties}")
+        return fragment_merger_from_properties(properties)
+
+    async def on_cmd(self, async_ten_env: AsyncTenEnv, cmd: Cmd) -> None:
+        cmd_name = cmd.get_name()
+        async_ten_env.log_info(f"on_cmd name: {cmd_name}")
+
+        if cmd_name == CMD_IN_FLUSH:
+            await self.on_cancel_tts(async_ten_env)
+            await self.flush_input_items(async_ten_env)
+            await async_ten_env.send_cmd(Cmd.create(CMD_OUT_FLUSH))
+            async_ten_env.log_info("on_cmd sent flush")
+            status_code, detail = StatusCode.OK, "success"
+            cmd_result = CmdResult.create(status_code)
+            cmd_result.set_property_string("detail", detail)
+            await async_ten_env.return_result(cmd_result, cmd)
+
+    async def on_data(self, async_ten_env: AsyncTenEnv, data: Data) -> None:
+        # Get the necessary properties
+        async_ten_env.log_info(f"on_data name: {data.get_name()}")
+        input_text = get_property_string(data, DATA_IN_PROPERTY_TEXT)
+        end_of_segment = get_property_bool(data, DATA_IN_PROPERTY_END_OF_SEGMENT)
+
+        if not input_text:
+            async_ten_env.log_warn("ignore empty text")
+            return
+
+        # Start an asynchronous task for handling tts
+        await self.queue.put([input_text, end_of_segment])
+
+    async def flush_input_items(self, ten_env: AsyncTenEnv):
+        """Flushes the self.queue and cancels the current task."""
+        # Flush the queue using the new flush method
+        await self.queue.flush()
+        if self.fragment_merger is not None:
+            self.fragment_merger.reset()
+
+        # Cancel the current task if one is running
+        if self.current_task:
+            ten_env.log_info("Cancelling the current task during flush.")
+            self.current_task.cancel()
+
+    async def send_audio_out(
+        self, ten_env: AsyncTenEnv, audio_data: bytes, **args: TTSPcmOptions
+    ) -> None:
+        """End sending audio out."""
+        sample_rate = args.get("sample_rate", 16000)
+        bytes_per_sample = args.get("bytes_per_sample", 2)
+        number_of_channels = args.get("number_of_channels", 1)
+        try:
+            # Combine leftover bytes with new audio data
+            combined_data = self.leftover_bytes + audio_data
+
+            # Check if combined_data length is odd
+            if len(combined_data) % (bytes_per_sample * number_of_channels) != 0:
+                # Save the last incomplete frame
+                valid_length = len(combined_data) - (
+                    len(combined_data) % (bytes_per_sample * number_of_channels)
+                )
+                self.leftover_bytes = combined_data[valid_length:]
+                combined_data = combined_data[:valid_length]
+            else:
+                self.leftover_bytes = b""
+
+            if combined_data:
+                f = AudioFrame.create("pcm_frame")
+                f.set_sample_rate(sample_rate)
+                f.set_bytes_per_sample(bytes_per_sample)
+                f.set_number_of_channels(number_of_channels)
+                f.set_data_fmt(AudioFrameDataFmt.INTERLEAVE)
+                f.set_samples_per_channel(
+                    len(combined_data) // (bytes_per_sample * number_of_channels)
+                )
+                f.alloc_buf(len(combined_data))
+                buff = f.lock_buf()
+                buff[:] = combined_data
+                f.unlock_buf(buff)
+                await ten_env.send_audio_frame(f)
+                if self.fragment_merger is not None:
+                    self.fragment_merger.on_audio(
+                        len(combined_data)
+                        / (sample_rate * bytes_per_sample * number_of_channels)
+                    )
+        except Exception as e:
+            ten_env.log_error(f"error send audio frame, {traceback.format_exc()}")
+
+    @abstractmethod
+    async def on_request_tts(
+        self, ten_env: AsyncTenEnv, input_text: str, end_of_segment: bool
+    ) -> None:
+        """
+        Called when a new input item is available in the queue. Override this method to implement the TTS request logic.
+        Use send_audio_out to send the audio data to the output when the audio data is ready.
+        """
+        pass
+
+    @abstractmethod
+    async def on_cancel_tts(self, ten_env: AsyncTenEnv) -> None:
+        """Called when the TTS request is cancelled."""
+        pass
+
+    async def _process_queue(self, ten_env: AsyncTenEnv):
+        """Asynchronously process queue items one by one."""
+        while True:
+            # Wait for an item to be available in the queue
+            [text, end_of_segment] = await self.queue.get()
+
+            if self.fragment_merger is not None:
+                request = await self._merge_fragments(text, end_of_segment)
+                if request is None:
+                    # flushed while merging
+                    continue
+                text, end_of_segment = request
+                self.fragment_merger.on_request_sent(text)
+
+            try:
+                self.current_task = asyncio.create_task(
+                    self.on_request_tts(ten_env, text, end_of_segment)
+                )
+                await self.current_task  # Wait for the current task to finish or be cancelled
+            except asyncio.CancelledError:
+                ten_env.log_info(f"Task cancelled: {text}")
+            except Exception as err:
+                ten_env.log_error(f"Task failed: {text}, err: {traceback.format_exc()}")
+
+    async def _merge_fragments(
+        self, text: str, end_of_segment: bool
+    ) -> tuple[str, bool] | None:
+        """Merge the fragments following text while the audio to play allows."""
+        merger = self.fragment_merger
+        request = merger.add(text, end_of_segment)
+        while request is None:
+            timeout = merger.wait_timeout()
+            item = None if timeout is None else await self.queue.get(timeout)
+            if item is None:
+                return merger.take()
+            request = merger.add(*item)
+        return request
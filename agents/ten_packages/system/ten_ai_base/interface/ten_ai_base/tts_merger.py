@@ -0,0 +1,153 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import time
+from typing import Callable, Optional
+
+PROPERTY_MERGE_FRAGMENTS = "merge_fragments"
+PROPERTY_MERGE_MIN_CHARS = "merge_min_chars"
+PROPERTY_MERGE_MARGIN_MS = "merge_margin_ms"
+PROPERTY_MERGE_TTFB_MS = "merge_ttfb_ms"
+
+# the int properties and the merger argument each sets
+MERGER_PROPERTIES = {
+    PROPERTY_MERGE_MIN_CHARS: "min_chars",
+    PROPERTY_MERGE_MARGIN_MS: "margin_ms",
+    PROPERTY_MERGE_TTFB_MS: "ttfb_ms",
+}
+
+
+class TTSFragmentMerger:
+    """
+    Merge the short fragments the LLM sentence splitters emit, like "OK," or
+    "Sure.", into fewer TTS requests, each of which costs a vendor round trip
+    and an audible seam.
+
+    Nothing is held while nothing is playing: the first fragment of a turn
+    goes out at once. After that fragments are merged until min_chars are
+    pending, the end of the segment comes, or the audio still to play, the
+    audio received plus the estimate of the requests in flight, gets down to
+    the time to first audio of a request plus margin_ms. The time to first
+    audio is taken as its moving average plus twice its mean deviation, so a
+    slow response is covered as well, much like a TCP retransmission timeout.
+
+    The merger only keeps the estimates, the caller feeds it with
+    on_request_sent and on_audio and sends out what add and take return.
+    """
+
+    def __init__(
+        self,
+        min_chars: int = 30,
+        margin_ms: float = 150,
+        ttfb_ms: float = 300,
+        chars_per_second: float = 15,
+        smoothing: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.min_chars = min_chars
+        self.margin = margin_ms / 1000
+        self.chars_per_second = chars_per_second
+        self.smoothing = smoothing
+        self.clock = clock
+
+        self.ttfb = ttfb_ms / 1000
+        """Moving average of the time to first audio of a request."""
+        self.ttfb_deviation = self.ttfb / 4
+
+        self.pending: list[str] = []
+        self.end_of_turn = True
+        self.played_until = 0.0
+        self.projected_until = 0.0
+        self.sent_at: Optional[float] = None
+
+        self.fragments = 0
+        self.requests = 0
+
+    def reset(self) -> None:
+        """Drop the pending text and the audio to play, e.g. on flush."""
+        self.pending.clear()
+        self.end_of_turn = True
+        self.played_until = 0.0
+        self.projected_until = 0.0
+        self.sent_at = None
+
+    def add(self, text: str, end_of_segment: bool) -> Optional[tuple[str, bool]]:
+        """Add a fragment, returns the request to send now or None to hold it."""
+        self.fragments += 1
+        self.pending.append(text)
+        if (
+            end_of_segment
+            or self.end_of_turn
+            or self.remaining() <= 0
+            or sum(len(t) for t in self.pending) >= self.min_chars
+        ):
+            return self.take(end_of_segment)
+        return None
+
+    def take(self, end_of_segment: bool = False) -> Optional[tuple[str, bool]]:
+        """The pending text as one request, None if there is none."""
+        if not self.pending:
+            return None
+        text = "".join(self.pending)
+        self.pending.clear()
+        self.end_of_turn = end_of_segment
+        self.requests += 1
+        return text, end_of_segment
+
+    def wait_timeout(self) -> Optional[float]:
+        """Seconds the pending text can wait for more, None if nothing is pending."""
+        if not self.pending:
+            return None
+        return max(0.0, self.remaining() - self.expected_ttfb() - self.margin)
+
+    def expected_ttfb(self) -> float:
+        return self.ttfb + 2 * self.ttfb_deviation
+
+    def remaining(self) -> float:
+        """Seconds of audio still to play, including the requests in flight."""
+        return max(self.played_until, self.projected_until) - self.clock()
+
+    def on_request_sent(self, text: str) -> None:
+        now = self.clock()
+        if self.sent_at is None:
+            self.sent_at = now
+        # its audio is expected to start after the usual time to first audio,
+        # not before the audio already expected is played
+        start = max(self.projected_until, self.played_until, now + self.ttfb)
+        self.projected_until = start + len(text) / self.chars_per_second
+
+    def on_audio(self, duration: float) -> None:
+        """Audio of duration seconds was sent out to play."""
+        now = self.clock()
+        if self.sent_at is not None:
+            error = now - self.sent_at - self.ttfb
+            self.ttfb += self.smoothing * error
+            self.ttfb_deviation += self.smoothing * (abs(error) - self.ttfb_deviation)
+            self.sent_at = None
+        self.played_until = max(self.played_until, now) + duration
+
+    def metrics(self) -> dict:
+        return {
+            "fragments": self.fragments,
+            "requests": self.requests,
+            "ttfb_ms": round(self.ttfb * 1000),
+            "ttfb_deviation_ms": round(self.ttfb_deviation * 1000),
+        }
+
+
+def fragment_merger_from_properties(properties: dict) -> Optional[TTSFragmentMerger]:
+    """
+    The merger set by the properties of an extension, None if merge_fragments
+    is false. Missing properties keep the defaults of the merger.
+    """
+    if not properties.get(PROPERTY_MERGE_FRAGMENTS, True):
+        return None
+    return TTSFragmentMerger(
+        **{
+            arg: properties[key]
+            for key, arg in MERGER_PROPERTIES.items()
+            if key in properties
+        }
+    )
@@ -0,0 +1,75 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Benchmark payload size and encode + decode time of embeddings sent between
+extensions, JSON text as today against the float32 and float16 buffers.
+
+    python tests/bench_embedding_codec.py [--dims 1024 1536] [--batch 5]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "interface"))
+
+from ten_ai_base.embedding import (  # noqa: E402
+    EMBEDDING_FORMAT_FLOAT16,
+    EMBEDDING_FORMAT_FLOAT32,
+    decode_embeddings,
+    encode_embeddings,
+)
+
+
+def json_round_trip(vectors):
+    payload = json.dumps([{"text_index": i, "embedding": v} for i, v in enumerate(vectors)])
+    decoded = [record["embedding"] for record in json.loads(payload)]
+    return payload, decoded
+
+
+def binary_round_trip(fmt):
+    def round_trip(vectors):
+        payload = encode_embeddings(vectors, fmt)
+        return payload, decode_embeddings(payload)
+
+    return round_trip
+
+
+def measure(round_trip, vectors, rounds):
+    payload, _ = round_trip(vectors)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        round_trip(vectors)
+    elapsed = time.perf_counter() - start
+    return len(payload), elapsed / rounds / len(vectors) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dims", type=int, nargs="+", default=[1024, 1536])
+    parser.add_argument("--batch", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    modes = [
+        ("json", json_round_trip),
+        (EMBEDDING_FORMAT_FLOAT32, binary_round_trip(EMBEDDING_FORMAT_FLOAT32)),
+        (EMBEDDING_FORMAT_FLOAT16, binary_round_trip(EMBEDDING_FORMAT_FLOAT16)),
+    ]
+    rng = random.Random(0)
+    print(f"{args.batch} vectors per message, encode + decode")
+    print(f"{'dim':>6}{'format':>10}{'bytes/vector':>14}{'us/vector':>12}")
+    for dim in args.dims:
+        vectors = [[rng.uniform(-0.1, 0.1) for _ in range(dim)] for _ in range(args.batch)]
+        for name, round_trip in modes:
+            size, us = measure(round_trip, vectors, args.rounds)
+            print(f"{dim:>6}{name:>10}{size / args.batch:>14.0f}{us:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Benchmark CPU time and buffer copies per second of the frame capture modes
+with a 30 fps 720p RGBA stream and one tool call per simulated minute.
+
+    python tests/bench_frame_capture.py [--seconds 120] [--width 1280] [--height 720]
+"""
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "interface"))
+
+from ten_ai_base.frame_capture import CAPTURE_MODES, VideoFrameCapturer  # noqa: E402
+
+FPS = 30
+TOOL_CALL_INTERVAL_S = 60
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class FakeVideoFrame:
+    """Mimics ten.VideoFrame, whose get_buf() returns a fresh copy of the buffer."""
+
+    def __init__(self, buf: bytes, width: int, height: int, timestamp: int):
+        self._buf = buf
+        self._width = width
+        self._height = height
+        self._timestamp = timestamp
+
+    def get_buf(self) -> bytearray:
+        return bytearray(self._buf)
+
+    def get_width(self) -> int:
+        return self._width
+
+    def get_height(self) -> int:
+        return self._height
+
+    def get_timestamp(self) -> int:
+        return self._timestamp
+
+
+async def run_mode(mode: str, seconds: int, width: int, height: int) -> dict:
+    clock = SimulatedClock()
+    capturer = VideoFrameCapturer(mode=mode, clock=clock.monotonic)
+    raw = bytes(width * height * 4)
+    frame_interval = 1 / FPS
+    tool_calls = 0
+    pending = None
+
+    tracemalloc.start()
+    cpu_start = time.process_time()
+    for i in range(seconds * FPS):
+        clock.now = i * frame_interval
+
+        if pending is None and i % (TOOL_CALL_INTERVAL_S * FPS) == FPS:
+            pending = asyncio.ensure_future(capturer.capture())
+            await asyncio.sleep(0)
+
+        capturer.on_video_frame(FakeVideoFrame(raw, width, height, int(clock.now * 1000)))
+
+        if pending is not None:
+            await asyncio.sleep(0)
+            if pending.done():
+                assert pending.result() is not None
+                tool_calls += 1
+                pending = None
+    cpu = time.process_time() - cpu_start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "mode": mode,
+        "cpu_ms_per_s": cpu * 1000 / seconds,
+        "copies_per_s": capturer.frames_copied / seconds,
+        "copied_mb_per_s": capturer.frames_copied * len(raw) / seconds / 1e6,
+        "peak_mb": peak / 1e6,
+        "tool_calls": tool_calls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=int, default=120)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+
+    print(
+        f"{args.width}x{args.height} RGBA @ {FPS} fps, {args.seconds}s simulated, "
+        f"1 tool call / {TOOL_CALL_INTERVAL_S}s"
+    )
+    print(
+        f"{'mode':<12}{'cpu ms/s':>10}{'copies/s':>10}{'MB/s':>10}{'peak MB':>10}{'calls':>7}"
+    )
+    for mode in CAPTURE_MODES:
+        r = asyncio.run(run_mode(mode, args.seconds, args.width, args.height))
+        print(
+            f"{r['mode']:<12}{r['cpu_ms_per_s']:>10.2f}{r['copies_per_s']:>10.2f}"
+            f"{r['copied_mb_per_s']:>10.1f}{r['peak_mb']:>10.1f}{r['tool_calls']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
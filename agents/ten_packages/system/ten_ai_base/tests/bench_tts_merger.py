@@ -0,0 +1,160 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+"""
+Offline simulation of the TTS request queue of AsyncTTSBaseExtension, every
+fragment requested as it comes against the fragments merged by
+TTSFragmentMerger. The LLM streams answers at --llm-cps characters a second
+after --llm-first-ms, split into fragments on every comma and full stop. The
+vendor answers a request after a time to first audio drawn around --ttfb-ms,
+synthesizes --speed times faster than real time and takes the next request
+once the audio of this one is in, as on_request_tts does. The audio plays at
+--speech-cps characters a second; the gap is the silence at the seam between
+two requests.
+
+    python tests/bench_tts_merger.py [--turns 2000] [--ttfb-ms 150 300 600]
+"""
+import argparse
+import random
+import re
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "interface"))
+
+from ten_ai_base.tts_merger import TTSFragmentMerger  # noqa: E402
+
+ANSWERS = [
+    "Sure. I can help with that. First, open the settings, then choose the account tab.",
+    "OK, got it. Your meeting is moved to Thursday, at three in the afternoon.",
+    "Yes! That works. Anything else?",
+    "Hmm, let me think. The fastest route is the highway, it should take about twenty minutes.",
+    "No problem. I have added milk, eggs, and bread to your list.",
+    "Well, it depends. If you want something light, try the salad, otherwise the pasta is great.",
+    "Right. The weather today is sunny, with a high of twenty four degrees.",
+    "Of course. Here is a short summary: sales grew, costs fell, and the margin improved.",
+]
+
+SPLIT = re.compile(r"(?<=[,.!?:;])")
+
+
+def fragments_of(answer, args, rng):
+    """The fragments of an answer and when the LLM gives them, seconds into the turn."""
+    parts = [p for p in SPLIT.split(answer) if p.strip()]
+    fragments, emitted, t = [], 0, args.llm_first_ms / 1000
+    for i, part in enumerate(parts):
+        emitted += len(part)
+        arrival = t + emitted / args.llm_cps * rng.uniform(0.8, 1.2)
+        fragments.append((arrival, part, i == len(parts) - 1))
+    return fragments
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def simulate_turn(fragments, merger, clock, ttfb_ms, args, rng):
+    """Returns the requests, the first audio and the gaps between requests of a turn."""
+    i, free, play_end, first_audio, gaps, requests = 0, 0.0, None, 0.0, [], 0
+    while i < len(fragments):
+        t = max(free, fragments[i][0])
+        clock.now = t
+        _, text, end_of_segment = fragments[i]
+        i += 1
+        if merger is not None:
+            request = merger.add(text, end_of_segment)
+            while request is None:
+                deadline = t + merger.wait_timeout()
+                if i < len(fragments) and fragments[i][0] <= deadline:
+                    t = clock.now = max(t, fragments[i][0])
+                    request = merger.add(*fragments[i][1:])
+                    i += 1
+                else:
+                    t = clock.now = deadline
+                    request = merger.take()
+            text = request[0]
+            merger.on_request_sent(text)
+
+        requests += 1
+        latency = ttfb_ms / 1000 * rng.lognormvariate(0, args.jitter)
+        duration = len(text) / args.speech_cps
+        audio_at = t + latency
+        if play_end is None:
+            first_audio, start = audio_at, audio_at
+        else:
+            start = max(play_end, audio_at)
+            gaps.append((start - play_end) * 1000)
+        play_end = start + duration
+        if merger is not None:
+            clock.now = audio_at
+            merger.on_audio(duration)
+        free = audio_at + duration / args.speed
+    return requests, first_audio * 1000, gaps
+
+
+def bench(ttfb_ms, merge, args):
+    rng = random.Random(args.seed)
+    clock = Clock()
+    merger = (
+        TTSFragmentMerger(min_chars=args.min_chars, ttfb_ms=ttfb_ms, clock=clock)
+        if merge
+        else None
+    )
+    requests, ttfbs, gaps, stalled = 0, [], [], []
+    for turn in range(args.turns):
+        fragments = fragments_of(ANSWERS[turn % len(ANSWERS)], args, rng)
+        if merger is not None:
+            merger.reset()
+        clock.now = 0.0
+        turn_requests, ttfb, turn_gaps = simulate_turn(
+            fragments, merger, clock, ttfb_ms, args, rng
+        )
+        requests += turn_requests
+        ttfbs.append(ttfb)
+        gaps.extend(turn_gaps)
+        stalled.append(sum(turn_gaps))
+    return requests / args.turns, ttfbs, gaps, stalled
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--ttfb-ms", type=float, nargs="+", default=[150, 300, 600])
+    parser.add_argument("--jitter", type=float, default=0.35, help="sigma of the log ttfb")
+    parser.add_argument("--speed", type=float, default=4, help="synthesis over real time")
+    parser.add_argument("--speech-cps", type=float, default=15)
+    parser.add_argument("--llm-first-ms", type=float, default=300)
+    parser.add_argument("--llm-cps", type=float, default=120)
+    parser.add_argument("--min-chars", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(
+        f"{'ttfb':>6}  {'mode':<10}{'requests':>9}{'ttfb p50':>10}"
+        f"{'gap p95':>9}{'max':>7}{'stalled/turn':>14}{'p95':>7}"
+    )
+    for ttfb_ms in args.ttfb_ms:
+        for mode in ("fragment", "merged"):
+            requests, ttfbs, gaps, stalled = bench(ttfb_ms, mode == "merged", args)
+            print(
+                f"{ttfb_ms:>4.0f}ms  {mode:<10}{requests:>9.1f}"
+                f"{statistics.median(ttfbs):>8.0f}ms{percentile(gaps, 0.95):>7.0f}ms"
+                f"{max(gaps):>5.0f}ms{statistics.mean(stalled):>12.0f}ms"
+                f"{percentile(stalled, 0.95):>5.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
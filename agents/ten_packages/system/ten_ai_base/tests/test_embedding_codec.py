@@ -0,0 +1,88 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import json
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "interface"))
+
+from ten_ai_base.embedding import (  # noqa: E402
+    EMBEDDING_FORMAT_FLOAT16,
+    EMBEDDING_FORMAT_FLOAT32,
+    decode_embedding,
+    decode_embeddings,
+    embedding_format_of,
+    embedding_header,
+    encode_embedding,
+    encode_embeddings,
+)
+
+
+def random_vectors(count, dim):
+    rng = random.Random(count * 1000 + dim)
+    return [[rng.uniform(-1, 1) for _ in range(dim)] for _ in range(count)]
+
+
+def test_float32_round_trip():
+    vectors = random_vectors(5, 1536)
+    buf = encode_embeddings(vectors, EMBEDDING_FORMAT_FLOAT32)
+
+    assert len(buf) == 12 + 5 * 1536 * 4
+    assert len(buf) < len(json.dumps(vectors)) / 4
+    assert embedding_header(buf) == (EMBEDDING_FORMAT_FLOAT32, 5, 1536)
+    decoded = decode_embeddings(buf)
+    assert len(decoded) == 5
+    for v, d in zip(vectors, decoded):
+        assert max(abs(a - b) for a, b in zip(v, d)) < 1e-7
+
+
+def test_float16_round_trip():
+    vector = random_vectors(1, 1024)[0]
+    buf = encode_embedding(vector, EMBEDDING_FORMAT_FLOAT16)
+
+    assert len(buf) == 12 + 1024 * 2
+    decoded = decode_embedding(buf)
+    assert max(abs(a - b) for a, b in zip(vector, decoded)) < 1e-3
+
+
+def test_empty_batch():
+    buf = encode_embeddings([])
+    assert embedding_header(buf) == (EMBEDDING_FORMAT_FLOAT32, 0, 0)
+    assert decode_embeddings(buf) == []
+
+
+def test_invalid_input_rejected():
+    with pytest.raises(ValueError):
+        encode_embeddings([[1.0, 2.0], [3.0]])
+    with pytest.raises(ValueError):
+        encode_embeddings([[1.0]], "int8")
+
+    buf = encode_embeddings(random_vectors(2, 8))
+    with pytest.raises(ValueError):
+        decode_embeddings(buf[:-1])
+    with pytest.raises(ValueError):
+        decode_embeddings(b"EV")
+    with pytest.raises(ValueError):
+        decode_embeddings(json.dumps([1.0, 2.0]).encode())
+    with pytest.raises(ValueError):
+        decode_embedding(buf)
+
+
+def test_format_of_cmd():
+    class FakeCmd:
+        def __init__(self, props):
+            self.props = props
+
+        def get_property_string(self, key):
+            if key not in self.props:
+                raise Exception(f"property {key} not found")
+            return self.props[key]
+
+    assert embedding_format_of(FakeCmd({})) == ""
+    assert embedding_format_of(FakeCmd({"embedding_format": "float16"})) == "float16"
@@ -0,0 +1,166 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "interface"))
+
+from ten_ai_base.frame_capture import (  # noqa: E402
+    CAPTURE_MODE_EVERY_FRAME,
+    CAPTURE_MODE_ON_DEMAND,
+    CAPTURE_MODE_PERIODIC,
+    VideoFrameCapturer,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class VideoFrame:
+    def __init__(self, timestamp: int):
+        self.timestamp = timestamp
+        self.copies = 0
+
+    def get_buf(self) -> bytearray:
+        self.copies += 1
+        return bytearray(f"frame {self.timestamp}".encode())
+
+    def get_width(self) -> int:
+        return 2
+
+    def get_height(self) -> int:
+        return 1
+
+    def get_timestamp(self) -> int:
+        return self.timestamp
+
+
+def make_capturer(mode, **kwargs):
+    clock = Clock()
+    kwargs.setdefault("snapshot_interval_ms", 1000)
+    kwargs.setdefault("capture_timeout_ms", 100)
+    return VideoFrameCapturer(mode=mode, clock=clock, **kwargs), clock
+
+
+def feed(capturer, clock, timestamps, interval=1 / 30):
+    frames = []
+    for timestamp in timestamps:
+        clock.now += interval
+        frame = VideoFrame(timestamp)
+        capturer.on_video_frame(frame)
+        frames.append(frame)
+    return frames
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        VideoFrameCapturer(mode="sometimes")
+
+
+def test_every_frame_copies_each_frame():
+    async def main():
+        capturer, clock = make_capturer(CAPTURE_MODE_EVERY_FRAME)
+        frames = feed(capturer, clock, range(5))
+        assert [f.copies for f in frames] == [1] * 5
+        assert capturer.frames_copied == 5
+
+        # the latest copy is returned without waiting for the next frame
+        frame = await asyncio.wait_for(capturer.capture(), 0.01)
+        assert frame.timestamp == 4
+        assert frame.data == bytearray(b"frame 4")
+        assert (frame.width, frame.height) == (2, 1)
+
+    asyncio.run(main())
+
+
+def test_on_demand_copies_only_the_frame_after_a_capture():
+    async def main():
+        capturer, clock = make_capturer(CAPTURE_MODE_ON_DEMAND)
+        feed(capturer, clock, range(30))
+        assert capturer.frames_seen == 30
+        assert capturer.frames_copied == 0
+        assert capturer.last_frame_timestamp == 29
+
+        pending = asyncio.ensure_future(capturer.capture())
+        await asyncio.sleep(0)
+        assert not pending.done()
+        frames = feed(capturer, clock, [30, 31])
+        assert (await pending).timestamp == 30
+        assert [f.copies for f in frames] == [1, 0]
+        assert capturer.frames_copied == 1
+
+    asyncio.run(main())
+
+
+def test_on_demand_does_not_wait_for_a_stalled_stream():
+    async def main():
+        capturer, clock = make_capturer(CAPTURE_MODE_ON_DEMAND)
+        assert await asyncio.wait_for(capturer.capture(), 0.01) is None
+
+        feed(capturer, clock, [0])
+        clock.now += 1
+        assert await asyncio.wait_for(capturer.capture(), 0.01) is None
+
+    asyncio.run(main())
+
+
+def test_on_demand_falls_back_to_the_last_copy_after_the_timeout():
+    async def main():
+        capturer, clock = make_capturer(CAPTURE_MODE_ON_DEMAND, capture_timeout_ms=20)
+        feed(capturer, clock, [0])
+        pending = asyncio.ensure_future(capturer.capture())
+        await asyncio.sleep(0)
+        feed(capturer, clock, [1])
+        assert (await pending).timestamp == 1
+
+        # the stream stops right after a frame was seen
+        feed(capturer, clock, [2])
+        frame = await capturer.capture()
+        assert frame.timestamp == 1
+        assert capturer.frames_copied == 1
+
+    asyncio.run(main())
+
+
+def test_periodic_keeps_a_snapshot_per_interval():
+    async def main():
+        capturer, clock = make_capturer(CAPTURE_MODE_PERIODIC, snapshot_interval_ms=500)
+        # 2 seconds at 30 fps
+        feed(capturer, clock, range(60))
+        assert capturer.frames_copied == 4
+
+        # a fresh snapshot is returned at once
+        frame = await asyncio.wait_for(capturer.capture(), 0.01)
+        assert frame.timestamp < 60
+        assert capturer.frames_copied == 4
+
+    asyncio.run(main())
+
+
+def test_periodic_waits_for_a_new_frame_when_the_snapshot_is_stale():
+    async def main():
+        capturer, clock = make_capturer(CAPTURE_MODE_PERIODIC, snapshot_interval_ms=500)
+        feed(capturer, clock, [0])
+        frames = feed(capturer, clock, [1], interval=0.45)
+        assert frames[0].copies == 0
+
+        # the snapshot is stale, but frames are still flowing
+        clock.now += 0.07
+        pending = asyncio.ensure_future(capturer.capture())
+        await asyncio.sleep(0)
+        assert not pending.done()
+        feed(capturer, clock, [2], interval=0.01)
+        assert (await pending).timestamp == 2
+
+    asyncio.run(main())
@@ -0,0 +1,183 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "interface"))
+
+from ten_ai_base.routing import (  # noqa: E402
+    LLMModelProfile,
+    LLMRouteContext,
+    LLMRouter,
+    LLMRoutingPolicy,
+    SizeAwareRoutingPolicy,
+    register_routing_policy,
+)
+
+MODEL_DELAYS = {"small-model": 0.02, "large-model": 0.15}
+
+ROUTING_CONFIG = {
+    "policy": "size_aware",
+    "profiles": [
+        {"name": "small", "model": "small-model"},
+        {"name": "large", "model": "large-model"},
+    ],
+    "default_profile": "large",
+    "options": {"max_small_chars": 16},
+}
+
+
+class FakeOpenAI:
+    """OpenAI compatible streaming chat endpoint whose first token delay depends on the model."""
+
+    def __init__(self):
+        self.models = []
+        self.runner = None
+        self.url = ""
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._chat)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/v1/chat/completions"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    async def _chat(self, request: web.Request):
+        body = await request.json()
+        self.models.append(body["model"])
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await asyncio.sleep(MODEL_DELAYS[body["model"]])
+        for word in ["Sure", ", ", "done", "."]:
+            chunk = {"choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+
+async def _chat(session: aiohttp.ClientSession, url: str, profile: LLMModelProfile, text: str):
+    payload = {"model": profile.model, "messages": [{"role": "user", "content": text}], "stream": True}
+    start = time.time()
+    first_token = None
+    async with session.post(url, json=payload) as response:
+        async for line in response.content:
+            line = line.decode().strip()
+            if not line.startswith("data:") or line == "data: [DONE]":
+                continue
+            if first_token is None:
+                first_token = time.time() - start
+    return first_token, time.time() - start
+
+
+def test_size_aware_policy():
+    policy = SizeAwareRoutingPolicy(max_small_chars=16)
+    profiles = {}
+
+    def route(text, **kwargs):
+        context = LLMRouteContext.from_messages([{"role": "user", "content": text}], **kwargs)
+        return policy.route(context, profiles)
+
+    assert route("yes") == "small"
+    assert route("Thanks!") == "small"
+    assert route("Can you explain how a heat pump works in winter?") == "large"
+    assert route("search news", has_tools=True) == "large"
+    assert route("search news", has_tools=False) == "small"
+    assert route("ok", follow_up=True) == "large"
+
+
+def test_route_context_reads_last_user_text_part():
+    context = LLMRouteContext.from_messages(
+        [
+            {"role": "user", "content": "first"},
+            {"role": "assistant", "content": "answer"},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": "what is"},
+                    {"type": "image_url", "image_url": {"url": "data:"}},
+                    {"type": "text", "text": "this"},
+                ],
+            },
+        ]
+    )
+    assert context.text == "what is this"
+
+
+def test_custom_policy_is_pluggable():
+    class AlwaysLarge(LLMRoutingPolicy):
+        def route(self, context, profiles):
+            return "large"
+
+    register_routing_policy("always_large", AlwaysLarge)
+    router = LLMRouter.from_config({**ROUTING_CONFIG, "policy": "always_large", "options": {}})
+    assert router.select(LLMRouteContext(text="yes")).name == "large"
+
+
+def test_unknown_profile_falls_back_to_default():
+    class Unknown(LLMRoutingPolicy):
+        def route(self, context, profiles):
+            return "missing"
+
+    router = LLMRouter(
+        [LLMModelProfile(name="small", model="small-model"), LLMModelProfile(name="large", model="large-model")],
+        Unknown(),
+        default_profile="large",
+    )
+    assert router.select(LLMRouteContext(text="yes")).name == "large"
+
+
+def test_routing_against_fake_server():
+    utterances = [
+        "yes",
+        "stop",
+        "thanks",
+        "What should I cook tonight with rice and eggs?",
+        "ok",
+        "Tell me a short story about a fox and a crow.",
+    ]
+
+    async def run():
+        server = FakeOpenAI()
+        await server.start()
+        router = LLMRouter.from_config(ROUTING_CONFIG)
+        try:
+            async with aiohttp.ClientSession() as session:
+                for text in utterances:
+                    context = LLMRouteContext.from_messages([{"role": "user", "content": text}])
+                    profile = router.select(context)
+                    first_token, total = await _chat(session, server.url, profile, text)
+                    router.record(profile, first_token, total)
+        finally:
+            await server.stop()
+
+        assert server.models == [
+            "small-model",
+            "small-model",
+            "small-model",
+            "large-model",
+            "small-model",
+            "large-model",
+        ]
+        metrics = router.metrics()
+        assert metrics["small"]["count"] == 4
+        assert metrics["large"]["count"] == 2
+        assert metrics["small"]["ttft_p50_ms"] < metrics["large"]["ttft_p50_ms"]
+        assert metrics["large"]["ttft_p50_ms"] >= MODEL_DELAYS["large-model"] * 1000
+
+    asyncio.run(run())
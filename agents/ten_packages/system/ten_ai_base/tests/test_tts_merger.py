@@ -0,0 +1,127 @@
+#
+# This file is part of TEN Framework, an open source project.
+# Licensed under the Apache License, Version 2.0.
+# See the LICENSE file for more information.
+#
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "interface"))
+
+from ten_ai_base.tts_merger import (  # noqa: E402
+    TTSFragmentMerger,
+    fragment_merger_from_properties,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_merger(**kwargs):
+    clock = Clock()
+    kwargs.setdefault("min_chars", 20)
+    kwargs.setdefault("ttfb_ms", 200)
+    kwargs.setdefault("margin_ms", 100)
+    return TTSFragmentMerger(clock=clock, **kwargs), clock
+
+
+def test_first_fragment_of_a_turn_goes_out_at_once():
+    merger, _ = make_merger()
+    assert merger.add("OK,", False) == ("OK,", False)
+
+
+def test_fragments_are_merged_up_to_min_chars():
+    merger, _ = make_merger()
+    text, _ = merger.add("Sure.", False)
+    merger.on_request_sent(text)
+    merger.on_audio(2.0)
+
+    assert merger.add(" I can", False) is None
+    assert merger.add(" do that,", False) is None
+    assert merger.add(" right now.", False) == (" I can do that, right now.", False)
+    assert merger.metrics()["fragments"] == 4
+    assert merger.metrics()["requests"] == 2
+
+
+def test_end_of_segment_sends_the_pending_text_and_ends_the_turn():
+    merger, _ = make_merger()
+    merger.on_request_sent(merger.add("Hi.", False)[0])
+    merger.on_audio(2.0)
+
+    assert merger.add(" Bye.", True) == (" Bye.", True)
+    # the next turn starts at once again
+    assert merger.add("Next.", False) == ("Next.", False)
+
+
+def test_wait_timeout_shrinks_as_the_audio_plays():
+    merger, clock = make_merger()
+    merger.on_request_sent(merger.add("Sure.", False)[0])
+    clock.now += 0.2
+    merger.on_audio(1.0)
+    assert merger.add(" I", False) is None
+
+    budget = 1.0 - merger.expected_ttfb() - 0.1
+    assert merger.wait_timeout() == pytest.approx(budget)
+    clock.now += budget - 0.1
+    assert merger.wait_timeout() == pytest.approx(0.1)
+    clock.now += 0.2
+    assert merger.wait_timeout() == 0
+    assert merger.take() == (" I", False)
+    assert merger.wait_timeout() is None
+
+
+def test_requests_in_flight_count_as_audio_to_play():
+    merger, _ = make_merger(chars_per_second=10)
+    merger.on_request_sent(merger.add("Of course, let me see.", False)[0])
+    # no audio yet, 2.2s of it expected 0.2s from now
+    assert merger.add(" Well,", False) is None
+    assert merger.wait_timeout() == pytest.approx(0.2 + 2.2 - merger.expected_ttfb() - 0.1)
+
+
+def test_nothing_is_held_once_the_audio_played():
+    merger, clock = make_merger()
+    merger.on_request_sent(merger.add("Sure.", False)[0])
+    merger.on_audio(0.5)
+    clock.now += 1.0
+    assert merger.add(" Well,", False) == (" Well,", False)
+
+
+def test_ttfb_estimate_follows_the_requests():
+    merger, clock = make_merger(ttfb_ms=200, smoothing=0.5)
+    merger.on_request_sent(merger.add("Sure.", False)[0])
+    clock.now += 0.6
+    merger.on_audio(1.0)
+    assert merger.metrics()["ttfb_ms"] == 400
+    # the deviation grows with the surprise, from 50ms to (50 + 400) / 2
+    assert merger.metrics()["ttfb_deviation_ms"] == 225
+    assert merger.expected_ttfb() == pytest.approx(0.85)
+
+
+def test_reset_drops_the_pending_text():
+    merger, _ = make_merger()
+    merger.on_request_sent(merger.add("Sure.", False)[0])
+    merger.on_audio(2.0)
+    assert merger.add(" I", False) is None
+
+    merger.reset()
+    assert merger.take() is None
+    assert merger.add("New turn.", False) == ("New turn.", False)
+
+
+def test_merger_from_properties():
+    assert fragment_merger_from_properties({"merge_fragments": False}) is None
+
+    merger = fragment_merger_from_properties({})
+    assert (merger.min_chars, merger.margin, merger.ttfb) == (30, 0.15, 0.3)
+
+    merger = fragment_merger_from_properties(
+        {"merge_fragments": True, "merge_min_chars": 10, "merge_ttfb_ms": 500}
+    )
+    assert (merger.min_chars, merger.margin, merger.ttfb) == (10, 0.15, 0.5)